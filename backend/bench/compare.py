@@ -0,0 +1,71 @@
+"""
+İki benchmark sonucunu karşılaştırır.
+
+    python -m bench.compare bench-results/old.json bench-results/new.json [--threshold 10]
+
+Gecikme/süre metriklerinde artış, throughput metriklerinde (…_per_sec) düşüş gerileme sayılır.
+Eşiği (%) aşan gerileme varsa çıkış kodu 1 olur (CI'da kullanılabilir).
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+# Karşılaştırmaya girmeyen sayaç/konfigürasyon alanları
+_SKIP = {"n", "students", "jobs", "questions", "concurrency", "job_concurrency", "llm_max_concurrency",
+         "subscribers", "fanout", "messages_per_subscriber", "payload_bytes", "delivered", "ws_messages",
+         "key_bytes", "student_bytes_mean", "retries", "rate_limited", "failed_questions", "uploads", "upload_mb",
+         "trimmed_tokens", "agreement_n", "compress_min_bytes"}
+
+
+def _flatten(d: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for k, v in d.items():
+        path = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            yield from _flatten(v, path)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool) and k not in _SKIP:
+            yield path, float(v)
+
+
+def _higher_is_better(path: str) -> bool:
+    return path.rsplit(".", 1)[-1].endswith("_per_sec")
+
+
+def compare(old: Dict, new: Dict, threshold: float) -> int:
+    a = dict(_flatten({"stages": old.get("stages", {}), "memory": old.get("memory", {})}))
+    b = dict(_flatten({"stages": new.get("stages", {}), "memory": new.get("memory", {})}))
+    regressions = 0
+    print(f"{'metric':<48} {'old':>12} {'new':>12} {'delta':>9}")
+    for path in sorted(a.keys() & b.keys()):
+        x, y = a[path], b[path]
+        delta = ((y - x) / x * 100.0) if x else 0.0
+        worse = -delta if _higher_is_better(path) else delta
+        flag = ""
+        # Çok küçük mutlak değerlerdeki (ör. 0.01 ms) gürültüyü yok say
+        if worse > threshold and max(abs(x), abs(y)) >= 0.5:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{path:<48} {x:>12.3f} {y:>12.3f} {delta:>+8.1f}%{flag}")
+    for side, only in (("old", a.keys() - b.keys()), ("new", b.keys() - a.keys())):
+        for path in sorted(only):
+            print(f"{path:<48} (only in {side})")
+    print(f"\nold: {old.get('meta', {}).get('git', {}).get('commit')}  new: {new.get('meta', {}).get('git', {}).get('commit')}")
+    print(f"{regressions} regression(s) over {threshold:.0f}%")
+    return 1 if regressions else 0
+
+
+def main():
+    p = argparse.ArgumentParser(description="İki benchmark JSON sonucunu karşılaştır")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=10.0, help="gerileme eşiği (%)")
+    args = p.parse_args()
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    sys.exit(compare(old, new, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+Uçtan uca benchmark: sentetik PDF → ayrıştırma → değerlendirme (sahte LLM) → WebSocket yayını.
+
+Kullanım (backend/ dizininden):
+    python -m bench.run --students 50 --questions 20 --out bench-results/$(git rev-parse --short HEAD).json
+    python -m bench.compare bench-results/old.json bench-results/new.json
+
+Aşamalar (--stages ile seçilir, varsayılan hepsi):
+    parse   : parse_student_and_key (senkron, UploadFile) gecikmesi ve öğrenci/sn
+    ingest  : süreç havuzu üzerinden akışlı öğrenci ayrıştırma (PDF önbelleği kapalı); ilk sorunun hazır olma süresi dahil
+    upload  : büyük (--upload-mb) yüklemenin geçici dosyaya aktarılıp ayrıştırılması; yükleme başına tepe RSS
+    assess  : run_assessment_job, sahte LLM arka ucu ile; her işe bir WebSocket abonesi bağlanır
+              (iş başına WebSocket baytı ve replay tamponu; --trace-memory ile tracemalloc tepe belleği)
+    ws      : ws_manager.stream üzerinden yoğun mesaj yayını (fan-out) gecikmesi
+Pipeline günlükleri LOG_LEVEL (--log-level) ile üretilir; --verbose verilmedikçe /dev/null'a yönlendirilir.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from tempfile import SpooledTemporaryFile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Ayarlar import sırasında okunur; benchmark daima sahte arka uçla çalışır
+os.environ.setdefault("LLM_BACKEND", "mock")
+
+from fastapi import UploadFile  # noqa: E402
+from config import settings  # noqa: E402
+from helpers.log import setup_logging, shutdown_logging  # noqa: E402
+from helpers.ws_manager import ws_manager  # noqa: E402
+from helpers.job_store import MemoryJobStore, SQLiteJobStore, set_job_store  # noqa: E402
+from modules.llm_backend import MockBackend, set_backend  # noqa: E402
+from modules.scheduler import llm_scheduler  # noqa: E402
+from bench.stats import LoopLagMonitor, RssSampler, Timer, peak_rss_mb, percentiles  # noqa: E402
+from bench.synth import make_exam, make_pdf  # noqa: E402
+
+STAGES = ("parse", "ingest", "upload", "assess", "ws")
+
+
+class _FakeWebSocket:
+    """ws_manager.stream için send_text/send_bytes sağlayan alıcı; alış zamanlarını ve bayt sayısını kaydeder."""
+
+    def __init__(self, sent_at: Dict[Tuple[str, int], float]):
+        self._sent_at = sent_at
+        self.received = 0
+        self.bytes = 0
+        self.latencies_ms: List[float] = []
+
+    async def send_text(self, text: str):
+        self.bytes += len(text.encode("utf-8"))
+        self._receive(json.loads(text))
+
+    async def send_bytes(self, data: bytes):
+        # ?compress=1 aboneleri: zlib ile sıkıştırılmış JSON
+        self.bytes += len(data)
+        self._receive(json.loads(zlib.decompress(data)))
+
+    def _receive(self, msg: Dict):
+        self.received += 1
+        t = self._sent_at.get((msg.get("job_id"), msg.get("cursor")))
+        if t is not None:
+            self.latencies_ms.append((time.perf_counter() - t) * 1000.0)
+
+
+@contextlib.contextmanager
+def _track_publish():
+    """ws_manager.publish'i sarar: her mesajın yayın anını (job_id, cursor) ile kaydeder."""
+    sent_at: Dict[Tuple[str, int], float] = {}
+    original = ws_manager.publish
+
+    async def publish(job_id: str, message: dict):
+        t0 = time.perf_counter()
+        await original(job_id, message)
+        sent_at[(job_id, message.get("cursor"))] = t0
+
+    ws_manager.publish = publish
+    try:
+        yield sent_at
+    finally:
+        ws_manager.publish = original
+
+
+@contextlib.contextmanager
+def _quiet():
+    """stdout'u dosya tanımlayıcısı düzeyinde /dev/null'a yönlendirir (havuz süreçlerinin çıktısı dahil)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+async def _subscribe(job_id: str, ws: _FakeWebSocket) -> float:
+    """Aboneliği yürütür; dönen değer: stream'in kapandığı an. Sıkıştırma açıksa abone ikili çerçeve alır."""
+    await ws_manager.stream(job_id, ws, compressed=settings.WS_COMPRESS_MIN_BYTES > 0)
+    return time.perf_counter()
+
+
+# --- aşamalar ---
+
+def stage_parse(key_pdf: bytes, students: List[Tuple[str, bytes]]) -> Tuple[Dict, List[List[Dict]]]:
+    from modules.parser_agent import parse_student_and_key
+
+    lat: List[float] = []
+    parsed: List[List[Dict]] = []
+    with Timer() as total:
+        for fname, raw in students:
+            t0 = time.perf_counter()
+            questions = parse_student_and_key(
+                UploadFile(file=io.BytesIO(raw), filename=fname),
+                UploadFile(file=io.BytesIO(key_pdf), filename="key.pdf"),
+            )
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            parsed.append(questions)
+    return {
+        "students": len(students),
+        "elapsed_s": round(total.elapsed, 3),
+        "students_per_sec": round(len(students) / total.elapsed, 2) if total.elapsed else 0.0,
+        "latency_ms": percentiles(lat),
+    }, parsed
+
+
+async def stage_ingest(students: List[Tuple[str, bytes]], concurrency: int) -> Dict:
+    from modules.ingestion import iter_student_questions, get_pool, shutdown_pool
+
+    settings.PDF_CACHE_ENABLED = False
+    # Havuz/süreç başlatma maliyeti ölçüme girmesin
+    pool = get_pool()
+    await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(pool, os.getpid)
+                           for _ in range(pool._max_workers)))
+    sem = asyncio.Semaphore(max(1, concurrency))
+    lat: List[float] = []
+    first: List[float] = []
+
+    async def one(fname: str, raw: bytes):
+        async with sem:
+            t0 = time.perf_counter()
+            t_first = None
+            async for _ in iter_student_questions(raw, fname):
+                # İlk sorunun değerlendirmeye verilebildiği an
+                if t_first is None:
+                    t_first = time.perf_counter()
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            if t_first is not None:
+                first.append((t_first - t0) * 1000.0)
+
+    try:
+        with LoopLagMonitor() as lag, Timer() as total:
+            await asyncio.gather(*(one(f, r) for f, r in students))
+    finally:
+        shutdown_pool()
+    return {
+        "students": len(students),
+        "concurrency": concurrency,
+        "elapsed_s": round(total.elapsed, 3),
+        "students_per_sec": round(len(students) / total.elapsed, 2) if total.elapsed else 0.0,
+        "latency_ms": percentiles(lat),
+        "first_question_ms": percentiles(first),
+        "loop_lag_ms": lag.report(),
+    }
+
+
+async def stage_upload(count: int, size_mb: float, questions: int) -> Dict:
+    """
+    Yükleme yolu: multipart ayrıştırıcısının bıraktığı UploadFile (1 MB'a kadar bellekte, sonra disk)
+    → sınırlı geçici dosya (spool_upload) → yol üzerinden havuzda ayrıştırma. Her yükleme için API
+    sürecinin ve havuz işçilerinin tepe RSS artışı ayrı ayrı örneklenir.
+    """
+    from helpers.uploads import discard, spool_upload
+    from modules.ingestion import parse_student_bytes, get_pool, shutdown_pool
+
+    settings.PDF_CACHE_ENABLED = False
+    lines = [f"Soru {i}: soru {i}?\nCevap: cevap {i}" for i in range(1, questions + 1)]
+    payload = make_pdf(lines, filler_bytes=int(size_mb * 1024 * 1024))
+    settings.UPLOAD_MAX_BYTES = max(settings.UPLOAD_MAX_BYTES, len(payload))
+    pool = get_pool()
+    pids = await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(pool, os.getpid)
+                                  for _ in range(pool._max_workers)))
+    lat: List[float] = []
+    rss: List[float] = []
+    rss_children: List[float] = []
+    try:
+        for i in range(max(1, count)):
+            spooled = SpooledTemporaryFile(max_size=1024 * 1024)
+            spooled.write(payload)
+            upload = UploadFile(file=spooled, filename=f"upload_{i:04d}.pdf")
+            with RssSampler(pids=set(pids)) as sampler:
+                t0 = time.perf_counter()
+                path = await spool_upload(upload)
+                try:
+                    await parse_student_bytes(path, upload.filename)
+                finally:
+                    discard(path)
+                lat.append((time.perf_counter() - t0) * 1000.0)
+            await upload.close()
+            rss.append(sampler.peak_delta_mb)
+            rss_children.append(sampler.children_peak_delta_mb)
+    finally:
+        shutdown_pool()
+    return {
+        "uploads": len(lat),
+        "upload_mb": round(len(payload) / (1024 * 1024), 2),
+        "latency_ms": percentiles(lat),
+        "peak_rss_delta_mb": percentiles(rss),
+        "pool_peak_rss_delta_mb": percentiles(rss_children),
+    }
+
+
+async def stage_assess(parsed: List[List[Dict]], concurrency: int, trace_memory: bool = False) -> Dict:
+    from modules.orchestrator import run_assessment_job
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+    job_lat: List[float] = []
+    done_lat: List[float] = []
+    llm_meta = {"retries": 0, "rate_limited": 0, "failed_questions": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "trimmed_tokens": 0}
+    pre = {"skipped": 0, "decided": 0, "agree_n": 0, "abs_diff": 0.0, "within_1": 0.0}
+    sockets: List[_FakeWebSocket] = []
+    questions_total = sum(len(q) for q in parsed)
+
+    with _track_publish() as sent_at:
+        async def one(i: int, questions: List[Dict]):
+            async with sem:
+                job_id = f"bench-{i}"
+                ws = _FakeWebSocket(sent_at)
+                sockets.append(ws)
+                sub = asyncio.create_task(_subscribe(job_id, ws))
+                t0 = time.perf_counter()
+                summary = await run_assessment_job(job_id, questions)
+                meta = (summary or {}).get("meta") or {}
+                llm = meta.get("llm") or {}
+                batching = meta.get("batching") or {}
+                llm_meta["retries"] += llm.get("retries", 0)
+                llm_meta["rate_limited"] += llm.get("rate_limited", 0)
+                llm_meta["failed_questions"] += len(llm.get("failed_questions", []))
+                for k in ("prompt_tokens", "completion_tokens"):
+                    llm_meta[k] += llm.get(k, 0) + batching.get(k, 0)
+                llm_meta["trimmed_tokens"] += llm.get("trimmed_tokens", 0)
+                pg = meta.get("pregrade") or {}
+                pre["skipped"] += pg.get("skipped", 0)
+                pre["decided"] += pg.get("decided", 0)
+                agreement = pg.get("agreement") or {}
+                n = agreement.get("n", 0)
+                pre["agree_n"] += n
+                pre["abs_diff"] += agreement.get("mean_abs_diff", 0.0) * n
+                pre["within_1"] += agreement.get("within_1", 0.0) * n
+                t_done = time.perf_counter()
+                job_lat.append((t_done - t0) * 1000.0)
+                # İş bittikten sonra abonenin kapanmasına kadar geçen süre
+                done_lat.append((await sub - t_done) * 1000.0)
+
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            with LoopLagMonitor() as lag, Timer() as total:
+                await asyncio.gather(*(one(i, q) for i, q in enumerate(parsed)))
+            traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+    # Biten işlerin kanalları WS_CHANNEL_TTL_SECONDS boyunca tamponlarıyla tutulur
+    buffer_bytes = ws_manager.stats()["buffer_bytes"]
+
+    ws_lat = [x for ws in sockets for x in ws.latencies_ms]
+    if questions_total:
+        llm_meta["prompt_tokens_per_question"] = round(llm_meta["prompt_tokens"] / questions_total, 1)
+    # Ön değerlendirme: LLM'siz puanlanan oran ("on") / yerel kararın LLM puanıyla uyumu ("shadow")
+    pregrade = {
+        "mode": settings.PREGRADE_MODE,
+        "skip_rate": round(pre["skipped"] / questions_total, 3) if questions_total else 0.0,
+        "decided_rate": round(pre["decided"] / questions_total, 3) if questions_total else 0.0,
+    }
+    if pre["agree_n"]:
+        pregrade["agreement_n"] = pre["agree_n"]
+        pregrade["agreement_mean_abs_diff"] = round(pre["abs_diff"] / pre["agree_n"], 3)
+        pregrade["agreement_within_1"] = round(pre["within_1"] / pre["agree_n"], 3)
+    return {
+        "jobs": len(parsed),
+        "questions": questions_total,
+        "job_concurrency": concurrency,
+        "llm_max_concurrency": llm_scheduler.max_concurrency,
+        "elapsed_s": round(total.elapsed, 3),
+        "jobs_per_sec": round(len(parsed) / total.elapsed, 3) if total.elapsed else 0.0,
+        "questions_per_sec": round(questions_total / total.elapsed, 2) if total.elapsed else 0.0,
+        "job_latency_ms": percentiles(job_lat),
+        "ws_delivery_ms": percentiles(ws_lat),
+        "ws_close_after_done_ms": percentiles(done_lat),
+        "ws_messages": sum(ws.received for ws in sockets),
+        "ws": {
+            "progress_payload": settings.PROGRESS_PAYLOAD,
+            "compress_min_bytes": settings.WS_COMPRESS_MIN_BYTES,
+            "bytes_per_job": round(sum(ws.bytes for ws in sockets) / max(1, len(parsed))),
+            "replay_buffer_bytes_per_job": round(buffer_bytes / max(1, len(parsed))),
+        },
+        "llm": llm_meta,
+        "pregrade": pregrade,
+        "loop_lag_ms": lag.report(),
+        **({"traced_peak_kb_per_active_job": round(traced_peak / 1024 / max(1, min(concurrency, len(parsed))), 1)}
+           if trace_memory else {}),
+    }
+
+
+async def stage_ws(subscribers: int, messages: int, payload_bytes: int, fanout: int = 1) -> Dict:
+    """
+    `subscribers` aboneyi, her kanalda `fanout` abone olacak şekilde iş kanallarına dağıtır ve her
+    kanala `messages` adet mesaj yayınlar.
+    """
+    payload = {"text": "x" * payload_bytes}
+    fanout = max(1, fanout)
+    n_jobs = max(1, subscribers // fanout)
+    with _track_publish() as sent_at:
+        sockets = [_FakeWebSocket(sent_at) for _ in range(n_jobs * fanout)]
+        subs = [asyncio.create_task(_subscribe(f"ws-bench-{i % n_jobs}", ws)) for i, ws in enumerate(sockets)]
+        await asyncio.sleep(0)  # aboneler kanallara bağlansın
+
+        async def produce(i: int):
+            job_id = f"ws-bench-{i}"
+            for n in range(messages):
+                await ws_manager.publish(job_id, {"type": "progress", "job_id": job_id, "seq": n, "payload": payload})
+                await asyncio.sleep(0)
+            await ws_manager.mark_done(job_id)
+
+        with LoopLagMonitor() as lag, Timer() as total:
+            await asyncio.gather(*(produce(i) for i in range(n_jobs)))
+            await asyncio.gather(*subs)
+
+    lat = [x for ws in sockets for x in ws.latencies_ms]
+    delivered = sum(ws.received for ws in sockets)
+    return {
+        "subscribers": len(sockets),
+        "fanout": fanout,
+        "messages_per_subscriber": messages,
+        "payload_bytes": payload_bytes,
+        "delivered": delivered,
+        "elapsed_s": round(total.elapsed, 3),
+        "messages_per_sec": round(delivered / total.elapsed, 1) if total.elapsed else 0.0,
+        "delivery_ms": percentiles(lat),
+        "loop_lag_ms": lag.report(),
+    }
+
+
+# --- çalıştırıcı ---
+
+def _git_meta() -> Dict:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def _configure(args):
+    # Havuz süreçleri ayarları ortamdan okur
+    os.environ["LOG_LEVEL"] = settings.LOG_LEVEL = args.log_level.upper()
+    setup_logging()
+    settings.GRADE_CACHE_ENABLED = args.grade_cache
+    settings.GRADE_STREAMING = args.stream
+    settings.GRADE_BATCH_ENABLED = args.batch
+    settings.PREGRADE_MODE = args.pregrade
+    settings.PROGRESS_DELIVERY = args.delivery
+    settings.PROGRESS_PAYLOAD = args.progress_payload
+    settings.WS_COMPRESS_MIN_BYTES = max(0, args.ws_compress_min_bytes)
+    llm_scheduler.max_concurrency = max(1, args.llm_concurrency)
+    # İş deposu her koşuda boş başlar (geçici SQLite dosyası veya bellek)
+    if args.job_store == "sqlite":
+        set_job_store(SQLiteJobStore(os.path.join(tempfile.mkdtemp(prefix="bench-"), "jobs.sqlite3")))
+    else:
+        set_job_store(MemoryJobStore())
+    set_backend(MockBackend(
+        latency_ms=args.latency_ms,
+        dist=args.latency_dist,
+        sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rpm=0,
+        rate_limit_rate=0.0,
+        seed=args.seed,
+    ))
+
+
+async def _run_async(args, stages, students, parsed, report):
+    if "ingest" in stages:
+        report["stages"]["ingest"] = await stage_ingest(students, args.ingest_concurrency)
+    if "upload" in stages:
+        report["stages"]["upload"] = await stage_upload(args.upload_count, args.upload_mb, args.questions)
+    if "assess" in stages:
+        report["stages"]["assess"] = await stage_assess(parsed, args.job_concurrency, args.trace_memory)
+    if "ws" in stages:
+        report["stages"]["ws"] = await stage_ws(args.ws_subscribers, args.ws_messages, args.ws_payload_bytes,
+                                              args.ws_fanout)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    p = argparse.ArgumentParser(description="LLM-Exam-Evaluator uçtan uca benchmark")
+    p.add_argument("--students", type=int, default=20)
+    p.add_argument("--questions", type=int, default=10)
+    p.add_argument("--answer-words", type=int, nargs=2, default=(10, 80), metavar=("MIN", "MAX"))
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--stages", default=",".join(STAGES), help=f"virgülle ayrılmış: {','.join(STAGES)}")
+    p.add_argument("--out", help="JSON sonuç dosyası (verilmezse stdout)")
+    p.add_argument("--verbose", action="store_true", help="pipeline günlüklerini göster")
+    p.add_argument("--log-level", default=settings.LOG_LEVEL,
+                   help="pipeline günlük seviyesi (günlükleme maliyeti ölçüme dahildir)")
+    # sahte LLM
+    p.add_argument("--latency-ms", type=float, default=settings.MOCK_LLM_LATENCY_MS)
+    p.add_argument("--latency-dist", default=settings.MOCK_LLM_LATENCY_DIST)
+    p.add_argument("--latency-sigma", type=float, default=settings.MOCK_LLM_LATENCY_SIGMA)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    # eşzamanlılık ve özellikler
+    p.add_argument("--llm-concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    p.add_argument("--job-concurrency", type=int, default=4, help="aynı anda çalışan değerlendirme işi")
+    p.add_argument("--ingest-concurrency", type=int, default=4)
+    p.add_argument("--upload-mb", type=float, default=20.0, help="upload aşamasındaki PDF boyutu (MB)")
+    p.add_argument("--upload-count", type=int, default=5, help="upload aşamasındaki ardışık yükleme sayısı")
+    p.add_argument("--delivery", choices=("ordered", "as_completed"), default=settings.PROGRESS_DELIVERY)
+    p.add_argument("--progress-payload", choices=("full", "lean"), default=settings.PROGRESS_PAYLOAD,
+                   help="ilerleme mesajı içeriği (lean → metinsiz)")
+    p.add_argument("--ws-compress-min-bytes", type=int, default=settings.WS_COMPRESS_MIN_BYTES,
+                   help="bu boyuttan büyük WebSocket mesajlarını sıkıştır (0 → kapalı)")
+    p.add_argument("--trace-memory", action="store_true",
+                   help="assess aşamasında tracemalloc ile tepe bellek (yavaşlatır; süre metrikleri karşılaştırılmamalı)")
+    p.add_argument("--stream", action="store_true", help="akışlı değerlendirme (partial mesajları)")
+    p.add_argument("--batch", action="store_true", help="toplu (multi-question) değerlendirme")
+    p.add_argument("--pregrade", choices=("off", "shadow", "on"), default=settings.PREGRADE_MODE,
+                   help="yerel ön değerlendirme (shadow: LLM yine çağrılır, uyum ölçülür)")
+    p.add_argument("--grade-cache", action="store_true", help="değerlendirme önbelleğini açık bırak")
+    p.add_argument("--job-store", choices=("sqlite", "memory"), default="sqlite")
+    # ws aşaması
+    p.add_argument("--ws-subscribers", type=int, default=50)
+    p.add_argument("--ws-messages", type=int, default=200)
+    p.add_argument("--ws-payload-bytes", type=int, default=1024)
+    p.add_argument("--ws-fanout", type=int, default=1, help="iş kanalı başına abone sayısı")
+    args = p.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        p.error(f"bilinmeyen aşama: {', '.join(sorted(unknown))}")
+    _configure(args)
+
+    report: Dict = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "git": _git_meta(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "verbose")},
+        },
+        "stages": {},
+    }
+
+    sink = contextlib.nullcontext() if args.verbose else _quiet()
+    with sink:
+        with Timer() as t:
+            key_pdf, students = make_exam(args.students, args.questions, tuple(args.answer_words), args.seed)
+        report["stages"]["synth"] = {
+            "elapsed_s": round(t.elapsed, 3),
+            "key_bytes": len(key_pdf),
+            "student_bytes_mean": round(sum(len(r) for _, r in students) / max(1, len(students))),
+        }
+
+        # assess aşaması ayrıştırılmış soruları kullanır; parse seçilmese de bir kez ayrıştır
+        parse_report, parsed = stage_parse(key_pdf, students)
+        if "parse" in stages:
+            report["stages"]["parse"] = parse_report
+
+        asyncio.run(_run_async(args, stages, students, parsed, report))
+        # Kuyrukta kalan kayıtlar yönlendirme kalkmadan yazılsın
+        shutdown_logging()
+
+    report["memory"] = {"peak_rss_mb": peak_rss_mb(), "peak_rss_children_mb": peak_rss_mb(children=True)}
+
+    out = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+        print(f"[bench] results written to {args.out}")
+    else:
+        print(out)
+    return report
+
+
+if __name__ == "__main__":
+    main()
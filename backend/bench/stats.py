@@ -0,0 +1,123 @@
+"""Benchmark ölçüm yardımcıları: yüzdelikler, event-loop gecikmesi, bellek."""
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max/mean (ms cinsinden örnekler için)."""
+    if not samples:
+        return {"n": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    xs = sorted(samples)
+
+    def q(p: float) -> float:
+        # En yakın sıra yöntemi
+        idx = min(len(xs) - 1, max(0, int(round(p / 100.0 * len(xs) + 0.5)) - 1))
+        return round(xs[idx], 3)
+
+    return {
+        "n": len(xs),
+        "p50": q(50),
+        "p95": q(95),
+        "p99": q(99),
+        "max": round(xs[-1], 3),
+        "mean": round(sum(xs) / len(xs), 3),
+    }
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Sürecin (veya alt süreçlerin) en yüksek RSS değeri, MB."""
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 2)
+
+
+def current_rss_mb(pid: Optional[int] = None) -> float:
+    """Sürecin anlık RSS değeri, MB (/proc gerektirir; yoksa 0)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", "rb") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Blok süresince anlık RSS'i bir thread'de örnekler; `peak_delta_mb` başlangıca göre en yüksek artıştır.
+    ru_maxrss süreç ömrü boyunca tek bir tepe verdiğinden istek başına bellek bununla ölçülür.
+    `pids` verilirse (ör. havuz işçileri) onların toplam RSS'i ayrıca izlenir.
+    """
+
+    def __init__(self, interval: float = 0.002, pids: Iterable[int] = ()):
+        self.interval = interval
+        self.pids = list(pids)
+        self.peak_delta_mb = 0.0
+        self.children_peak_delta_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _children(self) -> float:
+        return sum(current_rss_mb(p) for p in self.pids)
+
+    def _run(self, base: float, children_base: float):
+        while True:
+            self.peak_delta_mb = max(self.peak_delta_mb, current_rss_mb() - base)
+            if self.pids:
+                self.children_peak_delta_mb = max(self.children_peak_delta_mb, self._children() - children_base)
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, args=(current_rss_mb(), self._children()), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+class LoopLagMonitor:
+    """
+    Event loop gecikmesini ölçer: `interval` aralıkla uyuyan bir görev, planlanandan ne kadar
+    geç uyandığını kaydeder. Loop'u bloklayan iş (senkron PDF ayrıştırma, print vb.) burada görünür.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append((loop.time() - t0 - self.interval) * 1000.0)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        if self._task:
+            self._task.cancel()
+
+    def report(self) -> Dict[str, float]:
+        return percentiles(self.samples)
+
+
+class Timer:
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.t0
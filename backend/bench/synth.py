@@ -0,0 +1,112 @@
+"""
+Benchmark için sentetik sınav PDF'leri (harici bağımlılık olmadan, düz PDF 1.4).
+
+Cevap anahtarı:   'Soru N: <soru>' + 'Cevap: <anahtar>'
+Öğrenci kağıdı:   'Adi Soyadi: ...' + her soru için 'Soru N: <soru>' + 'Cevap: <öğrenci cevabı>'
+Öğrenci cevapları anahtardan farklı oranlarda kelime alarak (boş, kısmi, tam, alakasız) üretilir.
+Metin Helvetica/WinAnsi ile yazıldığından yalnızca ASCII kullanılır.
+"""
+import random
+import textwrap
+from typing import List, Tuple
+
+_WORDS = (
+    "osmanli devlet 1299 yilinda kuruldu istanbul 1453 fethedildi sultan mehmet ordu donanma "
+    "ticaret yolu ipek baharat anadolu beylik selcuklu malazgirt 1071 savas antlasma lozan 1923 "
+    "cumhuriyet ilan edildi meclis ankara kurtulus milli mucadele reform tanzimat islahat ferman "
+    "mesrutiyet anayasa secim parti ekonomi tarim sanayi egitim harf devrimi kultur toplum"
+).split()
+
+_LINES_PER_PAGE = 52
+_WRAP = 90
+
+
+def _escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(lines: List[str], filler_bytes: int = 0) -> bytes:
+    """
+    Satır listesinden (gerekirse çok sayfalı) metin katmanlı bir PDF üretir.
+    filler_bytes > 0 ise taranmış sayfa görüntüsünü andıran, referans verilmeyen rastgele bir akış
+    nesnesi eklenir (büyük yükleme senaryoları için; metin çıkarmayı etkilemez).
+    """
+    wrapped: List[str] = []
+    for line in lines:
+        wrapped.extend(textwrap.wrap(line, _WRAP) or [""])
+    pages = [wrapped[i:i + _LINES_PER_PAGE] for i in range(0, len(wrapped), _LINES_PER_PAGE)] or [[""]]
+
+    objs: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objs.append(body)
+        return len(objs)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = len(objs) + 2 * len(pages) + 1
+    kids = []
+    for page_lines in pages:
+        ops = " ".join(f"({_escape(l)}) Tj T*" for l in page_lines)
+        content = f"BT /F1 10 Tf 40 800 Td 14 TL {ops} ET".encode("latin-1", "replace")
+        cid = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, cid, font)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    if filler_bytes > 0:
+        add(b"<< /Length %d >>\nstream\n" % filler_bytes + random.Random(filler_bytes).randbytes(filler_bytes)
+            + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, catalog, xref)
+    return bytes(out)
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def make_exam(n_students: int, n_questions: int, answer_words: Tuple[int, int] = (10, 80),
+              seed: int = 42) -> Tuple[bytes, List[Tuple[str, bytes]]]:
+    """
+    (anahtar PDF, [(dosya adı, öğrenci PDF)]) döndürür.
+    answer_words: anahtar/öğrenci cevabı kelime sayısı aralığı.
+    """
+    rng = random.Random(seed)
+    questions = [(f"{_sentence(rng, rng.randint(6, 14))}?", _sentence(rng, rng.randint(*answer_words)))
+                 for _ in range(n_questions)]
+
+    key_lines: List[str] = []
+    for i, (q, k) in enumerate(questions, start=1):
+        key_lines += [f"Soru {i}: {q}", f"Cevap: {k}", ""]
+    key_pdf = make_pdf(key_lines)
+
+    students = []
+    for s in range(1, n_students + 1):
+        lines = [f"Adi Soyadi: Ogrenci {s:04d}", ""]
+        for i, (q, k) in enumerate(questions, start=1):
+            kind = rng.random()
+            key_words = k.split()
+            if kind < 0.08:
+                ans = ""                                   # boş
+            elif kind < 0.15:
+                ans = "bilmiyorum"
+            elif kind < 0.3:
+                ans = k                                    # anahtarla aynı
+            elif kind < 0.4:
+                ans = _sentence(rng, rng.randint(*answer_words))   # alakasız
+            else:
+                keep = rng.uniform(0.3, 0.9)               # kısmi
+                ans = " ".join(w for w in key_words if rng.random() < keep) + " " + _sentence(rng, rng.randint(0, 15))
+            lines += [f"Soru {i}: {q}", f"Cevap: {ans.strip()}", ""]
+        students.append((f"student_{s:04d}.pdf", make_pdf(lines)))
+    return key_pdf, students
@@ -2,9 +2,185 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str | None = None
+    # OpenAI uyumlu başka bir uç nokta (örn. devtools/fake_openai_server.py) için
+    OPENAI_BASE_URL: str | None = None
     CORS_ORIGINS: list[str] = ["*"]
     APP_NAME: str = "Exam Evaluator API"
 
+    # Değerlendirme modeli ve arka ucu: "openai" | "mock" (yerel, deterministik; yük testi için)
+    LLM_BACKEND: str = "openai"
+    LLM_MODEL: str = "gpt-4o-mini"
+    LLM_TEMPERATURE: float = 0.2
+
+    # Mock arka uç davranışı
+    MOCK_LLM_LATENCY_MS: float = 800.0
+    MOCK_LLM_LATENCY_DIST: str = "lognormal"   # fixed | uniform | normal | lognormal | exponential
+    MOCK_LLM_LATENCY_SIGMA: float = 0.5
+    MOCK_LLM_ERROR_RATE: float = 0.0
+    MOCK_LLM_RATE_LIMIT_RPM: int = 0           # 0 → sınırsız
+    MOCK_LLM_RATE_LIMIT_RATE: float = 0.0      # rastgele 429 olasılığı
+    MOCK_LLM_SEED: int = 0
+
+    # Akış modu: model cevabı token token alınır ve 'partial' WS mesajları yayınlanır
+    GRADE_STREAMING: bool = False
+    GRADE_STREAM_MIN_INTERVAL_MS: int = 50
+
+    # Toplu değerlendirme: birden fazla soruyu (ve aynı sorudaki farklı öğrencileri) tek istekte paketler
+    GRADE_BATCH_ENABLED: bool = False
+    GRADE_BATCH_TOKEN_BUDGET: int = 6000
+    GRADE_BATCH_MAX_ITEMS: int = 12
+    GRADE_BATCH_WINDOW_MS: int = 30
+
+    # Değerlendirme prompt'u: sabit yönergeler önde (sağlayıcı önek önbelleği), değişken içerik sonda;
+    # soru/anahtar/öğrenci cevabı bu token bütçelerini aşarsa ortası kısaltılır (0 → sınırsız)
+    GRADE_PROMPT_QUESTION_MAX_TOKENS: int = 600
+    GRADE_PROMPT_KEY_MAX_TOKENS: int = 1200
+    GRADE_PROMPT_ANSWER_MAX_TOKENS: int = 1500
+
+    # Yerel ön değerlendirme (TF-IDF benzerliği, NumPy): "off" | "shadow" (karar yalnızca sonuca yazılır,
+    # model yine çağrılır) | "on" (boş / anahtarla birebir aynı / anahtarla hiç örtüşmeyen cevaplar
+    # modele gitmeden puanlanır). Cevaplar PREGRADE_WINDOW_MS penceresinde toplanıp tek geçişte karşılaştırılır.
+    # Varsayılan "shadow": bench uyum oranı (meta.pregrade.agreement) yeterli görülünce "on" yapılmalı
+    PREGRADE_MODE: str = "shadow"
+    PREGRADE_HIGH_THRESHOLD: float = 0.97
+    PREGRADE_LOW_THRESHOLD: float = 0.02
+    PREGRADE_WINDOW_MS: int = 5
+
+    # İlerleme yayını: "ordered" (soru sırasıyla) | "as_completed" (biten hemen gönderilir)
+    PROGRESS_DELIVERY: str = "ordered"
+    # İlerleme içeriği: "full" (soru/öğrenci/anahtar metinleri dahil) | "lean" (yalnızca kimlik + değerlendirme;
+    # metinler iş başına bir kez GET /api/jobs/{job_id}/questions ile alınır). İstekte progress_payload ile değişir.
+    PROGRESS_PAYLOAD: str = "full"
+
+    # LLM zamanlayıcı: tüm işler için aynı anda yürütülecek en fazla değerlendirme çağrısı
+    LLM_MAX_CONCURRENCY: int = 8
+    # İstemci tarafı hız sınırı (0 → bilinmiyor; sağlayıcının x-ratelimit-* başlıklarından öğrenilir)
+    LLM_RPM_LIMIT: int = 0
+    LLM_TPM_LIMIT: int = 0
+    # Geçici hatalarda (429, 5xx, zaman aşımı) jitter'lı üstel yeniden deneme
+    LLM_MAX_RETRIES: int = 5
+    LLM_RETRY_BASE_MS: int = 500
+    LLM_RETRY_MAX_MS: int = 20_000
+    LLM_CALL_TIMEOUT_SECONDS: float = 120.0
+    # LLM HTTP istemcisi (süreç başına tek havuz): en fazla bağlantı (0 → LLM_MAX_CONCURRENCY × 2), boşta tutulacak
+    # bağlantı (0 → hepsi) ve boştaki bağlantının ömrü; HTTP/2 (h2 paketi gerekir) tek bağlantıda çoklu istek taşır
+    LLM_HTTP_MAX_CONNECTIONS: int = 0
+    LLM_HTTP_MAX_KEEPALIVE: int = 0
+    LLM_HTTP_KEEPALIVE_SECONDS: float = 60.0
+    LLM_HTTP2: bool = False
+    # Ayrı zaman aşımları: bağlantı kurma, okuma (akışta parçalar arası bekleme), yazma, havuzdan bağlantı bekleme.
+    # Çağrının tamamı LLM_CALL_TIMEOUT_SECONDS ile sınırlıdır
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_READ_TIMEOUT_SECONDS: float = 60.0
+    LLM_WRITE_TIMEOUT_SECONDS: float = 10.0
+    LLM_POOL_TIMEOUT_SECONDS: float = 30.0
+    # Bir değerlendirme işinin son tarihi; canlı (interactive) işte bu süreyi aşacak yeniden deneme yapılmaz,
+    # toplu (batch) sınıfta yalnızca sıralamada kullanılır
+    LLM_JOB_DEADLINE_SECONDS: float = 900.0
+    # Zamanlayıcı önceliği: tekil işler ('interactive') toplu işlerden ('batch') önce slot alır; aynı sınıfta
+    # işler sırayla (round-robin) paylaşır, son tarihine bu süreden az kalan çağrılar öne alınır
+    LLM_SCHEDULER_URGENT_SECONDS: float = 30.0
+    # İş iptali: canlı tekil işin son WebSocket aboneliği koptuktan bu süre sonra kimse yeniden bağlanmadıysa
+    # iş iptal edilir (0 → kapalı; abonelikler süreç içi olduğundan yalnızca inline modda); kuyruk modunda
+    # worker'lar iptal edilen işleri bu aralıkla depodan okur
+    JOB_DISCONNECT_CANCEL_SECONDS: float = 30.0
+    JOB_CANCEL_POLL_SECONDS: float = 2.0
+    # Circuit breaker: art arda bu kadar geçici hatada zamanlayıcı duraklatılır
+    LLM_BREAKER_THRESHOLD: int = 5
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 5.0
+    LLM_BREAKER_MAX_COOLDOWN_SECONDS: float = 60.0
+    # Toplu değerlendirmede kabul edilecek en fazla öğrenci PDF'i
+    BATCH_MAX_STUDENTS: int = 500
+
+    # WebSocket yayını: kanal başına replay tamponu (mesaj), abone başına gönderim kuyruğu ve
+    # biten işin kanalının (geç bağlanan istemciler için) tutulma süresi
+    WS_REPLAY_BUFFER: int = 2048
+    WS_SUBSCRIBER_QUEUE: int = 256
+    WS_CHANNEL_TTL_SECONDS: float = 600.0
+    # WebSocket mesaj sıkıştırma: bu boyuttan (bayt) büyük mesajlar replay tamponunda zlib ile sıkıştırılmış tutulur
+    # ve ?compress=1 ile bağlanan istemcilere ikili çerçeve olarak gider (0 → kapalı). Tarayıcı bağlantılarında
+    # uvicorn permessage-deflate'i zaten anlaşır; bu ayar tampon belleği ve deflate desteklemeyen istemciler içindir.
+    WS_COMPRESS_MIN_BYTES: int = 0
+    WS_COMPRESS_LEVEL: int = 6
+
+    # PDF ayrıştırma süreç havuzu (0 → CPU sayısı) ve işçi başına sayfa parçası
+    INGEST_WORKERS: int = 0
+    INGEST_PAGES_PER_TASK: int = 8
+
+    # Yüklemeler geçici dosyaya akar ("" → sistem geçici dizini); PDF başına ve istek gövdesi başına
+    # üst sınır (gövde sınırı Content-Length ile gövde okunmadan uygulanır; zip yüklemeleri de buna tabidir).
+    # Zip'lerden açılan PDF'lerin istek başına toplam boyutu UPLOAD_MAX_EXTRACTED_BYTES ile sınırlıdır
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_MAX_REQUEST_BYTES: int = 1024 * 1024 * 1024
+    UPLOAD_MAX_EXTRACTED_BYTES: int = 2 * 1024 * 1024 * 1024
+    UPLOAD_SPOOL_DIR: str = ""
+
+    # Metin katmanı olmayan (taranmış) sayfalar için Tesseract OCR: sayfada OCR_MIN_CHARS'tan az karakter
+    # çıkarsa sayfa OCR_DPI çözünürlükte render edilip süreç havuzunda okunur (sonuç sayfa görüntüsü
+    # özetiyle PDF önbelleğine yazılır); ikili bulunamazsa OCR atlanır
+    OCR_ENABLED: bool = True
+    OCR_TESSERACT_CMD: str = "tesseract"
+    OCR_LANG: str = "tur+eng"
+    OCR_DPI: int = 200
+    OCR_MIN_CHARS: int = 1
+    OCR_TIMEOUT_SECONDS: float = 120.0
+
+    # Kalıcı iş deposu: "sqlite" | "memory"; açılışta yarım kalan işler sürdürülür
+    JOB_STORE_BACKEND: str = "sqlite"
+    JOB_STORE_PATH: str = ".cache/jobs.sqlite3"
+    JOB_RESUME_ON_STARTUP: bool = True
+    JOB_RESULTS_PAGE_MAX: int = 200
+
+    # Açılış ısınması: ağır kütüphaneler (PDF, LLM SDK'sı, tokenizer) arka planda yüklenir; /readyz bitince 200 döner.
+    # WARMUP_INGEST_POOL → ayrıştırma havuzu işçileri önceden başlatılır; WARMUP_LLM_CONNECT → sağlayıcıya
+    # ücretsiz bir istek (model listesi) atılarak bağlantı önceden kurulur
+    WARMUP_ENABLED: bool = True
+    WARMUP_INGEST_POOL: bool = True
+    WARMUP_LLM_CONNECT: bool = False
+
+    # Sınıf analitiği (/api/insights): iş deposundaki yeni sonuçlar en fazla bu aralıkla çekilir;
+    # tek okumada alınacak en fazla sonuç satırı
+    ANALYTICS_REFRESH_SECONDS: float = 2.0
+    ANALYTICS_FETCH_LIMIT: int = 10_000
+
+    # Yürütme modu: "inline" (iş, yüklemeyi alan API sürecinde çalışır) | "queue" (iş kuyruğa konur,
+    # `python worker.py` süreçleri yürütür; ilerleme broker üzerinden soketi tutan API sürecine aktarılır)
+    EXECUTION_MODE: str = "inline"
+    # Kuyruk/yayın katmanı: "sqlite" (yerel; aynı makine/paylaşılan birim) | "redis"
+    QUEUE_BACKEND: str = "sqlite"
+    QUEUE_SQLITE_PATH: str = ".cache/queue.sqlite3"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    QUEUE_PREFIX: str = "exam-evaluator"
+    QUEUE_POLL_MS: int = 50
+    # Heartbeat'i bu süre gelmeyen görev (worker öldü) başka bir worker'a yeniden verilir
+    QUEUE_VISIBILITY_TIMEOUT_SECONDS: float = 60.0
+    QUEUE_BLOB_TTL_SECONDS: float = 24 * 3600
+    QUEUE_EVENT_RETENTION_SECONDS: float = 600.0
+    # Worker süreci başına aynı anda yürütülecek iş
+    WORKER_CONCURRENCY: int = 4
+    # Worker metriklerinin (Prometheus) sunulacağı port; 0 → kapalı
+    WORKER_METRICS_PORT: int = 0
+
+    # Günlükleme: seviye (DEBUG | INFO | WARNING | ERROR), kalem başına (sayfa/parça/soru) debug
+    # satırlarından her N'de birinin yazılması, metin önizlemeleri (yalnızca DEBUG + LOG_PREVIEWS iken
+    # hesaplanır) ve engellemeyen kuyruk işleyicisinin boyutu (dolarsa kayıt atılır)
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_EVERY: int = 10
+    LOG_PREVIEWS: bool = False
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_FORMAT: str = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+    # İçerik-adresli PDF önbelleği (sayfa metni + ayrıştırılmış sorular)
+    PDF_CACHE_ENABLED: bool = True
+    PDF_CACHE_PATH: str = ".cache/pdf_cache.sqlite3"
+    PDF_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Değerlendirme sonucu önbelleği (normalize edilmiş girdi + model + sıcaklık özeti)
+    GRADE_CACHE_ENABLED: bool = True
+    GRADE_CACHE_PATH: str = ".cache/grade_cache.sqlite3"
+    GRADE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    GRADE_CACHE_MAX_ENTRIES: int = 100_000
+
     class Config:
         env_file = ".env"
 
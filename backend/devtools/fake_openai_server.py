@@ -0,0 +1,108 @@
+"""
+Yerel, sahte OpenAI uyumlu chat completion sunucusu (akışlı ve akışsız).
+
+Canlı API olmadan akış modunu (GRADE_STREAMING) ve 'partial' WebSocket mesajlarını denemek için:
+
+    uvicorn devtools.fake_openai_server:app --port 9000
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=fake uvicorn main:app
+
+Davranış ortam değişkenleriyle ayarlanır:
+    FAKE_OPENAI_FIRST_TOKEN_MS   ilk parçadan önceki gecikme (varsayılan 150)
+    FAKE_OPENAI_TOKEN_MS         parçalar arası gecikme (varsayılan 15)
+    FAKE_OPENAI_CHUNK_CHARS      parça başına karakter (varsayılan 6)
+    FAKE_OPENAI_DROP_AFTER_CHUNKS  >0 ise her farklı prompt'un ilk akışı bu kadar parçadan sonra
+                                 bağlantı koparılarak kesilir (yeniden denemeler başarılı olur; varsayılan 0)
+
+Puan, prompt içeriğinin özetinden türetilir; aynı girdi her zaman aynı cevabı üretir.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake OpenAI")
+
+FIRST_TOKEN_MS = float(os.getenv("FAKE_OPENAI_FIRST_TOKEN_MS", "150"))
+TOKEN_MS = float(os.getenv("FAKE_OPENAI_TOKEN_MS", "15"))
+CHUNK_CHARS = int(os.getenv("FAKE_OPENAI_CHUNK_CHARS", "6"))
+DROP_AFTER_CHUNKS = int(os.getenv("FAKE_OPENAI_DROP_AFTER_CHUNKS", "0"))
+
+# Akışı bir kez kesilmiş promptların özetleri
+_dropped = set()
+
+
+class StreamDropped(Exception):
+    """Akış yarıda kesildi (istemci tamamlanmamış gövde görür)."""
+
+
+def _fake_answer(prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    score = round(digest[0] / 255 * 10, 1)
+    return json.dumps({
+        "question_id": "0",
+        "score": score,
+        "turkish_reasoning": (
+            "Öğrenci cevabı anahtardaki temel kavramlara kısmen değiniyor; "
+            "tarihsel bağlam ve neden-sonuç ilişkisi yeterince açıklanmamış."
+        ),
+        "turkish_tips": "Önemli tarihleri ve olayların sonuçlarını örneklerle destekleyin.",
+        "overall_comment": "Kabul edilebilir, ancak daha ayrıntılı bir açıklama beklenirdi.",
+    }, ensure_ascii=False)
+
+
+def _prompt_of(body: dict) -> str:
+    return "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    answer = _fake_answer(_prompt_of(body))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep((FIRST_TOKEN_MS + TOKEN_MS * len(answer) / CHUNK_CHARS) / 1000.0)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(_prompt_of(body)) // 4, "completion_tokens": len(answer) // 4,
+                      "total_tokens": (len(_prompt_of(body)) + len(answer)) // 4},
+        })
+
+    async def _events():
+        def _chunk(delta: dict, finish_reason=None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }, ensure_ascii=False) + "\n\n"
+
+        digest = hashlib.sha256(_prompt_of(body).encode("utf-8")).hexdigest()
+        drop_after = DROP_AFTER_CHUNKS if DROP_AFTER_CHUNKS and digest not in _dropped else 0
+        await asyncio.sleep(FIRST_TOKEN_MS / 1000.0)
+        yield _chunk({"role": "assistant", "content": ""})
+        for n, i in enumerate(range(0, len(answer), CHUNK_CHARS), 1):
+            yield _chunk({"content": answer[i:i + CHUNK_CHARS]})
+            await asyncio.sleep(TOKEN_MS / 1000.0)
+            if n == drop_after:
+                _dropped.add(digest)
+                raise StreamDropped(f"stream dropped after {n} chunks")
+        yield _chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
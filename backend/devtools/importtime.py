@@ -0,0 +1,90 @@
+"""
+Import süresi profili: modülü temiz bir yorumlayıcıda `python -X importtime` ile içe aktarır ve
+en pahalı importları listeler (soğuk açılış / otomatik ölçeklenen kopyaların başlangıç süresi).
+
+    python -m devtools.importtime main                 # API süreci
+    python -m devtools.importtime worker --top 30
+    python -m devtools.importtime main --budget-ms 800  # toplam süre bütçeyi aşarsa çıkış kodu 1 (CI)
+    python -m devtools.importtime main --watch pdfplumber,openai,tiktoken
+                                                       # bu paketler import sırasında yüklenirse çıkış kodu 1
+
+Süreler mikrosaniye ölçümlerinin milisaniyeye çevrilmiş halidir; 'self' modülün kendi gövdesi,
+'cumulative' alt importlar dahil süredir. Aynı makinede birkaç kez çalıştırıp karşılaştırın
+(ilk çalıştırma .pyc derlemesini de içerir).
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile(module: str) -> Tuple[List[Tuple[str, float, float]], Optional[str]]:
+    """[(modül, self_ms, cumulative_ms)] (import sırasıyla) ve import hatası (varsa son stderr satırı)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    rows: List[Tuple[str, float, float]] = []
+    other: List[str] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            if line.strip():
+                other.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue   # başlık satırı
+        rows.append((parts[2].rstrip(), int(parts[0]) / 1000.0, int(parts[1]) / 1000.0))
+    error = other[-1] if proc.returncode != 0 and other else None
+    return rows, error
+
+
+def top_level(rows: List[Tuple[str, float, float]]) -> Dict[str, float]:
+    """Kök paket başına toplam 'self' süresi (ör. fastapi, pydantic, numpy)."""
+    totals: Dict[str, float] = {}
+    for name, self_ms, _ in rows:
+        root = name.strip().split(".")[0]
+        totals[root] = totals.get(root, 0.0) + self_ms
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Import süresi profili")
+    p.add_argument("module", nargs="?", default="main")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--budget-ms", type=float, default=0.0, help="toplam import süresi bütçesi (0 → kontrol yok)")
+    p.add_argument("--watch", default="", help="import sırasında yüklenmemesi gereken paketler (virgülle)")
+    args = p.parse_args(argv)
+
+    rows, error = profile(args.module)
+    if error:
+        print(f"[importtime] import {args.module} failed: {error}")
+        return 2
+    # Kök modülün (girintisiz son satır) kümülatif süresi toplam import süresidir
+    total = next((cum for name, _, cum in reversed(rows) if name.strip() == args.module), sum(r[1] for r in rows))
+
+    print(f"import {args.module}: {total:.1f} ms, {len(rows)} modules")
+    print(f"\n{'package':<32} {'self ms':>10}")
+    for root, ms in sorted(top_level(rows).items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{root:<32} {ms:>10.1f}")
+    print(f"\n{'module (cumulative)':<48} {'self ms':>10} {'cum ms':>10}")
+    for name, self_ms, cum in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{name[:48]:<48} {self_ms:>10.1f} {cum:>10.1f}")
+
+    failed = False
+    loaded = {name.strip().split(".")[0] for name, _, _ in rows}
+    leaked = [w for w in (x.strip() for x in args.watch.split(",")) if w and w in loaded]
+    if leaked:
+        print(f"\n[importtime] eagerly imported: {', '.join(leaked)}")
+        failed = True
+    if args.budget_ms and total > args.budget_ms:
+        print(f"\n[importtime] {total:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from config import settings
+from helpers.log import get_logger
+
+# Yayın olayı: (kanal = job_id, mesaj); mesaj None → kanal kapandı (mark_done)
+Event = Tuple[str, Optional[Dict]]
+
+log = get_logger("broker")
+
+
+class Broker:
+    """
+    Kuyruk modu (EXECUTION_MODE=queue) için paylaşılan iş kuyruğu + yayın (pub/sub) katmanı.
+    API süreçleri işi kuyruğa koyar ve olayları kendi WebSocket abonelerine aktarır; worker
+    süreçleri işi sahiplenir (claim), değerlendirir ve ilerlemeyi olay olarak yayınlar.
+
+    Teslim garantisi 'en az bir kez'dir: sahiplenilen görev `heartbeat` ile canlı tutulur;
+    worker ölürse QUEUE_VISIBILITY_TIMEOUT_SECONDS sonunda başka bir worker tarafından yeniden alınır.
+    PDF baytları görev gövdesine değil, ayrı blob anahtarlarına yazılır.
+    """
+
+    async def put_blob(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def enqueue(self, task: Dict) -> str:
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str, timeout: float) -> Optional[Tuple[str, Dict]]:
+        """Sıradaki görevi sahiplenir; `timeout` saniye içinde görev yoksa None."""
+        raise NotImplementedError
+
+    async def heartbeat(self, task_ids: Iterable[str]):
+        raise NotImplementedError
+
+    async def ack(self, task_id: str, blob_keys: Iterable[str] = ()):
+        """Görevi ve bağlı blob'ları siler."""
+        raise NotImplementedError
+
+    async def publish_many(self, events: List[Event]):
+        raise NotImplementedError
+
+    def subscribe(self) -> AsyncIterator[Event]:
+        """Abone olunduğu andan sonraki tüm kanal olayları (sırasıyla)."""
+        raise NotImplementedError
+
+    async def stats(self) -> Dict:
+        return {}
+
+    async def close(self):
+        pass
+
+
+class SQLiteBroker(Broker):
+    """
+    Redis gerektirmeyen yerel karşılık: aynı makinedeki (veya paylaşılan birimi gören) süreçler
+    tek bir SQLite (WAL) dosyası üzerinden kuyruk ve olay tablosunu paylaşır. Kuyruk sahiplenme
+    `BEGIN IMMEDIATE` ile atomiktir; olaylar artan id ile QUEUE_POLL_MS aralıkla okunur.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_prune = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    claimed_by TEXT,
+                    claimed_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tasks_seq ON tasks(seq);
+                CREATE TABLE IF NOT EXISTS blobs (
+                    key TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    message TEXT,
+                    created_at REAL NOT NULL
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    # --- senkron çekirdek (to_thread ile çağrılır) ---
+
+    def _put_blob(self, key: str, data: bytes):
+        with self._lock:
+            self._db().execute("INSERT OR REPLACE INTO blobs (key, data, created_at) VALUES (?, ?, ?)",
+                               (key, sqlite3.Binary(data), time.time()))
+
+    def _get_blob(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db().execute("SELECT data FROM blobs WHERE key = ?", (key,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _enqueue(self, task_id: str, task: Dict):
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO tasks (task_id, seq, payload, created_at) VALUES (?, ?, ?, ?)",
+                (task_id, time.time_ns(), json.dumps(task, ensure_ascii=False), now),
+            )
+
+    def _claim(self, worker_id: str) -> Optional[Tuple[str, Dict]]:
+        now = time.time()
+        stale = now - settings.QUEUE_VISIBILITY_TIMEOUT_SECONDS
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT task_id, payload FROM tasks WHERE claimed_at IS NULL OR claimed_at < ? "
+                    "ORDER BY seq LIMIT 1",
+                    (stale,),
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE tasks SET claimed_by = ?, claimed_at = ?, attempts = attempts + 1 WHERE task_id = ?",
+                        (worker_id, now, row[0]),
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _heartbeat(self, task_ids: List[str]):
+        now = time.time()
+        with self._lock:
+            self._db().executemany("UPDATE tasks SET claimed_at = ? WHERE task_id = ?",
+                                   [(now, t) for t in task_ids])
+
+    def _ack(self, task_id: str, blob_keys: List[str]):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            if blob_keys:
+                db.executemany("DELETE FROM blobs WHERE key = ?", [(k,) for k in blob_keys])
+
+    def _publish_many(self, events: List[Event]):
+        now = time.time()
+        rows = [(ch, None if msg is None else json.dumps(msg, ensure_ascii=False), now) for ch, msg in events]
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany("INSERT INTO events (channel, message, created_at) VALUES (?, ?, ?)", rows)
+            db.execute("COMMIT")
+
+    def _last_event_id(self) -> int:
+        with self._lock:
+            row = self._db().execute("SELECT MAX(id) FROM events").fetchone()
+        return row[0] or 0
+
+    def _read_events(self, after: int, limit: int = 1000) -> List[Tuple[int, str, Optional[str]]]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT id, channel, message FROM events WHERE id > ? ORDER BY id LIMIT ?", (after, limit)
+            ).fetchall()
+            # Eski olayları ara sıra temizle (tüm aboneler zaten okumuş olur)
+            now = time.time()
+            if now - self._last_prune > 60:
+                self._last_prune = now
+                self._db().execute("DELETE FROM events WHERE created_at < ?",
+                                   (now - settings.QUEUE_EVENT_RETENTION_SECONDS,))
+        return rows
+
+    def _stats(self) -> Dict:
+        with self._lock:
+            db = self._db()
+            queued = db.execute("SELECT COUNT(*) FROM tasks WHERE claimed_at IS NULL").fetchone()[0]
+            claimed = db.execute("SELECT COUNT(*) FROM tasks WHERE claimed_at IS NOT NULL").fetchone()[0]
+        return {"backend": "sqlite", "queued": queued, "claimed": claimed}
+
+    # --- asenkron arayüz ---
+
+    async def put_blob(self, key: str, data: bytes):
+        await asyncio.to_thread(self._put_blob, key, data)
+
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get_blob, key)
+
+    async def enqueue(self, task: Dict) -> str:
+        task_id = str(uuid.uuid4())
+        await asyncio.to_thread(self._enqueue, task_id, task)
+        return task_id
+
+    async def claim(self, worker_id: str, timeout: float) -> Optional[Tuple[str, Dict]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            claimed = await asyncio.to_thread(self._claim, worker_id)
+            if claimed is not None or time.monotonic() >= deadline:
+                return claimed
+            await asyncio.sleep(settings.QUEUE_POLL_MS / 1000.0)
+
+    async def heartbeat(self, task_ids: Iterable[str]):
+        ids = list(task_ids)
+        if ids:
+            await asyncio.to_thread(self._heartbeat, ids)
+
+    async def ack(self, task_id: str, blob_keys: Iterable[str] = ()):
+        await asyncio.to_thread(self._ack, task_id, list(blob_keys))
+
+    async def publish_many(self, events: List[Event]):
+        if events:
+            await asyncio.to_thread(self._publish_many, events)
+
+    async def subscribe(self) -> AsyncIterator[Event]:
+        after = await asyncio.to_thread(self._last_event_id)
+        while True:
+            rows = await asyncio.to_thread(self._read_events, after)
+            for event_id, channel, message in rows:
+                after = event_id
+                yield channel, (None if message is None else json.loads(message))
+            if not rows:
+                await asyncio.sleep(settings.QUEUE_POLL_MS / 1000.0)
+
+    async def stats(self) -> Dict:
+        return await asyncio.to_thread(self._stats)
+
+    async def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RedisBroker(Broker):
+    """
+    Çok makineli kurulum için Redis karşılığı (redis>=5, `redis.asyncio`).
+    Kuyruk: LIST + BLMOVE ile 'processing' listesi; canlılık: görev başına süreli heartbeat anahtarı.
+    Olaylar tek bir PUBLISH kanalından yayınlanır (abone yokken gelen olaylar kaybolur).
+    """
+
+    def __init__(self, url: str, prefix: str):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        # Heartbeat'i olmayan görev iki ardışık taramada görülürse kuyruğa geri konur
+        self._suspects: set = set()
+        self._last_sweep = 0.0
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def _redis(self):
+        if self._client is None:
+            import redis.asyncio as aioredis  # isteğe bağlı bağımlılık; yalnızca QUEUE_BACKEND=redis iken
+            self._client = aioredis.from_url(self.url)
+        return self._client
+
+    async def put_blob(self, key: str, data: bytes):
+        await self._redis().set(self._key("blob", key), data, ex=int(settings.QUEUE_BLOB_TTL_SECONDS))
+
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        return await self._redis().get(self._key("blob", key))
+
+    async def enqueue(self, task: Dict) -> str:
+        task_id = str(uuid.uuid4())
+        body = json.dumps({"task_id": task_id, "task": task}, ensure_ascii=False)
+        await self._redis().lpush(self._key("queue"), body)
+        return task_id
+
+    async def _sweep(self):
+        """Heartbeat'i düşmüş (worker'ı ölmüş) görevleri kuyruğa geri koyar."""
+        now = time.monotonic()
+        if now - self._last_sweep < settings.QUEUE_VISIBILITY_TIMEOUT_SECONDS / 2:
+            return
+        self._last_sweep = now
+        r = self._redis()
+        suspects = set()
+        for body in await r.lrange(self._key("processing"), 0, -1):
+            task_id = json.loads(body)["task_id"]
+            if await r.exists(self._key("hb", task_id)):
+                continue
+            if task_id in self._suspects and await r.lrem(self._key("processing"), 1, body):
+                await r.rpush(self._key("queue"), body)
+                log.warning("♻️ Requeued stale task %s", task_id)
+            else:
+                suspects.add(task_id)
+        self._suspects = suspects
+
+    async def claim(self, worker_id: str, timeout: float) -> Optional[Tuple[str, Dict]]:
+        await self._sweep()
+        r = self._redis()
+        body = await r.blmove(self._key("queue"), self._key("processing"), max(timeout, 0.01), "RIGHT", "LEFT")
+        if body is None:
+            return None
+        data = json.loads(body)
+        await r.set(self._key("hb", data["task_id"]), worker_id, ex=int(settings.QUEUE_VISIBILITY_TIMEOUT_SECONDS))
+        await r.set(self._key("body", data["task_id"]), body, ex=int(settings.QUEUE_BLOB_TTL_SECONDS))
+        return data["task_id"], data["task"]
+
+    async def heartbeat(self, task_ids: Iterable[str]):
+        r = self._redis()
+        for task_id in task_ids:
+            await r.expire(self._key("hb", task_id), int(settings.QUEUE_VISIBILITY_TIMEOUT_SECONDS))
+
+    async def ack(self, task_id: str, blob_keys: Iterable[str] = ()):
+        r = self._redis()
+        body = await r.get(self._key("body", task_id))
+        if body is not None:
+            await r.lrem(self._key("processing"), 1, body)
+        await r.delete(self._key("hb", task_id), self._key("body", task_id),
+                       *[self._key("blob", k) for k in blob_keys])
+
+    async def publish_many(self, events: List[Event]):
+        if not events:
+            return
+        pipe = self._redis().pipeline(transaction=False)
+        for channel, message in events:
+            pipe.publish(self._key("events"), json.dumps({"channel": channel, "message": message}, ensure_ascii=False))
+        await pipe.execute()
+
+    async def subscribe(self) -> AsyncIterator[Event]:
+        pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._key("events"))
+        try:
+            async for item in pubsub.listen():
+                if item.get("type") != "message":
+                    continue
+                data = json.loads(item["data"])
+                yield data["channel"], data["message"]
+        finally:
+            await pubsub.aclose()
+
+    async def stats(self) -> Dict:
+        r = self._redis()
+        return {
+            "backend": "redis",
+            "queued": await r.llen(self._key("queue")),
+            "claimed": await r.llen(self._key("processing")),
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_broker: Optional[Broker] = None
+
+
+def build_broker(name: Optional[str] = None) -> Broker:
+    name = (name or settings.QUEUE_BACKEND).lower()
+    if name == "sqlite":
+        return SQLiteBroker(settings.QUEUE_SQLITE_PATH)
+    if name == "redis":
+        return RedisBroker(settings.REDIS_URL, settings.QUEUE_PREFIX)
+    raise ValueError(f"Bilinmeyen QUEUE_BACKEND: {name} (sqlite | redis)")
+
+
+def get_broker() -> Broker:
+    """Ayarlara göre seçilen kuyruk/yayın katmanı (ilk kullanımda oluşturulur)."""
+    global _broker
+    if _broker is None:
+        _broker = build_broker()
+    return _broker
+
+
+def set_broker(broker: Broker):
+    """Kuyruk/yayın katmanını değiştirir (test/yük testi için)."""
+    global _broker
+    _broker = broker
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+from config import settings
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(s: Optional[str]) -> str:
+    """Önbellek anahtarı için metni normalize eder (NFKC, küçük harf, tek boşluk)."""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKC", s).casefold()
+    return _WS_RE.sub(" ", s).strip()
+
+
+def grading_key(question_text: Optional[str], student_answer: str, key_answer: str,
+                model: str, temperature: float, prompt_version: str) -> str:
+    """(soru, öğrenci cevabı, anahtar) üçlüsü + model ayarları için kararlı özet."""
+    parts = [
+        prompt_version,
+        model,
+        f"{float(temperature):.3f}",
+        normalize_text(question_text),
+        normalize_text(key_answer),
+        normalize_text(student_answer),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class GradeCache:
+    """
+    Değerlendirme sonuçları için kalıcı önbellek (SQLite).
+    Kayıtlar `ttl_seconds` sonunda geçersizleşir; kayıt sayısı `max_entries` değerini aşınca
+    en uzun süredir kullanılmayanlar (LRU) silinir. Hatalı/varsayılan sonuçlar önbelleğe yazılmaz.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS grade_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_grade_cache_access ON grade_cache(last_access)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, created_at FROM grade_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                db.execute("DELETE FROM grade_cache WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE grade_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO grade_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, now, now),
+            )
+            count = db.execute("SELECT COUNT(*) FROM grade_cache").fetchone()[0]
+            if count > self.max_entries:
+                db.execute(
+                    "DELETE FROM grade_cache WHERE key IN (SELECT key FROM grade_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            if self.ttl_seconds:
+                db.execute("DELETE FROM grade_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+
+
+grade_cache = GradeCache(settings.GRADE_CACHE_PATH, settings.GRADE_CACHE_TTL_SECONDS, settings.GRADE_CACHE_MAX_ENTRIES)
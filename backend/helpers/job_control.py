@@ -0,0 +1,124 @@
+import asyncio
+from typing import Dict, List, Optional
+
+# Öncelik sınıfları (öncelik sırasıyla): canlı izlenen tekil iş, toplu (sınıf) değerlendirme
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+
+class _Entry:
+    __slots__ = ("task", "priority", "group", "reason")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.priority = PRIORITY_INTERACTIVE
+        # Adil paylaşım grubu: toplu işteki öğrenciler batch_id altında tek iş sayılır
+        self.group: Optional[str] = None
+        self.reason: Optional[str] = None
+
+
+class JobControl:
+    """
+    Bu süreçte çalışan işlerin kaydı: işi yürüten asyncio görevi, öncelik sınıfı ve adil paylaşım grubu.
+
+    `cancel` işin görevini iptal eder; görev CancelledError'ı yakalayıp `absorb` ile iptalin bu
+    kayıttan geldiğini doğrularsa işi 'cancelled' olarak kapatır (sunucu kapanışındaki iptaller
+    yutulmaz). Toplu işin iptali, grubundaki öğrenci işlerine de iptal nedeni olarak yansır.
+    LLM zamanlayıcısı önceliği ve grubu buradan okur.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, _Entry] = {}
+
+    def _entry(self, job_id: str, priority: Optional[str], group: Optional[str]) -> _Entry:
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            entry = self._jobs[job_id] = _Entry()
+        if priority in PRIORITIES:
+            entry.priority = priority
+        if group:
+            entry.group = group
+        return entry
+
+    def expect(self, job_id: str, priority: Optional[str] = None, group: Optional[str] = None):
+        """
+        Bu süreçte başlatılmak üzere gönderilen işi, görevi henüz çalışmadan kaydeder; bu arada gelen
+        iptal, görev `track` ile kaydolduğu anda uygulanır. Kaydı işi yürüten görev `release` ile siler.
+        """
+        self._entry(job_id, priority, group)
+
+    def track(self, job_id: str, priority: Optional[str] = None, group: Optional[str] = None) -> bool:
+        """
+        İşi geçerli görevle ilişkilendirir; iş önceden iptal edildiyse görev hemen iptal edilir.
+        Dönen değer: kaydın sahibi bu çağrı mı (ilk kez görev atandı) — sahip iş bitince `release` çağırır.
+        """
+        entry = self._entry(job_id, priority, group)
+        if entry.task is not None:
+            return False
+        entry.task = asyncio.current_task()
+        if self.reason(job_id) is not None:
+            entry.task.cancel()
+        return True
+
+    def release(self, job_id: str):
+        self._jobs.pop(job_id, None)
+
+    def priority(self, job_id: Optional[str]) -> str:
+        entry = self._jobs.get(job_id) if job_id else None
+        return entry.priority if entry is not None else PRIORITY_INTERACTIVE
+
+    def group(self, job_id: Optional[str]) -> Optional[str]:
+        entry = self._jobs.get(job_id) if job_id else None
+        return (entry.group or job_id) if entry is not None else job_id
+
+    def reason(self, job_id: str) -> Optional[str]:
+        """İşin (veya ait olduğu toplu işin) iptal nedeni; iptal edilmediyse None."""
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        if entry.reason is None and entry.group:
+            parent = self._jobs.get(entry.group)
+            return parent.reason if parent is not None else None
+        return entry.reason
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        """
+        İşi iptal eder; iş bu süreçte kayıtlı değilse (bilinmiyor, bitmiş veya başka süreçte) ya da zaten
+        iptal edildiyse False — bilinmeyen iş için kayıt açılmaz. `expect` ile kaydedilmiş ama görevi henüz
+        başlamamış iş, görevi kaydedildiği anda iptal edilir.
+        """
+        entry = self._jobs.get(job_id)
+        if entry is None or entry.reason is not None:
+            return False
+        entry.reason = reason
+        if entry.task is not None and not entry.task.done():
+            entry.task.cancel()
+        return True
+
+    def absorb(self, job_id: str) -> Optional[str]:
+        """
+        CancelledError yakalandığında çağrılır: iptal bu kayıttan geldiyse nedenini döner ve geçerli
+        görevin iptal sayacını sıfırlar (görev normal şekilde devam edebilir); gelmediyse None.
+        """
+        reason = self.reason(job_id)
+        if reason is not None:
+            task = asyncio.current_task()
+            if task is not None and hasattr(task, "uncancel"):   # Python 3.11+
+                while task.cancelling():
+                    task.uncancel()
+        return reason
+
+    def active(self) -> List[str]:
+        """Bu süreçte çalışan ve iptal edilmemiş işler."""
+        return [job_id for job_id, e in self._jobs.items() if e.task is not None and e.reason is None]
+
+    def stats(self) -> dict:
+        by_priority = {p: 0 for p in PRIORITIES}
+        for e in self._jobs.values():
+            if e.task is not None and not e.task.done():
+                by_priority[e.priority] += 1
+        return {"jobs": by_priority}
+
+
+job_control = JobControl()
@@ -0,0 +1,72 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# Çalışan değerlendirme işinin kimliği; asyncio görevleri oluşturulurken bağlam kopyalandığı
+# için alt görevlerde (grade_one vb.) de görünür.
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+
+class JobStatsRegistry:
+    """
+    İş bazlı sayaçlar (önbellek isabetleri vb.).
+    Sayaçlar `current_job_id` bağlamına yazılır; iş bitince `pop` ile özet 'meta' alanına taşınır.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._deadlines: Dict[str, float] = {}
+        # İş bazlı zamanlama dökümü: span adı → [adet, toplam saniye, en uzun saniye]
+        self._timings: Dict[str, Dict[str, List[float]]] = {}
+
+    def bind(self, job_id: str, deadline_seconds: Optional[float] = None):
+        """
+        Geçerli bağlamı job_id'ye bağlar; dönen token `current_job_id.reset` için kullanılabilir.
+        deadline_seconds verilirse işin son tarihi (monotonic) kaydedilir; canlı işlerde yeniden denemeler bunu aşmaz.
+        """
+        self._stats.setdefault(job_id, {})
+        if deadline_seconds:
+            self._deadlines[job_id] = time.monotonic() + deadline_seconds
+        return current_job_id.set(job_id)
+
+    def deadline(self, job_id: str) -> Optional[float]:
+        return self._deadlines.get(job_id)
+
+    def incr(self, name: str, n: float = 1, job_id: Optional[str] = None):
+        job_id = job_id or current_job_id.get()
+        if job_id is None:
+            return
+        bucket = self._stats.setdefault(job_id, {})
+        bucket[name] = bucket.get(name, 0) + n
+
+    def timing(self, name: str, seconds: float, job_id: Optional[str] = None):
+        job_id = job_id or current_job_id.get()
+        if job_id is None:
+            return
+        spans = self._timings.setdefault(job_id, {})
+        entry = spans.get(name)
+        if entry is None:
+            spans[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def timings(self, job_id: str) -> Dict[str, Dict[str, float]]:
+        """Span bazlı döküm: {'llm_network': {'count', 'total_ms', 'max_ms'}, ...}"""
+        return {
+            name: {"count": int(c), "total_ms": round(total * 1000, 2), "max_ms": round(mx * 1000, 2)}
+            for name, (c, total, mx) in sorted(self._timings.get(job_id, {}).items())
+        }
+
+    def get(self, job_id: str) -> Dict[str, float]:
+        return dict(self._stats.get(job_id, {}))
+
+    def pop(self, job_id: str) -> Dict[str, float]:
+        self._deadlines.pop(job_id, None)
+        self._timings.pop(job_id, None)
+        return self._stats.pop(job_id, {})
+
+
+job_stats = JobStatsRegistry()
@@ -0,0 +1,441 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+
+# İş durumları
+STATUS_INGESTING = "ingesting"   # PDF'ler ayrıştırılıyor (sorular henüz kaydedilmedi)
+STATUS_RUNNING = "running"       # sorular kaydedildi, değerlendirme sürüyor
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"   # API ile veya istemci bağlantısı koptuğu için iptal edildi
+
+UNFINISHED = (STATUS_INGESTING, STATUS_RUNNING)
+
+
+class JobStore:
+    """
+    Kalıcı iş deposu arayüzü: iş kaydı, ayrıştırılmış sorular ve her değerlendirilen sonuç.
+    Metotlar senkrondur; event loop içinden `asyncio.to_thread` ile çağrılır.
+    """
+
+    def create_job(self, job_id: str, kind: str = "single", batch_id: Optional[str] = None,
+                   filename: Optional[str] = None, options: Optional[Dict] = None,
+                   status: str = STATUS_INGESTING):
+        raise NotImplementedError
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        """İptal edilmiş iş yeniden 'running' yapılmaz (iptal, sahibi görmeden önce yazılmış olabilir)."""
+        raise NotImplementedError
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        """
+        Bitmemiş işi (toplu işte bitmemiş öğrenci işleriyle birlikte) 'cancelled' yapar.
+        Dönen değer: iş bu çağrıyla iptal edildi mi (bitmiş veya yok → False).
+        """
+        raise NotImplementedError
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        """Verilen işlerin durumları (bilinmeyen işler sonuçta yer almaz)."""
+        raise NotImplementedError
+
+    def save_questions(self, job_id: str, questions: List[Dict]):
+        """Soruları kaydeder ve işi 'running' yapar (iş kaydı yoksa oluşturur)."""
+        raise NotImplementedError
+
+    def save_result(self, job_id: str, question_id: str, position: int, row: Dict):
+        raise NotImplementedError
+
+    def finish(self, job_id: str, summary: Dict):
+        """İşi 'completed' yapar; bitmiş (iptal edilmiş, başarısız) işin durumu ve özeti değişmez."""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get_questions(self, job_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """Soru sırasına göre sonuçlar ve toplam sonuç sayısı."""
+        raise NotImplementedError
+
+    def list_jobs(self, statuses: Optional[Tuple[str, ...]] = None, batch_id: Optional[str] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def results_since(self, after: int = 0, limit: int = 10_000) -> Tuple[List[Dict], int]:
+        """
+        `after` sıra numarasından sonra yazılan (veya yeniden yazılan) sonuçların puan alanları:
+        [{'job_id', 'batch_id', 'student_name', 'question_id', 'score', 'error'}] ve son sıra numarası.
+        Analitik bu akışla artımlı güncellenir; yalnızca puan alanları okunur.
+        """
+        raise NotImplementedError
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite (WAL) tabanlı iş deposu; tek süreç içinde bir bağlantı + kilit kullanır."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    batch_id TEXT,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    student_name TEXT,
+                    options TEXT,
+                    total_questions INTEGER,
+                    summary TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+                CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id);
+                CREATE TABLE IF NOT EXISTS job_questions (
+                    job_id TEXT NOT NULL,
+                    question_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (job_id, question_id)
+                );
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT NOT NULL,
+                    question_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, question_id)
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row_to_job(row) -> Dict:
+        (job_id, kind, batch_id, status, filename, student_name, options, total_questions,
+         summary, error, created_at, updated_at, completed) = row
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "batch_id": batch_id,
+            "status": status,
+            "filename": filename,
+            "student_name": student_name,
+            "options": json.loads(options) if options else {},
+            "total_questions": total_questions,
+            "completed_questions": completed,
+            "summary": json.loads(summary) if summary else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    _JOB_COLUMNS = (
+        "j.job_id, j.kind, j.batch_id, j.status, j.filename, j.student_name, j.options, j.total_questions, "
+        "j.summary, j.error, j.created_at, j.updated_at, "
+        "(SELECT COUNT(*) FROM job_results r WHERE r.job_id = j.job_id)"
+    )
+
+    def create_job(self, job_id: str, kind: str = "single", batch_id: Optional[str] = None,
+                   filename: Optional[str] = None, options: Optional[Dict] = None,
+                   status: str = STATUS_INGESTING):
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT OR IGNORE INTO jobs (job_id, kind, batch_id, status, filename, options, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, batch_id, status, filename, json.dumps(options or {}), now, now),
+            )
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        sql = "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?"
+        params = [status, error, time.time(), job_id]
+        if status == STATUS_RUNNING:
+            sql += " AND status != ?"
+            params.append(STATUS_CANCELLED)
+        with self._lock:
+            self._db().execute(sql, params)
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        marks = ",".join("?" * len(UNFINISHED))
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            cur = db.execute(
+                f"UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ? AND status IN ({marks})",
+                (STATUS_CANCELLED, reason, now, job_id, *UNFINISHED),
+            )
+            if cur.rowcount:
+                db.execute(
+                    f"UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE batch_id = ? AND status IN ({marks})",
+                    (STATUS_CANCELLED, reason, now, job_id, *UNFINISHED),
+                )
+        return cur.rowcount > 0
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        ids = list(job_ids)
+        with self._lock:
+            db = self._db()
+            # SQLite parametre sınırı için parçalı okunur
+            for i in range(0, len(ids), 500):
+                part = ids[i:i + 500]
+                out.update(db.execute(
+                    f"SELECT job_id, status FROM jobs WHERE job_id IN ({','.join('?' * len(part))})", part
+                ).fetchall())
+        return out
+
+    def save_questions(self, job_id: str, questions: List[Dict]):
+        now = time.time()
+        student_name = next((q.get("student_name") for q in questions if q.get("student_name")), None)
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                db.execute(
+                    "INSERT OR IGNORE INTO jobs (job_id, kind, status, options, created_at, updated_at) "
+                    "VALUES (?, 'single', ?, '{}', ?, ?)",
+                    (job_id, STATUS_RUNNING, now, now),
+                )
+                db.execute(
+                    "UPDATE jobs SET status = CASE WHEN status = ? THEN status ELSE ? END, total_questions = ?, "
+                    "student_name = COALESCE(?, student_name), updated_at = ? WHERE job_id = ?",
+                    (STATUS_CANCELLED, STATUS_RUNNING, len(questions), student_name, now, job_id),
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO job_questions (job_id, question_id, position, data) VALUES (?, ?, ?, ?)",
+                    [(job_id, str(q["question_id"]), i, json.dumps(q, ensure_ascii=False))
+                     for i, q in enumerate(questions, start=1)],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def save_result(self, job_id: str, question_id: str, position: int, row: Dict):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO job_results (job_id, question_id, position, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, str(question_id), position, json.dumps(row, ensure_ascii=False), time.time()),
+            )
+
+    def finish(self, job_id: str, summary: Dict):
+        marks = ",".join("?" * len(UNFINISHED))
+        with self._lock:
+            self._db().execute(
+                f"UPDATE jobs SET status = ?, summary = ?, error = NULL, updated_at = ? "
+                f"WHERE job_id = ? AND status IN ({marks})",
+                (STATUS_COMPLETED, json.dumps(summary, ensure_ascii=False), time.time(), job_id, *UNFINISHED),
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db().execute(
+                f"SELECT {self._JOB_COLUMNS} FROM jobs j WHERE j.job_id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_questions(self, job_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT data FROM job_questions WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def get_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        with self._lock:
+            db = self._db()
+            total = db.execute("SELECT COUNT(*) FROM job_results WHERE job_id = ?", (job_id,)).fetchone()[0]
+            rows = db.execute(
+                "SELECT data FROM job_results WHERE job_id = ? ORDER BY position LIMIT ? OFFSET ?",
+                (job_id, -1 if limit is None else limit, max(0, offset)),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows], total
+
+    def list_jobs(self, statuses: Optional[Tuple[str, ...]] = None, batch_id: Optional[str] = None) -> List[Dict]:
+        where, params = [], []
+        if statuses:
+            where.append(f"j.status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if batch_id is not None:
+            where.append("j.batch_id = ?")
+            params.append(batch_id)
+        sql = f"SELECT {self._JOB_COLUMNS} FROM jobs j"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY j.created_at"
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def results_since(self, after: int = 0, limit: int = 10_000) -> Tuple[List[Dict], int]:
+        # INSERT OR REPLACE satırı yeni rowid ile yazar; rowid artımlı okuma için sıra numarasıdır
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT r.rowid, r.job_id, j.batch_id, j.student_name, r.question_id, "
+                "json_extract(r.data, '$.score'), json_extract(r.data, '$.error') "
+                "FROM job_results r LEFT JOIN jobs j ON j.job_id = r.job_id "
+                "WHERE r.rowid > ? ORDER BY r.rowid LIMIT ?",
+                (after, limit),
+            ).fetchall()
+        out = [
+            {"job_id": job_id, "batch_id": batch_id, "student_name": student_name or "", "question_id": qid,
+             "score": score, "error": bool(error)}
+            for _, job_id, batch_id, student_name, qid, score, error in rows
+        ]
+        return out, (rows[-1][0] if rows else after)
+
+
+class MemoryJobStore(JobStore):
+    """Süreç içi depo (yeniden başlatmada kaybolur); benchmark ve yerel denemeler için."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._questions: Dict[str, List[Dict]] = {}
+        self._results: Dict[str, Dict[str, Tuple[int, Dict]]] = {}
+        # (job_id, question_id) → yazılma sıra numarası (results_since için)
+        self._result_seq: Dict[Tuple[str, str], int] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _job(self, job_id: str) -> Dict[str, Any]:
+        return self._jobs.setdefault(job_id, {
+            "job_id": job_id, "kind": "single", "batch_id": None, "status": STATUS_RUNNING,
+            "filename": None, "student_name": None, "options": {}, "total_questions": None,
+            "summary": None, "error": None, "created_at": time.time(), "updated_at": time.time(),
+        })
+
+    def _view(self, job: Dict) -> Dict:
+        return {**job, "completed_questions": len(self._results.get(job["job_id"], {}))}
+
+    def create_job(self, job_id: str, kind: str = "single", batch_id: Optional[str] = None,
+                   filename: Optional[str] = None, options: Optional[Dict] = None,
+                   status: str = STATUS_INGESTING):
+        with self._lock:
+            if job_id not in self._jobs:
+                self._job(job_id).update(kind=kind, batch_id=batch_id, filename=filename,
+                                         options=dict(options or {}), status=status)
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not (status == STATUS_RUNNING and job["status"] == STATUS_CANCELLED):
+                job.update(status=status, error=error, updated_at=time.time())
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] not in UNFINISHED:
+                return False
+            for j in self._jobs.values():
+                if (j is job or j["batch_id"] == job_id) and j["status"] in UNFINISHED:
+                    j.update(status=STATUS_CANCELLED, error=reason, updated_at=now)
+        return True
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        with self._lock:
+            return {j: self._jobs[j]["status"] for j in job_ids if j in self._jobs}
+
+    def save_questions(self, job_id: str, questions: List[Dict]):
+        student_name = next((q.get("student_name") for q in questions if q.get("student_name")), None)
+        with self._lock:
+            job = self._job(job_id)
+            job.update(total_questions=len(questions), updated_at=time.time())
+            if job["status"] != STATUS_CANCELLED:
+                job["status"] = STATUS_RUNNING
+            if student_name:
+                job["student_name"] = student_name
+            self._questions[job_id] = [dict(q) for q in questions]
+
+    def save_result(self, job_id: str, question_id: str, position: int, row: Dict):
+        with self._lock:
+            self._results.setdefault(job_id, {})[str(question_id)] = (position, dict(row))
+            self._seq += 1
+            self._result_seq[(job_id, str(question_id))] = self._seq
+
+    def finish(self, job_id: str, summary: Dict):
+        with self._lock:
+            job = self._job(job_id)
+            if job["status"] in UNFINISHED:
+                job.update(status=STATUS_COMPLETED, summary=summary, error=None, updated_at=time.time())
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._view(job) if job else None
+
+    def get_questions(self, job_id: str) -> List[Dict]:
+        with self._lock:
+            return [dict(q) for q in self._questions.get(job_id, [])]
+
+    def get_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        with self._lock:
+            rows = sorted(self._results.get(job_id, {}).values(), key=lambda r: r[0])
+        offset = max(0, offset)
+        page = rows[offset:] if limit is None else rows[offset:offset + limit]
+        return [dict(r) for _, r in page], len(rows)
+
+    def list_jobs(self, statuses: Optional[Tuple[str, ...]] = None, batch_id: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            jobs = [self._view(j) for j in self._jobs.values()
+                    if (not statuses or j["status"] in statuses) and (batch_id is None or j["batch_id"] == batch_id)]
+        return sorted(jobs, key=lambda j: j["created_at"])
+
+    def results_since(self, after: int = 0, limit: int = 10_000) -> Tuple[List[Dict], int]:
+        with self._lock:
+            fresh = sorted((seq, key) for key, seq in self._result_seq.items() if seq > after)[:limit]
+            out = []
+            for _, (job_id, qid) in fresh:
+                job = self._jobs.get(job_id, {})
+                row = self._results[job_id][qid][1]
+                out.append({"job_id": job_id, "batch_id": job.get("batch_id"),
+                            "student_name": job.get("student_name") or "", "question_id": qid,
+                            "score": row.get("score"), "error": bool(row.get("error"))})
+        return out, (fresh[-1][0] if fresh else after)
+
+
+_store: Optional[JobStore] = None
+
+
+def build_job_store(name: Optional[str] = None) -> JobStore:
+    name = (name or settings.JOB_STORE_BACKEND).lower()
+    if name == "sqlite":
+        return SQLiteJobStore(settings.JOB_STORE_PATH)
+    if name == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Bilinmeyen JOB_STORE_BACKEND: {name} (sqlite | memory)")
+
+
+def get_job_store() -> JobStore:
+    """Ayarlara göre seçilen iş deposu (ilk kullanımda oluşturulur)."""
+    global _store
+    if _store is None:
+        _store = build_job_store()
+    return _store
+
+
+def set_job_store(store: JobStore):
+    """İş deposunu değiştirir (benchmark/yük testi için)."""
+    global _store
+    _store = store
@@ -0,0 +1,103 @@
+import time
+from typing import Dict, Optional
+import httpx
+from config import settings
+from helpers import metrics
+from helpers.log import get_logger
+
+log = get_logger("llm_http")
+
+# Yeni açılan / havuzdan yeniden kullanılan bağlantılar (churn göstergesi)
+CONNECTIONS = metrics.registry.counter("llm_http_connections_total", "LLM HTTP requests by connection (new | reused)",
+                                       ("result",))
+
+# Havuzdan bağlantı bekleyen istekler (havuz tükenmesi göstergesi)
+_waiting = 0
+
+
+class _RequestTrace:
+    """
+    httpcore izleme olaylarından tek isteğin havuz beklemesini ve bağlantı kurulum süresini çıkarır.
+    İlk olay ya yeni bağlantı kurulumu ('connection.connect_tcp.started') ya da havuzdan alınan bağlantıda
+    istek gönderimidir; istek başlangıcından ilk olaya kadar geçen süre havuzda boş bağlantı beklemektir.
+    Kurulum süresi TCP + TLS (+ HTTP/2 önsözü) — ilk başlık gönderimine kadar.
+    """
+
+    __slots__ = ("started", "waited", "connect_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.waited = False
+        self.connect_started: Optional[float] = None
+
+    def acquired(self) -> bool:
+        """İlk olayda bir kez True: bağlantı alındı, bekleme bitti."""
+        global _waiting
+        if self.waited:
+            return False
+        self.waited = True
+        _waiting -= 1
+        return True
+
+    async def __call__(self, event: str, info: Dict):
+        now = time.perf_counter()
+        if self.acquired():
+            metrics.observe_span("llm_pool_wait", now - self.started)
+            CONNECTIONS.inc(result="new" if event == "connection.connect_tcp.started" else "reused")
+        if event == "connection.connect_tcp.started":
+            self.connect_started = now
+        elif event.endswith(".send_request_headers.started") and self.connect_started is not None:
+            metrics.observe_span("llm_connect", now - self.connect_started)
+            self.connect_started = None
+
+
+class TracedTransport(httpx.AsyncHTTPTransport):
+    """Her isteğe httpcore 'trace' eklentisini bağlayan taşıma katmanı (havuz metrikleri için)."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        global _waiting
+        trace = _RequestTrace()
+        request.extensions = {**request.extensions, "trace": trace}
+        _waiting += 1
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            # Bağlantı alınamadan biten istek (havuz zaman aşımı, iptal) bekleyenlerden düşülür
+            trace.acquired()
+
+
+def pool_size() -> int:
+    """Havuzdaki en fazla bağlantı: LLM_HTTP_MAX_CONNECTIONS veya (0 ise) zamanlayıcı sınırının iki katı."""
+    return settings.LLM_HTTP_MAX_CONNECTIONS or max(2, settings.LLM_MAX_CONCURRENCY * 2)
+
+
+def http_timeout() -> httpx.Timeout:
+    """Bağlantı / okuma (akışta parçalar arası) / yazma / havuzdan bağlantı bekleme için ayrı zaman aşımları."""
+    return httpx.Timeout(
+        connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+        read=settings.LLM_READ_TIMEOUT_SECONDS,
+        write=settings.LLM_WRITE_TIMEOUT_SECONDS,
+        pool=settings.LLM_POOL_TIMEOUT_SECONDS,
+    )
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """
+    LLM sağlayıcısı için paylaşılan HTTP istemcisi: bağlantı havuzu boyutu, keep-alive süresi,
+    isteğe bağlı HTTP/2 ve ayrı zaman aşımları ayarlardan gelir. Süreç başına bir tane oluşturulur
+    (her worker kendi havuzuna sahip olur) ve kapanışta kapatılır (modules.llm_backend.close_backend).
+    """
+    size = pool_size()
+    limits = httpx.Limits(
+        max_connections=size,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE or size,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS,
+    )
+    transport = TracedTransport(limits=limits, http2=settings.LLM_HTTP2)
+    log.info("LLM HTTP pool: %d connections, keep-alive %.0fs, http2=%s.",
+             size, settings.LLM_HTTP_KEEPALIVE_SECONDS, settings.LLM_HTTP2)
+    # Havuz ayarları taşıma katmanında; SDK'nın varsayılan istemcisi gibi yönlendirmeler izlenir
+    return httpx.AsyncClient(transport=transport, timeout=http_timeout(), follow_redirects=True)
+
+
+metrics.registry.gauge("llm_http_pool_waiting", "LLM HTTP requests waiting for a pooled connection", lambda: _waiting)
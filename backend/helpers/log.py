@@ -0,0 +1,111 @@
+import atexit
+import itertools
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from config import settings
+
+# Uygulama günlükleyicilerinin kökü: get_logger("orchestrator") → "exam.orchestrator"
+ROOT = "exam"
+
+# Kalem başına (sayfa, parça, soru) tekrarlanan debug satırları için: log.debug(..., extra=SAMPLED)
+# Bu kayıtlardan yalnızca her LOG_SAMPLE_EVERY'de biri yazılır.
+SAMPLED = {"sampled": True}
+
+_listener: Optional[QueueListener] = None
+_dropped = 0
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def previews_enabled(logger: logging.Logger) -> bool:
+    """
+    Metin önizlemeleri (sayfa/soru içeriği) yalnızca LOG_PREVIEWS açık ve DEBUG seviyesi etkinken
+    hesaplanır; üretimde önizleme dilimleri/replace çağrıları hiç çalışmaz.
+    """
+    return settings.LOG_PREVIEWS and logger.isEnabledFor(logging.DEBUG)
+
+
+class SamplingFilter(logging.Filter):
+    """`sampled` işaretli kayıtlardan (günlükleyici + mesaj şablonu başına) her N'de birini geçirir."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counters: Dict[tuple, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or not getattr(record, "sampled", False):
+            return True
+        key = (record.name, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % self.every == 0
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Kaydı biçimlendirmeden sınırlı kuyruğa bırakır; biçimlendirme ve yazma dinleyici thread'inde
+    yapılır. Kuyruk doluysa (yavaş log hattı) kayıt atılır, çağıran (event loop) hiç beklemez.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Aynı süreç içi kuyruk: kayıt pickle edilmez, mesaj tembel kalır
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+
+def dropped() -> int:
+    """Kuyruk dolu olduğu için atılan kayıt sayısı."""
+    return _dropped
+
+
+def setup_logging(level: Optional[str] = None, stream=None):
+    """
+    'exam' günlükleyicisini kuyruk tabanlı işleyiciyle yapılandırır (tekrar çağrılırsa yeniden kurar).
+    Ana süreç, worker ve PDF havuzu işçileri (initializer) açılışta çağırır.
+    """
+    global _listener
+    shutdown_logging()
+
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(logging.Formatter(settings.LOG_FORMAT))
+
+    handler = _NonBlockingQueueHandler(queue.Queue(maxsize=max(1, settings.LOG_QUEUE_SIZE)))
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_EVERY))
+
+    root = logging.getLogger(ROOT)
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+    root.propagate = False
+
+    _listener = QueueListener(handler.queue, target, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Kuyrukta kalan kayıtları yazar ve dinleyiciyi durdurur."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            # Bitiş işareti sığmadı; dinleyici daemon thread'dir, süreçle birlikte sonlanır
+            pass
+        _listener = None
+
+
+atexit.register(shutdown_logging)
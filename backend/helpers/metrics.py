@@ -0,0 +1,199 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from helpers.job_stats import job_stats
+
+# Prometheus metin biçimi (0.0.4) ile dışa aktarılan süreç içi ölçümler.
+# Harici istemci kütüphanesi gerektirmez; /metrics uç noktası ve worker metrik portu `render()` döner.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Saniye cinsinden histogram sınırları: mikro saniyelik WS yayınından dakikalık LLM çağrısına kadar
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, n: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + n
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Değeri okuma anında bir geri çağrıdan alınan gösterge (kuyruk derinliği, açık kanal vb.)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float]):
+        super().__init__(name, help_text)
+        self._fn = fn
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self._fn())
+        except Exception:
+            return []
+        return self.header() + [f"{self.name} {_num(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # etiket → (kova sayaçları, toplam, adet)
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, [list(s[0]), s[1], s[2]]) for k, s in self._series.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {repr(float(total))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "exam_"):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, fn: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help_text, fn))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+SPAN_SECONDS = registry.histogram(
+    "span_seconds",
+    "Pipeline stage durations (upload_read, page_extract, chunk, llm_queue_wait, llm_network, llm_parse, "
+    "ws_publish, summary_build, ...)",
+    ("span",),
+)
+LLM_TOKENS = registry.counter("llm_tokens_total", "LLM tokens by kind (prompt | completion | cached_prompt | trimmed)", ("kind",))
+CACHE_EVENTS = registry.counter("cache_events_total", "Cache lookups by cache and result", ("cache", "result"))
+ERRORS = registry.counter("errors_total", "Errors by kind", ("kind",))
+PREGRADED = registry.counter("pregraded_total", "Answers decided by the local pre-grader, by reason and mode",
+                             ("reason", "mode"))
+JOBS = registry.counter("jobs_total", "Finished jobs by kind and status", ("kind", "status"))
+
+
+def observe_span(name: str, seconds: float, job_id: Optional[str] = None,
+                 job_ids: Optional[Iterable[Optional[str]]] = None):
+    """
+    Süreyi global histograma ve iş bazlı zamanlama dökümüne yazar.
+    job_id/job_ids verilmezse geçerli bağlamdaki iş (current_job_id) kullanılır.
+    """
+    SPAN_SECONDS.observe(seconds, span=name)
+    if job_ids is not None:
+        for j in dict.fromkeys(job_ids):
+            if j:
+                job_stats.timing(name, seconds, job_id=j)
+    else:
+        job_stats.timing(name, seconds, job_id=job_id)
+
+
+@contextmanager
+def span(name: str, job_id: Optional[str] = None, job_ids: Optional[Iterable[Optional[str]]] = None):
+    """`with span("llm_network"):` — bloğun süresini ölçer (senkron ve asenkron kodda kullanılabilir)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_span(name, time.perf_counter() - t0, job_id=job_id, job_ids=job_ids)
+
+
+def cache_event(cache: str, result: str):
+    CACHE_EVENTS.inc(cache=cache, result=result)
+
+
+def error(kind: str, n: int = 1):
+    ERRORS.inc(n, kind=kind)
@@ -0,0 +1,93 @@
+import hashlib
+import shutil
+import subprocess
+import time
+from typing import Dict, Optional
+from config import settings
+from helpers.log import get_logger
+from helpers.pdf_cache import pdf_cache
+from helpers.pdf_utils import PDFSource, _open_source, load_pdfplumber
+
+log = get_logger("ocr")
+
+# Metin katmanı olmayan (taranmış / el yazısı) sayfalar için Tesseract OCR.
+# `ocr_page` süreç havuzunda sayfa başına bir görev olarak çalışır; ayarlar ana süreçten `ocr_options`
+# ile taşınır (havuz işçileri ayarları yalnızca ortamdan okur).
+
+_available: Optional[bool] = None
+
+
+def lacks_text(text: str) -> bool:
+    """Sayfada OCR_MIN_CHARS'tan az (boşluk dışı) karakter çıktıysa metin katmanı yok sayılır."""
+    return len("".join(text.split())) < max(1, settings.OCR_MIN_CHARS)
+
+
+def needs_ocr(text: str) -> bool:
+    """OCR açıkken metin katmanı olmayan sayfa OCR'a gönderilir."""
+    return settings.OCR_ENABLED and lacks_text(text)
+
+
+def ocr_available() -> bool:
+    """Tesseract ikilisi bulunuyor mu (bir kez kontrol edilir; yoksa bir kez uyarı yazılır)."""
+    global _available
+    if _available is None:
+        _available = shutil.which(settings.OCR_TESSERACT_CMD) is not None
+        if not _available:
+            log.warning("OCR disabled: '%s' not found; scanned pages will yield empty text.",
+                        settings.OCR_TESSERACT_CMD)
+    return _available
+
+
+def ocr_options() -> Dict:
+    return {
+        "cmd": settings.OCR_TESSERACT_CMD,
+        "lang": settings.OCR_LANG,
+        "dpi": settings.OCR_DPI,
+        "timeout": settings.OCR_TIMEOUT_SECONDS,
+        "cache": settings.PDF_CACHE_ENABLED,
+    }
+
+
+def _tesseract(image, opts: Dict) -> str:
+    # Gri tonlamalı PGM: kodlaması ucuzdur, tesseract stdin'den okur
+    w, h = image.size
+    pgm = b"P5\n%d %d\n255\n" % (w, h) + image.tobytes()
+    proc = subprocess.run(
+        [opts["cmd"], "stdin", "stdout", "-l", opts["lang"], "--dpi", str(opts["dpi"])],
+        input=pgm, capture_output=True, timeout=opts["timeout"], check=True,
+    )
+    return proc.stdout.decode("utf-8", errors="replace")
+
+
+def ocr_page(source: PDFSource, filename: str, index: int, opts: Dict) -> Dict:
+    """
+    Sayfayı (0 tabanlı `index`) opts['dpi'] çözünürlükte render edip Tesseract ile okur.
+    Sonuç sayfa görüntüsünün özetiyle (+ dil) önbelleğe yazılır; aynı tarama başka bir PDF'te
+    gelse bile yeniden OCR yapılmaz.
+    Dönen değer: {'text', 'seconds', 'cached', 'error'} — hata durumunda metin boştur.
+    """
+    t0 = time.perf_counter()
+    text, cached, error = "", False, None
+    try:
+        with load_pdfplumber().open(_open_source(source, filename)) as pdf:
+            image = pdf.pages[index].to_image(resolution=opts["dpi"]).original.convert("L")
+        digest = hashlib.sha256(b"%dx%d:" % image.size + image.tobytes()).hexdigest()
+        kind = f"ocr:{opts['lang']}"
+        hit = pdf_cache.get(digest, kind) if opts["cache"] else None
+        if hit is not None:
+            text, cached = hit, True
+        else:
+            text = _tesseract(image, opts)
+            if opts["cache"]:
+                pdf_cache.put(digest, kind, text)
+    except subprocess.TimeoutExpired:
+        error = "timeout"
+    except (OSError, subprocess.CalledProcessError) as e:
+        error = f"tesseract: {e}"
+    except Exception as e:
+        error = f"render: {e}"
+    if error:
+        log.warning("OCR failed for %s page %d: %s", filename, index + 1, error)
+    else:
+        log.debug("OCR page %d of %s: %d chars%s.", index + 1, filename, len(text), " (cached)" if cached else "")
+    return {"text": text, "seconds": time.perf_counter() - t0, "cached": cached, "error": error}
@@ -0,0 +1,139 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_NUMBER_CHARS = set("+-0123456789.eE")
+
+
+def _read_string(buf: str, i: int) -> Tuple[str, int, bool]:
+    """
+    buf[i] == '"' varsayılır. (çözülmüş metin, bir sonraki indeks, tamamlandı mı) döner.
+    Yarım kalan kaçış dizileri (örn. sondaki '\\' veya eksik '\\u00') atılır.
+    """
+    out = []
+    i += 1
+    n = len(buf)
+    while i < n:
+        c = buf[i]
+        if c == '"':
+            return "".join(out), i + 1, True
+        if c == "\\":
+            if i + 1 >= n:
+                break
+            e = buf[i + 1]
+            if e == "u":
+                if i + 6 > n:
+                    break
+                try:
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            out.append(_ESCAPES.get(e, e))
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out), n, False
+
+
+def _skip_ws(buf: str, i: int) -> int:
+    n = len(buf)
+    while i < n and buf[i] in " \t\r\n":
+        i += 1
+    return i
+
+
+def parse_partial_object(buf: str) -> Dict[str, Any]:
+    """
+    Akış halinde gelen (henüz kapanmamış olabilecek) bir JSON nesnesinden
+    o ana kadar okunabilen üst düzey alanları çıkarır.
+
+    - Tamamlanmış string/sayı/bool değerleri olduğu gibi döner.
+    - Yarım string değerler, o ana kadarki önekleriyle döner (metin büyüdükçe güncellenir).
+    - Sayılar yalnızca ardından ayraç geldiyse (',' '}' veya boşluk) döner; '7' → '7.5' karışıklığı olmaz.
+    - İç içe nesne/diziler atlanır.
+    """
+    out: Dict[str, Any] = {}
+    start = buf.find("{")
+    if start == -1:
+        return out
+    i = start + 1
+    n = len(buf)
+    while True:
+        i = _skip_ws(buf, i)
+        if i >= n or buf[i] == "}":
+            return out
+        if buf[i] == ",":
+            i += 1
+            continue
+        if buf[i] != '"':
+            return out
+        key, i, done = _read_string(buf, i)
+        if not done:
+            return out
+        i = _skip_ws(buf, i)
+        if i >= n or buf[i] != ":":
+            return out
+        i = _skip_ws(buf, i + 1)
+        if i >= n:
+            return out
+        c = buf[i]
+        if c == '"':
+            val, i, done = _read_string(buf, i)
+            out[key] = val
+            if not done:
+                return out
+        elif c in _NUMBER_CHARS:
+            j = i
+            while j < n and buf[j] in _NUMBER_CHARS:
+                j += 1
+            if j >= n:
+                return out
+            try:
+                out[key] = json.loads(buf[i:j])
+            except ValueError:
+                pass
+            i = j
+        elif buf.startswith("true", i) or buf.startswith("false", i) or buf.startswith("null", i):
+            word = "true" if buf.startswith("true", i) else "false" if buf.startswith("false", i) else "null"
+            out[key] = json.loads(word)
+            i += len(word)
+        elif c in "{[":
+            # İç içe yapıyı atla (string içindeki parantezlere dikkat ederek)
+            depth = 0
+            while i < n:
+                ch = buf[i]
+                if ch == '"':
+                    _, i, done = _read_string(buf, i)
+                    if not done:
+                        return out
+                    continue
+                if ch in "{[":
+                    depth += 1
+                elif ch in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        i += 1
+                        break
+                i += 1
+            else:
+                return out
+        else:
+            return out
+
+
+class PartialJSONParser:
+    """
+    Akış parçalarını biriktirir ve her `feed` çağrısında o ana kadarki alanları döndürür.
+    Değerlendirme cevapları küçük olduğundan tampon her seferinde baştan taranır.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, chunk: Optional[str]) -> Dict[str, Any]:
+        if chunk:
+            self.buffer += chunk
+        return parse_partial_object(self.buffer)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Union
+from config import settings
+from helpers.pdf_utils import PARSER_VERSION
+
+
+def content_hash(source: Union[bytes, str]) -> str:
+    """PDF içeriğinin sha256 özeti (içerik-adresli önbellek anahtarı); dosya yolu verilirse akış olarak okunur."""
+    if isinstance(source, str):
+        h = hashlib.sha256()
+        with open(source, "rb") as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
+    return hashlib.sha256(source).hexdigest()
+
+
+class PDFCache:
+    """
+    Çıkarılmış PDF metni ve ayrıştırılmış sorular için içerik-adresli disk önbelleği (SQLite).
+
+    Anahtar: (sha256, tür) — tür: 'pages' (ham sayfa metinleri), 'student' / 'key' (ayrıştırılmış sorular).
+    Her kayıt PARSER_VERSION ile damgalanır; sürüm değişince eski kayıtlar geçersiz sayılır ve silinir.
+    Toplam boyut `max_bytes` değerini aşınca en uzun süredir kullanılmayan kayıtlar (LRU) atılır.
+    """
+
+    def __init__(self, path: str, max_bytes: int, version: str = PARSER_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pdf_cache (
+                    digest TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (digest, kind)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pdf_cache_access ON pdf_cache(last_access)")
+            # Toplam boyut tek satırlık tabloda tetikleyicilerle tutulur (her yazımda SUM taraması yapılmaz);
+            # aynı dosyayı kullanan tüm süreçler (ayrıştırma havuzu, worker'lar) aynı toplamı görür
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("CREATE TABLE IF NOT EXISTS pdf_cache_stats (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                             "total INTEGER NOT NULL)")
+                if conn.execute("SELECT 1 FROM pdf_cache_stats").fetchone() is None:
+                    conn.execute("INSERT INTO pdf_cache_stats (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM pdf_cache")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS pdf_cache_size_ins AFTER INSERT ON pdf_cache BEGIN "
+                             "UPDATE pdf_cache_stats SET total = total + NEW.size WHERE id = 0; END")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS pdf_cache_size_del AFTER DELETE ON pdf_cache BEGIN "
+                             "UPDATE pdf_cache_stats SET total = total - OLD.size WHERE id = 0; END")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS pdf_cache_size_upd AFTER UPDATE OF size ON pdf_cache BEGIN "
+                             "UPDATE pdf_cache_stats SET total = total + NEW.size - OLD.size WHERE id = 0; END")
+                # Ayrıştırıcı sürümü değiştiyse eski kayıtları temizle
+                conn.execute("DELETE FROM pdf_cache WHERE version != ?", (self.version,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._conn = conn
+        return self._conn
+
+    def get(self, digest: str, kind: str) -> Optional[Any]:
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value FROM pdf_cache WHERE digest = ? AND kind = ? AND version = ?",
+                (digest, kind, self.version),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute(
+                "UPDATE pdf_cache SET last_access = ? WHERE digest = ? AND kind = ?",
+                (time.time(), digest, kind),
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, digest: str, kind: str, value: Any):
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            db = self._db()
+            # Kayıt ekleme, toplamın güncellenmesi (tetikleyici) ve gerekirse tahliye tek işlemde
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # REPLACE silme tetikleyicisini çalıştırmaz; güncelleme 'size' farkını toplama yansıtır
+                db.execute(
+                    "INSERT INTO pdf_cache (digest, kind, version, value, size, last_access) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (digest, kind) DO UPDATE SET version = excluded.version, value = excluded.value, "
+                    "size = excluded.size, last_access = excluded.last_access",
+                    (digest, kind, self.version, data, size, time.time()),
+                )
+                self._evict(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total(self._db())
+
+    @staticmethod
+    def _total(db: sqlite3.Connection) -> int:
+        return db.execute("SELECT total FROM pdf_cache_stats WHERE id = 0").fetchone()[0]
+
+    def _evict(self, db: sqlite3.Connection):
+        total = self._total(db)
+        if total <= self.max_bytes:
+            return
+        # LRU: en eski erişimden başlayarak sınırın altına inene kadar sil
+        excess = total - self.max_bytes
+        victims = []
+        for digest, kind, size in db.execute("SELECT digest, kind, size FROM pdf_cache ORDER BY last_access ASC"):
+            victims.append((digest, kind))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM pdf_cache WHERE digest = ? AND kind = ?", victims)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+pdf_cache = PDFCache(settings.PDF_CACHE_PATH, settings.PDF_CACHE_MAX_BYTES)
@@ -1,41 +1,155 @@
 import io
-import pdfplumber
+import os
+import time
 from fastapi import UploadFile
 from fastapi import HTTPException
-from typing import List, Dict, Tuple
+from typing import BinaryIO, Iterable, Iterator, List, Dict, Tuple, Union
 import re
+from helpers.log import get_logger, previews_enabled, SAMPLED
 
-def extract_text(uploaded_pdf: UploadFile) -> str:
+log = get_logger("pdf_utils")
+
+# Ayrıştırma mantığı (sayfa çıkarma, soru bölme, soru/cevap ayırma) değiştiğinde artırın;
+# önbellekteki eski kayıtlar bu damga sayesinde geçersiz olur.
+# 2: taranmış sayfalar OCR ile okunur (önceden boş metinle önbelleğe yazılmış PDF'ler yeniden çıkarılır)
+PARSER_VERSION = "2"
+
+def load_pdfplumber():
     """
-    PDF içeriğini sayfa sayfa okuyup birleştirir.
-    Debug çıktıları: sayfa sayısı, karakter uzunlukları, ilk 200 karakter önizlemesi.
+    pdfplumber (ve pdfminer) ilk kullanımda içe aktarılır: yalnızca yükleme kontrolü yapan API süreci
+    (ör. kuyruk modu) bu yığını hiç yüklemez. Açılıştaki ısınma (modules.warmup) bunu arka planda çağırır.
     """
-    print(f"[DEBUG] Starting PDF text extraction: {uploaded_pdf.filename}")
-    raw = uploaded_pdf.file.read()
+    import pdfplumber
+    return pdfplumber
+
+
+def preload_worker(_: int = 0) -> int:
+    """Havuz işçisinde PDF yığınını önceden yükler (ısınma); dönen değer: işçinin pid'i."""
+    load_pdfplumber()
+    return os.getpid()
+
+
+class PDFParseError(ValueError):
+    """
+    PDF okunamadığında/çözümlenemediğinde fırlatılır.
+    İşçi süreçlerinden güvenle taşınabilmesi için HTTPException yerine kullanılır;
+    HTTP katmanında 400 hatasına çevrilir.
+    """
+
+
+def check_pdf_bytes(raw: bytes, filename: str) -> None:
+    """Boş dosya ve basit PDF imza kontrolü."""
     if not raw or not isinstance(raw, (bytes, bytearray)):
-        raise HTTPException(status_code=400, detail=f"'{uploaded_pdf.filename}' okunamadı veya boş dosya.")
+        raise PDFParseError(f"'{filename}' okunamadı veya boş dosya.")
     # Basit PDF imza kontrolü
     if not raw.startswith(b"%PDF"):
-        raise HTTPException(status_code=400, detail=f"'{uploaded_pdf.filename}' geçerli bir PDF değil.")
+        raise PDFParseError(f"'{filename}' geçerli bir PDF değil.")
+
+
+# PDF kaynağı: bellekteki baytlar, diskteki dosya yolu veya okunabilir/konumlanabilir dosya nesnesi
+PDFSource = Union[bytes, bytearray, str, BinaryIO]
+
+
+def _open_source(source: PDFSource, filename: str):
+    """
+    İmzayı kontrol eder ve pdfplumber'a verilecek nesneyi döner. Yol ve dosya nesneleri
+    doğrudan açılır (pdfminer gerektiği kadarını diskten okur); yalnızca bayt girdisi sarılır.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        check_pdf_bytes(source, filename)
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        try:
+            with open(source, "rb") as fh:
+                head = fh.read(8)
+        except OSError:
+            raise PDFParseError(f"'{filename}' okunamadı veya boş dosya.")
+        check_pdf_bytes(head, filename)
+        return source
+    pos = source.tell()
+    head = source.read(8)
+    source.seek(pos)
+    check_pdf_bytes(head, filename)
+    return source
+
+
+def extract_pages(source: PDFSource, filename: str, start: int = 0, end: int | None = None) -> Tuple[List[str], int]:
+    """
+    PDF'in [start, end) aralığındaki sayfalarının metnini çıkarır.
+    Dönen değer: (sayfa metinleri, toplam sayfa sayısı).
+    Süreç havuzunda dosya yolu verilmelidir: her görev dosyayı kendisi açar, baytlar süreçler arası kopyalanmaz.
+    """
+    texts, total, _ = extract_pages_timed(source, filename, start, end)
+    return texts, total
 
+
+def extract_pages_timed(source: PDFSource, filename: str, start: int = 0,
+                        end: int | None = None) -> Tuple[List[str], int, List[float]]:
+    """
+    `extract_pages` ile aynı; ek olarak sayfa başına çıkarma süresini (saniye) döner.
+    Süreler havuz işçisinde ölçülür, metrikler ana süreçte kaydedilir.
+    """
+    opened = _open_source(source, filename)
     try:
-        with pdfplumber.open(io.BytesIO(raw)) as pdf:
-            print(f"[DEBUG] Total pages found: {len(pdf.pages)}")
-            texts = []
+        with load_pdfplumber().open(opened) as pdf:
+            total = len(pdf.pages)
+            log.debug("Total pages found: %d (range %d:%s)", total, start, end if end is not None else total)
+            texts, durations = [], []
+            for idx, page in enumerate(pdf.pages[start:end], start=start + 1):
+                t0 = time.perf_counter()
+                texts.append(_page_text(page, idx))
+                durations.append(time.perf_counter() - t0)
+    except PDFParseError:
+        raise
+    except Exception as e:
+        # pdfminer kaynaklı hataları kullanıcı dostu bir mesaja çevir
+        raise PDFParseError(f"PDF çözümlenemedi: {filename} ({e})")
+    return texts, total, durations
+
+
+def _page_text(page, idx: int) -> str:
+    t = page.extract_text() or ""
+    # Sayfanın ayrıştırılmış nesneleri (karakterler, düzen) bir sonraki sayfaya taşınmasın
+    page.close()
+    log.debug("Page %d: extracted %d chars.", idx, len(t), extra=SAMPLED)
+    if previews_enabled(log):
+        log.debug("Page %d preview: %s ...", idx, t[:200].replace("\n", " "))
+    return t
+
+
+def iter_pages(source: PDFSource, filename: str) -> Iterator[str]:
+    """Sayfa metinlerini pdfplumber çıkardıkça tek tek verir (tüm PDF'in bitmesi beklenmez)."""
+    opened = _open_source(source, filename)
+    try:
+        with load_pdfplumber().open(opened) as pdf:
+            log.debug("Total pages found: %d", len(pdf.pages))
             for idx, page in enumerate(pdf.pages, start=1):
-                t = page.extract_text() or ""
-                print(f"[DEBUG] Page {idx}: extracted {len(t)} chars.")
-                preview = t[:200].replace("\n", " ")
-                print(f"[DEBUG] Page {idx} preview: {preview} ...")
-                texts.append(t)
-            combined = "\n".join(texts)
+                yield _page_text(page, idx)
+    except PDFParseError:
+        raise
     except Exception as e:
-        # pdfminer kaynaklı hataları kullanıcı dostu bir 400 mesajı olarak döndür
-        raise HTTPException(status_code=400, detail=f"PDF çözümlenemedi: {uploaded_pdf.filename} ({e})")
+        raise PDFParseError(f"PDF çözümlenemedi: {filename} ({e})")
+
+
+def extract_text(uploaded_pdf: UploadFile) -> str:
+    """
+    PDF içeriğini sayfa sayfa okuyup birleştirir.
+    Yüklemenin (geçici) dosyası doğrudan açılır; içerik belleğe kopyalanmaz.
+    Debug çıktıları: sayfa sayısı, karakter uzunlukları, önizleme (yalnızca LOG_PREVIEWS açıkken).
+    """
+    log.debug("Starting PDF text extraction: %s", uploaded_pdf.filename)
+    uploaded_pdf.file.seek(0)
+    try:
+        combined = "\n".join(iter_pages(uploaded_pdf.file, uploaded_pdf.filename))
+    except PDFParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    print(f"[DEBUG] Combined text length: {len(combined)} chars.")
-    print(f"[DEBUG] Combined preview: {combined[:300].replace(chr(10), ' ')} ...")
+    log.debug("Combined text length: %d chars.", len(combined))
+    if previews_enabled(log):
+        log.debug("Combined preview: %s ...", combined[:300].replace("\n", " "))
     return combined
+
+
 _NAME_RE = re.compile(r"^Ad[ıi]\s*Soyad[ıi]\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
 
 def extract_student_name_from_text(text: str) -> str:
@@ -51,44 +165,73 @@ def extract_student_name_from_text(text: str) -> str:
     return ""
 
 
+_HEADER_RE = re.compile(r"Soru\s+(\d+)[:\.]", re.IGNORECASE)
+# Metnin sonunda yarım kalmış olabilecek başlık ('S', 'Sor', 'Soru 1' ...); sonraki sayfayla tamamlanabilir
+_HEADER_TAIL_RE = re.compile(r"S(?:o(?:r(?:u\s*\d*)?)?)?\Z", re.IGNORECASE)
+_HEADER_TAIL_WINDOW = 64
 
-def chunk_by_questions(text: str) -> List[Dict]:
+
+class QuestionChunker:
     """
-    'Soru 1:', 'Soru 2:' gibi başlıklara göre metni böler.
-    Debug çıktıları: bulunan soru başlıkları, parçaların uzunlukları.
+    'Soru 1:', 'Soru 2:' gibi başlıklara göre metni artımlı böler.
+    Sayfalar sırayla `feed` ile verilir; bir sorunun metni, sonraki başlık göründüğü anda tamamlanmış
+    parça olarak döner (son soru `finish` ile). Sayfalar tek bir metinde birleştirilmez; sonuç,
+    sayfaları '\\n' ile birleştirip bölmekle aynıdır. İlk başlıktan önceki metin atılır.
     """
-    print("[DEBUG] Splitting text into questions...")
-    parts = re.split(r"(Soru\s+\d+[:\.])", text, flags=re.IGNORECASE)
-    print(f"[DEBUG] Total parts after split: {len(parts)}")
 
-    chunks = []
-    cur_id = None
-    buf = []
+    def __init__(self):
+        self._id: str | None = None
+        self._buf: List[str] = []
+        self._tail = ""
+        self._pages = 0
+        self.count = 0
 
-    for i, part in enumerate(parts):
-        # Soru başlığı
-        if re.match(r"Soru\s+\d+[:\.]", part, flags=re.IGNORECASE):
-            if cur_id is not None and buf:
-                content = "\n".join(buf).strip()
-                chunks.append({"question_id": cur_id, "text": content})
-                print(f"[DEBUG] Added chunk Q{cur_id}: {len(content)} chars.")
-            cur_id = re.findall(r"\d+", part)[0]
-            print(f"[DEBUG] Found question header: {part.strip()} (id={cur_id})")
-            buf = []
-        else:
-            buf.append(part)
+    def _close(self) -> Dict:
+        content = "".join(self._buf).strip()
+        self._buf = []
+        self.count += 1
+        log.debug("Added chunk Q%s: %d chars.", self._id, len(content), extra=SAMPLED)
+        if previews_enabled(log):
+            log.debug("    ↳ Q%s preview: %s ...", self._id, content[:100].replace("\n", " "))
+        return {"question_id": self._id, "text": content}
 
-    if cur_id is not None and buf:
-        content = "\n".join(buf).strip()
-        chunks.append({"question_id": cur_id, "text": content})
-        print(f"[DEBUG] Final chunk Q{cur_id}: {len(content)} chars.")
+    def _keep(self, segment: str):
+        if self._id is not None and segment:
+            self._buf.append(segment)
 
-    print(f"[DEBUG] Total questions extracted: {len(chunks)}")
-    for q in chunks:
-        preview = q["text"][:100].replace("\n", " ")
-        print(f"    ↳ Q{q['question_id']} preview: {preview} ...")
+    def feed(self, page: str) -> List[Dict]:
+        text = self._tail + "\n" + page if self._pages else page
+        self._pages += 1
+        done: List[Dict] = []
+        pos = 0
+        for m in _HEADER_RE.finditer(text):
+            self._keep(text[pos:m.start()])
+            if self._id is not None:
+                done.append(self._close())
+            self._id = m.group(1)
+            log.debug("Found question header: %s (id=%s)", m.group(0).strip(), self._id, extra=SAMPLED)
+            pos = m.end()
+        partial = _HEADER_TAIL_RE.search(text, max(pos, len(text) - _HEADER_TAIL_WINDOW))
+        cut = partial.start() if partial else len(text)
+        self._keep(text[pos:cut])
+        self._tail = text[cut:]
+        return done
 
-    return chunks
+    def finish(self) -> List[Dict]:
+        self._keep(self._tail)
+        self._tail = ""
+        done = [self._close()] if self._id is not None else []
+        log.debug("Total questions extracted: %d", self.count)
+        return done
+
+
+def chunk_by_questions(text: str) -> List[Dict]:
+    """
+    'Soru 1:', 'Soru 2:' gibi başlıklara göre metni böler (bkz. QuestionChunker).
+    Debug çıktıları: bulunan soru başlıkları, parçaların uzunlukları.
+    """
+    chunker = QuestionChunker()
+    return chunker.feed(text) + chunker.finish()
 
 
 # ==========================================================
@@ -96,6 +239,14 @@ def chunk_by_questions(text: str) -> List[Dict]:
 # ==========================================================
 
 _SPLIT_RE = re.compile(r"\b(?:Cevap|Yanıt|Yanit)\s*[:\-–]\s*", re.IGNORECASE)
+_SPLIT_WORD_RE = re.compile(r"\b(?:Cevap|Yanıt|Yanit)\b", re.IGNORECASE)
+_NAME_LINE_RE = re.compile(r"^Ad[ıi]\s*Soyad[ıi]\s*:[^\n]*\n", re.IGNORECASE)
+_BLANK_LINE_RE = re.compile(r"\n\s*\n+")
+_PARAGRAPH_RE = re.compile(r"\n\n+")
+# Sıra önemli: noktalı/iki noktalı biçim varsa ayraç soru metnine dahil edilir
+_ACIKLAYINIZ_RES = tuple(re.compile(re.escape(t), re.IGNORECASE)
+                         for t in ("Açıklayınız.", "Açıklayınız:", "Açıklayınız"))
+_QMARK_RE = re.compile(r"\?(?:\s|$)")
 
 def split_student_q_and_answer(chunk_text: str) -> Tuple[str, str]:
     """
@@ -105,26 +256,26 @@ def split_student_q_and_answer(chunk_text: str) -> Tuple[str, str]:
     if not chunk_text:
         return "", ""
     # Başta yer alan kimlik satırlarını temizle (örn. "Adı Soyadı: ...")
-    chunk_text = re.sub(r"^Ad[ıi]\s*Soyad[ıi]\s*:[^\n]*\n", "", chunk_text, flags=re.IGNORECASE)
+    chunk_text = _NAME_LINE_RE.sub("", chunk_text)
     m = _SPLIT_RE.search(chunk_text)
     if m:
         q_text = chunk_text[:m.start()].strip()
         s_ans = chunk_text[m.end():].strip()
         return q_text, s_ans
 
-    alt = re.search(r"\b(?:Cevap|Yanıt|Yanit)\b", chunk_text, flags=re.IGNORECASE)
+    alt = _SPLIT_WORD_RE.search(chunk_text)
     if alt:
         return chunk_text[:alt.start()].strip(), chunk_text[alt.end():].strip()
 
     # 1) İlk boş satırda bölmeyi dene (genelde soru metni paragrafı → boş satır → öğrenci cevabı)
-    parts = re.split(r"\n\s*\n+", chunk_text, maxsplit=1)
+    parts = _BLANK_LINE_RE.split(chunk_text, maxsplit=1)
     if len(parts) == 2:
         return parts[0].strip(), parts[1].strip()
 
     # 2) "Açıklayınız" ifadesinden sonra böl (soru direktifini soru metnine dahil et)
     acik_idx = None
-    for token in ["Açıklayınız.", "Açıklayınız:", "Açıklayınız"]:
-        m2 = re.search(re.escape(token), chunk_text, flags=re.IGNORECASE)
+    for token_re in _ACIKLAYINIZ_RES:
+        m2 = token_re.search(chunk_text)
         if m2:
             acik_idx = m2.end()
             break
@@ -132,7 +283,7 @@ def split_student_q_and_answer(chunk_text: str) -> Tuple[str, str]:
         return chunk_text[:acik_idx].strip(), chunk_text[acik_idx:].strip()
 
     # 3) İlk soru işaretine kadar olan kısmı soru kabul et
-    qm = re.search(r"\?(?:\s|$)", chunk_text)
+    qm = _QMARK_RE.search(chunk_text)
     if qm:
         return chunk_text[:qm.end()].strip(), chunk_text[qm.end():].strip()
 
@@ -140,52 +291,107 @@ def split_student_q_and_answer(chunk_text: str) -> Tuple[str, str]:
     return "", chunk_text.strip()
 
 
-def parse_student_pdf(student_pdf: UploadFile) -> List[Dict]:
+class StudentQuestionParser:
     """
-    Öğrenci PDF'ini okur, her sorunun soru metnini ve cevabını ayırır.
-    Dönen yapı: [{'question_id', 'question_text', 'student_answer'}]
+    Öğrenci PDF'inin sayfalarını sırayla alır; her soru tamamlandığı anda
+    {'question_id', 'question_text', 'student_answer', 'student_name'} satırını döner.
+    Öğrenci adı, ilk rastlandığı sayfadan itibaren (normalde ilk sorudan önce) satırlara eklenir.
     """
-    text = extract_text(student_pdf)
-    student_name = extract_student_name_from_text(text)
-    chunks = chunk_by_questions(text)
-    parsed = []
-    for c in chunks:
+
+    def __init__(self):
+        self._chunker = QuestionChunker()
+        self.student_name = ""
+
+    def _row(self, c: Dict) -> Dict:
         q_text, s_ans = split_student_q_and_answer(c["text"])
-        parsed.append({
+        return {
             "question_id": c["question_id"],
             "question_text": q_text,
             "student_answer": s_ans,
-            "student_name": student_name
-        })
-    print(f"[DEBUG] Student PDF parsed into {len(parsed)} questions.")
-    return parsed
+            "student_name": self.student_name
+        }
 
+    def feed(self, page: str) -> List[Dict]:
+        if not self.student_name:
+            self.student_name = extract_student_name_from_text(page)
+        return [self._row(c) for c in self._chunker.feed(page)]
 
-def parse_key_pdf(key_pdf: UploadFile) -> List[Dict]:
-    """
-    Cevap anahtarı PDF'ini okur, her sorunun metninden mümkünse soru kısmını ve anahtar cevabı ayırır.
-    Dönen yapı: [{'question_id', 'question_text', 'key_answer'}]
-    """
-    text = extract_text(key_pdf)
-    chunks = chunk_by_questions(text)
+    def finish(self) -> List[Dict]:
+        rows = [self._row(c) for c in self._chunker.finish()]
+        log.debug("Student PDF parsed into %d questions.", self._chunker.count)
+        return rows
+
+
+class KeyQuestionParser:
+    """Cevap anahtarı sayfalarını sırayla alır; tamamlanan her soru için {'question_id', 'question_text', 'key_answer'}."""
 
-    parsed: List[Dict] = []
-    for c in chunks:
+    def __init__(self):
+        self._chunker = QuestionChunker()
+
+    @staticmethod
+    def _row(c: Dict) -> Dict:
         raw = c["text"]
         # Anahtar metninde de 'Cevap' benzeri ayraç varsa soru/cevabı ayırmayı dene
         q_text, ans = split_student_q_and_answer(raw)
         if not q_text and raw:
             # Heuristik: ilk paragrafı soru kabul et, geri kalanı cevap
-            parts = re.split(r"\n\n+", raw, maxsplit=1)
+            parts = _PARAGRAPH_RE.split(raw, maxsplit=1)
             if parts:
                 q_text = parts[0].strip()
                 ans = raw[len(parts[0]):].strip()
-
-        parsed.append({
+        return {
             "question_id": c["question_id"],
             "question_text": q_text,
             "key_answer": ans or raw
-        })
+        }
+
+    def feed(self, page: str) -> List[Dict]:
+        return [self._row(c) for c in self._chunker.feed(page)]
+
+    def finish(self) -> List[Dict]:
+        rows = [self._row(c) for c in self._chunker.finish()]
+        log.debug("Key PDF parsed into %d questions.", self._chunker.count)
+        return rows
+
+
+def iter_questions(parser, pages: Iterable[str]) -> Iterator[Dict]:
+    """Sayfaları ayrıştırıcıya verir; her soru, sonraki başlık görülür görülmez üretilir."""
+    for page in pages:
+        yield from parser.feed(page)
+    yield from parser.finish()
+
+
+def _iter_upload_pages(upload: UploadFile) -> Iterator[str]:
+    log.debug("Starting PDF text extraction: %s", upload.filename)
+    upload.file.seek(0)
+    try:
+        yield from iter_pages(upload.file, upload.filename)
+    except PDFParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def parse_student_pdf(student_pdf: UploadFile) -> List[Dict]:
+    """
+    Öğrenci PDF'ini okur, her sorunun soru metnini ve cevabını ayırır.
+    Sayfalar çıkarıldıkça ayrıştırılır; metin tek parçada birleştirilmez.
+    Dönen yapı: [{'question_id', 'question_text', 'student_answer'}]
+    """
+    return list(iter_questions(StudentQuestionParser(), _iter_upload_pages(student_pdf)))
+
+
+def parse_student_text(text: str) -> List[Dict]:
+    """Çıkarılmış öğrenci PDF metnini sorulara ayırır (bkz. parse_student_pdf)."""
+    return list(iter_questions(StudentQuestionParser(), [text]))
+
+
+def parse_key_pdf(key_pdf: UploadFile) -> List[Dict]:
+    """
+    Cevap anahtarı PDF'ini okur, her sorunun metninden mümkünse soru kısmını ve anahtar cevabı ayırır.
+    Dönen yapı: [{'question_id', 'question_text', 'key_answer'}]
+    """
+    return list(iter_questions(KeyQuestionParser(), _iter_upload_pages(key_pdf)))
+
 
-    print(f"[DEBUG] Key PDF parsed into {len(parsed)} questions.")
-    return parsed
+def parse_key_text(text: str) -> List[Dict]:
+    """Çıkarılmış cevap anahtarı metnini sorulara ayırır (bkz. parse_key_pdf)."""
+    return list(iter_questions(KeyQuestionParser(), [text]))
@@ -5,6 +5,48 @@ class AssessInitResponse(BaseModel):
     job_id: str
     message: str = "Assessment started. Connect to WebSocket for progress."
 
+class BatchJobRef(BaseModel):
+    job_id: str
+    filename: str
+
+class BatchInitResponse(BaseModel):
+    batch_id: str
+    jobs: List[BatchJobRef]
+    message: str = "Batch assessment started. Connect to WebSocket with batch_id for per-student progress."
+
+class JobRef(BaseModel):
+    job_id: str
+    filename: Optional[str] = None
+    status: str
+    total_questions: Optional[int] = None
+    completed_questions: int = 0
+
+class JobInfo(BaseModel):
+    job_id: str
+    kind: str                    # "single" | "batch"
+    batch_id: Optional[str] = None
+    status: str                  # "ingesting" | "running" | "completed" | "failed" | "cancelled"
+    filename: Optional[str] = None
+    student_name: Optional[str] = None
+    total_questions: Optional[int] = None
+    completed_questions: int = 0
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    jobs: Optional[List[JobRef]] = None   # yalnızca toplu işlerde: öğrenci işleri
+
+class JobResultsPage(BaseModel):
+    job_id: str
+    total: int
+    offset: int
+    limit: int
+    items: List[Dict[str, Any]]
+
+class JobQuestions(BaseModel):
+    job_id: str
+    items: List[Dict[str, Any]]   # [{'question_id', 'question_text', 'student_answer', 'key_answer', ...}]
+
 class QuestionChunk(BaseModel):
     question_id: str
     student_answer: str
@@ -23,6 +65,6 @@ class AssessFinalSummary(BaseModel):
     gaps: List[str]
 
 class WSProgressMessage(BaseModel):
-    type: str                    # "progress" | "summary" | "done" | "error"
+    type: str                    # "ingest" | "progress" | "summary" | "batch_progress" | "batch_summary" | "done" | "error"
     job_id: str
     payload: Dict[str, Any]      # QuestionResult veya final özet vs.
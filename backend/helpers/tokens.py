@@ -0,0 +1,67 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """tiktoken kodlayıcısı; kurulu değilse veya model tanınmıyorsa None (yaklaşık sayım kullanılır)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+    except Exception:
+        return None
+
+
+def count_tokens(text: Optional[str], model: str = "gpt-4o-mini") -> int:
+    """
+    Metnin yerel token sayısı. tiktoken yoksa ~4 karakter/token yaklaşımı kullanılır
+    (Türkçe metinde gerçek sayı biraz daha yüksek olabilir; bütçeler buna göre pay bırakmalı).
+    """
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return max(1, len(text) // 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def trim_to_tokens(text: Optional[str], max_tokens: int, model: str = "gpt-4o-mini",
+                   head_ratio: float = 0.67) -> Tuple[str, int]:
+    """
+    Metni en fazla `max_tokens` tokena indirir: baştan ~head_ratio, sondan kalanı korunur, ortası
+    '…(N token kısaltıldı)…' işaretiyle atılır (cevabın girişi ve sonucu çoğunlukla en bilgilendirici kısımdır).
+    Dönen değer: (metin, atılan token sayısı); max_tokens <= 0 → kısaltma yok.
+    """
+    if not text or max_tokens <= 0:
+        return text or "", 0
+    enc = _encoding(model)
+    if enc is None:
+        # Yaklaşık: ~4 karakter/token
+        limit = max_tokens * 4
+        if len(text) <= limit:
+            return text, 0
+        head_n = int(limit * head_ratio)
+        head, tail = text[:head_n], text[len(text) - (limit - head_n):]
+        # Kelime ortasından bölmemek için kesim noktaları boşluğa çekilir
+        head = head[:head.rfind(" ")] if " " in head[head_n // 2:] else head
+        tail = tail[tail.find(" ") + 1:] if " " in tail[:len(tail) // 2] else tail
+        removed = max(1, (len(text) - limit) // 4)
+    else:
+        ids = enc.encode(text, disallowed_special=())
+        if len(ids) <= max_tokens:
+            return text, 0
+        head_n = int(max_tokens * head_ratio)
+        tail_n = max_tokens - head_n
+        # Token sınırında bölünmüş çok baytlı karakterler (�) atılır
+        head = enc.decode(ids[:head_n]).rstrip("�")
+        tail = enc.decode(ids[len(ids) - tail_n:]).lstrip("�") if tail_n else ""
+        removed = len(ids) - max_tokens
+    return f"{head.rstrip()}\n…({removed} token kısaltıldı)…\n{tail.lstrip()}", removed
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import tempfile
+import zipfile
+from typing import BinaryIO, List, Optional, Tuple
+from fastapi import UploadFile
+from config import settings
+from helpers.log import get_logger
+from helpers.pdf_utils import PDFParseError, check_pdf_bytes
+
+log = get_logger("uploads")
+
+# Yüklemeler belleğe alınmadan bu boyuttaki parçalarla geçici dosyaya kopyalanır
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(PDFParseError):
+    """Dosya UPLOAD_MAX_BYTES sınırını aştığında fırlatılır; HTTP katmanında 413'e çevrilir."""
+
+
+class TooManyFiles(PDFParseError):
+    """Zip, kabul edilen dosya sayısından fazla PDF içerdiğinde fırlatılır (HTTP 400)."""
+
+
+def _spool_dir() -> Optional[str]:
+    if not settings.UPLOAD_SPOOL_DIR:
+        return None
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    return settings.UPLOAD_SPOOL_DIR
+
+
+def spool_stream(src: BinaryIO, filename: str, max_bytes: Optional[int] = None, check_pdf: bool = True) -> str:
+    """
+    Dosya benzeri kaynağı parça parça geçici dosyaya yazar ve yolunu döner.
+    İlk parçada PDF imzası kontrol edilir (geçersiz dosyanın geri kalanı okunmaz); sınır aşılınca
+    kopyalama kesilir. Hata durumunda geçici dosya silinir.
+    """
+    limit = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf" if check_pdf else ".bin", dir=_spool_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            size = 0
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0 and check_pdf:
+                    check_pdf_bytes(chunk, filename)
+                size += len(chunk)
+                if limit and size > limit:
+                    raise UploadTooLarge(f"'{filename}' çok büyük (en fazla {limit // (1024 * 1024)} MB).")
+                out.write(chunk)
+        if size == 0:
+            raise PDFParseError(f"'{filename}' okunamadı veya boş dosya.")
+    except BaseException:
+        discard(path)
+        raise
+    return path
+
+
+async def spool_upload(f: UploadFile, max_bytes: Optional[int] = None, check_pdf: bool = True) -> str:
+    """UploadFile içeriğini (thread'de) geçici dosyaya aktarır; event loop disk G/Ç'sini beklemez."""
+    await f.seek(0)
+    return await asyncio.to_thread(spool_stream, f.file, f.filename, max_bytes, check_pdf)
+
+
+def spool_bytes(raw: bytes) -> str:
+    """Bellekteki baytları geçici dosyaya yazar (kuyruktan alınan blob'lar için)."""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf", dir=_spool_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(raw)
+    except BaseException:
+        discard(path)
+        raise
+    return path
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def unzip_pdfs(zip_path: str, zip_name: str, max_files: Optional[int] = None,
+               max_total_bytes: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Zip içindeki PDF'leri tek tek geçici dosyalara açar: [(dosya adı, yol)].
+    Üyeler akış olarak kopyalanır; her biri UPLOAD_MAX_BYTES sınırına tabidir (zip bombasına karşı
+    bildirilen değil okunan bayt sayılır). max_files'tan fazla PDF içeren zip'te ve açılan toplam boyut
+    max_total_bytes'ı aştığında açma hemen durur (geri kalan üyeler okunmaz); yazılan dosyalar silinir.
+    """
+    out: List[Tuple[str, str]] = []
+    total = 0
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            for info in zf.infolist():
+                name = info.filename.rsplit("/", 1)[-1]
+                if info.is_dir() or name.startswith(".") or not name.lower().endswith(".pdf"):
+                    continue
+                if max_files is not None and len(out) >= max_files:
+                    raise TooManyFiles(f"'{zip_name}' çok fazla PDF içeriyor (en fazla {max_files}).")
+                limit = settings.UPLOAD_MAX_BYTES
+                if max_total_bytes is not None and (not limit or max_total_bytes - total < limit):
+                    limit = max_total_bytes - total
+                    if limit <= 0:
+                        raise _extracted_too_large(zip_name, max_total_bytes)
+                with zf.open(info) as member:
+                    try:
+                        path = spool_stream(member, name, max_bytes=limit)
+                    except UploadTooLarge:
+                        if limit != settings.UPLOAD_MAX_BYTES:
+                            raise _extracted_too_large(zip_name, max_total_bytes)
+                        raise
+                out.append((name, path))
+                total += os.path.getsize(path)
+    except zipfile.BadZipFile:
+        discard(*(p for _, p in out))
+        raise PDFParseError(f"Geçersiz zip dosyası: {zip_name}")
+    except BaseException:
+        discard(*(p for _, p in out))
+        raise
+    return out
+
+
+def _extracted_too_large(zip_name: str, max_total_bytes: int) -> UploadTooLarge:
+    return UploadTooLarge(f"'{zip_name}' açıldığında çok büyük (toplam en fazla {max_total_bytes // (1024 * 1024)} MB).")
+
+
+def discard(*paths: Optional[str]):
+    """Geçici yükleme dosyalarını siler (bayt kaynakları ve eksik dosyalar yok sayılır)."""
+    for path in paths:
+        if not isinstance(path, str):
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("Could not remove spooled upload %s: %s", path, e)
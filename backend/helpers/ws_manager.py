@@ -1,44 +1,232 @@
 import asyncio
-from typing import Dict
+import json
+import zlib
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple, Union
 from fastapi import WebSocket
+from config import settings
+from helpers import metrics
+
+# Abone kuyruğunda kanal kapanışını bildiren işaret
+_CLOSED = object()
+
+# Tampondaki mesaj: JSON metni ya da (WS_COMPRESS_MIN_BYTES üstündeyse) zlib ile sıkıştırılmış UTF-8 baytları
+Frame = Union[str, bytes]
+
+
+def _encode(message: dict) -> Frame:
+    text = json.dumps(message, ensure_ascii=False)
+    threshold = settings.WS_COMPRESS_MIN_BYTES
+    if threshold > 0 and len(text) >= threshold:
+        raw = text.encode("utf-8")
+        if len(raw) >= threshold:
+            return zlib.compress(raw, settings.WS_COMPRESS_LEVEL)
+    return text
+
+
+async def _send(websocket: WebSocket, frame: Frame, compressed: bool):
+    """Sıkıştırmayı kabul eden aboneye ikili çerçeve, diğerlerine metin gönderir."""
+    if isinstance(frame, str):
+        await websocket.send_text(frame)
+    elif compressed:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(zlib.decompress(frame).decode("utf-8"))
+
+
+class SubscriberLagged(Exception):
+    """Yavaş abone, replay tamponunun dışına düşecek kadar geride kaldı."""
+
+
+class Subscriber:
+    """
+    Tek bir WebSocket bağlantısının gönderim kuyruğu.
+    Kuyruk sınırlıdır (WS_SUBSCRIBER_QUEUE); dolarsa yayıncı beklemez, abone 'lagged' işaretlenir
+    ve gönderici eksik mesajları kanalın replay tamponundan tamamlar.
+    """
+
+    __slots__ = ("queue", "cursor", "lagged", "compressed")
+
+    def __init__(self, maxsize: int, compressed: bool = False):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.cursor = 0          # gönderilen son mesajın imleci
+        self.lagged = False
+        self.compressed = compressed   # sıkıştırılmış mesajları ikili çerçeve olarak alır
+
+    def offer(self, item) -> None:
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Kuyruk doluyken gönderici zaten uyanık; sıradaki turda tampondan tamamlar
+            self.lagged = True
+
 
 class JobChannel:
-    def __init__(self):
-        self.queue: asyncio.Queue = asyncio.Queue()
-        self.done = asyncio.Event()
+    """
+    Bir işin yayın kanalı: çok aboneli (öğretmen paneli + öğrenci görünümü vb.), sınırlı replay
+    tamponlu. Her mesaja artan bir 'cursor' atanır; geç bağlanan veya yeniden bağlanan istemci
+    `since` ile kaçırdığı mesajları tampondan alır. Mesaj bir kez JSON'a çevrilir, tüm abonelere
+    aynı metin gönderilir. WS_COMPRESS_MIN_BYTES üstündeki mesajlar tamponda bir kez zlib ile
+    sıkıştırılmış tutulur (büyük sınavlarda tamponun belleği); `buffer_bytes` tampondaki toplam boyuttur.
+    """
+
+    def __init__(self, replay: int):
+        self.buffer: Deque[Tuple[int, Frame]] = deque(maxlen=max(1, replay))
+        self.buffer_bytes = 0
+        self.subscribers: Set[Subscriber] = set()
+        self.cursor = 0
+        self.done = False
+        self.gc_handle: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, message: dict) -> None:
+        self.cursor += 1
+        message["cursor"] = self.cursor
+        item = (self.cursor, _encode(message))
+        if len(self.buffer) == self.buffer.maxlen:
+            self.buffer_bytes -= len(self.buffer[0][1])
+        self.buffer.append(item)
+        self.buffer_bytes += len(item[1])
+        for sub in self.subscribers:
+            sub.offer(item)
+
+    def close(self) -> None:
+        self.done = True
+        for sub in self.subscribers:
+            if sub.lagged:
+                continue
+            try:
+                sub.queue.put_nowait(_CLOSED)
+            except asyncio.QueueFull:
+                sub.lagged = True
+
+    def replay(self, since: int):
+        """
+        since'ten sonraki tampon mesajları. since <= 0 → tamponda kalan ilk mesajdan itibaren;
+        tampon istenen noktayı kaybettiyse SubscriberLagged.
+        """
+        if since > 0 and self.buffer and since < self.buffer[0][0] - 1:
+            raise SubscriberLagged(f"cursor {since} no longer in replay buffer (oldest {self.buffer[0][0]})")
+        return [item for item in self.buffer if item[0] > since]
+
 
 class WSManager:
+    """
+    İş bazlı WebSocket yayını. `publish` hiçbir zaman yavaş bir soketi beklemez; her abonenin kendi
+    sınırlı kuyruğu vardır. Boşta bekleyen bağlantılar için periyodik uyanma (polling) yoktur.
+    Biten işin kanalı, geç gelen istemciler tampondan okuyabilsin diye WS_CHANNEL_TTL_SECONDS
+    boyunca (son abone ayrıldıktan sonra) tutulur.
+    """
+
     def __init__(self):
         self._jobs: Dict[str, JobChannel] = {}
+        # Kuyruk modunda worker süreçleri mesajları yerel kanala değil bu aktarıcıya verir
+        # (modules.dispatch.EventOutbox); API süreci onları broker üzerinden alıp yerelde yayınlar.
+        self._relay = None
+
+    def set_relay(self, relay):
+        """relay.send(job_id, message | None) — None kanalın kapandığını bildirir."""
+        self._relay = relay
+
+    def has_channel(self, job_id: str) -> bool:
+        return job_id in self._jobs
 
     def get_or_create_channel(self, job_id: str) -> JobChannel:
-        if job_id not in self._jobs:
-            self._jobs[job_id] = JobChannel()
-        return self._jobs[job_id]
+        chan = self._jobs.get(job_id)
+        if chan is None:
+            chan = self._jobs[job_id] = JobChannel(settings.WS_REPLAY_BUFFER)
+        return chan
 
     async def publish(self, job_id: str, message: dict):
-        chan = self.get_or_create_channel(job_id)
-        await chan.queue.put(message)
+        with metrics.span("ws_publish", job_id=job_id):
+            if self._relay is not None:
+                self._relay.send(job_id, message)
+                return
+            self.get_or_create_channel(job_id).publish(message)
 
     async def mark_done(self, job_id: str):
+        if self._relay is not None:
+            self._relay.send(job_id, None)
+            return
         chan = self.get_or_create_channel(job_id)
-        chan.done.set()
+        chan.close()
+        self._schedule_gc(job_id, chan)
+
+    def _schedule_gc(self, job_id: str, chan: JobChannel):
+        if not chan.done or chan.subscribers:
+            return
+        if chan.gc_handle is not None:
+            chan.gc_handle.cancel()
 
-    async def stream(self, job_id: str, websocket: WebSocket):
+        def _drop():
+            if self._jobs.get(job_id) is chan and chan.done and not chan.subscribers:
+                self._jobs.pop(job_id, None)
+
+        chan.gc_handle = asyncio.get_running_loop().call_later(settings.WS_CHANNEL_TTL_SECONDS, _drop)
+
+    async def stream(self, job_id: str, websocket: WebSocket, since: int = 0, compressed: bool = False):
+        """
+        Kanaldaki mesajları `since` imlecinden itibaren (0 → tampondaki ilk mesajdan) gönderir,
+        ardından canlı yayını iş bitene kadar iletir. compressed: sıkıştırılmış mesajlar açılmadan
+        ikili (zlib) çerçeve olarak gönderilir; aksi halde sunucu açıp metin gönderir.
+        Abone tampon dışına düşecek kadar geride kalırsa SubscriberLagged fırlatılır.
+        """
         chan = self.get_or_create_channel(job_id)
+        if chan.gc_handle is not None:
+            chan.gc_handle.cancel()
+            chan.gc_handle = None
+
+        sub = Subscriber(settings.WS_SUBSCRIBER_QUEUE, compressed)
+        sub.cursor = since
+        # Önce abone ol, sonra tamponu oku: aradaki mesajlar kuyrukta imleçle elenir
+        chan.subscribers.add(sub)
         try:
+            for cursor, text in chan.replay(since):
+                await _send(websocket, text, sub.compressed)
+                sub.cursor = cursor
             while True:
-                # Önce sıradaki mesajları tüket
-                try:
-                    msg = await asyncio.wait_for(chan.queue.get(), timeout=1.0)
-                    await websocket.send_json(msg)
-                except asyncio.TimeoutError:
-                    pass
-                # Bittiyse done + çık
-                if chan.done.is_set() and chan.queue.empty():
+                if sub.lagged:
+                    # Kuyruk taştı: kaçırılanları tampondan tamamla ve canlı yayına geri dön
+                    sub.lagged = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    for cursor, text in chan.replay(sub.cursor):
+                        await _send(websocket, text, sub.compressed)
+                        sub.cursor = cursor
+                    if chan.done:
+                        break
+                    continue
+                if chan.done and sub.queue.empty():
+                    break
+                item = await sub.queue.get()
+                if item is _CLOSED:
                     break
+                cursor, text = item
+                if cursor <= sub.cursor:
+                    continue
+                await _send(websocket, text, sub.compressed)
+                sub.cursor = cursor
         finally:
-            # temizlik: işi bittiğinde kanalı kaldırmak istersen:
-            self._jobs.pop(job_id, None)
+            chan.subscribers.discard(sub)
+            self._schedule_gc(job_id, chan)
+
+    def watched(self, job_id: str) -> bool:
+        """İşin kanalına bu süreçte bağlı en az bir abone var mı."""
+        chan = self._jobs.get(job_id)
+        return chan is not None and bool(chan.subscribers)
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._jobs),
+            "subscribers": sum(len(c.subscribers) for c in self._jobs.values()),
+            "buffer_bytes": sum(c.buffer_bytes for c in self._jobs.values()),
+        }
+
 
 ws_manager = WSManager()
+
+metrics.registry.gauge("ws_channels", "Open WebSocket job channels", lambda: ws_manager.stats()["channels"])
+metrics.registry.gauge("ws_subscribers", "Connected WebSocket subscribers", lambda: ws_manager.stats()["subscribers"])
+metrics.registry.gauge("ws_buffer_bytes", "Size of WebSocket replay buffers (characters of text, bytes of compressed frames)",
+                       lambda: ws_manager.stats()["buffer_bytes"])
@@ -1,12 +1,43 @@
-from fastapi import FastAPI
+import time
+
+# Import süresi (/readyz'de raporlanır); ayrıntılı profil için: python -m devtools.importtime main
+_import_started = time.perf_counter()
+
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from config import settings
 from routes.assess import router as assess_router
 from routes.ws import router as ws_router
+from routes.jobs import router as jobs_router
+from routes.metrics import router as metrics_router
+from routes.analytics import router as analytics_router
+from routes.health import router as health_router
+from modules.ingestion import shutdown_pool
+from modules.orchestrator import resume_interrupted_jobs
+from modules.dispatch import queue_mode, relay_events
+from modules.warmup import warmup, warmup_steps
+from modules.llm_backend import close_backend
+from helpers.broker import get_broker
+from helpers.log import setup_logging, shutdown_logging
+
+setup_logging()
 
 app = FastAPI(title=settings.APP_NAME)
 
-# CORS
+# Büyük yüklemeleri gövde okunmadan (multipart ayrıştırma ve geçici dosyaya yazma başlamadan) reddet
+@app.middleware("http")
+async def _limit_request_body(request: Request, call_next):
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and settings.UPLOAD_MAX_REQUEST_BYTES \
+            and int(length) > settings.UPLOAD_MAX_REQUEST_BYTES:
+        return JSONResponse(status_code=413, content={
+            "detail": f"İstek çok büyük (en fazla {settings.UPLOAD_MAX_REQUEST_BYTES // (1024 * 1024)} MB)."
+        })
+    return await call_next(request)
+
+# CORS (en dışta: 413 yanıtı da CORS başlıklarını alır)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -17,7 +48,40 @@ app.add_middleware(
 
 # Routers
 app.include_router(assess_router, prefix="/api", tags=["assess"])
+app.include_router(jobs_router, prefix="/api", tags=["jobs"])
+app.include_router(analytics_router, prefix="/api", tags=["analytics"])
 app.include_router(ws_router, tags=["ws"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(health_router, tags=["health"])
+
+warmup.import_seconds = round(time.perf_counter() - _import_started, 3)
+
+_relay_task: asyncio.Task | None = None
+
+@app.on_event("startup")
+async def _resume_jobs():
+    global _relay_task
+    # Ağır kütüphaneler ilk istekte değil arka planda yüklenir; bitince /readyz 200 döner
+    warmup.start(warmup_steps(executes_jobs=not queue_mode()) if settings.WARMUP_ENABLED else [])
+    if queue_mode():
+        # İşleri worker'lar yürütür (yarım kalanlar kuyruktan yeniden teslim edilir);
+        # bu süreç yalnızca olayları kendi WebSocket abonelerine aktarır
+        _relay_task = asyncio.create_task(relay_events())
+        return
+    # Yarım kalan işler arka planda sürdürülür; açılışı bekletmez
+    if settings.JOB_RESUME_ON_STARTUP:
+        asyncio.create_task(resume_interrupted_jobs())
+
+@app.on_event("shutdown")
+async def _shutdown_ingestion_pool():
+    warmup.cancel()
+    shutdown_pool()
+    if _relay_task is not None:
+        _relay_task.cancel()
+        await get_broker().close()
+    # LLM bağlantı havuzu sürecin ömrüne bağlıdır (ısınmada veya ilk çağrıda kurulur)
+    await close_backend()
+    shutdown_logging()
 
 @app.get("/")
 def root():
@@ -0,0 +1,219 @@
+# modules/analytics.py
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import settings
+from helpers.job_store import JobStore, get_job_store
+from helpers.log import get_logger
+
+log = get_logger("analytics")
+
+# Puan dağılımı kovaları (0–10 ham puan; son kova 10'u da içerir)
+_BINS = np.linspace(0.0, 10.0, 11)
+_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _clean(value) -> Optional[float]:
+    """NaN/inf → None (JSON), diğerleri yuvarlanmış float."""
+    value = float(value)
+    return round(value, 4) if np.isfinite(value) else None
+
+
+def _div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """Eleman bazlı bölme; payda 0 olan hücreler NaN (RuntimeWarning üretmez)."""
+    num, den = np.broadcast_arrays(np.asarray(num, dtype=float), np.asarray(den, dtype=float))
+    return np.divide(num, den, out=np.full(num.shape, np.nan), where=den != 0)
+
+
+def compute_report(scores: np.ndarray, questions: List[str], students: List[str]) -> Dict:
+    """
+    Sınıf analitiği; tek vektörel geçiş. scores: öğrenci × soru ham puan matrisi (0–10, eksik/hatalı = NaN).
+
+    - Güçlük (p): soru ortalaması / 10 (yüksek → kolay)
+    - Ayırt edicilik (D): toplam puana göre üst %27 ile alt %27 grubun soru ortalaması farkı / 10
+    - Madde-kalan korelasyonu: soru puanı ile öğrencinin diğer sorulardaki toplamı arasındaki Pearson r
+    - Madde korelasyonları: soru × soru Pearson matrisi (eksik değerler soru ortalamasıyla doldurulur)
+    - Öğrenci toplamları (0–100, cevaplanan soruların ortalaması üzerinden) dağılımı ve yüzdelikleri
+    """
+    n_students, n_questions = scores.shape
+    valid = ~np.isnan(scores)
+    counts = valid.sum(axis=0)
+    filled = np.where(valid, scores, 0.0)
+
+    # Bölmeler _div ile: sonucu olmayan (counts == 0) ve sabit (varyansı 0) sorular uyarısız NaN → null olur
+    means = _div(filled.sum(axis=0), counts)
+    dx = np.where(valid, scores - np.nan_to_num(means), 0.0)
+    stds = np.sqrt(_div((dx ** 2).sum(axis=0), counts))
+    per_student = valid.sum(axis=1)
+    totals = _div(filled.sum(axis=1), per_student) * 10.0   # 0–100
+
+    # Üst/alt %27 grupları (yalnızca en az bir sonucu olan öğrenciler)
+    ranked = np.argsort(np.where(per_student > 0, totals, -np.inf))[::-1]
+    ranked = ranked[: int((per_student > 0).sum())]
+    k = max(1, int(round(len(ranked) * 0.27))) if len(ranked) >= 2 else 0
+    if k:
+        upper, lower = ranked[:k], ranked[-k:]
+        up_mean = _div(filled[upper].sum(axis=0), valid[upper].sum(axis=0))
+        low_mean = _div(filled[lower].sum(axis=0), valid[lower].sum(axis=0))
+        discrimination = (up_mean - low_mean) / 10.0
+    else:
+        discrimination = np.full(n_questions, np.nan)
+
+    # Madde-kalan korelasyonu: kalan = öğrenci toplamı − bu soru (eksik hücreler hariç)
+    rest = filled.sum(axis=1, keepdims=True) - filled
+    rest_mean = _div(np.where(valid, rest, 0.0).sum(axis=0), counts)
+    dr = np.where(valid, rest - np.nan_to_num(rest_mean), 0.0)
+    item_rest = _div((dx * dr).sum(axis=0), np.sqrt((dx ** 2).sum(axis=0) * (dr ** 2).sum(axis=0)))
+
+    # Soru × soru korelasyonu (öğrenci yoksa tüm hücreler NaN)
+    imputed = np.where(valid, scores, np.nan_to_num(means)[None, :])
+    centered = imputed - _div(imputed.sum(axis=0), np.full(n_questions, n_students))
+    norms = np.sqrt((centered ** 2).sum(axis=0))
+    corr = _div(centered.T @ centered, np.outer(norms, norms))
+
+    pct = np.full((len(_PERCENTILES), n_questions), np.nan)
+    answered = counts > 0
+    if answered.any():
+        pct[:, answered] = np.nanpercentile(scores[:, answered], _PERCENTILES, axis=0)
+    # Kova indeksi: 10 puan son kovaya düşer
+    bucket = np.clip(np.floor(np.nan_to_num(scores, nan=-1.0)).astype(np.int64), -1, 9)
+    hist = np.stack([(bucket == b).sum(axis=0) for b in range(10)], axis=1) if n_questions else np.zeros((0, 10))
+
+    per_question = []
+    for j, qid in enumerate(questions):
+        per_question.append({
+            "question_id": qid,
+            "n": int(counts[j]),
+            "mean": _clean(means[j]),
+            "std": _clean(stds[j]),
+            "difficulty": _clean(means[j] / 10.0),
+            "discrimination": _clean(discrimination[j]),
+            "item_rest_r": _clean(item_rest[j]),
+            "percentiles": {str(p): _clean(pct[i, j]) for i, p in enumerate(_PERCENTILES)},
+            "distribution": [int(c) for c in hist[j]],
+        })
+
+    graded = totals[per_student > 0]
+    student_hist = np.histogram(graded, bins=10, range=(0.0, 100.0))[0] if graded.size else np.zeros(10)
+    return {
+        "students": int((per_student > 0).sum()),
+        "questions": n_questions,
+        "per_question": per_question,
+        "item_correlations": [[_clean(v) for v in row] for row in corr],
+        "totals": {
+            "mean": _clean(graded.mean()) if graded.size else None,
+            "std": _clean(graded.std()) if graded.size else None,
+            "percentiles": {str(p): _clean(v) for p, v in zip(
+                _PERCENTILES, np.percentile(graded, _PERCENTILES) if graded.size else [np.nan] * len(_PERCENTILES))},
+            "distribution": [int(c) for c in student_hist],
+            "top": [students[i] for i in ranked[:5]] if n_students else [],
+        },
+        "distribution_bins": [round(float(b), 1) for b in _BINS],
+    }
+
+
+class ClassAnalytics:
+    """
+    İş deposundaki sonuçların sütunsal (öğrenci × soru) puan matrisi ve önbelleğe alınmış raporlar.
+
+    Matris `JobStore.results_since` ile artımlı büyür (yalnızca yeni/yeniden yazılmış sonuçlar okunur;
+    kuyruk modunda worker'ların yazdıkları da görünür). Rapor kapsam başına (toplu iş = sınıf, ya da
+    tümü = dönem) önbellekte tutulur ve yalnızca matris değiştiyse yeniden hesaplanır; değişiklikler
+    en fazla ANALYTICS_REFRESH_SECONDS aralıkla depodan çekilir.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._store: Optional[JobStore] = None
+        self._reset()
+
+    def _reset(self):
+        self._watermark = 0
+        self._version = 0
+        self._checked_at = 0.0
+        self._rows: Dict[str, int] = {}        # job_id → satır
+        self._cols: Dict[str, int] = {}        # question_id → sütun
+        self._batch: List[Optional[str]] = []  # satır → batch_id
+        self._names: List[str] = []            # satır → öğrenci adı (yoksa job_id)
+        self._scores = np.full((64, 16), np.nan)
+        self._reports: Dict[str, Tuple[int, Dict]] = {}
+
+    def _grow(self, rows: int, cols: int):
+        r, c = self._scores.shape
+        if rows <= r and cols <= c:
+            return
+        grown = np.full((max(rows, r * 2 if rows > r else r), max(cols, c * 2 if cols > c else c)), np.nan)
+        grown[:r, :c] = self._scores
+        self._scores = grown
+
+    def _apply(self, results: List[Dict]):
+        for res in results:
+            row = self._rows.get(res["job_id"])
+            if row is None:
+                row = self._rows[res["job_id"]] = len(self._rows)
+                self._batch.append(res["batch_id"])
+                self._names.append(res["student_name"] or res["job_id"])
+            elif res["student_name"]:
+                self._names[row] = res["student_name"]
+            col = self._cols.get(res["question_id"])
+            if col is None:
+                col = self._cols[res["question_id"]] = len(self._cols)
+            self._grow(len(self._rows), len(self._cols))
+            try:
+                score = np.nan if res["error"] or res["score"] is None else float(res["score"])
+            except (TypeError, ValueError):
+                score = np.nan
+            self._scores[row, col] = score
+
+    def refresh(self, force: bool = False) -> int:
+        """Depodaki yeni sonuçları matrise ekler; dönen değer: matris sürümü."""
+        store = get_job_store()
+        with self._lock:
+            if store is not self._store:
+                self._store = store
+                self._reset()
+            now = time.monotonic()
+            if not force and now - self._checked_at < settings.ANALYTICS_REFRESH_SECONDS:
+                return self._version
+            self._checked_at = now
+            while True:
+                results, watermark = store.results_since(self._watermark, settings.ANALYTICS_FETCH_LIMIT)
+                if not results:
+                    break
+                self._apply(results)
+                self._watermark = watermark
+                self._version += 1
+            return self._version
+
+    def report(self, batch_id: Optional[str] = None) -> Dict:
+        """Kapsamın (batch_id verilirse o sınıf, yoksa tüm işler) raporu; değişiklik yoksa önbellekten."""
+        version = self.refresh()
+        scope = batch_id or ""
+        with self._lock:
+            cached = self._reports.get(scope)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            n_rows, n_cols = len(self._rows), len(self._cols)
+            mask = np.ones(n_rows, dtype=bool) if not batch_id else np.array(
+                [b == batch_id for b in self._batch], dtype=bool)
+            scores = self._scores[:n_rows, :n_cols][mask]
+            names = [n for n, m in zip(self._names, mask) if m]
+            qids = list(self._cols)
+
+        # Kapsamda hiç sonucu olmayan sorular çıkarılır; sorular numara sırasına dizilir
+        present = ~np.isnan(scores).all(axis=0) if scores.size else np.zeros(n_cols, dtype=bool)
+        order = sorted((j for j in range(n_cols) if present[j]),
+                       key=lambda j: (0, int(qids[j])) if qids[j].isdigit() else (1, qids[j]))
+        t0 = time.perf_counter()
+        report = compute_report(scores[:, order], [qids[j] for j in order], names)
+        report.update(scope=batch_id or "all", version=version, generated_at=time.time(),
+                      compute_ms=round((time.perf_counter() - t0) * 1000, 2))
+        with self._lock:
+            self._reports[scope] = (version, report)
+        log.debug("Analytics report for %s: %d students × %d questions in %.1f ms.",
+                  report["scope"], report["students"], report["questions"], report["compute_ms"])
+        return report
+
+
+class_analytics = ClassAnalytics()
@@ -0,0 +1,282 @@
+# modules/batch_grader.py
+import asyncio
+import itertools
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from helpers import metrics
+from helpers.job_stats import current_job_id, job_stats
+from helpers.log import get_logger
+from helpers.tokens import count_tokens
+from modules import grader_agent
+from modules.llm_backend import get_backend
+from modules.prompt_builder import build_grading_prompt, trim_inputs
+from modules.rate_limit import call_with_retry, rate_limiter
+
+log = get_logger("batch_grader")
+
+_BATCH_PROMPT_HEAD = """
+Sen deneyimli bir tarih öğretmenisin.
+Aşağıda birden fazla öğrenci cevabı var. Her cevabı kendi sorusunun cevap anahtarıyla karşılaştırarak AYRI AYRI değerlendir.
+
+Her cevap için:
+- "score": 0–10 arası puan (float, örn: 7.5).
+- "turkish_reasoning": Öğrenci cevabının neden güçlü veya zayıf olduğunu açıklayan kısa ve net bir açıklama.
+- "turkish_tips": Geliştirme önerisi veya nasıl daha iyi olabileceğine dair bir ipucu.
+- "overall_comment": Bu soruya dair genel yargı ve performans özeti.
+
+Uzun metinlerin ortası '…(N token kısaltıldı)…' ile kısaltılmış olabilir; kısaltılan kısım için puan kırma.
+
+Cevabını YALNIZCA GEÇERLİ JSON formatında döndür. Başka metin ekleme.
+Her item_id için tam olarak bir sonuç üret.
+
+JSON şablonu:
+{
+  "results": [
+    {"item_id": "i0", "score": 0.0, "turkish_reasoning": "...", "turkish_tips": "...", "overall_comment": "..."}
+  ]
+}
+""".strip()
+
+# Toplu cevapta öğe başına beklenen çıktı tokenı (bütçe hesabı için)
+_EXPECTED_OUTPUT_TOKENS_PER_ITEM = 160
+
+_batch_ids = itertools.count(1)
+
+
+class _Item:
+    __slots__ = ("question_id", "question_text", "student_answer", "key_answer", "future", "job_id")
+
+    def __init__(self, question_id: str, question_text: str, student_answer: str, key_answer: str,
+                 future: asyncio.Future, job_id: Optional[str]):
+        self.question_id = question_id
+        self.question_text = question_text
+        self.student_answer = student_answer
+        self.key_answer = key_answer
+        self.future = future
+        self.job_id = job_id
+
+    @property
+    def group(self) -> Tuple[str, str]:
+        return (self.question_text, self.key_answer)
+
+
+class BatchGrader:
+    """
+    Birden fazla değerlendirmeyi tek LLM isteğinde toplayan mikro-toplayıcı.
+
+    `grade` çağrıları kısa bir pencere (GRADE_BATCH_WINDOW_MS) boyunca biriktirilir; aynı soru+anahtar
+    çiftine ait cevaplar (farklı öğrenciler dahil) tek başlık altında gruplanır ve token bütçesine
+    (GRADE_BATCH_TOKEN_BUDGET) sığacak şekilde paketlenir. Model {"results": [...]} döndürür;
+    eksik veya hatalı her öğe tekil değerlendirmeye (`grader_agent._grade_uncached`) düşer.
+    Her sonuç, ait olduğu paketin token kullanımını 'batch' alanında, paketin öğe başına düşen
+    payını prompt_tokens/completion_tokens alanlarında taşır; aynı pay öğenin işinin token sayaçlarına
+    yazılır. Sabit başlık system mesajında gider
+    (sağlayıcı önek önbelleği); soru, anahtar ve cevaplar paketlenmeden önce token bütçelerine indirilir.
+    """
+
+    def __init__(self):
+        self._pending: List[_Item] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def grade(self, question_id: str, student_answer: str, key_answer: str,
+                    question_text: Optional[str] = None) -> dict:
+        loop = asyncio.get_running_loop()
+        q_text, key, answer, _ = trim_inputs(question_text, key_answer, student_answer)
+        item = _Item(str(question_id), q_text, answer, key, loop.create_future(), current_job_id.get())
+        self._pending.append(item)
+        self._pending_tokens += self._item_tokens(item) + count_tokens(item.question_text + item.key_answer)
+
+        # Birden fazla paketi dolduracak kadar birikti ise pencereyi beklemeden boşalt
+        if (len(self._pending) >= settings.GRADE_BATCH_MAX_ITEMS
+                or self._pending_tokens >= settings.GRADE_BATCH_TOKEN_BUDGET * 2):
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.GRADE_BATCH_WINDOW_MS / 1000.0, self._flush)
+        return await item.future
+
+    # --- paketleme ---
+
+    @staticmethod
+    def _item_tokens(item: _Item) -> int:
+        return count_tokens(item.student_answer) + _EXPECTED_OUTPUT_TOKENS_PER_ITEM + 12
+
+    def _pack(self, items: List[_Item]) -> List[List[_Item]]:
+        """Aynı soru/anahtar gruplarını bir arada tutarak öğeleri token bütçesine göre paketler."""
+        groups: Dict[Tuple[str, str], List[_Item]] = {}
+        for it in items:
+            groups.setdefault(it.group, []).append(it)
+
+        budget = settings.GRADE_BATCH_TOKEN_BUDGET
+        head_tokens = count_tokens(_BATCH_PROMPT_HEAD)
+        batches: List[List[_Item]] = []
+        cur: List[_Item] = []
+        cur_tokens = head_tokens
+        cur_groups: set = set()
+
+        for group_key, members in groups.items():
+            group_tokens = count_tokens(group_key[0]) + count_tokens(group_key[1]) + 16
+            for it in members:
+                cost = self._item_tokens(it) + (0 if group_key in cur_groups else group_tokens)
+                if cur and (cur_tokens + cost > budget or len(cur) >= settings.GRADE_BATCH_MAX_ITEMS):
+                    batches.append(cur)
+                    cur, cur_tokens, cur_groups = [], head_tokens, set()
+                    cost = self._item_tokens(it) + group_tokens
+                cur.append(it)
+                cur_tokens += cost
+                cur_groups.add(group_key)
+        if cur:
+            batches.append(cur)
+        return batches
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items = [it for it in self._pending if not it.future.done()]
+        self._pending = []
+        self._pending_tokens = 0
+        for batch in self._pack(items):
+            asyncio.create_task(self._run_batch(batch))
+
+    # --- çalıştırma ---
+
+    @staticmethod
+    def _build_prompt(batch: List[_Item]) -> Tuple[List[Dict], Dict[str, _Item]]:
+        by_id: Dict[str, _Item] = {}
+        sections = []
+        groups: Dict[Tuple[str, str], List[Tuple[str, _Item]]] = {}
+        for idx, it in enumerate(batch):
+            item_id = f"i{idx}"
+            by_id[item_id] = it
+            groups.setdefault(it.group, []).append((item_id, it))
+        for gi, ((q_text, key), members) in enumerate(groups.items(), start=1):
+            part = [f"### Soru grubu {gi}", "[Soru Metni]", q_text, "", "[Cevap Anahtarı]", key]
+            for item_id, it in members:
+                part += ["", f"[Öğrenci Cevabı — item_id: {item_id}]", it.student_answer]
+            sections.append("\n".join(part))
+        messages = [
+            {"role": "system", "content": _BATCH_PROMPT_HEAD},
+            {"role": "user", "content": "\n\n".join(sections)},
+        ]
+        return messages, by_id
+
+    async def _call(self, messages: List[Dict], job_ids: List[Optional[str]]) -> Tuple[dict, int, int]:
+        with metrics.span("llm_network", job_ids=job_ids):
+            response = await get_backend().complete(
+                messages,
+                model=settings.LLM_MODEL,
+                temperature=settings.LLM_TEMPERATURE,
+                json_mode=True,
+            )
+        rate_limiter.observe(response.headers)
+        raw = response.content
+        prompt_tokens = response.prompt_tokens or sum(count_tokens(m["content"]) for m in messages)
+        completion_tokens = response.completion_tokens or count_tokens(raw)
+        # Paket tokenları işlere `_run_batch` içinde öğe başına paylaştırılır; burada yalnızca global sayaç
+        metrics.LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        metrics.LLM_TOKENS.inc(completion_tokens, kind="completion")
+        if response.cached_tokens:
+            metrics.LLM_TOKENS.inc(response.cached_tokens, kind="cached_prompt")
+        with metrics.span("llm_parse", job_ids=job_ids):
+            return grader_agent._force_json(raw), prompt_tokens, completion_tokens
+
+    @staticmethod
+    def _valid(entry) -> bool:
+        if not isinstance(entry, dict):
+            return False
+        try:
+            score = float(entry.get("score"))
+        except (TypeError, ValueError):
+            return False
+        if not 0.0 <= score <= 10.0:
+            return False
+        return isinstance(entry.get("turkish_reasoning"), str) and bool(entry["turkish_reasoning"].strip())
+
+    async def _grade_single(self, it: _Item, fallback: bool = True):
+        """
+        Öğeyi tekil çağrıyla değerlendirir; fallback=True ise iş bazlı sayaca yazılır.
+        Paket görevi hiçbir işe bağlı değildir; token ve span sayaçları öğenin işine yazılsın diye
+        çağrı süresince `current_job_id` öğenin işine bağlanır.
+        """
+        ctx_token = current_job_id.set(it.job_id)
+        try:
+            if fallback:
+                job_stats.incr("batch_fallbacks")
+            # Öğe alanları zaten bütçeye indirildi; yeniden kısaltma yapılmaz
+            prompt = build_grading_prompt(it.student_answer, it.key_answer, it.question_text)
+            data = await call_with_retry(
+                lambda: grader_agent._grade_uncached(it.question_id, it.student_answer, it.key_answer,
+                                                     it.question_text, prompt=prompt),
+                tokens=grader_agent.estimate_tokens(prompt.tokens),
+                job_ids=[it.job_id],
+            )
+        except Exception as e:
+            if not it.future.done():
+                it.future.set_exception(e)
+                it.future.exception()
+            return
+        finally:
+            current_job_id.reset(ctx_token)
+        if not it.future.done():
+            it.future.set_result(data)
+
+    async def _run_batch(self, batch: List[_Item]):
+        # Görev, boşaltmayı tetikleyen işin bağlamıyla oluşturulur; paket hiçbir işe ait değildir
+        current_job_id.set(None)
+        if len(batch) == 1:
+            # Tek öğelik paket: normal tekil çağrı (fallback sayılmaz)
+            await self._grade_single(batch[0], fallback=False)
+            return
+
+        messages, by_id = self._build_prompt(batch)
+        batch_id = f"b{next(_batch_ids)}"
+        job_ids = [it.job_id for it in batch]
+        prompt_estimate = sum(count_tokens(m["content"]) for m in messages)
+        try:
+            data, prompt_tokens, completion_tokens = await call_with_retry(
+                lambda: self._call(messages, job_ids),
+                tokens=grader_agent.estimate_tokens(prompt_estimate, _EXPECTED_OUTPUT_TOKENS_PER_ITEM * len(batch)),
+                job_ids=job_ids,
+            )
+        except Exception as e:
+            log.error("Batch %s (%d items) failed, falling back to single grading: %s", batch_id, len(batch), e)
+            await asyncio.gather(*(self._grade_single(it) for it in batch))
+            return
+
+        info = {"id": batch_id, "size": len(batch), "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        log.debug("📦 Batch %s: %d items, prompt=%d completion=%d tokens", batch_id, len(batch), prompt_tokens, completion_tokens)
+
+        # Paket kullanımı, öğe başına eşit pay olarak her öğenin kendi işine yazılır
+        prompt_share = round(prompt_tokens / len(batch))
+        completion_share = round(completion_tokens / len(batch))
+        for it in batch:
+            job_stats.incr("llm_prompt_tokens", prompt_share, job_id=it.job_id)
+            job_stats.incr("llm_completion_tokens", completion_share, job_id=it.job_id)
+
+        entries = data.get("results") if isinstance(data, dict) else None
+        received: Dict[str, dict] = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and str(entry.get("item_id")) in by_id:
+                received[str(entry["item_id"])] = entry
+
+        fallbacks = []
+        for item_id, it in by_id.items():
+            entry = received.get(item_id)
+            if not self._valid(entry):
+                fallbacks.append(self._grade_single(it))
+                continue
+            result = grader_agent._normalize_result(
+                {k: entry.get(k) for k in ("score", "turkish_reasoning", "turkish_tips", "overall_comment")},
+                it.question_id,
+            )
+            result["batch"] = info
+            result["prompt_tokens"] = prompt_share
+            result["completion_tokens"] = completion_share
+            if not it.future.done():
+                it.future.set_result(result)
+        if fallbacks:
+            await asyncio.gather(*fallbacks)
+
+
+batch_grader = BatchGrader()
@@ -0,0 +1,320 @@
+import asyncio
+from typing import Dict, List, Optional
+from config import settings
+from helpers.broker import Event, get_broker
+from helpers.log import get_logger
+from helpers.job_control import job_control, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from helpers.job_store import get_job_store, STATUS_CANCELLED, STATUS_COMPLETED, STATUS_FAILED, STATUS_RUNNING, UNFINISHED
+from helpers.uploads import discard, read_file, spool_bytes
+from helpers.ws_manager import ws_manager
+from modules.ingestion import fail_job, finish_cancelled, ingest_and_assess, ingest_and_run_batch
+from modules.orchestrator import run_assessment_job
+
+log = get_logger("dispatch")
+
+# İşlerin nerede çalışacağına karar veren katman:
+#   inline → iş, yüklemeyi alan API sürecinde asyncio görevi olarak çalışır (varsayılan)
+#   queue  → PDF'ler blob olarak yazılır, görev kuyruğa konur; worker süreçleri (worker.py) sahiplenir
+
+
+def queue_mode() -> bool:
+    return settings.EXECUTION_MODE.lower() == "queue"
+
+
+def _student_blob(job_id: str) -> str:
+    return f"{job_id}:student"
+
+
+def _key_blob(job_id: str) -> str:
+    return f"{job_id}:key"
+
+
+async def _put_file_blob(broker, key: str, path: str):
+    """Geçici yükleme dosyasını blob olarak yazar ve siler (bellekte aynı anda tek dosya tutulur)."""
+    try:
+        await broker.put_blob(key, await asyncio.to_thread(read_file, path))
+    finally:
+        discard(path)
+
+
+async def _spooled_blob(broker, key: str) -> Optional[str]:
+    """Blob'u worker tarafında geçici dosyaya yazar; havuz görevleri PDF'i bu yoldan açar."""
+    raw = await broker.get_blob(key)
+    if raw is None:
+        return None
+    return await asyncio.to_thread(spool_bytes, raw)
+
+
+async def submit_assessment(job_id: str, student_path: str, student_name: str, key_path: str, key_name: str,
+                            stream: Optional[bool] = None, delivery: Optional[str] = None,
+                            priority: Optional[str] = None, deadline_seconds: Optional[float] = None,
+                            progress_payload: Optional[str] = None):
+    """Yolları verilen geçici yükleme dosyalarının sahipliği işe geçer (iş bitince silinir)."""
+    if not queue_mode():
+        # Görev başlamadan gelen iptal kaybolmasın diye iş hemen kaydedilir
+        job_control.expect(job_id, priority)
+        asyncio.create_task(
+            ingest_and_assess(job_id, student_path, student_name, key_path, key_name, stream=stream, delivery=delivery,
+                              priority=priority, deadline_seconds=deadline_seconds, progress_payload=progress_payload)
+        )
+        return
+    broker = get_broker()
+    try:
+        await _put_file_blob(broker, _student_blob(job_id), student_path)
+        await _put_file_blob(broker, _key_blob(job_id), key_path)
+    finally:
+        discard(key_path)
+    await broker.enqueue({
+        "kind": "single",
+        "job_id": job_id,
+        "student_name": student_name,
+        "key_name": key_name,
+        "stream": stream,
+        "delivery": delivery,
+        "priority": priority,
+        "deadline_seconds": deadline_seconds,
+        "progress_payload": progress_payload,
+    })
+
+
+async def submit_batch(batch_id: str, key_path: str, key_name: str, students: List[Dict],
+                       stream: Optional[bool] = None, delivery: Optional[str] = None,
+                       priority: Optional[str] = None, deadline_seconds: Optional[float] = None,
+                       progress_payload: Optional[str] = None):
+    """students: [{'job_id', 'filename', 'source'}] — kaynak, geçici yükleme dosyasının yolu; seçenekler her öğrenciye uygulanır"""
+    if not queue_mode():
+        job_control.expect(batch_id, priority or PRIORITY_BATCH)
+        for st in students:
+            job_control.expect(st["job_id"], priority or PRIORITY_BATCH, group=batch_id)
+        asyncio.create_task(
+            ingest_and_run_batch(batch_id, key_path, key_name, students, stream=stream, delivery=delivery,
+                                 priority=priority, deadline_seconds=deadline_seconds, progress_payload=progress_payload)
+        )
+        return
+    broker = get_broker()
+    try:
+        await _put_file_blob(broker, _key_blob(batch_id), key_path)
+        for st in students:
+            await _put_file_blob(broker, _student_blob(st["job_id"]), st.pop("source"))
+    finally:
+        discard(*(st.get("source") for st in students))
+    await broker.enqueue({
+        "kind": "batch",
+        "job_id": batch_id,
+        "key_name": key_name,
+        "students": [{"job_id": st["job_id"], "filename": st["filename"]} for st in students],
+        "stream": stream,
+        "delivery": delivery,
+        "priority": priority,
+        "deadline_seconds": deadline_seconds,
+        "progress_payload": progress_payload,
+    })
+
+
+def task_blob_keys(task: Dict) -> List[str]:
+    keys = [_key_blob(task["job_id"])]
+    if task["kind"] == "batch":
+        keys += [_student_blob(st["job_id"]) for st in task["students"]]
+    else:
+        keys.append(_student_blob(task["job_id"]))
+    return keys
+
+
+async def _resume_single(task: Dict) -> bool:
+    """
+    Görev yeniden teslim edildiyse (worker öldü / zaman aşımı) iş deposundaki durumdan devam eder.
+    Dönen değer: iş burada ele alındı mı.
+    """
+    store = get_job_store()
+    job_id = task["job_id"]
+    job = await asyncio.to_thread(store.get_job, job_id)
+    if job is None:
+        return False
+    if job["status"] in (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED):
+        log.info("Task for job %s already %s; skipping.", job_id, job["status"])
+        return True
+    if job["status"] != STATUS_RUNNING:
+        return False
+    questions = await asyncio.to_thread(store.get_questions, job_id)
+    if not questions:
+        return False
+    rows, _ = await asyncio.to_thread(store.get_results, job_id)
+    log.info("♻️ Resuming job %s from queue (%d/%d results stored).", job_id, len(rows), len(questions))
+    job_control.track(job_id, task.get("priority"))
+    try:
+        await run_assessment_job(job_id, questions, stream=task.get("stream"), delivery=task.get("delivery"),
+                                 prior_results={str(r["question_id"]): r for r in rows},
+                                 priority=task.get("priority"), deadline_seconds=task.get("deadline_seconds"),
+                                 progress_payload=task.get("progress_payload"))
+    finally:
+        job_control.release(job_id)
+    return True
+
+
+async def run_task(task: Dict):
+    """Kuyruktan sahiplenilen bir görevi worker sürecinde yürütür."""
+    broker = get_broker()
+    job_id = task["job_id"]
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is not None and job["status"] == STATUS_CANCELLED:
+        # Kuyrukta beklerken iptal edildi: abonelere bildirilir, PDF'ler ayrıştırılmaz
+        reason = job.get("error") or "İş iptal edildi."
+        for st in task.get("students", ()):
+            await finish_cancelled(st["job_id"], reason)
+        await finish_cancelled(job_id, reason)
+        return
+    if task["kind"] == "batch":
+        if job is not None and job["status"] in (STATUS_COMPLETED, STATUS_FAILED):
+            return
+        # Yeniden teslimde toplu iş baştan yürütülür; biten sorular değerlendirme önbelleğinden gelir
+        key_path = await _spooled_blob(broker, _key_blob(job_id))
+        students = []
+        for st in task["students"]:
+            path = await _spooled_blob(broker, _student_blob(st["job_id"]))
+            if path is None:
+                await fail_job(st["job_id"], "Yüklenen PDF kuyrukta bulunamadı; lütfen tekrar yükleyin.")
+                continue
+            students.append({"job_id": st["job_id"], "filename": st["filename"], "source": path})
+        if key_path is None:
+            for st in students:
+                discard(st["source"])
+                await fail_job(st["job_id"], "Cevap anahtarı kuyrukta bulunamadı; lütfen tekrar yükleyin.")
+            await fail_job(job_id, "Cevap anahtarı kuyrukta bulunamadı; lütfen tekrar yükleyin.")
+            return
+        await ingest_and_run_batch(job_id, key_path, task["key_name"], students,
+                                   stream=task.get("stream"), delivery=task.get("delivery"),
+                                   priority=task.get("priority"), deadline_seconds=task.get("deadline_seconds"),
+                                   progress_payload=task.get("progress_payload"))
+        return
+
+    if await _resume_single(task):
+        return
+    student_path = await _spooled_blob(broker, _student_blob(job_id))
+    key_path = await _spooled_blob(broker, _key_blob(job_id))
+    if student_path is None or key_path is None:
+        discard(student_path, key_path)
+        await fail_job(job_id, "Yüklenen PDF kuyrukta bulunamadı; lütfen tekrar yükleyin.")
+        return
+    await ingest_and_assess(job_id, student_path, task["student_name"], key_path, task["key_name"],
+                            stream=task.get("stream"), delivery=task.get("delivery"),
+                            priority=task.get("priority"), deadline_seconds=task.get("deadline_seconds"),
+                            progress_payload=task.get("progress_payload"))
+
+
+async def request_cancel(job_id: str, reason: str) -> bool:
+    """
+    Bitmemiş işi iptal eder: depoda 'cancelled' işaretlenir (toplu işte öğrencileriyle birlikte) ve iş bu
+    süreçte çalışıyorsa görevi hemen durdurulur. Kuyruk modunda işi yürüten worker iptali
+    `watch_cancellations` ile depodan okur. Dönen değer: iş bu çağrıyla iptal edildi mi.
+    """
+    if not await asyncio.to_thread(get_job_store().cancel, job_id, reason):
+        return False
+    if not queue_mode():
+        job_control.cancel(job_id, reason)
+    return True
+
+
+async def cancel_if_abandoned(job_id: str):
+    """
+    WebSocket aboneliği kopan canlı tekil işi JOB_DISCONNECT_CANCEL_SECONDS sonra iptal eder; bu sürede
+    istemci yeniden bağlandıysa (veya iş bittiyse) bir şey yapılmaz. Toplu işler ve 'batch' öncelikli
+    tekil işler bağlantıdan bağımsız sürer (sonuçlar GET /api/jobs ile alınır).
+    Abonelikler yalnızca bu sürecin ws_manager'ında görülür; queue modunda istemci başka bir API
+    sürecine yeniden bağlanmış olabileceğinden iptal yapılmaz.
+    """
+    grace = settings.JOB_DISCONNECT_CANCEL_SECONDS
+    if grace <= 0 or queue_mode():
+        return
+    await asyncio.sleep(grace)
+    if ws_manager.watched(job_id):
+        return
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is None or job["status"] not in UNFINISHED or job["kind"] != "single" or job.get("batch_id"):
+        return
+    if ((job.get("options") or {}).get("priority") or PRIORITY_INTERACTIVE) != PRIORITY_INTERACTIVE:
+        return
+    if await request_cancel(job_id, "İstemci bağlantısı koptu; değerlendirme iptal edildi."):
+        log.info("Job %s cancelled after client disconnect (%.0fs grace).", job_id, grace)
+
+
+async def watch_cancellations():
+    """Worker tarafı: bu süreçte çalışan işlerden depoda iptal edilmiş olanları JOB_CANCEL_POLL_SECONDS aralıkla durdurur."""
+    store = get_job_store()
+    while True:
+        await asyncio.sleep(max(0.1, settings.JOB_CANCEL_POLL_SECONDS))
+        active = job_control.active()
+        if not active:
+            continue
+        try:
+            statuses = await asyncio.to_thread(store.statuses, active)
+        except Exception as e:
+            log.error("Cancellation poll failed: %s", e)
+            continue
+        for job_id, status in statuses.items():
+            if status == STATUS_CANCELLED:
+                job = await asyncio.to_thread(store.get_job, job_id)
+                job_control.cancel(job_id, (job or {}).get("error") or "İş iptal edildi.")
+
+
+class EventOutbox:
+    """
+    Worker tarafı yayın aktarıcısı: ws_manager mesajları sırayla bir kuyruğa alınır ve tek bir
+    pompa görevi tarafından toplu halde broker'a yazılır. Böylece yayın sırası korunur ve
+    değerlendirme döngüsü broker gecikmesini beklemez.
+    """
+
+    def __init__(self, broker, max_batch: int = 500):
+        self._broker = broker
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+
+    def send(self, job_id: str, message: Optional[Dict]):
+        self._queue.put_nowait((job_id, message))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._pump())
+
+    async def _pump(self):
+        while True:
+            batch: List[Event] = [await self._queue.get()]
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._broker.publish_many(batch)
+                self.published += len(batch)
+            except Exception as e:
+                log.error("Event relay publish failed (%d events dropped): %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def flush(self):
+        """Kuyruktaki tüm olaylar broker'a yazılana kadar bekler."""
+        await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+async def relay_events():
+    """
+    API tarafı: broker'daki tüm iş olaylarını yerel ws_manager kanallarına aktarır.
+    Soket hangi API sürecindeyse mesajı oradaki kanal yayınlar (imleç/replay yerelde atanır).
+    """
+    broker = get_broker()
+    while True:
+        try:
+            async for channel, message in broker.subscribe():
+                if message is None:
+                    await ws_manager.mark_done(channel)
+                else:
+                    await ws_manager.publish(channel, message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("Event relay failed, reconnecting: %s", e)
+            await asyncio.sleep(1.0)
@@ -1,10 +1,37 @@
 # modules/grader_agent.py
+import asyncio
 import json
 import re
-from openai import AsyncOpenAI
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Union
 from config import settings
+from helpers import metrics
+from helpers.grade_cache import grade_cache, grading_key
+from helpers.log import get_logger
+from helpers.job_stats import job_stats
+from helpers.partial_json import PartialJSONParser
+from helpers.tokens import count_tokens
+from modules.llm_backend import get_backend
+from modules.pregrader import auto_result as pregrade_result, pregrader, record as record_pregrade
+from modules.prompt_builder import GradingPrompt, budget_version, build_grading_prompt
+from modules.rate_limit import call_with_retry, rate_limiter
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+log = get_logger("grader_agent")
+
+# Akış modunda kısmi alanları alan geri çağrı: {'score'?, 'turkish_reasoning'?}
+PartialCallback = Callable[[Dict], Awaitable[None]]
+
+# Prompt metni değiştiğinde artırın; değerlendirme önbelleği bu sürümle anahtarlanır.
+PROMPT_VERSION = "2"
+
+# Tekil değerlendirme cevabı için beklenen çıktı tokenı (TPM kovası tahmini)
+_EXPECTED_OUTPUT_TOKENS = 200
+
+# Çağrıya özgü alanlar (token kullanımı, paket bilgisi): sonuç satırında tutulur, önbelleğe yazılmaz
+CALL_FIELDS = ("batch", "prompt_tokens", "completion_tokens", "cached_tokens")
+
+# Aynı anahtar için devam eden model çağrıları (eşzamanlı özdeş istekler tek çağrıyı paylaşır)
+_inflight: Dict[str, asyncio.Future] = {}
 
 def _force_json(s: str) -> dict:
     """
@@ -25,78 +52,275 @@ def _force_json(s: str) -> dict:
     try:
         return json.loads(s)
     except Exception as e:
-        print(f"[ERROR] JSON parse error: {e}\n[RAW RESPONSE]: {s[:300]}...")
+        log.warning("JSON parse error: %s [RAW RESPONSE]: %s...", e, s[:300])
         return {}
 
-async def grade_one(question_id: str, student_answer: str, key_answer: str, question_text: str | None = None) -> dict:
+def _error_result(question_id: str, e: Exception) -> dict:
+    """
+    Yeniden denemelerden sonra da başarısız olan değerlendirme. 'error' alanı sonucun gerçek bir
+    puan olmadığını belirtir (UI ve özet bunu 0 puandan ayırt eder).
+    """
+    return {
+        "question_id": str(question_id),
+        "score": 0.0,
+        "error": True,
+        "error_message": f"{type(e).__name__}: {e}",
+        "turkish_reasoning": f"⚠️ Model cevabı çözümlenemedi: {e}",
+        "turkish_tips": "Değerlendirme sırasında hata oluştu.",
+        "overall_comment": "Bu soru için genel değerlendirme üretilemedi."
+    }
+
+
+async def grade_one(question_id: str, student_answer: str, key_answer: str, question_text: str | None = None,
+                    on_partial: Optional[PartialCallback] = None) -> dict:
     """
     Her soruyu Türkçe değerlendirir ve JSON olarak döndürür.
     Dönen alanlar: score (0–10), turkish_reasoning, turkish_tips, overall_comment
+
+    Önce yerel ön değerlendirme (`pregrader`) çalışır: PREGRADE_MODE="on" iken boş, anahtarla birebir
+    aynı veya alakasız cevaplar model çağrılmadan puanlanır ('pregrade' alanı nedeni taşır);
+    "shadow" modunda karar yalnızca sonuca eklenir ve model yine çağrılır (uyum ölçümü için).
     """
-    prompt = f"""
-    Sen deneyimli bir tarih öğretmenisin.
-    Aşağıdaki öğrenci cevabını ve cevap anahtarını karşılaştırarak değerlendir.
+    decision = None
+    if settings.PREGRADE_MODE in ("on", "shadow"):
+        decision = await pregrader.check(student_answer, key_answer)
+    if decision is not None and settings.PREGRADE_MODE == "on":
+        record_pregrade(decision, applied=True)
+        return pregrade_result(question_id, decision["score"], decision["reason"], decision["similarity"])
 
-    İstediğim format:
-    - Cevabı 0–10 arası puanla değerlendir (float, örn: 7.5).
-    - "turkish_reasoning": Öğrenci cevabının neden güçlü veya zayıf olduğunu açıklayan kısa ve net bir açıklama.
-    - "turkish_tips": Geliştirme önerisi veya nasıl daha iyi olabileceğine dair bir ipucu.
-    - "overall_comment": Bu soruya dair genel yargı ve performans özeti.
+    data = await _grade_llm(question_id, student_answer, key_answer, question_text, on_partial)
+    if decision is not None:
+        record_pregrade(decision, applied=False)
+        data = {**data, "pregrade": {**decision, "similarity": round(decision["similarity"], 3), "applied": False}}
+    return data
 
-    Cevabını YALNIZCA GEÇERLİ JSON formatında döndür. Başka metin ekleme.
 
-    JSON şablonu:
-    {{
-      "question_id": "{question_id}",
-      "score": 0.0,
-      "turkish_reasoning": "Kısa ama net açıklama.",
-      "turkish_tips": "Geliştirme önerisi.",
-      "overall_comment": "Genel yorum."
-    }}
+async def _grade_llm(question_id: str, student_answer: str, key_answer: str, question_text: str | None,
+                     on_partial: Optional[PartialCallback]) -> dict:
+    """
+    Model ile değerlendirme.
 
-    [Soru Metni]
-    {(question_text or '').strip()}
+    `on_partial` verilirse model cevabı akış (stream) olarak alınır ve kısmi JSON ayrıştırılarak
+    önce puan, ardından büyüyen açıklama metni geri çağrıya iletilir.
 
-    [Cevap Anahtarı]
-    {key_answer}
+    Sonuçlar normalize edilmiş (soru, öğrenci cevabı, anahtar, model, sıcaklık) özetine göre
+    önbelleğe alınır; aynı anda gelen özdeş istekler tek bir model çağrısını paylaşır.
+    Yalnızca gerçek model çağrıları global `llm_scheduler` sınırına tabidir; geçici hatalar
+    `call_with_retry` ile yeniden denenir. Yine de başarısız olursa 'error' işaretli sonuç döner.
+    İş bazlı isabet/yeniden deneme sayaçları `job_stats` üzerinden özet 'meta' alanına aktarılır.
+    """
+    try:
+        if not settings.GRADE_CACHE_ENABLED:
+            job_stats.incr("grade_cache_misses")
+            metrics.cache_event("grade", "disabled")
+            return await _call_model(question_id, student_answer, key_answer, question_text, on_partial)
 
-    [Öğrenci Cevabı]
-{student_answer}
-    """.strip()
+        key = grading_key(question_text, student_answer, key_answer,
+                          settings.LLM_MODEL, settings.LLM_TEMPERATURE, f"{PROMPT_VERSION}:{budget_version()}")
 
-    try:
-        completion = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            response_format={"type": "json_object"}  # JSON zorunluluğu
-        )
-
-        raw = (completion.choices[0].message.content or "").strip()
-        data = _force_json(raw)
+        cached = await asyncio.to_thread(grade_cache.get, key)
+        if cached is not None:
+            job_stats.incr("grade_cache_hits")
+            metrics.cache_event("grade", "hit")
+            # Önbellekten gelen sonuç için model çağrısı yapılmadı
+            return {**cached, "question_id": str(question_id), "prompt_tokens": 0, "completion_tokens": 0}
 
-        # 🔧 Emniyetli tip düzeltmeleri
-        data["question_id"] = str(question_id)
+        pending = _inflight.get(key)
+        if pending is not None:
+            job_stats.incr("grade_cache_shared")
+            metrics.cache_event("grade", "shared")
+            try:
+                data = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # Paylaşılan çağrı iptal edildi; bu istek kendi çağrısını yapar
+                data = await _call_model(question_id, student_answer, key_answer, question_text, on_partial)
+            # Tokenlar çağrının sahibine yazılır
+            return {**data, "question_id": str(question_id), "prompt_tokens": 0, "completion_tokens": 0}
 
+        job_stats.incr("grade_cache_misses")
+        metrics.cache_event("grade", "miss")
+        fut = asyncio.get_running_loop().create_future()
+        _inflight[key] = fut
         try:
-            data["score"] = float(data.get("score", 0.0))
-        except Exception:
-            data["score"] = 0.0
-
-        for field in ["turkish_reasoning", "turkish_tips", "overall_comment"]:
-            val = data.get(field, "")
-            if not isinstance(val, str):
-                val = str(val)
-            data[field] = val.strip()
+            data = await _call_model(question_id, student_answer, key_answer, question_text, on_partial)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Bekleyen yoksa "exception never retrieved" uyarısını önle
+            fut.exception()
+            raise
+        else:
+            fut.set_result(data)
+        finally:
+            _inflight.pop(key, None)
 
+        await asyncio.to_thread(grade_cache.put, key, {k: v for k, v in data.items() if k not in CALL_FIELDS})
         return data
 
     except Exception as e:
-        print(f"[ERROR] Grading failed for question {question_id}: {e}")
-        return {
-            "question_id": str(question_id),
-            "score": 0.0,
-            "turkish_reasoning": f"⚠️ Model cevabı çözümlenemedi: {e}",
-            "turkish_tips": "Değerlendirme sırasında hata oluştu.",
-            "overall_comment": "Bu soru için genel değerlendirme üretilemedi."
-        }
+        log.error("Grading failed for question %s: %s", question_id, e)
+        job_stats.incr("llm_failures")
+        metrics.error("llm_failure")
+        return _error_result(question_id, e)
+
+
+async def _call_model(question_id: str, student_answer: str, key_answer: str, question_text: str | None,
+                      on_partial: Optional[PartialCallback]) -> dict:
+    """
+    Gerçek model çağrısı: toplu mod açıksa (ve akış istenmiyorsa) paketleyiciye, aksi halde
+    hız sınırı/yeniden deneme katmanı üzerinden tekil çağrıya gider.
+    """
+    if settings.GRADE_BATCH_ENABLED and on_partial is None:
+        # batch_grader bu modülü içe aktardığı için döngüsel importu önlemek adına burada yüklenir
+        from modules.batch_grader import batch_grader
+        return await batch_grader.grade(question_id, student_answer, key_answer, question_text)
+    prompt = build_grading_prompt(student_answer, key_answer, question_text)
+    # Akış durumu denemeler arasında korunur: yeniden denenen akış, yayınlanmış kısmi sonuçları tekrar göndermez
+    stream = StreamState(on_partial) if on_partial is not None else None
+    return await call_with_retry(
+        lambda: _grade_uncached(question_id, student_answer, key_answer, question_text, stream, prompt),
+        tokens=estimate_tokens(prompt.tokens),
+    )
+
+
+def estimate_tokens(prompt: Union[str, int], expected_output: int = _EXPECTED_OUTPUT_TOKENS) -> int:
+    """
+    Bir çağrının TPM kovasından düşülecek tahmini token sayısı (prompt + beklenen çıktı).
+    `prompt` metin ya da önceden sayılmış token sayısı olabilir.
+    """
+    if isinstance(prompt, int):
+        return prompt + expected_output
+    return count_tokens(prompt, settings.LLM_MODEL) + expected_output
+
+
+class StreamState:
+    """
+    Bir sorunun akış yayını durumu: son gönderilen kısmi alanlar ve gönderim zamanı.
+    `call_with_retry` yarıda kesilen akışı baştan tekrarladığında aynı durum kullanılır; yeni akış
+    yayınlanmış olanın gerisinde kaldıkça (aynı puan, gönderilmiş açıklamanın öneki) mesaj gönderilmez,
+    böylece istemci aynı kısmi sonuçları yeniden almaz ve metin kısalıp tekrar büyümez.
+    """
+
+    __slots__ = ("on_partial", "last_sent", "last_at")
+
+    def __init__(self, on_partial: PartialCallback):
+        self.on_partial = on_partial
+        self.last_sent: Dict = {}
+        self.last_at = 0.0
+
+    def behind(self, partial: Dict) -> bool:
+        """Kısmi alanların tamamı önceden yayınlananlarda var mı."""
+        for k, v in partial.items():
+            sent = self.last_sent.get(k)
+            if sent is None:
+                return False
+            if isinstance(v, str) and isinstance(sent, str):
+                if not sent.startswith(v):
+                    return False
+            elif v != sent:
+                return False
+        return True
+
+    async def offer(self, partial: Dict):
+        if not partial or self.behind(partial):
+            return
+        now = time.monotonic()
+        # Puanın ilk gelişi hemen iletilir; metin büyümesi aralıkla seyreltilir
+        first_score = "score" in partial and "score" not in self.last_sent
+        if first_score or now - self.last_at >= settings.GRADE_STREAM_MIN_INTERVAL_MS / 1000.0:
+            await self.on_partial(partial)
+            self.last_sent, self.last_at = partial, now
+
+
+async def _stream_completion(messages: List[Dict], stream: StreamState) -> str:
+    """
+    Chat completion'ı akış olarak alır; her parçada kısmi JSON'u ayrıştırıp puan/açıklama
+    değiştiyse (en fazla GRADE_STREAM_MIN_INTERVAL_MS aralıkla) `stream.on_partial` çağırır.
+    Dönen değer: tam ham cevap metni.
+    """
+    parser = PartialJSONParser()
+
+    async for delta in get_backend().stream(
+        messages,
+        model=settings.LLM_MODEL,
+        temperature=settings.LLM_TEMPERATURE,
+    ):
+        fields = parser.feed(delta)
+        await stream.offer({k: fields[k] for k in ("score", "turkish_reasoning") if k in fields})
+
+    return parser.buffer.strip()
+
+
+async def _grade_uncached(question_id: str, student_answer: str, key_answer: str, question_text: str | None = None,
+                          stream: Optional[StreamState] = None,
+                          prompt: Optional[GradingPrompt] = None) -> dict:
+    """
+    Tek model çağrısı. Hata durumunda istisna fırlatır (hatalı sonuçlar önbelleğe yazılmaz).
+    Sonuç, bu çağrının prompt/completion token sayılarını taşır (sağlayıcı bildirmezse yerel sayım).
+    """
+    if prompt is None:
+        prompt = build_grading_prompt(student_answer, key_answer, question_text)
+    cached_tokens = None
+    with metrics.span("llm_network"):
+        if stream is not None:
+            raw = await _stream_completion(prompt.messages, stream)
+            prompt_tokens = completion_tokens = None
+        else:
+            response = await get_backend().complete(
+                prompt.messages,
+                model=settings.LLM_MODEL,
+                temperature=settings.LLM_TEMPERATURE,
+                json_mode=True,  # JSON zorunluluğu
+            )
+            rate_limiter.observe(response.headers)
+            raw = response.content
+            prompt_tokens, completion_tokens = response.prompt_tokens, response.completion_tokens
+            cached_tokens = response.cached_tokens
+    prompt_tokens = prompt_tokens or prompt.tokens
+    completion_tokens = completion_tokens or count_tokens(raw, settings.LLM_MODEL)
+    record_tokens(prompt_tokens, completion_tokens, cached_tokens)
+
+    with metrics.span("llm_parse"):
+        data = _force_json(raw)
+        if not data:
+            metrics.error("llm_invalid_json")
+            raise ValueError("Model geçerli JSON döndürmedi.")
+        data = _normalize_result(data, question_id)
+    data["prompt_tokens"], data["completion_tokens"] = prompt_tokens, completion_tokens
+    if cached_tokens is not None:
+        data["cached_tokens"] = cached_tokens
+    return data
+
+
+def record_tokens(prompt_tokens: int, completion_tokens: int, cached_tokens: Optional[int] = None):
+    """Token sayaçları: global metrik + geçerli işin sayaçları."""
+    metrics.LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+    metrics.LLM_TOKENS.inc(completion_tokens, kind="completion")
+    job_stats.incr("llm_prompt_tokens", prompt_tokens)
+    job_stats.incr("llm_completion_tokens", completion_tokens)
+    if cached_tokens:
+        metrics.LLM_TOKENS.inc(cached_tokens, kind="cached_prompt")
+        job_stats.incr("llm_cached_prompt_tokens", cached_tokens)
+
+
+def _normalize_result(data: dict, question_id: str) -> dict:
+    """Model çıktısındaki alan tiplerini düzeltir (tekil ve toplu değerlendirme ortak)."""
+    # 🔧 Emniyetli tip düzeltmeleri
+    data["question_id"] = str(question_id)
+
+    try:
+        data["score"] = float(data.get("score", 0.0))
+    except Exception:
+        data["score"] = 0.0
+
+    for field in ["turkish_reasoning", "turkish_tips", "overall_comment"]:
+        val = data.get(field, "")
+        if not isinstance(val, str):
+            val = str(val)
+        data[field] = val.strip()
+
+    return data
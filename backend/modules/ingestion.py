@@ -0,0 +1,416 @@
+# modules/ingestion.py
+import asyncio
+import multiprocessing
+import os
+import time
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from config import settings
+from helpers.pdf_utils import (
+    PDFParseError,
+    KeyQuestionParser,
+    PDFSource,
+    StudentQuestionParser,
+    extract_pages_timed,
+    preload_worker,
+)
+from helpers.ws_manager import ws_manager
+from helpers.job_control import job_control, PRIORITY_BATCH
+from helpers.job_store import get_job_store, STATUS_FAILED
+from helpers.job_stats import job_stats
+from helpers.ocr import lacks_text, needs_ocr, ocr_available, ocr_options, ocr_page
+from helpers.pdf_cache import pdf_cache, content_hash
+from helpers import metrics
+from helpers.log import get_logger, setup_logging
+from helpers.uploads import discard
+from modules.parser_agent import merge_question, merge_student_and_key
+from modules.orchestrator import EarlyGrading, mark_cancelled, run_assessment_job, run_batch_job
+
+log = get_logger("ingestion")
+
+# PDF ayrıştırma (pdfplumber) CPU-yoğun ve senkron çalışır; event loop'u
+# bloklamaması için ayrı süreç havuzunda yürütülür.
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _pool_size() -> int:
+    return settings.INGEST_WORKERS or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = _pool_size()
+        # uvicorn thread'leri ile fork güvenli olmadığından 'spawn' kullanılır
+        # Havuz işçileri de aynı kuyruk tabanlı günlükleyiciyle başlar
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=setup_logging)
+        log.info("Ingestion process pool started with %d workers.", workers)
+    return _pool
+
+
+async def warm_pool() -> int:
+    """
+    Havuzu başlatır ve her işçide PDF yığınını yükler ('spawn' işçileri boş bir yorumlayıcıyla başlar;
+    aksi halde ilk yüklemenin ayrıştırması bu maliyeti öder). Dönen değer: ısınan işçi sayısı.
+    """
+    pool = get_pool()
+    loop = asyncio.get_running_loop()
+    pids = await asyncio.gather(*(loop.run_in_executor(pool, preload_worker, i) for i in range(_pool_size())))
+    return len(set(pids))
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _publish_ingest(job_id: Optional[str], stage: str, pages_done: int, pages_total: int, cached: bool = False):
+    if not job_id:
+        return
+    await ws_manager.publish(job_id, {
+        "type": "ingest",
+        "job_id": job_id,
+        "payload": {"stage": stage, "pages_done": pages_done, "pages_total": pages_total, "cached": cached}
+    })
+
+
+def _observe_pages(durations: List[float], job_id: Optional[str]):
+    # Sayfa süreleri havuz işçisinde ölçülür; histogram ve iş dökümü bu süreçte tutulur
+    for seconds in durations:
+        metrics.observe_span("page_extract", seconds, job_id=job_id)
+
+
+async def iter_pages_async(source: PDFSource, filename: str, job_id: Optional[str] = None,
+                           stage: str = "", unread: Optional[Set[int]] = None) -> AsyncIterator[str]:
+    """
+    PDF sayfalarını süreç havuzunda çıkarır ve sırayla verir. Kaynak dosya yolu ise her görev dosyayı
+    kendisi açar; bayt kaynağı her parça görevine ayrı ayrı kopyalanır.
+    İlk görev yalnızca ilk sayfayı çıkarır ve toplam sayfa sayısını getirir (ilk soru erken hazır olur);
+    kalan sayfalar INGEST_PAGES_PER_TASK'lık aralıklarla havuza paralel dağıtılır. Metin katmanı
+    olmayan sayfalar için sayfa başına ayrı bir OCR görevi havuza verilir. Her parça bittikçe 'ingest'
+    ilerlemesi yayınlanır; sayfalar, öncekilerin hepsi hazır olduğu anda (sonrakiler beklenmeden) verilir.
+    unread: verilirse metin katmanı olmayıp OCR ile de okunamayan (OCR kapalı/yok, zaman aşımı, hata)
+    sayfaların indeksleri eklenir; bu sayfaların boş metni kalıcı sayılmamalıdır.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    step = max(1, settings.INGEST_PAGES_PER_TASK)
+    opts = ocr_options()
+
+    # Metni hazır sayfalar (indeks → metin) ve bekleyen havuz görevleri: ("range", ilk sayfa) | ("ocr", sayfa)
+    ready: Dict[int, str] = {}
+    pending: Dict[asyncio.Future, Tuple[str, int]] = {}
+
+    def _take_range(start: int, texts: List[str]):
+        for idx, text in enumerate(texts, start=start):
+            if needs_ocr(text) and ocr_available():
+                fut = asyncio.wrap_future(pool.submit(ocr_page, source, filename, idx, opts))
+                pending[fut] = ("ocr", idx)
+            else:
+                if unread is not None and lacks_text(text):
+                    unread.add(idx)
+                ready[idx] = text
+
+    first, total, durations = await loop.run_in_executor(pool, extract_pages_timed, source, filename, 0, 1)
+    _observe_pages(durations, job_id)
+    _take_range(0, first)
+    for start in range(1, total, step):
+        pending[asyncio.wrap_future(pool.submit(extract_pages_timed, source, filename, start, start + step))] = \
+            ("range", start)
+
+    next_idx = 0
+    try:
+        while True:
+            await _publish_ingest(job_id, stage, len(ready) + next_idx, total)
+            while next_idx in ready:
+                yield ready.pop(next_idx)
+                next_idx += 1
+            if not pending:
+                break
+            finished, _ = await asyncio.wait(set(pending), return_when=asyncio.FIRST_COMPLETED)
+            for fut in finished:
+                kind, key = pending.pop(fut)
+                if kind == "range":
+                    texts, _, durations = fut.result()
+                    _observe_pages(durations, job_id)
+                    _take_range(key, texts)
+                else:
+                    res = fut.result()
+                    metrics.observe_span("ocr", res["seconds"], job_id=job_id)
+                    if res["error"]:
+                        metrics.error("ocr")
+                        if unread is not None:
+                            unread.add(key)
+                    else:
+                        metrics.cache_event("ocr", "hit" if res["cached"] else "miss")
+                    ready[key] = res["text"]
+    finally:
+        # Tüketici erken bıraktıysa (hata) bekleyen görevler iptal edilir
+        for fut in pending:
+            fut.cancel()
+
+
+async def extract_pages_async(source: PDFSource, filename: str, job_id: Optional[str] = None,
+                              stage: str = "") -> List[str]:
+    """Tüm sayfa metinlerini liste olarak döner (bkz. iter_pages_async)."""
+    async with aclosing(iter_pages_async(source, filename, job_id, stage)) as pages:
+        return [text async for text in pages]
+
+
+async def _replay(pages: List[str]) -> AsyncIterator[str]:
+    for text in pages:
+        yield text
+
+
+async def _iter_source(source: PDFSource, filename: str, job_id: Optional[str], stage: str,
+                       parser) -> AsyncIterator[Dict]:
+    """
+    Soruları tamamlandıkça verir: sayfalar havuzdan geldikçe ayrıştırıcıya beslenir, her soru sonraki
+    'Soru N' başlığı göründüğü anda üretilir (kalan sayfalar hâlâ çıkarılıyor olabilir).
+    Önbellek katmanı: önce ayrıştırılmış sorular, sonra ham sayfa metni aranır; yalnızca ikisi de yoksa
+    pdfplumber çalıştırılır. Anahtar, içerik özeti + ayrıştırıcı sürümüdür; kayıtlar ayrıştırma
+    tamamlanınca yazılır. OCR ile okunamayan sayfa varsa hiçbir kayıt yazılmaz (boş metin kalıcı
+    olmasın; PDF sonraki yüklemede yeniden çıkarılır).
+    """
+    digest = None
+    pages: Optional[AsyncIterator[str]] = None
+    if settings.PDF_CACHE_ENABLED:
+        digest = await asyncio.to_thread(content_hash, source)
+        parsed = await asyncio.to_thread(pdf_cache.get, digest, stage)
+        if parsed is not None:
+            metrics.cache_event("pdf", "hit_parsed")
+            log.debug("💾 PDF cache hit (%s, parsed): %s", stage, filename)
+            await _publish_ingest(job_id, stage, 0, 0, cached=True)
+            for q in parsed:
+                yield q
+            return
+        cached_pages = await asyncio.to_thread(pdf_cache.get, digest, "pages")
+        if cached_pages is not None:
+            metrics.cache_event("pdf", "hit_pages")
+            log.debug("💾 PDF cache hit (%s, pages): %s", stage, filename)
+            await _publish_ingest(job_id, stage, len(cached_pages), len(cached_pages), cached=True)
+            pages = _replay(cached_pages)
+        else:
+            metrics.cache_event("pdf", "miss")
+    # Önbelleğe yazılacak sayfa metinleri (önbellek kapalıysa veya sayfalar zaten önbellekteyse tutulmaz)
+    seen: Optional[List[str]] = [] if digest and pages is None else None
+    unread: Set[int] = set()
+    if pages is None:
+        pages = iter_pages_async(source, filename, job_id, stage, unread)
+
+    parsed: List[Dict] = []
+    chunk_seconds = 0.0
+    async with aclosing(pages):
+        async for text in pages:
+            if seen is not None:
+                seen.append(text)
+            t0 = time.perf_counter()
+            rows = parser.feed(text)
+            chunk_seconds += time.perf_counter() - t0
+            for q in rows:
+                parsed.append(q)
+                yield q
+    t0 = time.perf_counter()
+    rows = parser.finish()
+    chunk_seconds += time.perf_counter() - t0
+    metrics.observe_span("chunk", chunk_seconds, job_id=job_id)
+    for q in rows:
+        parsed.append(q)
+        yield q
+
+    if unread:
+        log.warning("%d page(s) of %s have no text (OCR unavailable or failed); not caching.", len(unread), filename)
+    elif digest:
+        if seen is not None:
+            await asyncio.to_thread(pdf_cache.put, digest, "pages", seen)
+        await asyncio.to_thread(pdf_cache.put, digest, stage, parsed)
+
+
+def iter_student_questions(source: PDFSource, filename: str, job_id: Optional[str] = None) -> AsyncIterator[Dict]:
+    """Öğrenci PDF'inin sorularını (bayt veya geçici dosya yolu; önbellek → havuz) tamamlandıkça verir."""
+    return _iter_source(source, filename, job_id, "student", StudentQuestionParser())
+
+
+def iter_key_questions(source: PDFSource, filename: str, job_id: Optional[str] = None) -> AsyncIterator[Dict]:
+    """Cevap anahtarı PDF'inin sorularını tamamlandıkça verir."""
+    return _iter_source(source, filename, job_id, "key", KeyQuestionParser())
+
+
+async def parse_student_bytes(source: PDFSource, filename: str, job_id: Optional[str] = None) -> List[Dict]:
+    """Öğrenci PDF'ini (bayt veya geçici dosya yolu; önbellek → havuz) çıkarır ve sorulara ayırır."""
+    async with aclosing(iter_student_questions(source, filename, job_id)) as questions:
+        return [q async for q in questions]
+
+
+async def parse_key_bytes(source: PDFSource, filename: str, job_id: Optional[str] = None) -> List[Dict]:
+    """Cevap anahtarı PDF'ini (bayt veya geçici dosya yolu; önbellek → havuz) çıkarır ve sorulara ayırır."""
+    async with aclosing(iter_key_questions(source, filename, job_id)) as questions:
+        return [q async for q in questions]
+
+
+def _abandon(task: asyncio.Task):
+    """Artık sonucu beklenmeyen görevi iptal eder; hatası 'retrieved' sayılır."""
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
+
+
+async def fail_job(job_id: str, message: str):
+    log.error("❌ Ingestion failed for job %s: %s", job_id, message)
+    metrics.error("ingest")
+    job_stats.pop(job_id)
+    try:
+        await asyncio.to_thread(get_job_store().set_status, job_id, STATUS_FAILED, message)
+    except Exception as e:
+        log.error("Job store set_status failed: %s", e)
+    await ws_manager.publish(job_id, {"type": "error", "job_id": job_id, "payload": {"message": message}})
+    await ws_manager.publish(job_id, {"type": "done", "job_id": job_id, "payload": {"message": "completed"}})
+    await ws_manager.mark_done(job_id)
+
+
+async def finish_cancelled(job_id: str, reason: str):
+    """Değerlendirme başlamadan (ayrıştırma sırasında veya kuyrukta) iptal edilen işi kapatır."""
+    job_stats.pop(job_id)
+    await mark_cancelled(job_id, reason)
+    await ws_manager.publish(job_id, {"type": "done", "job_id": job_id, "payload": {"message": "completed"}})
+    await ws_manager.mark_done(job_id)
+
+
+async def ingest_and_assess(job_id: str, student_src: PDFSource, student_name: str, key_src: PDFSource,
+                            key_name: str, stream: Optional[bool] = None, delivery: Optional[str] = None,
+                            priority: Optional[str] = None, deadline_seconds: Optional[float] = None,
+                            progress_payload: Optional[str] = None):
+    """
+    Tekil iş hattı: ayrıştırma (süreç havuzu) → değerlendirme.
+    Uç nokta job_id'yi hemen döner; bu görev arka planda çalışır.
+    Anahtar öğrenci PDF'i ile eşzamanlı ayrıştırılır; öğrenci soruları tamamlandıkça (kalan sayfalar
+    beklenmeden) değerlendirmeye verilir. Geçici yükleme dosyaları ayrıştırma biter bitmez silinir.
+    İş bu görevle `job_control`'e kaydedilir; ayrıştırma sırasındaki iptal de burada kapatılır.
+    """
+    job_control.track(job_id, priority)
+    try:
+        early = EarlyGrading(job_id, stream, deadline_seconds)
+        key_task = asyncio.create_task(parse_key_bytes(key_src, key_name, job_id))
+        student_parsed: List[Dict] = []
+        key_by_id: Optional[Dict[str, Dict]] = None
+        try:
+            async with aclosing(iter_student_questions(student_src, student_name, job_id)) as questions:
+                async for sq in questions:
+                    student_parsed.append(sq)
+                    if key_by_id is None:
+                        key_by_id = {kq["question_id"]: kq for kq in await key_task}
+                    early.start(merge_question(sq, key_by_id))
+            key_parsed = await key_task
+        except asyncio.CancelledError:
+            early.cancel()
+            _abandon(key_task)
+            reason = job_control.absorb(job_id)
+            if reason is None:
+                raise
+            await finish_cancelled(job_id, reason)
+            return
+        except Exception as e:
+            early.cancel()
+            _abandon(key_task)
+            await fail_job(job_id, str(e) if isinstance(e, PDFParseError) else f"PDF çözümlenemedi: {e}")
+            return
+        finally:
+            discard(student_src, key_src)
+
+        questions = merge_student_and_key(student_parsed, key_parsed)
+        await run_assessment_job(job_id, questions, stream=stream, delivery=delivery,
+                                 progress_payload=progress_payload)
+    finally:
+        job_control.release(job_id)
+
+
+async def ingest_and_run_batch(batch_id: str, key_src: PDFSource, key_name: str, students: List[Dict],
+                               stream: Optional[bool] = None, delivery: Optional[str] = None,
+                               priority: Optional[str] = None, deadline_seconds: Optional[float] = None,
+                               progress_payload: Optional[str] = None):
+    """
+    Toplu iş hattı: anahtar bir kez ayrıştırılır, öğrenciler havuzda paralel ayrıştırılıp
+    `run_batch_job` ile ortak zamanlayıcıda değerlendirilir.
+    students: [{'job_id', 'filename', 'source'}] — kaynak bayt veya geçici dosya yolu
+    Seçenekler (`ingest_and_assess` ile aynı) her öğrenci işine uygulanır.
+    Toplu iş bu görevle `job_control`'e kaydedilir; bitince toplu işin ve (değerlendirmeye hiç
+    başlamamış olanlar dahil) öğrencilerinin kayıtları silinir.
+    """
+    job_control.track(batch_id, priority or PRIORITY_BATCH)
+    try:
+        await _ingest_batch(batch_id, key_src, key_name, students, stream, delivery, priority, deadline_seconds,
+                            progress_payload)
+    finally:
+        for st in students:
+            job_control.release(st["job_id"])
+        job_control.release(batch_id)
+
+
+async def _ingest_batch(batch_id: str, key_src: PDFSource, key_name: str, students: List[Dict],
+                        stream: Optional[bool], delivery: Optional[str], priority: Optional[str],
+                        deadline_seconds: Optional[float], progress_payload: Optional[str]):
+    try:
+        key_parsed = await parse_key_bytes(key_src, key_name, batch_id)
+    except asyncio.CancelledError:
+        reason = job_control.absorb(batch_id)
+        if reason is None:
+            raise
+        for st in students:
+            discard(st.get("source"))
+            await finish_cancelled(st["job_id"], reason)
+        await finish_cancelled(batch_id, reason)
+        return
+    except Exception as e:
+        message = str(e) if isinstance(e, PDFParseError) else f"PDF çözümlenemedi: {e}"
+        for st in students:
+            discard(st.get("source"))
+            await fail_job(st["job_id"], message)
+        await fail_job(batch_id, message)
+        return
+    finally:
+        discard(key_src)
+
+    key_by_id = {kq["question_id"]: kq for kq in key_parsed}
+
+    def _prepare(st: Dict) -> Callable[[], Awaitable[Optional[List[Dict]]]]:
+        async def _run() -> Optional[List[Dict]]:
+            source = st.pop("source")
+            # Sorular tamamlandıkça değerlendirme başlar; run_assessment_job görevleri devralır
+            early = EarlyGrading(st["job_id"], stream, deadline_seconds)
+            parsed: List[Dict] = []
+            try:
+                async with aclosing(iter_student_questions(source, st["filename"], st["job_id"])) as questions:
+                    async for sq in questions:
+                        parsed.append(sq)
+                        early.start(merge_question(sq, key_by_id))
+            except asyncio.CancelledError:
+                early.cancel()
+                reason = job_control.absorb(st["job_id"])
+                if reason is None:
+                    raise
+                await finish_cancelled(st["job_id"], reason)
+                return None
+            except Exception as e:
+                early.cancel()
+                await fail_job(st["job_id"], str(e) if isinstance(e, PDFParseError) else f"PDF çözümlenemedi: {e}")
+                return None
+            finally:
+                discard(source)
+            return merge_student_and_key(parsed, key_parsed)
+        return _run
+
+    try:
+        await run_batch_job(batch_id, [
+            {"job_id": st["job_id"], "filename": st["filename"], "prepare": _prepare(st)}
+            for st in students
+        ], stream=stream, delivery=delivery, priority=priority, deadline_seconds=deadline_seconds,
+            progress_payload=progress_payload)
+    finally:
+        # Ayrıştırılmadan kalan (ör. iş yarıda kesildi) geçici dosyalar
+        discard(*(st.get("source") for st in students))
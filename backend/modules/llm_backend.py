@@ -0,0 +1,322 @@
+# modules/llm_backend.py
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+from config import settings
+
+
+class LLMBackendError(Exception):
+    """Arka uç çağrısı başarısız oldu (sunucu hatası, zaman aşımı vb.)."""
+
+
+class LLMRateLimitError(LLMBackendError):
+    """Sağlayıcı 429 döndürdü. retry_after: önerilen bekleme (saniye) veya None."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class LLMResponse:
+    content: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    # Sağlayıcının önek önbelleğinden karşılanan prompt tokenları (prompt caching)
+    cached_tokens: Optional[int] = None
+    # Sağlayıcı yanıt başlıkları (örn. x-ratelimit-remaining-requests)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class LLMBackend:
+    """
+    Değerlendirme için chat-completion arka ucu arayüzü.
+    messages: OpenAI biçiminde [{'role', 'content'}] listesi; json_mode → JSON nesnesi zorunlu.
+    """
+
+    name = "base"
+
+    async def complete(self, messages: List[Dict], *, model: str, temperature: float,
+                       json_mode: bool = True) -> LLMResponse:
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict], *, model: str, temperature: float,
+               json_mode: bool = True) -> AsyncIterator[str]:
+        """Cevabı içerik parçaları (delta) olarak üretir."""
+        raise NotImplementedError
+
+    async def warmup(self):
+        """Açılış ısınması: bağlantıyı önceden kurar (varsayılan: bir şey yapmaz)."""
+
+    async def close(self):
+        """Bağlantı havuzunu kapatır (süreç kapanışı)."""
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None):
+        from openai import AsyncOpenAI
+        from helpers.llm_http import build_http_client, http_timeout
+        # Havuz boyutu, keep-alive, HTTP/2 ve zaman aşımları ayarlardan; istemci süreç kapanırken kapatılır
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=build_http_client(),
+                                  timeout=http_timeout())
+
+    async def warmup(self):
+        # Ücretsiz model listesi isteği TLS bağlantısını havuza koyar; ilk değerlendirme el sıkışmayı beklemez
+        if not settings.WARMUP_LLM_CONNECT:
+            return
+        import openai
+        try:
+            await self.client.models.list()
+        except openai.APIStatusError:
+            # Sağlayıcı cevap verdi (ör. uç nokta desteklenmiyor); bağlantı yine de havuzda
+            pass
+
+    async def close(self):
+        await self.client.close()
+
+    @staticmethod
+    def _map_error(e: Exception) -> Exception:
+        import openai
+        if isinstance(e, openai.RateLimitError):
+            retry_after = None
+            try:
+                retry_after = float(e.response.headers.get("retry-after"))
+            except (AttributeError, TypeError, ValueError):
+                pass
+            return LLMRateLimitError(str(e), retry_after)
+        if isinstance(e, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)):
+            return LLMBackendError(str(e))
+        import httpx
+        # Akış sırasında kopan bağlantı SDK tarafından sarılmadan gelir
+        if isinstance(e, httpx.TransportError):
+            return LLMBackendError(f"{type(e).__name__}: {e}")
+        return e
+
+    async def complete(self, messages: List[Dict], *, model: str, temperature: float,
+                       json_mode: bool = True) -> LLMResponse:
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, temperature=temperature, **kwargs
+            )
+        except Exception as e:
+            raise self._map_error(e) from e
+        completion = raw.parse()
+        usage = getattr(completion, "usage", None)
+        return LLMResponse(
+            content=(completion.choices[0].message.content or "").strip(),
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None),
+            headers={k.lower(): v for k, v in raw.headers.items()},
+        )
+
+    async def stream(self, messages: List[Dict], *, model: str, temperature: float,
+                     json_mode: bool = True) -> AsyncIterator[str]:
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, stream=True, **kwargs
+            )
+        except Exception as e:
+            raise self._map_error(e) from e
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise self._map_error(e) from e
+
+
+# --- Yerel, deterministik sahte arka uç (yük testi / benchmark) ---
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_KEY_RE = re.compile(r"\[Cevap Anahtarı\]\s*\n(.*?)(?=\n\s*\[|\Z)", re.S)
+_STUDENT_RE = re.compile(r"\[Öğrenci Cevabı\]\s*\n(.*?)(?=\n\s*\[|\Z)", re.S)
+_BATCH_GROUP_RE = re.compile(r"### Soru grubu \d+\n(.*?)(?=\n### Soru grubu |\Z)", re.S)
+_BATCH_ITEM_RE = re.compile(r"\[Öğrenci Cevabı — item_id: (\w+)\]\n(.*?)(?=\n\n\[|\Z)", re.S)
+
+
+def _overlap_score(key: str, student: str) -> float:
+    """Anahtar ve öğrenci cevabı arasındaki kelime örtüşmesinden 0–10 puan."""
+    k = {w.casefold() for w in _WORD_RE.findall(key or "")}
+    s = {w.casefold() for w in _WORD_RE.findall(student or "")}
+    if not k or not s:
+        return 0.0
+    return round(10 * len(k & s) / len(k), 1)
+
+
+def _mock_item(score: float, **extra) -> Dict:
+    return {
+        **extra,
+        "score": score,
+        "turkish_reasoning": f"Cevap, anahtardaki kavramların yaklaşık %{int(score * 10)} kadarını içeriyor.",
+        "turkish_tips": "Anahtar kavramları ve tarihleri açıkça belirtin.",
+        "overall_comment": "Sahte (mock) değerlendirme.",
+    }
+
+
+class MockBackend(LLMBackend):
+    """
+    Canlı API olmadan yük testi için deterministik arka uç.
+
+    - Gecikme: MOCK_LLM_LATENCY_DIST (fixed | uniform | normal | lognormal | exponential),
+      ortalama MOCK_LLM_LATENCY_MS, yayılım MOCK_LLM_LATENCY_SIGMA.
+    - Hata: MOCK_LLM_ERROR_RATE olasılıkla sunucu hatası.
+    - 429: son 60 saniyedeki istek sayısı MOCK_LLM_RATE_LIMIT_RPM'i aşarsa (0 → sınırsız)
+      veya MOCK_LLM_RATE_LIMIT_RATE olasılıkla LLMRateLimitError (retry_after ile).
+    Puan, prompt'taki anahtar/öğrenci cevabı kelime örtüşmesinden hesaplanır; aynı girdi aynı çıktıyı verir.
+    Gecikme/hata dizisi MOCK_LLM_SEED ile tekrarlanabilir.
+    """
+
+    name = "mock"
+
+    def __init__(self, latency_ms: float, dist: str, sigma: float, error_rate: float,
+                 rate_limit_rpm: int, rate_limit_rate: float, seed: int, stream_chunk_chars: int = 8):
+        self.latency_ms = latency_ms
+        self.dist = dist
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rpm = rate_limit_rpm
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self._rng = random.Random(seed)
+        self._window: deque = deque()
+        self.calls = 0
+
+    def _latency(self) -> float:
+        mean = max(0.0, self.latency_ms) / 1000.0
+        if self.dist == "fixed" or mean == 0:
+            return mean
+        if self.dist == "uniform":
+            return self._rng.uniform(mean * (1 - self.sigma), mean * (1 + self.sigma))
+        if self.dist == "normal":
+            return max(0.0, self._rng.gauss(mean, mean * self.sigma))
+        if self.dist == "exponential":
+            return self._rng.expovariate(1.0 / mean)
+        # lognormal: ortalaması `mean` olacak şekilde mu seçilir
+        mu = math.log(mean) - self.sigma ** 2 / 2
+        return self._rng.lognormvariate(mu, self.sigma)
+
+    def _admit(self):
+        """429 ve hata davranışını uygular; dönen değer: sahte hız sınırı başlıkları."""
+        now = time.monotonic()
+        while self._window and now - self._window[0] > 60.0:
+            self._window.popleft()
+        if self.rate_limit_rpm and len(self._window) >= self.rate_limit_rpm:
+            retry_after = max(0.0, 60.0 - (now - self._window[0]))
+            raise LLMRateLimitError("mock: rate limit (rpm) exceeded", retry_after)
+        if self.rate_limit_rate and self._rng.random() < self.rate_limit_rate:
+            raise LLMRateLimitError("mock: simulated 429", 1.0)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise LLMBackendError("mock: simulated server error")
+        self._window.append(now)
+        self.calls += 1
+        if not self.rate_limit_rpm:
+            return {}
+        return {
+            "x-ratelimit-limit-requests": str(self.rate_limit_rpm),
+            "x-ratelimit-remaining-requests": str(max(0, self.rate_limit_rpm - len(self._window))),
+            "x-ratelimit-reset-requests": f"{max(0.0, 60.0 - (now - self._window[0])):.1f}s",
+        }
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        groups = _BATCH_GROUP_RE.findall(prompt)
+        if groups:
+            results = []
+            for g in groups:
+                km = _KEY_RE.search(g)
+                key = km.group(1) if km else ""
+                for item_id, text in _BATCH_ITEM_RE.findall(g):
+                    results.append(_mock_item(_overlap_score(key, text), item_id=item_id))
+            return json.dumps({"results": results}, ensure_ascii=False)
+        km, sm = _KEY_RE.search(prompt), _STUDENT_RE.search(prompt)
+        if km and sm:
+            score = _overlap_score(km.group(1), sm.group(1))
+        else:
+            score = round(hashlib.sha256(prompt.encode("utf-8")).digest()[0] / 255 * 10, 1)
+        return json.dumps(_mock_item(score), ensure_ascii=False)
+
+    @staticmethod
+    def _prompt(messages: List[Dict]) -> str:
+        return "\n".join(str(m.get("content", "")) for m in messages)
+
+    async def complete(self, messages: List[Dict], *, model: str, temperature: float,
+                       json_mode: bool = True) -> LLMResponse:
+        headers = self._admit()
+        await asyncio.sleep(self._latency())
+        prompt = self._prompt(messages)
+        content = self._answer(prompt)
+        return LLMResponse(content=content, prompt_tokens=len(prompt) // 4,
+                           completion_tokens=len(content) // 4, headers=headers)
+
+    async def stream(self, messages: List[Dict], *, model: str, temperature: float,
+                     json_mode: bool = True) -> AsyncIterator[str]:
+        self._admit()
+        content = self._answer(self._prompt(messages))
+        n_chunks = max(1, math.ceil(len(content) / self.stream_chunk_chars))
+        total = self._latency()
+        # Toplam gecikmenin ~%30'u ilk token'a, kalanı parçalara dağıtılır
+        await asyncio.sleep(total * 0.3)
+        per_chunk = total * 0.7 / n_chunks
+        for i in range(0, len(content), self.stream_chunk_chars):
+            yield content[i:i + self.stream_chunk_chars]
+            await asyncio.sleep(per_chunk)
+
+
+_backend: Optional[LLMBackend] = None
+
+
+def build_backend(name: Optional[str] = None) -> LLMBackend:
+    name = (name or settings.LLM_BACKEND).lower()
+    if name == "mock":
+        return MockBackend(
+            latency_ms=settings.MOCK_LLM_LATENCY_MS,
+            dist=settings.MOCK_LLM_LATENCY_DIST,
+            sigma=settings.MOCK_LLM_LATENCY_SIGMA,
+            error_rate=settings.MOCK_LLM_ERROR_RATE,
+            rate_limit_rpm=settings.MOCK_LLM_RATE_LIMIT_RPM,
+            rate_limit_rate=settings.MOCK_LLM_RATE_LIMIT_RATE,
+            seed=settings.MOCK_LLM_SEED,
+        )
+    if name == "openai":
+        return OpenAIBackend(settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL)
+    raise ValueError(f"Bilinmeyen LLM_BACKEND: {name} (openai | mock)")
+
+
+def preload_backend():
+    """Seçili arka ucun SDK'sını içe aktarır (ısınma; senkron, thread'de çağrılır)."""
+    if settings.LLM_BACKEND.lower() == "openai":
+        import openai  # noqa: F401
+
+
+def get_backend() -> LLMBackend:
+    """Ayarlara göre seçilen arka uç (ilk kullanımda oluşturulur)."""
+    global _backend
+    if _backend is None:
+        _backend = build_backend()
+    return _backend
+
+
+async def close_backend():
+    """Süreç kapanırken arka ucun bağlantı havuzunu kapatır; sonraki get_backend yenisini kurar."""
+    global _backend
+    backend, _backend = _backend, None
+    if backend is not None:
+        await backend.close()
+
+
+def set_backend(backend: LLMBackend):
+    """Arka ucu değiştirir (benchmark/yük testi için)."""
+    global _backend
+    _backend = backend
@@ -1,104 +1,329 @@
-# jobs/assess_job.py  (dosya adın farklıysa aynı içerikle güncelle)
+# modules/orchestrator.py
 import asyncio
-from typing import List, Dict
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Optional, Tuple
+from helpers import metrics
+from helpers.log import get_logger, SAMPLED
 from helpers.ws_manager import ws_manager
+from helpers.job_control import job_control, PRIORITY_BATCH
+from helpers.job_stats import job_stats
+from helpers.job_store import (get_job_store, STATUS_CANCELLED, STATUS_COMPLETED, STATUS_FAILED, STATUS_INGESTING,
+                               STATUS_RUNNING, UNFINISHED)
 from modules.grader_agent import grade_one
 from modules.feedback_agent import build_summary
+from config import settings
 
-async def run_assessment_job(job_id: str, questions: List[Dict]):
+log = get_logger("orchestrator")
+
+def _partial_publisher(job_id: str, qid: str, per_q: Callable[[], Optional[float]]):
+    """
+    Akış modunda bir sorunun kısmi sonucunu 'partial' mesajı olarak yayınlayan geri çağrı.
+    per_q: soru başına tam puan; soru sayısı henüz bilinmiyorsa (erken başlatılan değerlendirme) None döner
+    ve normalize puan gönderilmez.
+    """
+    async def _publish(fields: Dict):
+        payload = {"question_id": qid}
+        scale = per_q()
+        if "score" in fields and scale is not None:
+            try:
+                payload["normalized_score"] = round((float(fields["score"]) / 10.0) * scale, 2)
+            except (TypeError, ValueError):
+                pass
+        if "turkish_reasoning" in fields:
+            payload["reasoning_tr"] = fields["turkish_reasoning"]
+        await ws_manager.publish(job_id, {"type": "partial", "job_id": job_id, "payload": payload})
+    return _publish
+
+
+async def _persist(method: str, *args):
+    """İş deposuna yazar; depo hatası değerlendirmeyi durdurmaz."""
+    try:
+        await asyncio.to_thread(getattr(get_job_store(), method), *args)
+    except Exception as e:
+        log.error("Job store %s failed: %s", method, e)
+
+
+async def mark_cancelled(job_id: str, reason: str, kind: str = "single"):
+    """İptal edilen işi depoda 'cancelled' yapar ve kanala bildirir ('done' mesajı çağırana aittir)."""
+    log.info("🛑 Job %s cancelled: %s", job_id, reason)
+    metrics.JOBS.inc(kind=kind, status=STATUS_CANCELLED)
+    await _persist("set_status", job_id, STATUS_CANCELLED, reason)
+    await ws_manager.publish(job_id, {
+        "type": "error",
+        "job_id": job_id,
+        "payload": {"message": reason, "cancelled": True}
+    })
+
+
+@dataclass(slots=True)
+class ResultRecord:
+    """
+    İş sürerken tutulan sonuç kaydı. Metinler kopyalanmaz: `question` ayrıştırılmış soru sözlüğünün
+    kendisidir (soru/öğrenci/anahtar metinleri paylaşılan referanslar), `grade` grade_one sonucudur.
+    Düz satır (depo, özet) yalnızca gerektiğinde `row()` ile kısa ömürlü olarak üretilir.
+    """
+    question_id: str
+    position: int
+    normalized_score: float
+    question: Dict
+    grade: Dict
+
+    def row(self) -> Dict:
+        q = self.question
+        return {
+            **self.grade,
+            "question_id": self.question_id,
+            "normalized_score": self.normalized_score,
+            "question_text": (q.get("question_text") or "").strip(),
+            "student_answer": (q.get("student_answer") or "").strip(),
+            "key_answer": (q.get("key_answer") or "").strip(),
+            "student_name": (q.get("student_name") or "").strip(),
+        }
+
+    def progress(self, seq: int, total: int, lean: bool) -> Dict:
+        """
+        'progress' mesajı: Soru → Öğrenci → Anahtar → Model Yorumu → Öneri → Genel.
+        lean → metinler gönderilmez (GET /api/jobs/{job_id}/questions ile alınır), yalnızca kimlik ve değerlendirme alanları.
+        """
+        res = self.grade
+        payload = {
+            "question_id": self.question_id,
+            "seq": seq,
+            "position": self.position,
+            "total": total,
+            "normalized_score": self.normalized_score,
+        }
+        if not lean:
+            q = self.question
+            payload.update(question_text=(q.get("question_text") or "").strip(), student_answer=(q.get("student_answer") or "").strip(),
+                           key_answer=(q.get("key_answer") or "").strip())
+        payload.update({
+            "student_name": (self.question.get("student_name") or "").strip(),
+            "reasoning_tr": res.get("turkish_reasoning", ""),
+            "tips_tr": res.get("turkish_tips", ""),
+            "overall_comment": res.get("overall_comment", ""),
+            # Yeniden denemelere rağmen değerlendirilemedi (puan gerçek değil)
+            "error": bool(res.get("error")),
+        })
+        return payload
+
+
+def _completed(value: Dict) -> asyncio.Future:
+    fut = asyncio.get_running_loop().create_future()
+    fut.set_result(value)
+    return fut
+
+
+# Ayrıştırma sürerken değerlendirmesi başlatılmış işler (job_id → EarlyGrading)
+_early: Dict[str, "EarlyGrading"] = {}
+
+
+class EarlyGrading:
+    """
+    Akışlı ayrıştırmada tamamlanan her soru için değerlendirmeyi (soru sayısı henüz bilinmeden) hemen
+    başlatır; böylece Q1 modele giderken sonraki sayfalar hâlâ çıkarılıyor olabilir. Aynı job_id ile
+    çağrılan `run_assessment_job` bu görevleri devralır; ayrıştırma başarısız olursa `cancel` çağrılmalıdır.
     """
-    Sıralı yayın: WebSocket'e daima soru numarası sırasıyla gönder.
+
+    def __init__(self, job_id: str, stream: bool | None = None, deadline_seconds: float | None = None):
+        self.job_id = job_id
+        self.stream = settings.GRADE_STREAMING if stream is None else stream
+        # Soru başına tam puan; run_assessment_job soru sayısını öğrenince doldurur
+        self.per_q: Optional[float] = None
+        self._tasks: Dict[str, Tuple[Dict, asyncio.Task]] = {}
+        # Görevler bu bağlamdan oluşturulduğu için sayaçlar ve son tarih işe bağlanır
+        job_stats.bind(job_id, deadline_seconds=deadline_seconds or settings.LLM_JOB_DEADLINE_SECONDS)
+        _early[job_id] = self
+
+    def start(self, q: Dict):
+        qid = str(q["question_id"])
+        if qid in self._tasks:
+            return
+        on_partial = _partial_publisher(self.job_id, qid, lambda: self.per_q) if self.stream else None
+        self._tasks[qid] = (q, asyncio.create_task(
+            grade_one(qid, q["student_answer"], q["key_answer"], q.get("question_text"), on_partial=on_partial)
+        ))
+
+    def take(self, q: Dict) -> Optional[asyncio.Task]:
+        """Soru erken başlatılanla aynıysa görevini devreder (tekrarlanan soru numarası vb. durumda yeniden değerlendirilir)."""
+        entry = self._tasks.pop(str(q["question_id"]), None)
+        if entry is None:
+            return None
+        started, task = entry
+        if started != q:
+            task.cancel()
+            return None
+        return task
+
+    def cancel(self):
+        for _, task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        if _early.get(self.job_id) is self:
+            del _early[self.job_id]
+
+
+async def run_assessment_job(job_id: str, questions: List[Dict], stream: bool | None = None,
+                             delivery: str | None = None, prior_results: Dict[str, Dict] | None = None,
+                             priority: str | None = None, deadline_seconds: float | None = None,
+                             progress_payload: str | None = None) -> Dict | None:
+    """
+    Sıralı yayın (varsayılan, delivery="ordered"): WebSocket'e daima soru numarası sırasıyla gönder.
+    delivery="as_completed": her sonuç biter bitmez gönderilir; mesajlardaki 'seq' (yayın sırası)
+    ve 'position' (1..N soru yeri) alanları UI'ın sonucu doğru yere koymasını sağlar.
     Tam metin: Öğrenci cevabı ve cevap anahtarı KESİLMEDEN gönderilir.
+    Tüm LLM çağrıları (grade_one içinde) global `llm_scheduler` üzerinden sınırlandırılır.
+    stream: True ise her soru için model cevabı akış olarak alınır ve 'partial' mesajları
+    (önce puan, sonra büyüyen açıklama) yayınlanır. None → settings.GRADE_STREAMING.
+    İş, sorular ve her sonuç geldiği anda iş deposuna (job_store) yazılır.
+    prior_results: yarım kalmış işi sürdürürken depodan okunan sonuçlar (question_id → satır);
+    bu sorular yeniden değerlendirilmez, yalnızca tekrar yayınlanır.
+    Ayrıştırma sırasında EarlyGrading ile başlatılmış değerlendirmeler devralınır.
+    priority: zamanlayıcı öncelik sınıfı (varsayılan 'interactive'; toplu işte çağıran belirler);
+    deadline_seconds: işe özel son tarih (verilmezse LLM_JOB_DEADLINE_SECONDS).
+    progress_payload: "full" → 'progress' mesajları soru/öğrenci/anahtar metinlerini içerir;
+    "lean" → yalnızca kimlik ve değerlendirme alanları (metinler iş başına bir kez
+    GET /api/jobs/{job_id}/questions ile alınır). None → settings.PROGRESS_PAYLOAD.
+    İş `job_control.cancel` ile iptal edilirse bekleyen değerlendirmeler durdurulur ve iş 'cancelled' olur.
+    Dönen değer: özet (hata veya iptal durumunda None).
     """
-    print(f"[DEBUG] 🚀 run_assessment_job started for job_id={job_id}")
-    print(f"[DEBUG] Total questions received: {len(questions)}")
+    log.info("🚀 run_assessment_job started for job_id=%s (%d questions)", job_id, len(questions))
+    started = time.perf_counter()
 
     total_questions = len(questions)
-    results: List[Dict] = []
+    results: List[ResultRecord] = []
+    summary: Dict | None = None
 
     # id → question lookup
     qmap = {str(q["question_id"]): q for q in questions}
 
-    # Tüm görevleri başlat (paralel hesapla), ama yayını sıralı yap
-    tasks = {
-        str(q["question_id"]): asyncio.create_task(
-            grade_one(
-                str(q["question_id"]),
-                q["student_answer"],
-                q["key_answer"],
-                q.get("question_text")
-            )
-        )
-        for q in questions
-    }
-    print(f"[DEBUG] Created {len(tasks)} grading tasks for OpenAI evaluation.")
+    # İş bazlı sayaçlar (önbellek isabetleri vb.) alt görevlere bağlam üzerinden aktarılır;
+    # değerlendirme ayrıştırma sırasında başladıysa son tarih o andan sayılır
+    early = _early.pop(job_id, None)
+    job_stats.bind(job_id, deadline_seconds=None if early else (deadline_seconds or settings.LLM_JOB_DEADLINE_SECONDS))
+    owned = job_control.track(job_id, priority)
+
+    if stream is None:
+        stream = settings.GRADE_STREAMING
+    if delivery is None:
+        delivery = settings.PROGRESS_DELIVERY
+    lean = (progress_payload or settings.PROGRESS_PAYLOAD) == "lean"
+    per_q_full = 100 / total_questions if total_questions else 0.0
+
+    prior_results = prior_results or {}
+
+    def _task(q: Dict) -> asyncio.Future:
+        qid = str(q["question_id"])
+        if qid in prior_results:
+            return _completed(prior_results[qid])
+        adopted = early.take(q) if early else None
+        if adopted is not None:
+            return adopted
+        return asyncio.create_task(grade_one(
+            qid,
+            q["student_answer"],
+            q["key_answer"],
+            q.get("question_text"),
+            on_partial=_partial_publisher(job_id, qid, lambda: per_q_full) if stream else None,
+        ))
+
+    # Tüm görevleri başlat (model çağrıları global zamanlayıcıda sınırlı), ama yayını sıralı yap
+    tasks = {str(q["question_id"]): _task(q) for q in questions}
+    if early:
+        early.per_q = per_q_full
+        # Son listede karşılığı kalmayan erken görevler
+        early.cancel()
+    log.debug("Created %d grading tasks.", len(tasks) - len(prior_results))
+
+    order = sorted(tasks.keys(), key=lambda x: int(x))
+    position = {qid: i for i, qid in enumerate(order, start=1)}
+    seq = 0
+
+    async def _deliver(qid: str, res: Dict):
+        nonlocal seq
+        # Normalize (100’lük sistem)
+        try:
+            raw_score = float(res.get("score", 0.0))
+        except Exception:
+            raw_score = 0.0
+        normalized_score = round((raw_score / 10.0) * per_q_full, 2)
+
+        # Sonuç havuzu (summary için); soru metinleri qmap'teki sözlükle paylaşılır
+        record = ResultRecord(qid, position[qid], normalized_score, qmap.get(qid, {}), res)
+        results.append(record)
+        if qid not in prior_results:
+            await _persist("save_result", job_id, qid, position[qid], record.row())
+
+        log.debug("✅ Q%s: score=%s normalized=%s", qid, raw_score, normalized_score, extra=SAMPLED)
+
+        # seq: yayın sırası, position: sorunun sınav içindeki yeri (1..N) — UI yerleşimi için
+        seq += 1
+        await ws_manager.publish(job_id, {
+            "type": "progress",
+            "job_id": job_id,
+            "payload": record.progress(seq, total_questions, lean),
+        })
+
+    async def _tagged(qid: str):
+        return qid, await tasks[qid]
 
     try:
-        # Sıralı yayın: 1..N sırayla bekle ve gönder
-        for qid in sorted(tasks.keys(), key=lambda x: int(x)):
-            res = await tasks[qid]  # {'question_id','score','turkish_reasoning','turkish_tips','overall_comment'}
+        # Sorular görevler başladıktan sonra yazılır (iptal bu beklemede de yakalanır)
+        if prior_results:
+            log.info("♻️ Resuming job %s: %d/%d results restored from store", job_id, len(prior_results), total_questions)
+        else:
+            await _persist("save_questions", job_id, questions)
 
-            # Normalize (100’lük sistem)
-            try:
-                raw_score = float(res.get("score", 0.0))
-            except Exception:
-                raw_score = 0.0
-            per_q = 100 / total_questions
-            normalized_score = round((raw_score / 10.0) * per_q, 2)
-
-            # Öğrenci/anahtar tam metin
-            qref = qmap.get(qid, {})
-            question_text = (qref.get("question_text") or "").strip()
-            student_answer = (qref.get("student_answer") or "").strip()
-            key_answer = (qref.get("key_answer") or "").strip()
-            student_name = (qref.get("student_name") or "").strip()
-
-            # Sonuç havuzu (summary için)
-            result_row = {
-                **res,
-                "question_id": qid,
-                "normalized_score": normalized_score,
-                "question_text": question_text,
-                "student_answer": student_answer,
-                "key_answer": key_answer,
-                "student_name": student_name,
-            }
-            results.append(result_row)
-
-            print(f"[DEBUG] ✅ Q{qid}: score={raw_score} normalized={normalized_score}")
-
-            # WebSocket: Soru → Öğrenci → Anahtar → Model Yorumu → Öneri → Genel
-            await ws_manager.publish(job_id, {
-                "type": "progress",
-                "job_id": job_id,
-                "payload": {
-                    "question_id": qid,
-                    "normalized_score": normalized_score,
-                    "question_text": question_text,
-                    "student_answer": student_answer,
-                    "key_answer": key_answer,
-                    "student_name": student_name,
-                    "reasoning_tr": res.get("turkish_reasoning", ""),
-                    "tips_tr": res.get("turkish_tips", ""),
-                    "overall_comment": res.get("overall_comment", "")
-                }
-            })
-            print(f"[DEBUG] 🛰️ WS progress sent for Q{qid}")
-
-        # Nihai özet
-        print("[DEBUG] 🧮 Building summary report...")
-        summary = build_summary(results)
-        print(f"[DEBUG] Summary: total={summary['total_score']} avg={summary['average_score']}")
+        if delivery == "as_completed":
+            # Sırasız yayın: biten sonuç beklemeden gönderilir (yavaş Q1, Q2..QN'i tutmaz)
+            for fut in asyncio.as_completed([_tagged(qid) for qid in order]):
+                qid, res = await fut
+                await _deliver(qid, res)
+            results.sort(key=lambda r: r.position)
+        else:
+            # Sıralı yayın: 1..N sırayla bekle ve gönder
+            for qid in order:
+                await _deliver(qid, await tasks[qid])
+
+        # Nihai özet (düz satırlar yalnızca burada üretilir)
+        with metrics.span("summary_build"):
+            rows = [r.row() for r in results]
+            summary = build_summary(rows)
+        summary.setdefault("meta", {})["grade_cache"] = _grade_cache_meta(job_stats.get(job_id))
+        summary["meta"]["llm"] = _llm_meta(rows, job_stats.get(job_id))
+        if settings.GRADE_BATCH_ENABLED:
+            summary["meta"]["batching"] = _batching_meta(rows, job_stats.get(job_id))
+        if settings.PREGRADE_MODE in ("on", "shadow"):
+            summary["meta"]["pregrade"] = _pregrade_meta(rows)
+        if prior_results:
+            summary["meta"]["resumed_questions"] = len(prior_results)
+        summary["meta"]["timing"] = _timing_meta(job_id, started)
+        log.debug("Summary: total=%s avg=%s", summary["total_score"], summary["average_score"])
 
         await ws_manager.publish(job_id, {
             "type": "summary",
             "job_id": job_id,
             "payload": summary
         })
-        print("[DEBUG] 📊 WS summary sent.")
+        await _persist("finish", job_id, summary)
+        metrics.JOBS.inc(kind="single", status=STATUS_COMPLETED)
 
+    except asyncio.CancelledError:
+        for t in tasks.values():
+            t.cancel()
+        reason = job_control.absorb(job_id)
+        if reason is None:
+            # Sunucu kapanıyor: iş yarım kalır ve açılışta sürdürülür
+            raise
+        await mark_cancelled(job_id, reason)
     except Exception as e:
-        print(f"[ERROR] ❌ Exception during assessment: {e}")
+        log.exception("❌ Exception during assessment %s: %s", job_id, e)
+        metrics.error("job")
+        metrics.JOBS.inc(kind="single", status=STATUS_FAILED)
+        for t in tasks.values():
+            t.cancel()
+        await _persist("set_status", job_id, STATUS_FAILED, str(e))
         await ws_manager.publish(job_id, {
             "type": "error",
             "job_id": job_id,
@@ -111,4 +336,237 @@ async def run_assessment_job(job_id: str, questions: List[Dict]):
             "payload": {"message": "completed"}
         })
         await ws_manager.mark_done(job_id)
-        print(f"[DEBUG] 🏁 Job {job_id} completed. Marked as done.")
+        job_stats.pop(job_id)
+        if owned:
+            job_control.release(job_id)
+        log.info("🏁 Job %s completed. Marked as done.", job_id)
+
+    return summary
+
+
+def _batching_meta(results: List[Dict], stats: Dict) -> Dict:
+    """Toplu değerlendirme paketlerinin (her paket bir kez sayılarak) token kullanımı."""
+    batches: Dict[str, Dict] = {}
+    for r in results:
+        info = r.get("batch")
+        if isinstance(info, dict) and info.get("id"):
+            batches[info["id"]] = info
+    per_batch = sorted(batches.values(), key=lambda b: b["id"])
+    return {
+        "batches": len(per_batch),
+        "batched_items": sum(1 for r in results if isinstance(r.get("batch"), dict)),
+        "fallbacks": int(stats.get("batch_fallbacks", 0)),
+        "prompt_tokens": sum(b["prompt_tokens"] for b in per_batch),
+        "completion_tokens": sum(b["completion_tokens"] for b in per_batch),
+        "per_batch": per_batch,
+    }
+
+
+def _pregrade_meta(results: List[Dict]) -> Dict:
+    """
+    Ön değerlendirme: modele gitmeden puanlanan sorular (neden bazında) ve "shadow" modunda
+    yerel kararın model puanıyla uyumu (0–10 ölçeğinde ortalama mutlak fark, ≤1 puan farkla uyan oran).
+    """
+    by_reason: Dict[str, int] = {}
+    skipped = 0
+    diffs: List[float] = []
+    for r in results:
+        pre = r.get("pregrade")
+        if not isinstance(pre, dict):
+            continue
+        by_reason[pre["reason"]] = by_reason.get(pre["reason"], 0) + 1
+        if pre.get("applied"):
+            skipped += 1
+        elif not r.get("error"):
+            diffs.append(abs(float(pre["score"]) - float(r.get("score", 0.0))))
+    meta = {"mode": settings.PREGRADE_MODE, "skipped": skipped, "decided": sum(by_reason.values()),
+            "by_reason": by_reason}
+    if diffs:
+        meta["agreement"] = {
+            "n": len(diffs),
+            "mean_abs_diff": round(sum(diffs) / len(diffs), 3),
+            "within_1": round(sum(1 for d in diffs if d <= 1.0) / len(diffs), 3),
+        }
+    return meta
+
+
+def _timing_meta(job_id: str, started: float) -> Dict:
+    """
+    İşin zamanlama dökümü. wall_ms değerlendirme aşamasını (sorular → özet) kapsar; ayrıştırma
+    span'ları (page_extract, chunk) ingest aşamasından gelir. Eşzamanlı soruların süreleri
+    toplandığından span toplamları wall_ms'i aşabilir.
+    """
+    return {
+        "wall_ms": round((time.perf_counter() - started) * 1000, 2),
+        "spans": job_stats.timings(job_id),
+    }
+
+
+def _llm_meta(results: List[Dict], stats: Dict) -> Dict:
+    """Yeniden deneme / hız sınırı sayaçları, token kullanımı ve değerlendirilemeyen sorular."""
+    return {
+        "prompt_tokens": int(stats.get("llm_prompt_tokens", 0)),
+        "completion_tokens": int(stats.get("llm_completion_tokens", 0)),
+        # Sağlayıcının önek önbelleğinden karşılanan / bütçe nedeniyle prompt'tan atılan tokenlar
+        "cached_prompt_tokens": int(stats.get("llm_cached_prompt_tokens", 0)),
+        "trimmed_tokens": int(stats.get("llm_trimmed_tokens", 0)),
+        "retries": int(stats.get("llm_retries", 0)),
+        "rate_limited": int(stats.get("llm_rate_limited", 0)),
+        "throttle_wait_ms": int(stats.get("llm_throttle_wait_ms", 0)),
+        "paused_wait_ms": int(stats.get("llm_paused_wait_ms", 0)),
+        "failed_questions": [r["question_id"] for r in results if r.get("error")],
+    }
+
+
+def _grade_cache_meta(stats: Dict) -> Dict:
+    hits = int(stats.get("grade_cache_hits", 0))
+    shared = int(stats.get("grade_cache_shared", 0))
+    misses = int(stats.get("grade_cache_misses", 0))
+    total = hits + shared + misses
+    return {
+        "hits": hits,
+        "shared_inflight": shared,
+        "misses": misses,
+        "hit_rate": round((hits + shared) / total, 3) if total else 0.0,
+    }
+
+
+async def run_batch_job(batch_id: str, students: List[Dict], stream: bool | None = None,
+                        delivery: str | None = None, priority: str | None = None,
+                        deadline_seconds: float | None = None, progress_payload: str | None = None):
+    """
+    Toplu (sınıf) değerlendirme: her öğrenci kendi job_id'si ile `run_assessment_job`
+    üzerinden çalışır; tüm öğrencilerin soruları aynı global zamanlayıcıyı paylaşır.
+    students: [{'job_id', 'filename', 'questions'}] — 'questions' yerine, soruları (veya ayrıştırma
+    başarısızsa None) döndüren asenkron 'prepare' çağrılabilir de verilebilir.
+    Batch kanalına öğrenci bazlı ilerleme ('batch_progress') ve nihai özet ('batch_summary') yayınlanır.
+    Öğrencilerin çağrıları zamanlayıcıda `priority` sınıfında (varsayılan 'batch') ve batch_id grubunda
+    (tek iş olarak) sıralanır; toplu işin iptali tüm öğrencilerini, bir öğrencinin iptali yalnızca onu durdurur.
+    Diğer seçenekler (stream, delivery, deadline_seconds, progress_payload) her öğrencinin
+    `run_assessment_job` çağrısına aktarılır.
+    """
+    log.info("🚀 run_batch_job started for batch_id=%s students=%d", batch_id, len(students))
+    started = time.perf_counter()
+    priority = priority or PRIORITY_BATCH
+    owned = job_control.track(batch_id, priority)
+    total = len(students)
+    completed = 0
+    rows: List[Dict] = []
+
+    async def _run_one(st: Dict):
+        nonlocal completed
+        job_control.track(st["job_id"], priority, group=batch_id)
+        try:
+            questions = st.get("questions")
+            if questions is None and st.get("prepare"):
+                questions = await st["prepare"]()
+            summary = None
+            if questions is not None:
+                summary = await run_assessment_job(
+                    st["job_id"], questions, stream=stream, delivery=delivery, priority=priority,
+                    deadline_seconds=deadline_seconds, progress_payload=progress_payload,
+                )
+            cancelled = job_control.reason(st["job_id"]) is not None
+        finally:
+            job_control.release(st["job_id"])
+        completed += 1
+        row = {
+            "job_id": st["job_id"],
+            "filename": st.get("filename", ""),
+            "student_name": (questions[0].get("student_name", "") if questions else ""),
+            "status": "completed" if summary is not None else ("cancelled" if cancelled else "error"),
+            "total_score": (summary or {}).get("total_score"),
+        }
+        rows.append(row)
+        await ws_manager.publish(batch_id, {
+            "type": "batch_progress",
+            "job_id": batch_id,
+            "payload": {**row, "completed": completed, "total": total}
+        })
+        log.debug("🧑‍🎓 Batch %s: %d/%d students done", batch_id, completed, total, extra=SAMPLED)
+
+    try:
+        await _persist("create_job", batch_id, "batch")
+        await _persist("set_status", batch_id, STATUS_RUNNING)
+        await asyncio.gather(*(_run_one(st) for st in students))
+
+        scores = [r["total_score"] for r in rows if r["total_score"] is not None]
+        batch_summary = {
+            "students": total,
+            "completed": len(scores),
+            "failed": total - len(scores),
+            "average_score": round(sum(scores) / len(scores), 2) if scores else 0.0,
+            "results": sorted(rows, key=lambda r: r["filename"]),
+            # Toplu işe ait span'lar (anahtar ayrıştırma, batch kanalı yayını); öğrenci dökümü kendi özetinde
+            "meta": {"timing": _timing_meta(batch_id, started)},
+        }
+        await ws_manager.publish(batch_id, {
+            "type": "batch_summary",
+            "job_id": batch_id,
+            "payload": batch_summary
+        })
+        await _persist("finish", batch_id, batch_summary)
+        metrics.JOBS.inc(kind="batch", status=STATUS_COMPLETED)
+    except asyncio.CancelledError:
+        reason = job_control.absorb(batch_id)
+        if reason is None:
+            raise
+        await mark_cancelled(batch_id, reason, kind="batch")
+    except Exception as e:
+        log.exception("❌ Exception during batch assessment %s: %s", batch_id, e)
+        metrics.error("job")
+        metrics.JOBS.inc(kind="batch", status=STATUS_FAILED)
+        await _persist("set_status", batch_id, STATUS_FAILED, str(e))
+        await ws_manager.publish(batch_id, {
+            "type": "error",
+            "job_id": batch_id,
+            "payload": {"message": str(e)}
+        })
+    finally:
+        await ws_manager.publish(batch_id, {
+            "type": "done",
+            "job_id": batch_id,
+            "payload": {"message": "completed"}
+        })
+        await ws_manager.mark_done(batch_id)
+        job_stats.pop(batch_id)
+        if owned:
+            job_control.release(batch_id)
+        log.info("🏁 Batch %s completed. Marked as done.", batch_id)
+
+
+async def resume_interrupted_jobs() -> int:
+    """
+    Yeniden başlatma sonrası yarım kalan işleri sürdürür: soruları kaydedilmiş her iş için yalnızca
+    sonucu eksik sorular değerlendirilir. Ayrıştırma aşamasında kesilen işler (PDF'ler saklanmadığı
+    için) ve toplu iş kayıtları 'failed' işaretlenir; toplu işe ait öğrenci işleri tek tek sürdürülür.
+    Dönen değer: sürdürülen iş sayısı.
+    """
+    store = get_job_store()
+    jobs = await asyncio.to_thread(store.list_jobs, UNFINISHED)
+    resumed = 0
+    for job in jobs:
+        job_id = job["job_id"]
+        if job["kind"] == "batch":
+            await _persist("set_status", job_id, STATUS_FAILED,
+                           "Sunucu yeniden başlatıldı; öğrenci işleri ayrı ayrı sürdürüldü.")
+            continue
+        questions = await asyncio.to_thread(store.get_questions, job_id) if job["status"] != STATUS_INGESTING else []
+        if not questions:
+            await _persist("set_status", job_id, STATUS_FAILED,
+                           "Sunucu PDF ayrıştırma sırasında yeniden başlatıldı; lütfen dosyaları tekrar yükleyin.")
+            continue
+        rows, _ = await asyncio.to_thread(store.get_results, job_id)
+        prior = {str(r["question_id"]): r for r in rows}
+        options = job.get("options") or {}
+        priority = options.get("priority") or (PRIORITY_BATCH if job.get("batch_id") else None)
+        job_control.expect(job_id, priority)
+        asyncio.create_task(run_assessment_job(
+            job_id, questions, stream=options.get("stream"), delivery=options.get("delivery"), prior_results=prior,
+            priority=priority,
+            deadline_seconds=options.get("deadline_seconds"), progress_payload=options.get("progress_payload"),
+        ))
+        resumed += 1
+    if jobs:
+        log.info("♻️ %d interrupted job(s) resumed, %d marked failed.", resumed, len(jobs) - resumed)
+    return resumed
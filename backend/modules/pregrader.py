@@ -0,0 +1,203 @@
+# modules/pregrader.py
+import asyncio
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import settings
+from helpers import metrics
+from helpers.job_stats import job_stats
+from helpers.log import get_logger
+
+log = get_logger("pregrader")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Cevap verilmediğini belirten kalıplar (normalize edilmiş, noktalama atılmış tam metin).
+# "yok" / "x" gibi tek kelimeler geçerli cevap olabileceğinden (ör. "Var mı?" sorusu) listede yok
+_NO_ANSWER = {"bilmiyorum", "bilmiyorum hocam", "fikrim yok", "cevap yok", "boş", "bos"}
+
+# Benzerliği şişiren Türkçe bağlaçlar/edatlar (alakasız cevaplar bunlarla örtüşmemeli)
+_STOPWORDS = frozenset(
+    "ve veya ile ya da de ki bu şu o bir için gibi kadar daha en çok az ama fakat ancak çünkü "
+    "olarak olan oldu olmuş olur ise mi mı mu mü ne her hem sonra önce göre kendi".split()
+)
+
+_REASONS = {
+    "blank": (
+        "Cevap boş bırakılmış veya soru cevaplanmamış.",
+        "Soruyu cevaplamaya çalışın; kısmi cevaplar da puan alabilir.",
+        "Bu soru cevapsız bırakıldı.",
+    ),
+    "matches_key": (
+        "Cevap, cevap anahtarıyla neredeyse birebir örtüşüyor (benzerlik %{pct}).",
+        "Cevabınızı kendi cümlelerinizle ve örneklerle zenginleştirebilirsiniz.",
+        "Beklenen cevabın tamamı verilmiş.",
+    ),
+    "unrelated": (
+        "Cevap, cevap anahtarındaki kavramların hiçbirini içermiyor (benzerlik %{pct}).",
+        "Sorunun istediği kavram ve olaylara odaklanın.",
+        "Cevap soruyla ilgili görünmüyor.",
+    ),
+}
+
+
+def _normalize(text: Optional[str]) -> List[str]:
+    # Türkçe büyük/küçük harf: İ → i, I → ı
+    text = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    return [w for w in _WORD_RE.findall(text) if w not in _STOPWORDS]
+
+
+def _is_blank(text: Optional[str]) -> bool:
+    words = _WORD_RE.findall((text or "").replace("İ", "i").replace("I", "ı").lower())
+    return not words or " ".join(words) in _NO_ANSWER
+
+
+def similarities(students: Sequence[str], keys: Sequence[str]) -> np.ndarray:
+    """
+    Her (öğrenci cevabı, anahtar) çifti için TF-IDF kosinüs benzerliği; tek NumPy geçişinde.
+    IDF verilen tüm belgelerden (öğrenci cevapları + farklı anahtarlar) hesaplanır; aynı pencerede
+    sınıfın tamamı varsa sınıf çapında ağırlıklandırma olur. Vektörler seyrek (belge, terim, ağırlık)
+    dizileri olarak tutulur; çift başına nokta çarpımı sıralı anahtar kodlarında arama ile bulunur.
+    """
+    n = len(students)
+    if n == 0:
+        return np.zeros(0)
+    key_index: Dict[str, int] = {}
+    pair_key = np.fromiter((key_index.setdefault(k, len(key_index)) for k in keys), dtype=np.int64, count=n)
+    docs = list(students) + list(key_index)
+
+    vocab: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    counts: List[int] = []
+    for d, text in enumerate(docs):
+        tf: Dict[int, int] = {}
+        for w in _normalize(text):
+            t = vocab.setdefault(w, len(vocab))
+            tf[t] = tf.get(t, 0) + 1
+        rows.extend([d] * len(tf))
+        cols.extend(tf.keys())
+        counts.extend(tf.values())
+    if not vocab:
+        return np.zeros(n)
+
+    rows_a = np.asarray(rows, dtype=np.int64)
+    cols_a = np.asarray(cols, dtype=np.int64)
+    n_docs, n_terms = len(docs), len(vocab)
+    df = np.bincount(cols_a, minlength=n_terms)
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    # Alt-doğrusal tf: tekrar eden kelime benzerliği orantısız artırmaz
+    w = (1.0 + np.log(np.asarray(counts, dtype=np.float64))) * idf[cols_a]
+    norms = np.sqrt(np.bincount(rows_a, weights=w * w, minlength=n_docs))
+    w /= np.where(norms > 0, norms, 1.0)[rows_a]
+
+    # Anahtar belgelerinin girdileri: kod = anahtar no * V + terim (sıralı)
+    is_key = rows_a >= n
+    key_codes = (rows_a[is_key] - n) * n_terms + cols_a[is_key]
+    order = np.argsort(key_codes)
+    key_codes, key_w = key_codes[order], w[is_key][order]
+
+    s_rows, s_cols, s_w = rows_a[~is_key], cols_a[~is_key], w[~is_key]
+    if key_codes.size == 0 or s_rows.size == 0:
+        return np.zeros(n)
+    query = pair_key[s_rows] * n_terms + s_cols
+    pos = np.minimum(np.searchsorted(key_codes, query), key_codes.size - 1)
+    hit = key_codes[pos] == query
+    return np.bincount(s_rows[hit], weights=s_w[hit] * key_w[pos[hit]], minlength=n)
+
+
+def decide(similarity: float, key_answer: str) -> Optional[Tuple[float, str]]:
+    """Eşiklere göre (puan, neden) ya da belirsizse None."""
+    if not _normalize(key_answer):
+        return None
+    if similarity >= settings.PREGRADE_HIGH_THRESHOLD:
+        return 10.0, "matches_key"
+    if similarity <= settings.PREGRADE_LOW_THRESHOLD:
+        return 0.0, "unrelated"
+    return None
+
+
+def auto_result(question_id: str, score: float, reason: str, similarity: float) -> Dict:
+    """Ön değerlendirme sonucu; LLM sonucuyla aynı alanlar + 'pregrade' bilgisi."""
+    reasoning, tips, overall = _REASONS[reason]
+    return {
+        "question_id": str(question_id),
+        "score": score,
+        "turkish_reasoning": reasoning.format(pct=int(round(similarity * 100))),
+        "turkish_tips": tips,
+        "overall_comment": overall,
+        "pregrade": {"reason": reason, "similarity": round(similarity, 3), "score": score, "applied": True},
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+    }
+
+
+class _Pending:
+    __slots__ = ("student_answer", "key_answer", "future")
+
+    def __init__(self, student_answer: str, key_answer: str, future: asyncio.Future):
+        self.student_answer = student_answer
+        self.key_answer = key_answer
+        self.future = future
+
+
+class PreGrader:
+    """
+    LLM'den önce çalışan yerel ön değerlendirme.
+
+    Boş / "bilmiyorum" cevaplar hemen 0 alır. Diğerleri kısa bir pencere (PREGRADE_WINDOW_MS)
+    boyunca biriktirilir ve tüm eşzamanlı işlerin (toplu değerlendirmede sınıfın) cevapları tek NumPy
+    geçişinde anahtarlarıyla karşılaştırılır: benzerlik PREGRADE_HIGH_THRESHOLD üstündeyse tam puan,
+    PREGRADE_LOW_THRESHOLD altındaysa 0; aradaki belirsiz cevaplar LLM'e gider.
+    `check` kararı {'score', 'reason', 'similarity'} olarak ya da belirsizse None döner.
+    """
+
+    def __init__(self):
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def check(self, student_answer: str, key_answer: str) -> Optional[Dict]:
+        if _is_blank(student_answer):
+            return {"score": 0.0, "reason": "blank", "similarity": 0.0}
+        loop = asyncio.get_running_loop()
+        item = _Pending(student_answer, key_answer or "", loop.create_future())
+        self._pending.append(item)
+        if self._timer is None:
+            self._timer = loop.call_later(settings.PREGRADE_WINDOW_MS / 1000.0, self._flush)
+        similarity = await item.future
+        decision = decide(similarity, item.key_answer)
+        if decision is None:
+            return None
+        return {"score": decision[0], "reason": decision[1], "similarity": similarity}
+
+    def _flush(self):
+        self._timer = None
+        items = [it for it in self._pending if not it.future.done()]
+        self._pending = []
+        if items:
+            asyncio.create_task(self._run(items))
+
+    async def _run(self, items: List[_Pending]):
+        try:
+            # Pencere birden fazla işin cevaplarını içerir; süre yalnızca global histograma yazılır
+            with metrics.span("pregrade", job_ids=()):
+                sims = await asyncio.to_thread(
+                    similarities, [it.student_answer for it in items], [it.key_answer for it in items]
+                )
+        except Exception as e:
+            # Ön değerlendirme yapılamazsa hepsi belirsiz sayılır (LLM'e gider)
+            log.error("Pre-grading %d answers failed: %s", len(items), e)
+            sims = np.full(len(items), np.nan)
+        log.debug("Pre-graded %d answers in one pass.", len(items))
+        for it, s in zip(items, sims.tolist()):
+            if not it.future.done():
+                it.future.set_result(s)
+
+
+def record(decision: Dict, applied: bool):
+    """Ön değerlendirme sayaçları: global metrik + geçerli işin sayaçları."""
+    metrics.PREGRADED.inc(reason=decision["reason"], mode="on" if applied else "shadow")
+    job_stats.incr(f"pregrade_{decision['reason']}")
+
+
+pregrader = PreGrader()
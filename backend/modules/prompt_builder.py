@@ -0,0 +1,97 @@
+# modules/prompt_builder.py
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from helpers import metrics
+from helpers.job_stats import job_stats
+from helpers.tokens import count_tokens, trim_to_tokens
+
+# Prompt düzeni sağlayıcı tarafı önek önbelleğine (prompt caching) göre kurulur:
+#   1) system: sabit yönergeler + JSON şablonu — her çağrıda bayt bayt aynı
+#   2) user:   soru metni + cevap anahtarı (aynı sorunun tüm öğrencilerinde aynı)
+#   3) user:   öğrenci cevabı (değişken kısım en sonda)
+# Böylece aynı sınavın öğrencileri arasında önek uzar; değişken içerik hiçbir zaman sabit metnin arasına girmez.
+
+GRADING_INSTRUCTIONS = """
+Sen deneyimli bir tarih öğretmenisin.
+Sana verilen öğrenci cevabını, sorunun cevap anahtarıyla karşılaştırarak değerlendir.
+
+İstediğim format:
+- Cevabı 0–10 arası puanla değerlendir (float, örn: 7.5).
+- "turkish_reasoning": Öğrenci cevabının neden güçlü veya zayıf olduğunu açıklayan kısa ve net bir açıklama.
+- "turkish_tips": Geliştirme önerisi veya nasıl daha iyi olabileceğine dair bir ipucu.
+- "overall_comment": Bu soruya dair genel yargı ve performans özeti.
+
+Uzun metinlerin ortası '…(N token kısaltıldı)…' ile kısaltılmış olabilir; kısaltılan kısım için puan kırma.
+
+Cevabını YALNIZCA GEÇERLİ JSON formatında döndür. Başka metin ekleme.
+
+JSON şablonu:
+{
+  "score": 0.0,
+  "turkish_reasoning": "Kısa ama net açıklama.",
+  "turkish_tips": "Geliştirme önerisi.",
+  "overall_comment": "Genel yorum."
+}
+""".strip()
+
+
+@dataclass
+class GradingPrompt:
+    """Tekil değerlendirme çağrısının mesajları ve yerel token sayımı."""
+    messages: List[Dict]
+    tokens: int
+    # Bütçe nedeniyle atılan token (soru + anahtar + öğrenci cevabı)
+    trimmed_tokens: int = 0
+
+    @property
+    def text(self) -> str:
+        return "\n".join(m["content"] for m in self.messages)
+
+
+def budget_version() -> str:
+    """Değerlendirme önbelleği anahtarına eklenir: bütçe değişince kısaltılmış prompt da değişir."""
+    return (f"q{settings.GRADE_PROMPT_QUESTION_MAX_TOKENS}"
+            f"k{settings.GRADE_PROMPT_KEY_MAX_TOKENS}"
+            f"a{settings.GRADE_PROMPT_ANSWER_MAX_TOKENS}")
+
+
+@lru_cache(maxsize=1024)
+def _trim_cached(text: str, max_tokens: int, model: str) -> Tuple[str, int]:
+    # Soru metni ve anahtar her öğrenci için aynıdır; kodlama bir kez yapılır
+    return trim_to_tokens(text, max_tokens, model)
+
+
+def trim_field(text: Optional[str], max_tokens: int, cache: bool = False) -> Tuple[str, int]:
+    """Alanı bütçeye indirir; kısaltma olduysa metrik ve iş sayacı artırılır."""
+    text = (text or "").strip()
+    if cache:
+        out, removed = _trim_cached(text, max_tokens, settings.LLM_MODEL)
+    else:
+        out, removed = trim_to_tokens(text, max_tokens, settings.LLM_MODEL)
+    if removed:
+        metrics.LLM_TOKENS.inc(removed, kind="trimmed")
+        job_stats.incr("llm_trimmed_tokens", removed)
+    return out, removed
+
+
+def trim_inputs(question_text: Optional[str], key_answer: Optional[str],
+                student_answer: Optional[str]) -> Tuple[str, str, str, int]:
+    """Soru, anahtar ve öğrenci cevabını GRADE_PROMPT_*_MAX_TOKENS bütçelerine indirir."""
+    q, rq = trim_field(question_text, settings.GRADE_PROMPT_QUESTION_MAX_TOKENS, cache=True)
+    k, rk = trim_field(key_answer, settings.GRADE_PROMPT_KEY_MAX_TOKENS, cache=True)
+    s, rs = trim_field(student_answer, settings.GRADE_PROMPT_ANSWER_MAX_TOKENS)
+    return q, k, s, rq + rk + rs
+
+
+def build_grading_prompt(student_answer: Optional[str], key_answer: Optional[str],
+                         question_text: Optional[str] = None) -> GradingPrompt:
+    q, k, s, removed = trim_inputs(question_text, key_answer, student_answer)
+    messages = [
+        {"role": "system", "content": GRADING_INSTRUCTIONS},
+        {"role": "user", "content": f"[Soru Metni]\n{q}\n\n[Cevap Anahtarı]\n{k}"},
+        {"role": "user", "content": f"[Öğrenci Cevabı]\n{s}"},
+    ]
+    tokens = sum(count_tokens(m["content"], settings.LLM_MODEL) for m in messages)
+    return GradingPrompt(messages=messages, tokens=tokens, trimmed_tokens=removed)
@@ -0,0 +1,224 @@
+# modules/rate_limit.py
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+from config import settings
+from helpers import metrics
+from helpers.job_control import PRIORITY_INTERACTIVE, job_control
+from helpers.job_stats import current_job_id, job_stats
+from helpers.log import get_logger
+from modules.llm_backend import LLMBackendError, LLMRateLimitError
+from modules.scheduler import llm_scheduler
+
+log = get_logger("rate_limit")
+
+T = TypeVar("T")
+
+class _Bucket:
+    """Dakika başına `limit` birimle dolan kova (limit=0 → sınırsız)."""
+
+    def __init__(self, limit: int):
+        self.limit = max(0, int(limit))
+        self.level = float(self.limit)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.limit:
+            self.level = min(float(self.limit), self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def wait_for(self, n: float) -> float:
+        """`n` birim için gereken bekleme (saniye); 0 → hemen alınabilir."""
+        if not self.limit:
+            return 0.0
+        # Tek istek kova kapasitesinden büyükse kova dolunca geçmesine izin ver
+        n = min(n, self.limit)
+        if self.level >= n:
+            return 0.0
+        return (n - self.level) * 60.0 / self.limit
+
+    def observe(self, limit: Optional[int], remaining: Optional[int], now: float):
+        """Sağlayıcı başlıklarından gelen gerçek limit/kalan değerleriyle kovayı hizalar."""
+        if limit:
+            self.limit = limit
+        if remaining is not None and self.limit:
+            self.level = min(self.level, float(remaining))
+            self.updated = now
+
+
+class RateLimiter:
+    """
+    İstemci tarafı token kovası: dakikadaki istek (RPM) ve token (TPM) sayısını birlikte izler.
+    Başlangıç limitleri LLM_RPM_LIMIT / LLM_TPM_LIMIT'ten gelir (0 → bilinmiyor/sınırsız);
+    her cevaptaki x-ratelimit-* başlıkları limitleri ve kalan kapasiteyi günceller.
+    Kapasite LLM zamanlayıcısında slot verilirken alınır (`llm_scheduler.set_limiter`); bekleyenlerin
+    sırasını zamanlayıcının öncelik/son tarih kuralı belirler.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """
+        Kapasite varsa bir istek ve `tokens` token ayırıp 0 döner; yoksa hiçbir şey ayırmadan
+        kapasitenin dolması için gereken bekleme süresini (saniye) döner.
+        """
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        delay = max(self.requests.wait_for(1), self.tokens.wait_for(tokens))
+        if delay > 0:
+            return delay
+        self.requests.level -= 1 if self.requests.limit else 0
+        self.tokens.level -= min(tokens, self.tokens.limit) if self.tokens.limit else 0
+        return 0.0
+
+    def observe(self, headers: Dict[str, str]):
+        if not headers:
+            return
+
+        def _int(name: str) -> Optional[int]:
+            try:
+                return int(float(headers[name]))
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        now = time.monotonic()
+        self.requests.observe(_int("x-ratelimit-limit-requests"), _int("x-ratelimit-remaining-requests"), now)
+        self.tokens.observe(_int("x-ratelimit-limit-tokens"), _int("x-ratelimit-remaining-tokens"), now)
+
+    def stats(self) -> dict:
+        return {
+            "rpm_limit": self.requests.limit,
+            "rpm_available": round(self.requests.level, 1),
+            "tpm_limit": self.tokens.limit,
+            "tpm_available": round(self.tokens.level, 1),
+        }
+
+
+class CircuitBreaker:
+    """
+    Art arda LLM_BREAKER_THRESHOLD geçici hata (429, sunucu hatası, zaman aşımı) görülürse
+    her soruyu ayrı ayrı başarısız etmek yerine global zamanlayıcıyı bir süre duraklatır.
+    Duraklama süresi her açılışta ikiye katlanır (en fazla LLM_BREAKER_MAX_COOLDOWN_SECONDS);
+    ilk başarılı çağrı sayaçları sıfırlar. 429 cevabındaki retry-after her durumda tüm
+    çağrılara uygulanır.
+    """
+
+    def __init__(self, threshold: int, cooldown: float, max_cooldown: float):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.trips = 0
+        self._open_until = 0.0
+
+    def record_success(self):
+        self.failures = 0
+        self.trips = 0
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        if retry_after:
+            llm_scheduler.pause(retry_after)
+        # Devre açıkken sonuçlanan (önceden başlamış) çağrıların hataları aynı kesintiye aittir
+        if time.monotonic() < self._open_until:
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            pause = min(self.max_cooldown, self.cooldown * (2 ** self.trips))
+            self.trips += 1
+            self.failures = 0
+            self._open_until = time.monotonic() + pause
+            log.error("⛔ LLM circuit open: pausing scheduler for %.1fs", pause)
+            llm_scheduler.pause(pause)
+
+    def stats(self) -> dict:
+        return {"consecutive_failures": self.failures, "trips": self.trips}
+
+
+rate_limiter = RateLimiter(settings.LLM_RPM_LIMIT, settings.LLM_TPM_LIMIT)
+circuit_breaker = CircuitBreaker(
+    settings.LLM_BREAKER_THRESHOLD,
+    settings.LLM_BREAKER_COOLDOWN_SECONDS,
+    settings.LLM_BREAKER_MAX_COOLDOWN_SECONDS,
+)
+llm_scheduler.set_limiter(rate_limiter)
+
+_RETRYABLE = (LLMBackendError, asyncio.TimeoutError)
+
+
+def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+    """Tam jitter'lı üstel bekleme; sağlayıcı retry-after verdiyse en az o kadar."""
+    cap = min(settings.LLM_RETRY_MAX_MS, settings.LLM_RETRY_BASE_MS * (2 ** attempt)) / 1000.0
+    delay = random.uniform(0, cap)
+    return max(delay, retry_after or 0.0)
+
+
+async def call_with_retry(factory: Callable[[], Awaitable[T]], *, tokens: int = 0,
+                          job_ids: Optional[Iterable[Optional[str]]] = None) -> T:
+    """
+    `factory()` ile üretilen model çağrısını global zamanlayıcı altında çalıştırır.
+
+    - Her denemeden önce zamanlayıcı duraklamasını (circuit breaker / retry-after) bekler; RPM/TPM
+      kapasitesi (`tokens`) zamanlayıcıda slotla birlikte, sıradaki bekleyenin önceliğine göre alınır.
+    - Geçici hatalar (LLMBackendError, LLMRateLimitError, zaman aşımı) en fazla LLM_MAX_RETRIES
+      kez jitter'lı üstel beklemeyle tekrarlanır; 'interactive' bir işin son tarihini (job_stats.deadline)
+      aşacak tekrar yapılmaz ve son hata fırlatılır. 'batch' sınıfındaki işlerin son tarihi yalnızca
+      sıralamada kullanılır: kuyrukta uzun beklemiş toplu iş çağrıları tekrar korumasını kaybetmez.
+    - Sayaçlar (llm_retries, llm_rate_limited, llm_throttle_wait_ms, llm_paused_wait_ms) ilgili
+      işlere yazılır; toplu çağrılarda pakete katılan her iş için ayrı sayılır.
+    """
+    ids: List[Optional[str]] = list(dict.fromkeys(job_ids)) if job_ids is not None else [current_job_id.get()]
+    deadlines = {j: d for j in ids if j and (d := job_stats.deadline(j)) is not None}
+    deadline = min(deadlines.values()) if deadlines else None
+    # Tekrarları kesen son tarih: yalnızca canlı (interactive) işlerinki
+    cutoff = min((d for j, d in deadlines.items() if job_control.priority(j) == PRIORITY_INTERACTIVE), default=None)
+
+    def _incr(name: str, n: float = 1):
+        for j in ids:
+            job_stats.incr(name, n, job_id=j)
+
+    async def _attempt() -> T:
+        # Çağrı coroutine'i slot alındığında oluşturulur (sırada iptal edilirse hiç oluşmaz)
+        return await asyncio.wait_for(factory(), timeout=settings.LLM_CALL_TIMEOUT_SECONDS)
+
+    attempt = 0
+    last_error: Optional[BaseException] = None
+    while True:
+        if last_error is not None and cutoff is not None and time.monotonic() + llm_scheduler.paused_for() > cutoff:
+            log.error("LLM call abandoned: scheduler paused past job deadline: %r", last_error)
+            raise last_error
+        paused = await llm_scheduler.wait_resumed()
+        if paused:
+            _incr("llm_paused_wait_ms", round(paused * 1000))
+            metrics.observe_span("llm_paused_wait", paused, job_ids=ids)
+
+        try:
+            result = await llm_scheduler.run(_attempt(), job_ids=ids, deadline=deadline, tokens=tokens)
+        except _RETRYABLE as e:
+            retry_after = e.retry_after if isinstance(e, LLMRateLimitError) else None
+            if isinstance(e, LLMRateLimitError):
+                _incr("llm_rate_limited")
+                metrics.error("llm_rate_limited")
+            else:
+                metrics.error("llm_transient")
+            circuit_breaker.record_failure(retry_after)
+
+            delay = _backoff(attempt, retry_after)
+            out_of_time = cutoff is not None and time.monotonic() + delay > cutoff
+            if attempt >= settings.LLM_MAX_RETRIES or out_of_time:
+                reason = "deadline" if out_of_time else "max retries"
+                log.error("LLM call failed after %d attempt(s) (%s): %r", attempt + 1, reason, e)
+                raise
+            attempt += 1
+            last_error = e
+            _incr("llm_retries")
+            metrics.error("llm_retry")
+            log.debug("🔁 LLM retry %d/%d in %.2fs: %r", attempt, settings.LLM_MAX_RETRIES, delay, e)
+            await asyncio.sleep(delay)
+            continue
+
+        circuit_breaker.record_success()
+        return result
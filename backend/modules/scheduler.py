@@ -0,0 +1,232 @@
+# modules/scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Deque, Dict, Iterable, List, Optional, Tuple, TypeVar
+from config import settings
+from helpers import metrics
+from helpers.job_control import PRIORITIES, job_control
+from helpers.job_stats import current_job_id, job_stats
+
+T = TypeVar("T")
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "throttled_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        # Sıranın başındayken token kovası ilk kez yetmediğinde (monotonic)
+        self.throttled_at: Optional[float] = None
+
+
+class LLMScheduler:
+    """
+    Tüm işler (tekil veya toplu) için ortak LLM çağrı zamanlayıcısı.
+    Aynı anda en fazla `max_concurrency` değerlendirme çağrısı yürütülür;
+    fazlası sırada bekler. Böylece birden fazla büyük iş aynı anda
+    çalışsa bile sağlayıcı hız sınırlarına toplu halde çarpılmaz.
+    `pause` ile (circuit breaker, retry-after) yeni çağrıların başlaması bir süre durdurulabilir.
+
+    Boşalan slot sırayla şu kurala göre verilir:
+      1) öncelik sınıfı: 'interactive' (tekil iş) bekleyenler 'batch' (toplu iş) bekleyenlerden önce
+      2) sınıf içinde son tarihine LLM_SCHEDULER_URGENT_SECONDS'tan az kalan çağrılar, en yakın son tarih önce
+      3) geri kalanı işler arasında sırayla (round-robin; toplu işin öğrencileri tek iş sayılır),
+         her işin kendi çağrıları geliş sırasıyla
+    Böylece toplu işler boş slotları doldurmaya devam ederken canlı bir tekil iş sıranın önüne geçer ve
+    aynı anda çalışan işler slotları eşit paylaşır. Sıradan çıkan (iptal edilen) bekleyenler tembel atlanır.
+
+    `set_limiter` ile bağlanan RPM/TPM kovası slot verilirken sıradaki bekleyen için alınır; kova boşsa
+    dolana kadar slot verilmez. Böylece hız sınırında bekleme sırası da yukarıdaki kurala uyar (canlı iş
+    bekleyen toplu iş yığınının arkasında kalmaz).
+    """
+
+    def __init__(self, max_concurrency: int):
+        self._max = max(1, int(max_concurrency))
+        self._free = self._max
+        self.in_flight = 0
+        self.waiting = 0
+        self._waiting_by: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        # Sınıf → (grup → bekleyen kuyruğu); grupların sırası round-robin sırasıdır
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITIES}
+        # Sınıf → (son tarih, sıra no, bekleyen) yığını
+        self._deadlines: Dict[str, List[Tuple[float, int, _Waiter]]] = {p: [] for p in PRIORITIES}
+        self._seq = itertools.count()
+        self._resume_at = 0.0
+        # Duraklama bitişine veya token kovasının dolmasına zamanlanmış _dispatch
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._limiter = None
+        self.pauses = 0
+        self.granted: Dict[str, int] = {p: 0 for p in PRIORITIES}
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max
+
+    @max_concurrency.setter
+    def max_concurrency(self, value: int):
+        # Çalışırken değiştirilebilir (bench); fark boş slot sayısına yansır
+        value = max(1, int(value))
+        self._free += value - self._max
+        self._max = value
+
+    def set_limiter(self, limiter):
+        """Slot verilirken kapasitesi alınacak hız sınırlayıcı (`try_acquire(tokens)` → bekleme saniyesi)."""
+        self._limiter = limiter
+
+    def pause(self, seconds: float):
+        """Yeni çağrıların başlamasını en az `seconds` saniye erteler (süreler üst üste eklenmez)."""
+        resume_at = time.monotonic() + max(0.0, seconds)
+        if resume_at > self._resume_at:
+            self._resume_at = resume_at
+            self.pauses += 1
+
+    def paused_for(self) -> float:
+        """Kalan duraklama süresi (saniye)."""
+        return max(0.0, self._resume_at - time.monotonic())
+
+    async def wait_resumed(self) -> float:
+        """Duraklama bitene kadar bekler; dönen değer: beklenen süre (saniye)."""
+        waited = 0.0
+        while (delay := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
+
+    def _head(self) -> Optional[Tuple[_Waiter, str, Optional[str]]]:
+        """Sıradaki bekleyen (sıradan çıkarılmaz): (bekleyen, sınıf, grup); son tarih yığınındansa grup None."""
+        now = time.monotonic()
+        for priority in PRIORITIES:
+            heap = self._deadlines[priority]
+            while heap and heap[0][2].future.done():
+                heapq.heappop(heap)
+            if heap and heap[0][0] - now <= settings.LLM_SCHEDULER_URGENT_SECONDS:
+                return heap[0][2], priority, None
+            groups = self._queues[priority]
+            while groups:
+                group, queue = next(iter(groups.items()))
+                while queue and queue[0].future.done():
+                    queue.popleft()
+                if not queue:
+                    del groups[group]
+                    continue
+                return queue[0], priority, group
+        return None
+
+    def _pop(self, priority: str, group: Optional[str]):
+        if group is None:
+            heapq.heappop(self._deadlines[priority])
+            return
+        groups = self._queues[priority]
+        queue = groups[group]
+        queue.popleft()
+        if queue:
+            groups.move_to_end(group)
+        else:
+            del groups[group]
+
+    def _dispatch(self):
+        """
+        Boş slotları sıradaki bekleyenlere verir. Duraklama sürüyorsa bitişine, sıradakinin token kovası
+        yetmiyorsa kovanın dolacağı ana zamanlanır (arkadakiler de bekler; sıra bozulmaz).
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            if self.waiting:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+            return
+        while self._free > 0:
+            head = self._head()
+            if head is None:
+                break
+            waiter, priority, group = head
+            delay = self._limiter.try_acquire(waiter.tokens) if self._limiter is not None else 0.0
+            if delay > 0:
+                if waiter.throttled_at is None:
+                    waiter.throttled_at = time.monotonic()
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            self._pop(priority, group)
+            self._free -= 1
+            waiter.future.set_result(None)
+
+    def _release(self):
+        self._free += 1
+        self._dispatch()
+
+    async def run(self, coro: Awaitable[T], job_ids: Optional[Iterable[Optional[str]]] = None,
+                  deadline: Optional[float] = None, tokens: int = 0) -> T:
+        """
+        Coroutine'i global eşzamanlılık sınırı altında çalıştırır.
+        job_ids: çağrının ait olduğu işler (verilmezse geçerli iş); öncelik en yüksek sınıftaki işten,
+        adil paylaşım grubu ilk işten alınır. deadline: monotonic son tarih (öne alma için).
+        tokens: slot verilirken hız sınırlayıcıdan bir istekle birlikte ayrılacak tahmini token sayısı.
+        """
+        ids = [j for j in (job_ids if job_ids is not None else [current_job_id.get()]) if j]
+        priority = min((job_control.priority(j) for j in ids), key=PRIORITIES.index, default=PRIORITIES[0])
+        queued_at = time.perf_counter()
+        throttled = 0.0
+        if (self._free > 0 and not self.waiting and self._resume_at <= time.monotonic()
+                and (self._limiter is None or self._limiter.try_acquire(tokens) <= 0)):
+            self._free -= 1
+        else:
+            waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+            group = job_control.group(ids[0]) if ids else ""
+            self._queues[priority].setdefault(group, deque()).append(waiter)
+            if deadline is not None:
+                heapq.heappush(self._deadlines[priority], (deadline, next(self._seq), waiter))
+            self.waiting += 1
+            self._waiting_by[priority] += 1
+            self._dispatch()
+            try:
+                await waiter.future
+            except BaseException:
+                # İptal edildiyse hiç başlatılmayan coroutine'i kapat; slot tam verilmişse geri bırak
+                coro.close()
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release()
+                raise
+            finally:
+                self.waiting -= 1
+                self._waiting_by[priority] -= 1
+            if waiter.throttled_at is not None:
+                throttled = time.monotonic() - waiter.throttled_at
+        self.granted[priority] += 1
+        metrics.observe_span("llm_queue_wait", time.perf_counter() - queued_at, job_ids=ids or None)
+        if throttled:
+            for j in ids:
+                job_stats.incr("llm_throttle_wait_ms", round(throttled * 1000), job_id=j)
+            metrics.observe_span("llm_throttle_wait", throttled, job_ids=ids or None)
+        self.in_flight += 1
+        try:
+            return await coro
+        finally:
+            self.in_flight -= 1
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "waiting_by_priority": dict(self._waiting_by),
+            "granted_by_priority": dict(self.granted),
+            "paused_for": round(self.paused_for(), 2),
+            "pauses": self.pauses,
+        }
+
+
+llm_scheduler = LLMScheduler(settings.LLM_MAX_CONCURRENCY)
+
+metrics.registry.gauge("llm_in_flight", "LLM calls currently running", lambda: llm_scheduler.in_flight)
+metrics.registry.gauge("llm_waiting", "LLM calls waiting for a scheduler slot", lambda: llm_scheduler.waiting)
+metrics.registry.gauge("llm_waiting_interactive", "Interactive-job LLM calls waiting for a slot",
+                       lambda: llm_scheduler.stats()["waiting_by_priority"]["interactive"])
+metrics.registry.gauge("llm_waiting_batch", "Batch-job LLM calls waiting for a slot",
+                       lambda: llm_scheduler.stats()["waiting_by_priority"]["batch"])
@@ -0,0 +1,122 @@
+# modules/warmup.py
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config import settings
+from helpers import metrics
+from helpers.job_store import get_job_store
+from helpers.log import get_logger
+from helpers.pdf_utils import load_pdfplumber
+from helpers.tokens import count_tokens
+from modules.ingestion import warm_pool
+from modules.llm_backend import get_backend, preload_backend
+
+log = get_logger("warmup")
+
+# Isınma durumları
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "running"
+WARMUP_READY = "ready"
+
+Step = Tuple[str, Callable[[], Awaitable]]
+
+
+class Warmup:
+    """
+    Açılıştan sonra arka planda yürüyen ısınma: ağır kütüphaneler (PDF yığını, LLM SDK'sı, tokenizer)
+    ilk istekte değil burada yüklenir, iş deposu ve ayrıştırma havuzu önceden başlatılır.
+    Süreç ısınma sürerken de istek kabul eder (tembel yükleme ilk kullanımda aynı işi yapar);
+    /readyz ısınma bitene kadar 503 döner. Hatalı adım ısınmayı durdurmaz, durumda raporlanır.
+    """
+
+    def __init__(self):
+        self.state = WARMUP_PENDING
+        self.steps: Dict[str, Dict] = {}
+        self.import_seconds: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == WARMUP_READY
+
+    def start(self, steps: List[Step]) -> asyncio.Task:
+        """Adımları sırayla arka planda yürütür (açılışı bekletmez)."""
+        self.state = WARMUP_RUNNING
+        self._task = asyncio.create_task(self._run(steps))
+        return self._task
+
+    async def _run(self, steps: List[Step]):
+        started = time.perf_counter()
+        for name, step in steps:
+            t0 = time.perf_counter()
+            entry: Dict = {}
+            try:
+                result = await step()
+                if result is not None:
+                    entry["result"] = result
+            except Exception as e:
+                log.warning("Warmup step %s failed: %s", name, e)
+                entry["error"] = str(e)
+            elapsed = time.perf_counter() - t0
+            entry["seconds"] = round(elapsed, 3)
+            self.steps[name] = entry
+            metrics.observe_span(f"warmup_{name}", elapsed, job_ids=())
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.state = WARMUP_READY
+        log.info("🔥 Warmup finished in %.2fs (%s).", self.seconds,
+                 ", ".join(f"{n}={s['seconds']}s" for n, s in self.steps.items()))
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "import_seconds": self.import_seconds,
+            "warmup_seconds": self.seconds,
+            "steps": self.steps,
+        }
+
+
+async def _warm_job_store():
+    # SQLite bağlantısı ve şema ilk sorguda kurulur
+    await asyncio.to_thread(get_job_store().get_job, "")
+
+
+async def _warm_pdf():
+    await asyncio.to_thread(load_pdfplumber)
+
+
+async def _warm_ingest_pool():
+    return {"workers": await warm_pool()}
+
+
+async def _warm_llm():
+    # SDK importu ve tokenizer (ilk kullanımda kodlama dosyasını okur) thread'de; istemci loop'ta kurulur
+    await asyncio.to_thread(preload_backend)
+    await asyncio.to_thread(count_tokens, "ısınma")
+    backend = get_backend()
+    await backend.warmup()
+    return {"backend": backend.name}
+
+
+def warmup_steps(executes_jobs: bool) -> List[Step]:
+    """
+    Sürecin rolüne göre adımlar: işleri yürüten süreç (inline API veya worker) PDF ve LLM yığınını ısıtır;
+    kuyruk modundaki API yalnızca yükleme kontrolü yaptığından yalnızca iş deposunu açar.
+    """
+    steps: List[Step] = [("job_store", _warm_job_store)]
+    if executes_jobs:
+        steps.append(("pdf", _warm_pdf))
+        if settings.WARMUP_INGEST_POOL:
+            steps.append(("ingest_pool", _warm_ingest_pool))
+        steps.append(("llm", _warm_llm))
+    return steps
+
+
+warmup = Warmup()
+
+metrics.registry.gauge("warmup_ready", "1 once the startup warmup has finished", lambda: 1 if warmup.ready else 0)
@@ -0,0 +1,21 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, Response
+from modules.analytics import class_analytics
+
+router = APIRouter()
+
+
+@router.get("/insights")
+async def get_insights(request: Request, batch_id: Optional[str] = Query(None)):
+    """
+    Sınıf (batch_id) veya tüm işler için soru güçlüğü, ayırt edicilik, dağılımlar, yüzdelikler ve madde
+    korelasyonları. Rapor önbellekten gelir ve yalnızca yeni sonuç yazıldığında yeniden hesaplanır;
+    ETag (kapsam + sürüm) eşleşirse 304 döner.
+    """
+    report = await asyncio.to_thread(class_analytics.report, batch_id)
+    etag = f'"{report["scope"]}-{report["version"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(report, headers={"ETag": etag})
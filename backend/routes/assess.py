@@ -1,24 +1,172 @@
-import uuid, asyncio
-from fastapi import APIRouter, UploadFile, BackgroundTasks, HTTPException
-from helpers.schemas import AssessInitResponse
-from modules.parser_agent import parse_student_and_key
-from modules.orchestrator import run_assessment_job
+import os, uuid, asyncio
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from helpers.schemas import AssessInitResponse, BatchInitResponse, BatchJobRef
+from helpers.pdf_utils import PDFParseError
+from helpers.job_store import get_job_store
+from helpers import metrics
+from helpers.job_control import PRIORITIES
+from helpers.uploads import TooManyFiles, UploadTooLarge, discard, spool_upload, unzip_pdfs
+from modules.dispatch import submit_assessment, submit_batch
+from config import settings
 
 router = APIRouter()
 
+DELIVERY_MODES = ("ordered", "as_completed")
+PROGRESS_PAYLOADS = ("full", "lean")
+
+
+def _check_pdf_upload(f: UploadFile):
+    if not f or not getattr(f, "filename", None):
+        raise HTTPException(status_code=400, detail="PDF dosyaları yüklenemedi.")
+    if not f.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail=f"Geçersiz dosya türü: {f.filename}. Lütfen PDF yükleyin.")
+
+
+def _upload_error(e: PDFParseError) -> HTTPException:
+    return HTTPException(status_code=413 if isinstance(e, UploadTooLarge) else 400, detail=str(e))
+
+
+def _job_options(stream: Optional[bool], delivery: Optional[str], priority: Optional[str],
+                 deadline_seconds: Optional[float], progress_payload: Optional[str]) -> Dict:
+    """Form seçeneklerini doğrular; iş kaydına yazılan ve işe aktarılan seçenek sözlüğünü döner."""
+    if delivery is not None and delivery not in DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz yayın modu: {delivery}. Seçenekler: {', '.join(DELIVERY_MODES)}")
+    if priority is not None and priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz öncelik: {priority}. Seçenekler: {', '.join(PRIORITIES)}")
+    if deadline_seconds is not None and deadline_seconds <= 0:
+        raise HTTPException(status_code=400, detail="deadline_seconds pozitif olmalı.")
+    if progress_payload is not None and progress_payload not in PROGRESS_PAYLOADS:
+        raise HTTPException(status_code=400,
+                            detail=f"Geçersiz ilerleme içeriği: {progress_payload}. Seçenekler: {', '.join(PROGRESS_PAYLOADS)}")
+    return {"stream": stream, "delivery": delivery, "priority": priority,
+            "deadline_seconds": deadline_seconds, "progress_payload": progress_payload}
+
+
+def _too_many_students() -> HTTPException:
+    return HTTPException(status_code=400, detail=f"En fazla {settings.BATCH_MAX_STUDENTS} öğrenci PDF'i yüklenebilir.")
+
+
+async def _spool_pdf(f: UploadFile) -> str:
+    """
+    Yüklemeyi sınırlı boyutta geçici dosyaya aktarır ve yolunu döner.
+    Ayrıştırma arka planda yapılacağından bariz hatalı dosyalar (imza, boyut) burada reddedilir.
+    """
+    _check_pdf_upload(f)
+    try:
+        with metrics.span("upload_read"):
+            return await spool_upload(f)
+    except PDFParseError as e:
+        raise _upload_error(e)
+
+
+async def _spool_student_uploads(files: List[UploadFile]) -> List[Tuple[str, str]]:
+    """
+    Öğrenci yüklemelerini düz bir (dosya adı, geçici dosya yolu) listesine çevirir.
+    .zip dosyalarının içindeki PDF'ler ayrı öğrenci dosyası olarak açılır; açma, öğrenci sayısı
+    BATCH_MAX_STUDENTS'ı veya açılan toplam boyut UPLOAD_MAX_EXTRACTED_BYTES'ı geçtiği anda durur.
+    Hata olursa o ana kadar yazılan geçici dosyalar silinir.
+    """
+    out: List[Tuple[str, str]] = []
+    extracted = 0
+    try:
+        for f in files:
+            if not f or not getattr(f, "filename", None):
+                raise HTTPException(status_code=400, detail="PDF dosyaları yüklenemedi.")
+            if f.filename.lower().endswith(".zip"):
+                try:
+                    with metrics.span("upload_read"):
+                        zip_path = await spool_upload(f, max_bytes=settings.UPLOAD_MAX_REQUEST_BYTES, check_pdf=False)
+                    try:
+                        members = await asyncio.to_thread(unzip_pdfs, zip_path, f.filename,
+                                                          settings.BATCH_MAX_STUDENTS - len(out),
+                                                          settings.UPLOAD_MAX_EXTRACTED_BYTES - extracted)
+                    finally:
+                        discard(zip_path)
+                except TooManyFiles:
+                    raise _too_many_students()
+                except PDFParseError as e:
+                    raise _upload_error(e)
+                out.extend(members)
+                extracted += sum(os.path.getsize(path) for _, path in members)
+            else:
+                if len(out) >= settings.BATCH_MAX_STUDENTS:
+                    raise _too_many_students()
+                out.append((f.filename, await _spool_pdf(f)))
+    except BaseException:
+        discard(*(path for _, path in out))
+        raise
+    return out
+
 
 @router.post("/assess", response_model=AssessInitResponse)
-async def start_assessment(student_pdf: UploadFile, answer_key: UploadFile):
-    # Basit içerik-türü ve isim kontrolü
-    for f in (student_pdf, answer_key):
-        if not f or not getattr(f, "filename", None):
-            raise HTTPException(status_code=400, detail="PDF dosyaları yüklenemedi.")
-        if not f.filename.lower().endswith(".pdf"):
-            raise HTTPException(status_code=400, detail=f"Geçersiz dosya türü: {f.filename}. Lütfen PDF yükleyin.")
+async def start_assessment(student_pdf: UploadFile, answer_key: UploadFile, stream: Optional[bool] = Form(None),
+                           delivery: Optional[str] = Form(None), priority: Optional[str] = Form(None),
+                           deadline_seconds: Optional[float] = Form(None),
+                           progress_payload: Optional[str] = Form(None)):
+    """
+    priority: zamanlayıcı sınıfı — "interactive" (varsayılan; canlı izlenen iş, toplu işlerin önüne geçer)
+    veya "batch" (arka plan; bağlantı kopsa da sürer). deadline_seconds: işe özel son tarih.
+    progress_payload: "lean" → ilerleme mesajları metinleri içermez (GET /api/jobs/{job_id}/questions).
+    """
+    options = _job_options(stream, delivery, priority, deadline_seconds, progress_payload)
+    # Basit içerik-türü, isim, imza ve boyut kontrolü; içerik geçici dosyaya akar
+    student_path = await _spool_pdf(student_pdf)
+    try:
+        key_path = await _spool_pdf(answer_key)
+    except BaseException:
+        discard(student_path)
+        raise
     job_id = str(uuid.uuid4())
-    questions = parse_student_and_key(student_pdf, answer_key)
+    try:
+        # İş kaydı hemen oluşturulur: GET /api/jobs/{job_id} ilk andan itibaren durumu döner
+        await asyncio.to_thread(get_job_store().create_job, job_id, "single", None, student_pdf.filename, options)
+    except BaseException:
+        discard(student_path, key_path)
+        raise
 
-    # ✅ asenkron görev başlat
-    asyncio.create_task(run_assessment_job(job_id, questions))
+    # ✅ ayrıştırma + değerlendirme arka planda (bu süreçte veya kuyruk modunda bir worker'da); job_id hemen döner
+    # Geçici dosyaların sahipliği işe geçer
+    await submit_assessment(job_id, student_path, student_pdf.filename, key_path, answer_key.filename, **options)
 
     return AssessInitResponse(job_id=job_id)
+
+
+@router.post("/assess/batch", response_model=BatchInitResponse)
+async def start_batch_assessment(answer_key: UploadFile, student_pdfs: List[UploadFile] = File(...),
+                                 stream: Optional[bool] = Form(None), delivery: Optional[str] = Form(None),
+                                 priority: Optional[str] = Form(None), deadline_seconds: Optional[float] = Form(None),
+                                 progress_payload: Optional[str] = Form(None)):
+    """
+    Bir cevap anahtarı + N öğrenci PDF'i (veya PDF'leri içeren .zip) alır.
+    Anahtar yalnızca bir kez ayrıştırılır; her öğrenci ayrı job_id ile değerlendirilir.
+    Seçenekler /assess ile aynıdır ve her öğrenci işine uygulanır; priority verilmezse öğrenciler
+    'batch' sınıfında çalışır, deadline_seconds her öğrencinin değerlendirmesi başladığı andan sayılır.
+    """
+    options = _job_options(stream, delivery, priority, deadline_seconds, progress_payload)
+    key_path = await _spool_pdf(answer_key)
+    uploads: List[Tuple[str, str]] = []
+    try:
+        uploads = await _spool_student_uploads(student_pdfs)
+        if not uploads:
+            raise HTTPException(status_code=400, detail="Öğrenci PDF'i bulunamadı.")
+
+        batch_id = str(uuid.uuid4())
+        students = [{"job_id": str(uuid.uuid4()), "filename": name, "source": path} for name, path in uploads]
+        refs = [BatchJobRef(job_id=st["job_id"], filename=st["filename"]) for st in students]
+
+        def _register():
+            store = get_job_store()
+            store.create_job(batch_id, "batch", None, answer_key.filename, options)
+            for st in students:
+                store.create_job(st["job_id"], "single", batch_id, st["filename"], options)
+        await asyncio.to_thread(_register)
+    except BaseException:
+        discard(key_path, *(path for _, path in uploads))
+        raise
+
+    # ✅ tüm öğrenciler tek zamanlayıcıyı paylaşan toplu görev olarak arka planda başlar
+    # Geçici dosyaların sahipliği işe geçer
+    await submit_batch(batch_id, key_path, answer_key.filename, students, **options)
+
+    return BatchInitResponse(batch_id=batch_id, jobs=refs)
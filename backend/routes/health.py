@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from modules.warmup import warmup
+
+router = APIRouter()
+
+
+@router.get("/healthz", include_in_schema=False)
+def liveness():
+    """Süreç ayakta ve event loop cevap veriyor (ısınma beklenmez)."""
+    return {"ok": True}
+
+
+@router.get("/readyz", include_in_schema=False)
+def readiness():
+    """Açılış ısınması bittiyse 200, sürüyorsa 503; gövdede adım süreleri ve import süresi."""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from helpers.schemas import JobInfo, JobQuestions, JobRef, JobResultsPage
+from helpers.job_store import get_job_store, UNFINISHED
+from modules.dispatch import request_cancel
+from config import settings
+
+router = APIRouter()
+
+
+async def _get_job_or_404(job_id: str) -> dict:
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"İş bulunamadı: {job_id}")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """İşin durumu, ilerlemesi ve (bittiyse) özeti. Toplu işlerde öğrenci işleri de listelenir."""
+    job = await _get_job_or_404(job_id)
+    info = JobInfo(**job)
+    if job["kind"] == "batch":
+        children = await asyncio.to_thread(get_job_store().list_jobs, None, job_id)
+        info.jobs = [JobRef(**c) for c in children]
+    return info
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsPage)
+async def get_job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1)):
+    """Değerlendirilmiş sorular (soru sırasıyla, sayfalı). İş sürerken de o ana kadarki sonuçları döner."""
+    await _get_job_or_404(job_id)
+    limit = min(limit, settings.JOB_RESULTS_PAGE_MAX)
+    items, total = await asyncio.to_thread(get_job_store().get_results, job_id, offset, limit)
+    return JobResultsPage(job_id=job_id, total=total, offset=offset, limit=limit, items=items)
+
+
+@router.get("/jobs/{job_id}/questions", response_model=JobQuestions)
+async def get_job_questions(job_id: str, question_id: Optional[str] = None):
+    """
+    İşin ayrıştırılmış soruları (soru, öğrenci cevabı, anahtar tam metni). progress_payload="lean" işlerde
+    ilerleme mesajları metin taşımaz; istemci metinleri buradan bir kez alır. question_id → yalnızca o soru.
+    """
+    await _get_job_or_404(job_id)
+    items = await asyncio.to_thread(get_job_store().get_questions, job_id)
+    if question_id is not None:
+        items = [q for q in items if str(q.get("question_id")) == question_id]
+    return JobQuestions(job_id=job_id, items=items)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    """
+    Süren işi iptal eder: bekleyen model çağrıları yapılmaz, iş 'cancelled' olur ve WebSocket'e
+    iptal bildirimi gider. Toplu işte tüm öğrenci işleri iptal edilir. Bitmiş işte 409 döner.
+    """
+    job = await _get_job_or_404(job_id)
+    if job["status"] not in UNFINISHED or not await request_cancel(job_id, "Değerlendirme kullanıcı tarafından iptal edildi."):
+        raise HTTPException(status_code=409, detail=f"İş zaten bitmiş: {job['status']}")
+    return await get_job(job_id)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from helpers.metrics import registry, CONTENT_TYPE
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus metin biçiminde süreç metrikleri (span histogramları, token/önbellek/hata sayaçları)."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
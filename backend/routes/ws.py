@@ -1,16 +1,92 @@
+import asyncio
+from typing import Dict, List
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from helpers.ws_manager import ws_manager
+from helpers.job_store import get_job_store, STATUS_CANCELLED, STATUS_COMPLETED, UNFINISHED
+from helpers.ws_manager import ws_manager, SubscriberLagged
+from modules.dispatch import cancel_if_abandoned
 
 router = APIRouter()
 
+# Bilinmeyen iş kimliğiyle açılan soketin kapanış kodu
+CLOSE_UNKNOWN_JOB = 4404
+
+
+def _final_messages(job: Dict) -> List[Dict]:
+    """
+    Kanalı kapatılmış (WS_CHANNEL_TTL_SECONDS dolmuş) bitmiş iş için depodaki son durumdan
+    yayının son mesajlarını üretir: özet (veya hata/iptal bildirimi) ve 'done'.
+    """
+    job_id = job["job_id"]
+    if job["status"] == STATUS_COMPLETED:
+        kind = "batch_summary" if job["kind"] == "batch" else "summary"
+        last = {"type": kind, "job_id": job_id, "payload": job["summary"] or {}}
+    else:
+        payload = {"message": job["error"] or job["status"]}
+        if job["status"] == STATUS_CANCELLED:
+            payload["cancelled"] = True
+        last = {"type": "error", "job_id": job_id, "payload": payload}
+    return [last, {"type": "done", "job_id": job_id, "payload": {"message": "completed"}}]
+
+
+async def _drain_client(websocket: WebSocket):
+    """İstemci mesajlarını (ping) okur; bağlantı kapanınca döner. Kopan soketi hemen fark etmeyi sağlar."""
+    try:
+        while True:
+            msg = await websocket.receive()
+            if msg.get("type") == "websocket.disconnect":
+                return
+    except (WebSocketDisconnect, RuntimeError):
+        return
+
+
 @router.websocket("/ws/assess/{job_id}")
-async def ws_assess(websocket: WebSocket, job_id: str):
+async def ws_assess(websocket: WebSocket, job_id: str, since: int = 0, compress: bool = False):
+    """
+    İşin mesajlarını yayınlar. Yeniden bağlanan istemci son aldığı mesajın 'cursor' değerini
+    `?since=` ile gönderir; kaçırılan mesajlar replay tamponundan iletilir.
+    `?compress=1`: WS_COMPRESS_MIN_BYTES üstündeki mesajlar zlib ile sıkıştırılmış ikili çerçeve olarak gelir
+    (tarayıcıda DecompressionStream("deflate")); diğer mesajlar ve varsayılan istemciler metin alır.
+    Kanalı olmayan iş kimliği depoda aranır: bilinmeyen kimlikte hata mesajı gönderilip soket 4404 ile kapanır;
+    kanalı silinmiş bitmiş işte son durum (özet veya hata) ve 'done' gönderilip soket kapanır.
+    İş bitmeden istemci koparsa ve JOB_DISCONNECT_CANCEL_SECONDS içinde kimse yeniden bağlanmazsa
+    canlı tekil iş iptal edilir (bekleyen model çağrıları yapılmaz).
+    """
     await websocket.accept()
+    if not ws_manager.has_channel(job_id):
+        # Kanal yoksa iş ya hiç yok ya da bitip kanalı silinmiş olabilir; boş kanal açıp sonsuza dek beklenmez
+        job = await asyncio.to_thread(get_job_store().get_job, job_id)
+        if job is None:
+            await websocket.send_json({"type": "error", "job_id": job_id, "payload": {"message": f"İş bulunamadı: {job_id}"}})
+            await websocket.close(code=CLOSE_UNKNOWN_JOB)
+            return
+        if job["status"] not in UNFINISHED:
+            for message in _final_messages(job):
+                await websocket.send_json(message)
+            await websocket.close()
+            return
+    stream = asyncio.create_task(ws_manager.stream(job_id, websocket, since=since, compressed=compress))
+    watcher = asyncio.create_task(_drain_client(websocket))
     try:
-        # bu job_id için kuyruktaki mesajları tüketip gönder
-        await ws_manager.stream(job_id, websocket)
+        await asyncio.wait({stream, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if stream.done():
+            stream.result()
+    except SubscriberLagged as e:
+        # İstemci tamponun dışına düştü; kaçırılan mesajlar kurtarılamaz
+        try:
+            await websocket.send_json({"type": "error", "job_id": job_id, "payload": {"message": str(e)}})
+        except Exception:
+            pass
     except WebSocketDisconnect:
         # istemci bağlantıyı kapattı
         pass
     finally:
-        await websocket.close()
+        for t in (stream, watcher):
+            t.cancel()
+        if watcher.done() and not stream.done():
+            # İstemci iş bitmeden ayrıldı
+            asyncio.create_task(cancel_if_abandoned(job_id))
+        try:
+            await websocket.close()
+        except RuntimeError:
+            # bağlantı zaten kapalı
+            pass
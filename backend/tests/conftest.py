@@ -0,0 +1,61 @@
+import asyncio
+import socket
+import threading
+import time
+import pytest
+import uvicorn
+from config import settings
+from devtools import fake_openai_server
+from modules import llm_backend
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def fake_openai_url():
+    """devtools/fake_openai_server'ı ayrı bir thread'de gerçek bir uvicorn sunucusu olarak çalıştırır."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(fake_openai_server.app, host="127.0.0.1", port=port, log_level="critical"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake OpenAI server did not start")
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def fake_openai(fake_openai_url, monkeypatch):
+    """
+    Sahte sunucuya bağlı OpenAI arka ucu; önbellek, ön değerlendirme ve toplu mod kapalı,
+    yeniden deneme beklemeleri kısa. Sunucu davranışı fake_openai_server modül değişkenleriyle değişir.
+    """
+    monkeypatch.setattr(fake_openai_server, "FIRST_TOKEN_MS", 5.0)
+    monkeypatch.setattr(fake_openai_server, "TOKEN_MS", 1.0)
+    monkeypatch.setattr(fake_openai_server, "DROP_AFTER_CHUNKS", 0)
+    fake_openai_server._dropped.clear()
+    for name, value in {
+        "GRADE_CACHE_ENABLED": False,
+        "GRADE_BATCH_ENABLED": False,
+        "PREGRADE_MODE": "off",
+        "GRADE_STREAM_MIN_INTERVAL_MS": 0,
+        "LLM_RETRY_BASE_MS": 1,
+        "LLM_RETRY_MAX_MS": 5,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    llm_backend.set_backend(llm_backend.OpenAIBackend("fake", fake_openai_url))
+    yield fake_openai_server
+    llm_backend.set_backend(None)
+
+
+def run(coro):
+    """Testler olay döngüsünü kendileri kurar (pytest-asyncio gerektirmez)."""
+    return asyncio.run(coro)
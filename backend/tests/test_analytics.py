@@ -0,0 +1,58 @@
+import warnings
+import numpy as np
+import pytest
+from helpers import job_store
+from helpers.job_store import MemoryJobStore
+from modules.analytics import ClassAnalytics, compute_report
+
+
+@pytest.fixture
+def no_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        yield
+
+
+def _report(matrix):
+    matrix = np.asarray(matrix, dtype=float)
+    return compute_report(matrix, [str(j + 1) for j in range(matrix.shape[1])], [f"s{i}" for i in range(matrix.shape[0])])
+
+
+def test_empty_store_report(no_warnings, monkeypatch):
+    monkeypatch.setattr(job_store, "_store", MemoryJobStore())
+    report = ClassAnalytics().report()
+    assert report["students"] == 0 and report["questions"] == 0
+    assert report["totals"]["mean"] is None and report["item_correlations"] == []
+
+
+@pytest.mark.parametrize("matrix", [np.zeros((0, 3)), [[np.nan, 3.0], [np.nan, 4.0]], [[7.0]]])
+def test_degenerate_matrices_do_not_warn(no_warnings, matrix):
+    report = _report(matrix)
+    assert len(report["per_question"]) == np.asarray(matrix).shape[1]
+
+
+def test_constant_question_has_no_correlation(no_warnings):
+    report = _report([[5.0, 2.0, 1.0], [5.0, 8.0, 9.0], [5.0, 4.0, 6.0]])
+    constant, q2, q3 = report["per_question"]
+    assert constant["mean"] == 5.0 and constant["std"] == 0.0
+    assert constant["item_rest_r"] is None and constant["difficulty"] == 0.5
+    assert report["item_correlations"][0] == [None, None, None]
+    assert report["item_correlations"][1][1] == pytest.approx(1.0)
+    assert q2["item_rest_r"] == pytest.approx(np.corrcoef([2, 8, 4], [1, 9, 6])[0, 1], abs=1e-4)
+    assert q3["discrimination"] == pytest.approx((9.0 - 1.0) / 10.0)
+
+
+def test_incremental_refresh_from_store(no_warnings, monkeypatch):
+    store = MemoryJobStore()
+    monkeypatch.setattr(job_store, "_store", store)
+    analytics = ClassAnalytics()
+    for job_id, batch, scores in (("a", "b1", (10, 4)), ("b", "b1", (6, 2)), ("c", "b2", (0, 0))):
+        store.create_job(job_id, "single", batch, f"{job_id}.pdf")
+        for pos, score in enumerate(scores):
+            store.save_result(job_id, str(pos + 1), pos, {"score": score})
+    analytics.refresh(force=True)
+    assert analytics.report("b1")["per_question"][0]["mean"] == 8.0
+    assert analytics.report()["students"] == 3
+    store.save_result("c", "1", 0, {"score": 10})
+    analytics.refresh(force=True)
+    assert analytics.report("b2")["per_question"][0]["mean"] == 10.0
@@ -0,0 +1,89 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from config import settings
+from helpers import job_store
+from helpers.job_control import PRIORITY_BATCH, PRIORITY_INTERACTIVE, job_control
+from helpers.job_store import MemoryJobStore, STATUS_COMPLETED
+from modules import orchestrator
+from routes import assess
+from tests.conftest import run
+
+PDF = b"%PDF-1.4\n" + b"0" * 1000
+
+
+@pytest.fixture
+def store():
+    previous = job_store._store
+    store = MemoryJobStore()
+    job_store.set_job_store(store)
+    yield store
+    job_store.set_job_store(previous)
+
+
+@pytest.fixture
+def client(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_DIR", str(tmp_path / "spool"))
+    submitted = []
+
+    async def _submit(batch_id, key_path, key_name, students, **options):
+        submitted.append((batch_id, students, options))
+
+    monkeypatch.setattr(assess, "submit_batch", _submit)
+    app = FastAPI()
+    app.include_router(assess.router, prefix="/api")
+    with TestClient(app) as c:
+        c.submitted = submitted
+        yield c
+
+
+def _post_batch(client, **data):
+    return client.post("/api/assess/batch", data=data, files=[
+        ("answer_key", ("key.pdf", PDF, "application/pdf")),
+        ("student_pdfs", ("a.pdf", PDF, "application/pdf")),
+        ("student_pdfs", ("b.pdf", PDF, "application/pdf")),
+    ])
+
+
+def test_batch_endpoint_stores_and_forwards_options(client, store):
+    resp = _post_batch(client, priority="interactive", deadline_seconds="120", delivery="as_completed",
+                       progress_payload="lean")
+    assert resp.status_code == 200
+    body = resp.json()
+    (batch_id, students, options), = client.submitted
+    assert batch_id == body["batch_id"] and len(students) == 2
+    assert options == {"stream": None, "delivery": "as_completed", "priority": "interactive",
+                       "deadline_seconds": 120.0, "progress_payload": "lean"}
+    # Yeniden başlatmada öğrenci işleri bu seçeneklerle sürdürülür
+    for ref in body["jobs"]:
+        assert store.get_job(ref["job_id"])["options"] == options
+    assert store.get_job(batch_id)["options"] == options
+
+
+@pytest.mark.parametrize("data", [{"priority": "urgent"}, {"deadline_seconds": "0"}, {"delivery": "random"},
+                                  {"progress_payload": "tiny"}])
+def test_batch_endpoint_rejects_invalid_options(client, data):
+    assert _post_batch(client, **data).status_code == 400
+    assert client.submitted == []
+
+
+@pytest.mark.parametrize("priority, expected", [(None, PRIORITY_BATCH), (PRIORITY_INTERACTIVE, PRIORITY_INTERACTIVE)])
+def test_run_batch_job_passes_options_to_students(store, monkeypatch, priority, expected):
+    seen = {}
+
+    async def _assess(job_id, questions, **options):
+        seen[job_id] = (job_control.priority(job_id), job_control.group(job_id), options)
+        return {"total_score": 50.0}
+
+    monkeypatch.setattr(orchestrator, "run_assessment_job", _assess)
+    batch_id = f"batch-options-{expected}"
+    students = [{"job_id": f"{batch_id}-{i}", "filename": f"s{i}.pdf", "questions": [{"question_id": "1"}]} for i in range(2)]
+    run(orchestrator.run_batch_job(batch_id, students, delivery="as_completed", priority=priority,
+                                   deadline_seconds=60.0, progress_payload="lean"))
+
+    assert store.get_job(batch_id)["status"] == STATUS_COMPLETED
+    for st in students:
+        got_priority, group, options = seen[st["job_id"]]
+        assert got_priority == expected and group == batch_id
+        assert options == {"stream": None, "delivery": "as_completed", "priority": expected,
+                           "deadline_seconds": 60.0, "progress_payload": "lean"}
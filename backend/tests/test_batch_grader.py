@@ -0,0 +1,133 @@
+import asyncio
+import json
+import pytest
+from config import settings
+from helpers.job_stats import current_job_id, job_stats
+from helpers.tokens import count_tokens
+from modules import batch_grader as batch_module
+from modules import grader_agent
+from modules.batch_grader import BatchGrader, _BATCH_PROMPT_HEAD, _Item
+from modules.llm_backend import LLMResponse
+from tests.conftest import run
+
+QUESTION = "Osmanlı Devleti hangi yıl kuruldu?"
+KEY = "1299 yılında Osman Bey tarafından kuruldu."
+
+
+class _Backend:
+    """Paket isteğine hazır 'results' listesini döndüren sahte arka uç."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+
+    async def complete(self, messages, **kwargs):
+        self.calls += 1
+        return LLMResponse(json.dumps({"results": self.results}), prompt_tokens=400, completion_tokens=100)
+
+
+def _entry(item_id, score=8.0, reasoning="Doğru yıl."):
+    return {"item_id": item_id, "score": score, "turkish_reasoning": reasoning, "turkish_tips": "", "overall_comment": ""}
+
+
+@pytest.fixture
+def grader(monkeypatch):
+    """Tekil değerlendirmeye düşen öğeler, çağrıldıkları bağlamdaki işle birlikte kaydedilir."""
+    monkeypatch.setattr(settings, "GRADE_BATCH_WINDOW_MS", 1)
+    singles = []
+
+    async def _single(question_id, student_answer, key_answer, question_text=None, stream=None, prompt=None):
+        singles.append((question_id, current_job_id.get()))
+        grader_agent.record_tokens(50, 10)
+        return {"question_id": question_id, "score": 5.0, "prompt_tokens": 50, "completion_tokens": 10}
+
+    monkeypatch.setattr(grader_agent, "_grade_uncached", _single)
+    grader = BatchGrader()
+    grader.singles = singles
+    return grader
+
+
+def _grade_all(grader, answers):
+    """Her (job_id, question_id, cevap) ayrı görevde, kendi işine bağlı olarak değerlendirilir."""
+
+    async def _one(job_id, question_id, answer):
+        job_stats.bind(job_id)
+        return await grader.grade(question_id, answer, KEY, QUESTION)
+
+    async def main():
+        return await asyncio.gather(*(asyncio.create_task(_one(*a)) for a in answers))
+
+    return run(main())
+
+
+def test_missing_and_malformed_items_fall_back_to_single_grading(grader, monkeypatch):
+    backend = _Backend([_entry("i0"), _entry("i2", score="on"), _entry("i3", score=12.0)])
+    monkeypatch.setattr(batch_module, "get_backend", lambda: backend)
+    answers = [("job-fb", str(i), f"cevap {i}") for i in range(4)]
+    results = _grade_all(grader, answers)
+    stats = job_stats.pop("job-fb")
+
+    assert backend.calls == 1
+    assert results[0]["score"] == 8.0 and results[0]["batch"]["size"] == 4
+    # i1 eksik, i2 sayı değil, i3 aralık dışı → tekil değerlendirme
+    assert sorted(q for q, _ in grader.singles) == ["1", "2", "3"]
+    assert all("batch" not in r for r in results[1:])
+    assert stats["batch_fallbacks"] == 3
+
+
+def test_batch_and_fallback_usage_is_attributed_to_each_items_job(grader, monkeypatch):
+    backend = _Backend([_entry("i0"), _entry("i1")])
+    monkeypatch.setattr(batch_module, "get_backend", lambda: backend)
+    # Son öğe (job-b) paketi boşaltır; i2 eksik olduğundan tekil çağrı job-b'ye yazılmalı
+    answers = [("job-a", "1", "cevap a1"), ("job-a", "2", "cevap a2"), ("job-b", "1", "cevap b1")]
+    _grade_all(grader, answers)
+    a, b = job_stats.pop("job-a"), job_stats.pop("job-b")
+
+    assert grader.singles == [("1", "job-b")]
+    share_prompt, share_completion = round(400 / 3), round(100 / 3)
+    assert a["llm_prompt_tokens"] == 2 * share_prompt and a["llm_completion_tokens"] == 2 * share_completion
+    assert b["llm_prompt_tokens"] == share_prompt + 50 and b["llm_completion_tokens"] == share_completion + 10
+    assert "batch_fallbacks" not in a and b["batch_fallbacks"] == 1
+
+
+def test_single_item_batch_runs_in_items_job(grader, monkeypatch):
+    backend = _Backend([])
+    monkeypatch.setattr(batch_module, "get_backend", lambda: backend)
+    _grade_all(grader, [("job-one", "1", "tek cevap")])
+    stats = job_stats.pop("job-one")
+    assert backend.calls == 0
+    assert grader.singles == [("1", "job-one")]
+    assert "batch_fallbacks" not in stats and stats["llm_prompt_tokens"] == 50
+
+
+def _items(answers, question=QUESTION, key=KEY):
+    loop = asyncio.new_event_loop()
+    try:
+        return [_Item(str(i), question, a, key, loop.create_future(), "job") for i, a in enumerate(answers)]
+    finally:
+        loop.close()
+
+
+def test_pack_splits_over_budget(monkeypatch):
+    grader = BatchGrader()
+    items = _items([f"birinci grup cevabı {i}" for i in range(3)])
+    group_tokens = count_tokens(QUESTION) + count_tokens(KEY) + 16
+    # Başlık + grup başlığı + iki öğe sığar, üçüncü öğe yeni pakete geçer
+    budget = count_tokens(_BATCH_PROMPT_HEAD) + group_tokens + sum(grader._item_tokens(it) for it in items[:2])
+    monkeypatch.setattr(settings, "GRADE_BATCH_TOKEN_BUDGET", budget)
+    monkeypatch.setattr(settings, "GRADE_BATCH_MAX_ITEMS", 12)
+    assert grader._pack(items) == [items[:2], items[2:]]
+
+
+def test_pack_keeps_question_groups_together(monkeypatch):
+    monkeypatch.setattr(settings, "GRADE_BATCH_TOKEN_BUDGET", 100_000)
+    first = _items(["cevap 1", "cevap 2"])
+    other = _items(["1071"], question="Malazgirt Savaşı ne zaman oldu?", key="1071")
+    assert BatchGrader()._pack([first[0], other[0], first[1]]) == [[first[0], first[1], other[0]]]
+
+
+def test_pack_respects_max_items(monkeypatch):
+    monkeypatch.setattr(settings, "GRADE_BATCH_TOKEN_BUDGET", 100_000)
+    monkeypatch.setattr(settings, "GRADE_BATCH_MAX_ITEMS", 2)
+    batches = BatchGrader()._pack(_items([f"cevap {i}" for i in range(5)]))
+    assert [len(b) for b in batches] == [2, 2, 1]
@@ -0,0 +1,88 @@
+import sqlite3
+import time
+from helpers.grade_cache import GradeCache, grading_key
+from helpers.pdf_cache import PDFCache, content_hash
+
+
+def _sum_size(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM pdf_cache").fetchone()[0]
+
+
+def test_pdf_cache_roundtrip_and_content_hash(tmp_path):
+    cache = PDFCache(str(tmp_path / "pdf.sqlite3"), max_bytes=10_000, version="v1")
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 test")
+    digest = content_hash(str(pdf))
+    assert digest == content_hash(b"%PDF-1.4 test")
+    assert cache.get(digest, "pages") is None
+    cache.put(digest, "pages", ["sayfa 1", "sayfa 2"])
+    assert cache.get(digest, "pages") == ["sayfa 1", "sayfa 2"]
+    assert cache.get(digest, "student") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_pdf_cache_version_change_drops_entries(tmp_path):
+    path = str(tmp_path / "pdf.sqlite3")
+    old = PDFCache(path, max_bytes=10_000, version="v1")
+    old.put("d1", "pages", ["x" * 100])
+    assert old.total_bytes() > 0
+    new = PDFCache(path, max_bytes=10_000, version="v2")
+    assert new.get("d1", "pages") is None
+    assert new.total_bytes() == 0 == _sum_size(path)
+
+
+def test_pdf_cache_lru_eviction_and_running_total(tmp_path):
+    path = str(tmp_path / "pdf.sqlite3")
+    cache = PDFCache(path, max_bytes=1_000, version="v1")
+    for i in range(4):
+        cache.put(f"d{i}", "pages", "x" * 200)
+        time.sleep(0.002)
+    cache.get("d0", "pages")            # d0 yeniden kullanıldı → en eski d1 olur
+    time.sleep(0.002)
+    cache.put("d4", "pages", "y" * 300)
+    assert cache.get("d1", "pages") is None
+    assert cache.get("d0", "pages") is not None
+    assert cache.total_bytes() == _sum_size(path) <= 1_000
+    # Aynı anahtarın üzerine yazılması toplamı farkla günceller
+    cache.put("d4", "pages", "z" * 10)
+    assert cache.total_bytes() == _sum_size(path)
+    # Sınırdan büyük değer hiç yazılmaz
+    cache.put("big", "pages", "x" * 2_000)
+    assert cache.get("big", "pages") is None
+    assert cache.total_bytes() == _sum_size(path)
+
+
+def test_pdf_cache_total_initialised_for_existing_file(tmp_path):
+    path = str(tmp_path / "pdf.sqlite3")
+    PDFCache(path, max_bytes=10_000, version="v1").put("d1", "pages", "x" * 50)
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE pdf_cache_stats")
+    reopened = PDFCache(path, max_bytes=10_000, version="v1")
+    assert reopened.total_bytes() == _sum_size(path) > 0
+
+
+def test_grading_key_normalises_text_and_versions():
+    base = grading_key("Soru?", "Cevap  metni", "Anahtar", "m", 0.2, "1")
+    assert grading_key("soru?", "cevap metni ", "ANAHTAR", "m", 0.2, "1") == base
+    assert grading_key("Soru?", "Cevap metni", "Anahtar", "m", 0.2, "2") != base
+    assert grading_key("Soru?", "Cevap metni", "Anahtar", "m", 0.3, "1") != base
+    assert grading_key("Soru?", "Başka cevap", "Anahtar", "m", 0.2, "1") != base
+
+
+def test_grade_cache_ttl_and_lru(tmp_path):
+    cache = GradeCache(str(tmp_path / "grade.sqlite3"), ttl_seconds=3600, max_entries=3)
+    for i in range(3):
+        cache.put(f"k{i}", {"score": i})
+        time.sleep(0.002)
+    assert cache.get("k0") == {"score": 0}      # k0 yeniden kullanıldı → en eski k1 olur
+    time.sleep(0.002)
+    cache.put("k3", {"score": 3})
+    assert cache.get("k1") is None
+    assert {k: cache.get(k) for k in ("k0", "k2", "k3")} == {"k0": {"score": 0}, "k2": {"score": 2}, "k3": {"score": 3}}
+
+    expired = GradeCache(str(tmp_path / "grade.sqlite3"), ttl_seconds=1, max_entries=10)
+    with sqlite3.connect(expired.path) as conn:
+        conn.execute("UPDATE grade_cache SET created_at = created_at - 10 WHERE key = 'k0'")
+    assert expired.get("k0") is None
+    assert expired.get("k2") == {"score": 2}
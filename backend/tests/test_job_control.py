@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from config import settings
+from helpers import job_store
+from helpers.job_control import JobControl, PRIORITY_BATCH, PRIORITY_INTERACTIVE, job_control
+from helpers.job_store import MemoryJobStore, STATUS_FAILED
+from modules import dispatch
+from tests.conftest import run
+
+
+def test_cancel_unknown_job_does_not_create_entry():
+    control = JobControl()
+    assert control.cancel("missing", "iptal") is False
+    assert control.reason("missing") is None
+    assert control._jobs == {}
+
+
+def test_cancel_before_task_starts_is_applied_on_track():
+    control = JobControl()
+
+    async def _job():
+        control.track("job", PRIORITY_BATCH)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            return control.absorb("job")
+        finally:
+            control.release("job")
+
+    async def main():
+        control.expect("job", PRIORITY_BATCH)
+        assert control.priority("job") == PRIORITY_BATCH
+        assert control.cancel("job", "iptal") is True
+        assert control.cancel("job", "tekrar") is False
+        return await asyncio.create_task(_job())
+
+    assert run(main()) == "iptal"
+    assert control._jobs == {}
+
+
+def test_batch_cancel_reaches_students_and_active_skips_cancelled():
+    control = JobControl()
+
+    async def _batch():
+        control.track("batch", PRIORITY_BATCH)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            return control.absorb("batch")
+
+    async def main():
+        control.expect("student", PRIORITY_BATCH, group="batch")
+        control.track("live", PRIORITY_INTERACTIVE)
+        batch = asyncio.create_task(_batch())
+        await asyncio.sleep(0)
+        assert control.group("student") == "batch" and control.group("live") == "live"
+        assert sorted(control.active()) == ["batch", "live"]
+        assert control.cancel("batch", "toplu iptal") is True
+        assert await batch == "toplu iptal"
+        assert control.reason("student") == "toplu iptal"
+        assert control.reason("live") is None
+        return control.active()
+
+    assert run(main()) == ["live"]
+
+
+@pytest.fixture
+def store():
+    previous = job_store._store
+    store = MemoryJobStore()
+    job_store.set_job_store(store)
+    yield store
+    job_store.set_job_store(previous)
+
+
+def test_cancel_of_job_not_running_here_leaves_no_entry(store):
+    # Depoda bitmemiş görünen ama bu süreçte çalışmayan iş (ör. başka bir süreçte) — kayıt açılmaz
+    store.create_job("orphan", "single")
+    assert run(dispatch.request_cancel("orphan", "iptal")) is True
+    assert job_control.reason("orphan") is None
+    assert "orphan" not in job_control._jobs
+
+
+def test_failed_batch_releases_student_entries(store, tmp_path):
+    key = tmp_path / "key.pdf"
+    key.write_bytes(b"not a pdf")
+    students = [{"job_id": f"fail-st-{i}", "filename": f"s{i}.pdf", "source": str(tmp_path / f"s{i}.pdf")}
+                for i in range(2)]
+    for st in students:
+        store.create_job(st["job_id"], "single", "fail-batch")
+    store.create_job("fail-batch", "batch")
+
+    async def main():
+        await dispatch.submit_batch("fail-batch", str(key), "key.pdf", students)
+        assert all(st["job_id"] in job_control._jobs for st in students)
+        while store.get_job("fail-batch")["status"] != STATUS_FAILED:
+            await asyncio.sleep(0.01)
+
+    run(asyncio.wait_for(main(), 10))
+    assert not any(j in job_control._jobs for j in ["fail-batch", "fail-st-0", "fail-st-1"])
+    assert all(store.get_job(st["job_id"])["status"] == STATUS_FAILED for st in students)
+
+
+@pytest.mark.parametrize("mode, cancelled", [("inline", True), ("queue", False)])
+def test_disconnected_live_job_is_cancelled_only_inline(store, monkeypatch, mode, cancelled):
+    # Queue modunda istemci başka bir API sürecine yeniden bağlanmış olabilir; yerel abonelik yokluğu yetmez
+    monkeypatch.setattr(settings, "EXECUTION_MODE", mode)
+    monkeypatch.setattr(settings, "JOB_DISCONNECT_CANCEL_SECONDS", 0.001)
+    requested = []
+
+    async def _request_cancel(job_id, reason):
+        requested.append(job_id)
+        return True
+
+    monkeypatch.setattr(dispatch, "request_cancel", _request_cancel)
+    job_id = f"abandoned-{mode}"
+    store.create_job(job_id, "single")
+    run(dispatch.cancel_if_abandoned(job_id))
+    assert requested == ([job_id] if cancelled else [])
@@ -0,0 +1,72 @@
+import pytest
+from helpers import job_store
+from helpers.job_control import PRIORITY_BATCH, job_control
+from helpers.job_store import (MemoryJobStore, SQLiteJobStore, STATUS_CANCELLED, STATUS_COMPLETED, STATUS_FAILED,
+                               STATUS_RUNNING)
+from modules import dispatch, orchestrator
+from tests.conftest import run
+
+QUESTIONS = [
+    {"question_id": str(i), "question_text": f"Soru {i}", "student_answer": f"Cevap {i}", "key_answer": f"Anahtar {i}",
+     "student_name": "Ayşe"}
+    for i in (1, 2, 3)
+]
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    previous = job_store._store
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3")) if request.param == "sqlite" else MemoryJobStore()
+    job_store.set_job_store(store)
+    yield store
+    job_store.set_job_store(previous)
+
+
+def test_finish_completes_running_job(store):
+    store.create_job("job", "single", status=STATUS_RUNNING)
+    store.finish("job", {"total_score": 80.0})
+    job = store.get_job("job")
+    assert job["status"] == STATUS_COMPLETED and job["summary"] == {"total_score": 80.0}
+
+
+@pytest.mark.parametrize("terminal", ["cancel", STATUS_FAILED, STATUS_COMPLETED])
+def test_finish_does_not_overwrite_terminal_status(store, terminal):
+    store.create_job("job", "single", status=STATUS_RUNNING)
+    if terminal == "cancel":
+        assert store.cancel("job", "iptal") is True
+        expected, error, summary = STATUS_CANCELLED, "iptal", None
+    elif terminal == STATUS_FAILED:
+        store.set_status("job", STATUS_FAILED, "hata")
+        expected, error, summary = STATUS_FAILED, "hata", None
+    else:
+        store.finish("job", {"total_score": 50.0})
+        expected, error, summary = STATUS_COMPLETED, None, {"total_score": 50.0}
+
+    # İptal/hata sonrasında biten görev özeti yazmaya çalışabilir
+    store.finish("job", {"total_score": 90.0})
+    job = store.get_job("job")
+    assert (job["status"], job["error"], job["summary"]) == (expected, error, summary)
+
+
+def test_resume_grades_only_missing_questions_with_stored_priority(store, monkeypatch):
+    job_id = f"resume-{type(store).__name__}"
+    store.create_job(job_id, "single", options={"priority": PRIORITY_BATCH})
+    store.save_questions(job_id, QUESTIONS)
+    store.save_result(job_id, "2", 2, {"question_id": "2", "score": 6.0, "turkish_reasoning": "Önceki sonuç."})
+    graded = []
+
+    async def _grade(question_id, student_answer, key_answer, question_text=None, on_partial=None):
+        graded.append((question_id, job_control.priority(job_id)))
+        return {"question_id": question_id, "score": 10.0, "turkish_reasoning": "Doğru."}
+
+    monkeypatch.setattr(orchestrator, "grade_one", _grade)
+    task = {"job_id": job_id, "priority": PRIORITY_BATCH, "deadline_seconds": 60.0}
+    assert run(dispatch._resume_single(task)) is True
+
+    assert sorted(graded) == [("1", PRIORITY_BATCH), ("3", PRIORITY_BATCH)]
+    job = store.get_job(job_id)
+    assert job["status"] == STATUS_COMPLETED
+    assert job["summary"]["meta"]["resumed_questions"] == 1
+    rows, total = store.get_results(job_id)
+    assert total == 3 and [r["question_id"] for r in rows] == ["1", "2", "3"]
+    assert job_id not in job_control._jobs
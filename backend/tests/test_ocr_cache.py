@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from config import settings
+from helpers.pdf_cache import PDFCache, content_hash
+from modules import ingestion
+from tests.conftest import run
+
+PDF = b"%PDF-1.4 taranmis sinav"
+PAGES = ["Soru 1\nBirinci cevap", ""]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Havuz yerine thread havuzu; ikinci sayfanın metin katmanı yok (taranmış)."""
+    pool = ThreadPoolExecutor(2)
+    cache = PDFCache(str(tmp_path / "pdf.sqlite3"), max_bytes=1_000_000)
+    monkeypatch.setattr(settings, "PDF_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "OCR_ENABLED", True)
+    monkeypatch.setattr(ingestion, "pdf_cache", cache)
+    monkeypatch.setattr(ingestion, "get_pool", lambda: pool)
+    monkeypatch.setattr(ingestion, "ocr_available", lambda: True)
+    monkeypatch.setattr(ingestion, "extract_pages_timed",
+                        lambda source, filename, start, end: (PAGES[start:end], len(PAGES), [0.0] * (end - start)))
+    yield cache
+    pool.shutdown()
+
+
+def _ocr(text, error=None):
+    return lambda source, filename, index, opts: {"text": text, "seconds": 0.0, "cached": False, "error": error}
+
+
+def test_failed_ocr_page_is_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(ingestion, "ocr_page", _ocr("", error="timeout"))
+    run(ingestion.parse_student_bytes(PDF, "s.pdf"))
+    digest = content_hash(PDF)
+    assert cache.get(digest, "pages") is None
+    assert cache.get(digest, "student") is None
+
+
+def test_unavailable_ocr_page_is_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(ingestion, "ocr_available", lambda: False)
+    run(ingestion.parse_student_bytes(PDF, "s.pdf"))
+    assert cache.get(content_hash(PDF), "pages") is None
+
+
+def test_successful_ocr_page_is_cached(cache, monkeypatch):
+    monkeypatch.setattr(ingestion, "ocr_page", _ocr("Soru 2\nEl yazısı cevap"))
+    run(ingestion.parse_student_bytes(PDF, "s.pdf"))
+    assert cache.get(content_hash(PDF), "pages") == [PAGES[0], "Soru 2\nEl yazısı cevap"]
+    assert cache.get(content_hash(PDF), "student") is not None
@@ -0,0 +1,84 @@
+import math
+import pytest
+from config import settings
+from modules import grader_agent
+from modules.pregrader import _is_blank, decide, similarities
+from tests.conftest import run
+
+KEY = "Osmanlı Devleti 1299 yılında kuruldu"
+
+
+def test_similarities_matches_hand_computed_tfidf():
+    # Belgeler: "elma ve armut", "kiraz" (öğrenciler) + "Elma" (ortak anahtar); "ve" durak kelimesi atılır
+    sims = similarities(["elma ve armut", "kiraz"], ["Elma", "Elma"])
+    # 3 belge; df(elma)=2, df(armut)=1 → idf = ln((1+3)/(1+df)) + 1
+    idf_elma, idf_armut = math.log(4 / 3) + 1, math.log(4 / 2) + 1
+    expected = idf_elma / math.sqrt(idf_elma ** 2 + idf_armut ** 2)
+    assert sims.tolist() == pytest.approx([expected, 0.0])
+
+
+def test_similarities_of_identical_and_empty_answers():
+    assert similarities([KEY, ""], [KEY, KEY]).tolist() == pytest.approx([1.0, 0.0])
+    assert similarities([], []).size == 0
+
+
+@pytest.mark.parametrize("similarity, expected", [
+    (0.97, (10.0, "matches_key")),
+    (0.96, None),
+    (0.03, None),
+    (0.02, (0.0, "unrelated")),
+])
+def test_decide_thresholds(monkeypatch, similarity, expected):
+    monkeypatch.setattr(settings, "PREGRADE_HIGH_THRESHOLD", 0.97)
+    monkeypatch.setattr(settings, "PREGRADE_LOW_THRESHOLD", 0.02)
+    assert decide(similarity, KEY) == expected
+
+
+@pytest.mark.parametrize("key", ["", "   ", "ve de ile"])
+def test_decide_without_key_terms_is_undecided(key):
+    assert decide(0.0, key) is None
+    assert decide(1.0, key) is None
+
+
+@pytest.mark.parametrize("text, blank", [
+    (None, True), ("", True), (" - ", True), ("Bilmiyorum.", True), ("BİLMİYORUM HOCAM", True),
+    ("fikrim yok!", True), ("Yok", False), ("x", False), ("1299", False),
+])
+def test_is_blank(text, blank):
+    assert _is_blank(text) is blank
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Model çağrısı yerine sabit sonuç; çağrılan soru kimlikleri kaydedilir."""
+    monkeypatch.setattr(settings, "PREGRADE_WINDOW_MS", 1)
+    calls = []
+
+    async def _grade_llm(question_id, student_answer, key_answer, question_text, on_partial):
+        calls.append(question_id)
+        return {"question_id": question_id, "score": 7.0, "prompt_tokens": 100, "completion_tokens": 20}
+
+    monkeypatch.setattr(grader_agent, "_grade_llm", _grade_llm)
+    return calls
+
+
+def test_on_mode_scores_decided_answers_without_llm(llm, monkeypatch):
+    monkeypatch.setattr(settings, "PREGRADE_MODE", "on")
+    exact = run(grader_agent.grade_one("1", KEY, KEY))
+    blank = run(grader_agent.grade_one("2", "bilmiyorum", KEY))
+    unsure = run(grader_agent.grade_one("3", "Devlet 1453 yılında İstanbul'u aldı", KEY))
+
+    assert llm == ["3"]
+    assert exact["score"] == 10.0 and exact["pregrade"]["reason"] == "matches_key" and exact["pregrade"]["applied"]
+    assert blank["score"] == 0.0 and blank["pregrade"]["reason"] == "blank"
+    assert exact["prompt_tokens"] == blank["prompt_tokens"] == 0
+    assert unsure["score"] == 7.0 and "pregrade" not in unsure
+
+
+def test_shadow_mode_still_calls_llm_and_records_decision(llm, monkeypatch):
+    monkeypatch.setattr(settings, "PREGRADE_MODE", "shadow")
+    result = run(grader_agent.grade_one("1", KEY, KEY))
+    assert llm == ["1"]
+    assert result["score"] == 7.0 and result["prompt_tokens"] == 100
+    assert result["pregrade"]["reason"] == "matches_key" and result["pregrade"]["score"] == 10.0
+    assert result["pregrade"]["applied"] is False
@@ -0,0 +1,59 @@
+import pytest
+from config import settings
+from helpers.job_stats import current_job_id, job_stats
+from helpers.tokens import count_tokens
+from modules.prompt_builder import GRADING_INSTRUCTIONS, build_grading_prompt, trim_inputs
+
+QUESTION = "Tanzimat Fermanı'nın ilan edilme nedenlerini açıklayınız."
+KEY = "1839'da ilan edildi; Avrupa devletlerinin desteğini kazanmak ve merkezi otoriteyi güçlendirmek amaçlandı."
+
+
+def _long_answer(words: int) -> str:
+    return " ".join(f"kelime{i}" for i in range(words)) + " SONUÇ: reformlar devleti kurtarmak içindi."
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    monkeypatch.setattr(settings, "GRADE_PROMPT_QUESTION_MAX_TOKENS", 200)
+    monkeypatch.setattr(settings, "GRADE_PROMPT_KEY_MAX_TOKENS", 200)
+    monkeypatch.setattr(settings, "GRADE_PROMPT_ANSWER_MAX_TOKENS", 100)
+
+
+def test_short_inputs_are_not_trimmed(budgets):
+    q, k, s, removed = trim_inputs(QUESTION, KEY, "Osmanlı'yı kurtarmak için.")
+    assert (q, k, s, removed) == (QUESTION, KEY, "Osmanlı'yı kurtarmak için.", 0)
+
+
+def test_long_answer_is_trimmed_to_budget_keeping_head_and_tail(budgets):
+    answer = _long_answer(400)
+    q, k, s, removed = trim_inputs(QUESTION, KEY, answer)
+    assert (q, k) == (QUESTION, KEY)
+    assert removed > 0 and "token kısaltıldı" in s
+    assert s.startswith("kelime0") and s.endswith("devleti kurtarmak içindi.")
+    # İşaret metni kadar pay bırakılır
+    assert count_tokens(s, settings.LLM_MODEL) <= settings.GRADE_PROMPT_ANSWER_MAX_TOKENS + 15
+
+
+def test_trimmed_prompt_keeps_rubric_and_key_and_uses_fewer_tokens(budgets, monkeypatch):
+    answer = _long_answer(400)
+    trimmed = build_grading_prompt(answer, KEY, QUESTION)
+    monkeypatch.setattr(settings, "GRADE_PROMPT_ANSWER_MAX_TOKENS", 0)
+    full = build_grading_prompt(answer, KEY, QUESTION)
+
+    assert full.trimmed_tokens == 0 and trimmed.trimmed_tokens > 0
+    assert trimmed.tokens < full.tokens
+    assert full.tokens - trimmed.tokens == pytest.approx(trimmed.trimmed_tokens, abs=20)
+    # Yönergeler (system) ve soru + anahtar mesajı kısaltmadan etkilenmez (önek önbelleği korunur)
+    assert trimmed.messages[0] == full.messages[0] == {"role": "system", "content": GRADING_INSTRUCTIONS}
+    assert trimmed.messages[1] == full.messages[1]
+    assert f"[Cevap Anahtarı]\n{KEY}" in trimmed.messages[1]["content"]
+    assert trimmed.messages[2]["content"].startswith("[Öğrenci Cevabı]\n")
+
+
+def test_trimming_is_counted_for_the_current_job(budgets):
+    token = job_stats.bind("job-trim")
+    try:
+        _, _, _, removed = trim_inputs(QUESTION, KEY, _long_answer(400))
+    finally:
+        current_job_id.reset(token)
+    assert job_stats.pop("job-trim")["llm_trimmed_tokens"] == removed
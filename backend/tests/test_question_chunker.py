@@ -0,0 +1,76 @@
+import random
+import re
+from helpers.pdf_utils import KeyQuestionParser, QuestionChunker, StudentQuestionParser, chunk_by_questions, iter_questions
+
+_TOKENS = ["Soru 1:", "Soru 2.", "soru 10:", "SORU 3:", "Soru", "Sor", "So", "S", "Soru 4", "u 5:", " ", " ", "\n",
+           "\n\n", ":", ".", "Cevap:", "Osmanlı", "1299", "kuruldu", "Soru  7:", "Sorular", "ası"]
+
+
+def _baseline(text):
+    """Artımlı bölücüden önceki chunk_by_questions (tüm metni tek seferde bölen referans)."""
+    parts = re.split(r"(Soru\s+\d+[:\.])", text, flags=re.IGNORECASE)
+    chunks, cur_id, buf = [], None, []
+    for part in parts:
+        if re.match(r"Soru\s+\d+[:\.]", part, flags=re.IGNORECASE):
+            if cur_id is not None and buf:
+                chunks.append({"question_id": cur_id, "text": "\n".join(buf).strip()})
+            cur_id = re.findall(r"\d+", part)[0]
+            buf = []
+        else:
+            buf.append(part)
+    if cur_id is not None and buf:
+        chunks.append({"question_id": cur_id, "text": "\n".join(buf).strip()})
+    return chunks
+
+
+def _split_pages(rng, text):
+    cuts = sorted(rng.sample(range(len(text) + 1), k=min(len(text) + 1, rng.randint(0, 6))))
+    bounds = [0, *cuts, len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _chunk_pages(pages):
+    chunker = QuestionChunker()
+    out = []
+    for page in pages:
+        out.extend(chunker.feed(page))
+    return out + chunker.finish()
+
+
+def test_single_text_matches_baseline():
+    text = "Ad Soyad: Ali\nSoru 1: Ne zaman?\nCevap: 1299\nSoru 2. İkinci\nSoru 2: tekrar\nsoru 3:"
+    assert chunk_by_questions(text) == _baseline(text)
+    assert [c["question_id"] for c in chunk_by_questions(text)] == ["1", "2", "2", "3"]
+    assert chunk_by_questions("başlıksız metin") == []
+
+
+def test_header_split_across_pages():
+    pages = ["Giriş\nSo", "ru 1", "2: birinci cevap\nSoru", " 13. ikinci"]
+    assert _chunk_pages(pages) == _baseline("\n".join(pages))
+
+
+def test_random_page_splits_match_baseline():
+    rng = random.Random(1234)
+    for _ in range(3000):
+        text = "".join(rng.choice(_TOKENS) for _ in range(rng.randint(0, 40)))
+        pages = _split_pages(rng, text)
+        assert _chunk_pages(pages) == _baseline("\n".join(pages)), pages
+
+
+def test_questions_are_emitted_as_soon_as_the_next_header_appears():
+    chunker = QuestionChunker()
+    assert chunker.feed("Soru 1: birinci") == []
+    assert chunker.feed("devam\nSoru 2: ikinci") == [{"question_id": "1", "text": "birinci\ndevam"}]
+    assert chunker.finish() == [{"question_id": "2", "text": "ikinci"}]
+    assert chunker.count == 2
+
+
+def test_student_and_key_parsers():
+    student = list(iter_questions(StudentQuestionParser(), [
+        "Adı Soyadı: Ayşe Yılmaz\nSoru 1: Osmanlı ne zaman kuruldu?\nCevap: 1299",
+        "Soru 2: İstanbul ne zaman alındı?\nCevap: 1453",
+    ]))
+    assert [(r["question_id"], r["student_answer"], r["student_name"]) for r in student] == [
+        ("1", "1299", "Ayşe Yılmaz"), ("2", "1453", "Ayşe Yılmaz")]
+    key = list(iter_questions(KeyQuestionParser(), ["Soru 1: Osmanlı ne zaman kuruldu?\n\n1299 yılında."]))
+    assert key == [{"question_id": "1", "question_text": "Osmanlı ne zaman kuruldu?", "key_answer": "1299 yılında."}]
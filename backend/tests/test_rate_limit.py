@@ -0,0 +1,139 @@
+import time
+import pytest
+from config import settings
+from helpers.job_stats import job_stats
+from modules import rate_limit
+from modules.llm_backend import LLMBackendError, LLMRateLimitError
+from modules.rate_limit import CircuitBreaker, RateLimiter, _Bucket, call_with_retry
+from modules.scheduler import LLMScheduler
+from tests.conftest import run
+
+
+def test_bucket_refills_at_limit_per_minute_up_to_capacity():
+    bucket = _Bucket(60)
+    bucket.level, bucket.updated = 0.0, 100.0
+    bucket.refill(110.0)
+    assert bucket.level == pytest.approx(10.0)
+    assert bucket.wait_for(15) == pytest.approx(5.0)
+    bucket.refill(1000.0)
+    assert bucket.level == 60.0
+    # Kapasiteden büyük istek kova dolunca geçer
+    assert bucket.wait_for(500) == 0.0
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = _Bucket(0)
+    bucket.refill(time.monotonic() + 60)
+    assert bucket.wait_for(10_000) == 0.0
+
+
+def test_bucket_aligns_with_provider_headers():
+    bucket = _Bucket(100)
+    bucket.observe(200, 30, now=5.0)
+    assert (bucket.limit, bucket.level, bucket.updated) == (200, 30.0, 5.0)
+    # Kalan değer yerel tahminden büyükse kova büyütülmez
+    bucket.observe(None, 150, now=6.0)
+    assert bucket.level == 30.0
+
+
+def test_try_acquire_accounts_tokens_and_reserves_nothing_when_waiting():
+    limiter = RateLimiter(0, 6000)
+    assert limiter.try_acquire(4000) == 0.0
+    assert limiter.tokens.level == pytest.approx(2000, abs=1)
+    # 2000 token eksik: 6000 TPM → ~20 sn; bekleme süresince hiçbir şey ayrılmaz
+    assert limiter.try_acquire(4000) == pytest.approx(20.0, abs=0.1)
+    assert limiter.tokens.level == pytest.approx(2000, abs=1)
+    assert limiter.try_acquire(1000) == 0.0
+    assert limiter.tokens.level == pytest.approx(1000, abs=1)
+
+
+def test_try_acquire_needs_both_request_and_token_capacity():
+    limiter = RateLimiter(1, 100_000)
+    assert limiter.try_acquire(10) == 0.0
+    assert limiter.try_acquire(10) == pytest.approx(60.0, abs=0.1)
+    assert limiter.tokens.level == pytest.approx(100_000 - 10, abs=5)
+
+
+class _Scheduler:
+    def __init__(self):
+        self.pauses = []
+
+    def pause(self, seconds: float):
+        self.pauses.append(seconds)
+
+
+def test_circuit_breaker_opens_with_doubling_cooldown_and_resets_on_success(monkeypatch):
+    sched = _Scheduler()
+    monkeypatch.setattr(rate_limit, "llm_scheduler", sched)
+    breaker = CircuitBreaker(threshold=3, cooldown=1.0, max_cooldown=3.0)
+
+    def _trip():
+        for _ in range(3):
+            breaker.record_failure()
+        # Devre açıkken gelen hatalar aynı kesintiye sayılır
+        breaker.record_failure()
+        assert breaker.failures == 0
+        breaker._open_until = 0.0
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert sched.pauses == [] and breaker.failures == 2
+    breaker.record_failure()
+    assert sched.pauses == [1.0] and breaker.trips == 1
+    breaker._open_until = 0.0
+    _trip()
+    _trip()
+    assert sched.pauses == [1.0, 2.0, 3.0]
+
+    breaker.record_success()
+    assert breaker.stats() == {"consecutive_failures": 0, "trips": 0}
+    _trip()
+    assert sched.pauses[-1] == 1.0
+
+
+def test_retry_after_pauses_scheduler_below_threshold(monkeypatch):
+    sched = _Scheduler()
+    monkeypatch.setattr(rate_limit, "llm_scheduler", sched)
+    breaker = CircuitBreaker(threshold=5, cooldown=1.0, max_cooldown=10.0)
+    breaker.record_failure(retry_after=2.5)
+    assert sched.pauses == [2.5] and breaker.failures == 1
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    """Global zamanlayıcı ve devre kesici yerine test başına yenileri; beklemeler kısa."""
+    monkeypatch.setattr(rate_limit, "llm_scheduler", LLMScheduler(4))
+    monkeypatch.setattr(rate_limit, "circuit_breaker", CircuitBreaker(100, 1.0, 1.0))
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_MS", 1)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_MS", 5)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+
+
+def _failing(errors):
+    calls = []
+
+    async def _call():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return _call, calls
+
+
+def test_call_with_retry_counts_retries_and_rate_limits(isolated):
+    factory, calls = _failing([LLMRateLimitError("429", retry_after=0.01), LLMBackendError("502")])
+    assert run(call_with_retry(factory, job_ids=["job-retry"])) == "ok"
+    stats = job_stats.pop("job-retry")
+    assert len(calls) == 3
+    assert stats["llm_retries"] == 2 and stats["llm_rate_limited"] == 1
+    assert rate_limit.circuit_breaker.failures == 0
+
+
+def test_call_with_retry_gives_up_after_max_retries(isolated):
+    factory, calls = _failing([LLMBackendError("502")] * 5)
+    with pytest.raises(LLMBackendError):
+        run(call_with_retry(factory, job_ids=["job-give-up"]))
+    job_stats.pop("job-give-up")
+    assert len(calls) == settings.LLM_MAX_RETRIES + 1
+    assert rate_limit.circuit_breaker.failures == len(calls)
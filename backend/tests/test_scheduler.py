@@ -0,0 +1,183 @@
+import asyncio
+import time
+import pytest
+from config import settings
+from helpers.job_control import JobControl, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from helpers.job_stats import job_stats
+from modules import rate_limit, scheduler
+from modules.llm_backend import LLMBackendError
+from modules.rate_limit import RateLimiter, call_with_retry
+from modules.scheduler import LLMScheduler
+from tests.conftest import run
+
+
+@pytest.fixture
+def control(monkeypatch):
+    """Zamanlayıcının öncelik/grup okuduğu kayıt; testler arasında paylaşılmaz."""
+    control = JobControl()
+    monkeypatch.setattr(scheduler, "job_control", control)
+    monkeypatch.setattr(rate_limit, "job_control", control)
+    return control
+
+
+def _limiter(rpm: int) -> RateLimiter:
+    """Boş başlayan RPM kovası: her slot kovanın dolmasını bekler (rpm=6000 → 10 ms'de bir istek)."""
+    limiter = RateLimiter(rpm, 0)
+    limiter.requests.level = 0.0
+    return limiter
+
+
+def _call(sched: LLMScheduler, order: list, label: str, job_id: str, **kwargs) -> asyncio.Task:
+    async def _work():
+        order.append(label)
+        await asyncio.sleep(0)
+    return asyncio.create_task(sched.run(_work(), job_ids=[job_id], **kwargs))
+
+
+def test_interactive_overtakes_rate_limited_batch_backlog(control):
+    async def main():
+        control.track("batch", PRIORITY_BATCH)
+        control.track("live", PRIORITY_INTERACTIVE)
+        sched = LLMScheduler(8)
+        sched.set_limiter(_limiter(6000))
+        order: list = []
+        tasks = [_call(sched, order, f"b{i}", "batch", tokens=100) for i in range(10)]
+        await asyncio.sleep(0)
+        assert sched.waiting == 10
+        tasks.append(_call(sched, order, "live", "live", tokens=100))
+        await asyncio.gather(*tasks)
+        return order
+
+    order = run(main())
+    assert order[0] == "live"
+    assert order[1:] == [f"b{i}" for i in range(10)]
+
+
+def test_fast_path_respects_empty_bucket(control):
+    async def main():
+        sched = LLMScheduler(4)
+        sched.set_limiter(_limiter(6000))
+        started = time.monotonic()
+        await sched.run(asyncio.sleep(0), job_ids=["job"])
+        return time.monotonic() - started, sched.waiting
+
+    elapsed, waiting = run(main())
+    assert elapsed >= 0.009
+    assert waiting == 0
+
+
+def test_throttle_wait_is_recorded_per_job(control):
+    async def main():
+        sched = LLMScheduler(1)
+        sched.set_limiter(_limiter(600))
+        await sched.run(asyncio.sleep(0), job_ids=["job-throttled"])
+
+    run(main())
+    assert job_stats.pop("job-throttled").get("llm_throttle_wait_ms", 0) >= 90
+
+
+def test_groups_share_slots_round_robin(control):
+    async def main():
+        control.track("a1", PRIORITY_BATCH, group="batch-a")
+        control.track("a2", PRIORITY_BATCH, group="batch-a")
+        control.track("b", PRIORITY_BATCH)
+        sched = LLMScheduler(1)
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(sched.run(gate.wait(), job_ids=["b"]))
+        await asyncio.sleep(0)
+        order: list = []
+        tasks = [
+            _call(sched, order, "a1-1", "a1"), _call(sched, order, "a2-1", "a2"), _call(sched, order, "a1-2", "a1"),
+            _call(sched, order, "b-1", "b"), _call(sched, order, "b-2", "b"),
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        return order
+
+    # Toplu işin öğrencileri (a1, a2) tek grup sayılır; b ile sırayla paylaşılır
+    assert run(main()) == ["a1-1", "b-1", "a2-1", "b-2", "a1-2"]
+
+
+def test_urgent_deadline_goes_first_within_class(control):
+    async def main():
+        sched = LLMScheduler(1)
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(sched.run(gate.wait(), job_ids=["other"]))
+        await asyncio.sleep(0)
+        order: list = []
+        tasks = [
+            _call(sched, order, "relaxed", "relaxed"),
+            _call(sched, order, "far", "far", deadline=time.monotonic() + 3600),
+            _call(sched, order, "urgent", "urgent", deadline=time.monotonic() + 1),
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        return order
+
+    assert run(main()) == ["urgent", "relaxed", "far"]
+
+
+def test_pause_delays_new_calls(control):
+    async def main():
+        sched = LLMScheduler(2)
+        sched.pause(0.05)
+        started = time.monotonic()
+        await sched.run(asyncio.sleep(0), job_ids=["job"])
+        return time.monotonic() - started
+
+    assert run(main()) >= 0.045
+
+
+def test_cancelled_waiter_is_skipped_and_frees_nothing(control):
+    async def main():
+        sched = LLMScheduler(1)
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(sched.run(gate.wait(), job_ids=["a"]))
+        await asyncio.sleep(0)
+        order: list = []
+        dropped = _call(sched, order, "dropped", "a")
+        kept = _call(sched, order, "kept", "b")
+        await asyncio.sleep(0)
+        dropped.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, kept)
+        return order, sched.stats()
+
+    order, stats = run(main())
+    assert order == ["kept"]
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+@pytest.mark.parametrize("priority", [PRIORITY_INTERACTIVE, PRIORITY_BATCH])
+def test_retry_past_deadline_only_abandoned_for_interactive_jobs(control, monkeypatch, priority):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_MS", 1)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_MS", 5)
+    job_id = f"late-{priority}"
+    attempts = []
+
+    async def _flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise LLMBackendError("geçici hata")
+        return "ok"
+
+    async def main():
+        control.track(job_id, priority)
+        job_stats.bind(job_id, deadline_seconds=0.001)
+        await asyncio.sleep(0.01)
+        return await call_with_retry(_flaky, job_ids=[job_id])
+
+    try:
+        if priority == PRIORITY_INTERACTIVE:
+            with pytest.raises(LLMBackendError):
+                run(main())
+            assert len(attempts) == 1
+        else:
+            # Kuyrukta son tarihini geçirmiş toplu iş çağrısı yine tekrarlanır
+            assert run(main()) == "ok"
+            assert len(attempts) == 2
+    finally:
+        job_stats.pop(job_id)
@@ -0,0 +1,98 @@
+import json
+import pytest
+from helpers.job_stats import job_stats
+from helpers.partial_json import PartialJSONParser, parse_partial_object
+from modules.grader_agent import grade_one
+from tests.conftest import run
+
+ANSWER = json.dumps({
+    "score": 7.5,
+    "turkish_reasoning": "Cevap \"temel\" kavramları içeriyor.\nAyrıntı eksik.",
+    "details": {"a": [1, "}"]},
+    "overall_comment": "İyi",
+}, ensure_ascii=False)
+
+
+def test_partial_parser_char_by_char():
+    parser = PartialJSONParser()
+    seen_reasoning = []
+    for ch in ANSWER:
+        fields = parser.feed(ch)
+        if "turkish_reasoning" in fields:
+            seen_reasoning.append(fields["turkish_reasoning"])
+        if "score" in fields:
+            assert fields["score"] == 7.5
+    final = json.loads(ANSWER)
+    assert parser.feed("") == {k: v for k, v in final.items() if k != "details"}
+    # Yarım metin her adımda bir öncekinin uzantısıdır
+    for prev, cur in zip(seen_reasoning, seen_reasoning[1:]):
+        assert cur.startswith(prev)
+    assert seen_reasoning[-1] == final["turkish_reasoning"]
+
+
+def test_partial_number_waits_for_delimiter():
+    assert parse_partial_object('{"score": 7') == {}
+    assert parse_partial_object('{"score": 7.5,') == {"score": 7.5}
+    assert parse_partial_object('{"turkish_reasoning": "a\\') == {"turkish_reasoning": "a"}
+    assert parse_partial_object('{"turkish_reasoning": "\\u00e') == {"turkish_reasoning": ""}
+
+
+async def _grade_streamed(backend, question_id="1"):
+    partials = []
+
+    async def on_partial(fields):
+        partials.append(dict(fields))
+
+    token = job_stats.bind(f"test-stream-{question_id}")
+    try:
+        result = await grade_one(question_id, "Osmanlı 1299'da kuruldu.", "Osmanlı Devleti 1299'da kuruldu.",
+                                 "Osmanlı Devleti ne zaman kuruldu?", on_partial=on_partial)
+    finally:
+        await backend.close()
+    return result, partials, job_stats.pop(f"test-stream-{question_id}")
+
+
+def _assert_monotonic(partials, result):
+    assert partials, "no partial messages were published"
+    assert "score" in partials[0]
+    assert all(p["score"] == result["score"] for p in partials if "score" in p)
+    texts = [p["turkish_reasoning"] for p in partials if "turkish_reasoning" in p]
+    assert len(texts) == len(set(texts)), "a partial was published twice"
+    for prev, cur in zip(texts, texts[1:]):
+        assert cur.startswith(prev) and len(cur) > len(prev)
+    assert result["turkish_reasoning"].startswith(texts[-1])
+
+
+def test_stream_against_fake_server(fake_openai):
+    from modules.llm_backend import get_backend
+    result, partials, stats = run(_grade_streamed(get_backend()))
+    assert not result.get("error"), result
+    assert 0 <= result["score"] <= 10
+    assert result["turkish_reasoning"]
+    _assert_monotonic(partials, result)
+    assert "llm_retries" not in stats
+
+
+def test_stream_retry_does_not_republish_partials(fake_openai):
+    from modules.llm_backend import get_backend
+    # İlk akış puan ve açıklamanın bir kısmı yayınlandıktan sonra kopar; yeniden deneme tamamlar
+    fake_openai.DROP_AFTER_CHUNKS = 15
+    result, partials, stats = run(_grade_streamed(get_backend(), "2"))
+    assert not result.get("error"), result
+    assert stats.get("llm_retries") == 1
+    assert len(fake_openai._dropped) == 1
+    assert sum(1 for p in partials if p.get("score") is not None and p == partials[0]) == 1
+    _assert_monotonic(partials, result)
+
+
+@pytest.mark.parametrize("drop_after", [3, 9])
+def test_stream_retry_result_matches_uninterrupted(fake_openai, drop_after):
+    from modules.llm_backend import get_backend, set_backend, OpenAIBackend
+    base_url = str(get_backend().client.base_url)
+    clean, _, _ = run(_grade_streamed(get_backend(), "3"))
+    set_backend(OpenAIBackend("fake", base_url))
+    fake_openai.DROP_AFTER_CHUNKS = drop_after
+    retried, partials, stats = run(_grade_streamed(get_backend(), "3"))
+    assert stats.get("llm_retries") == 1
+    assert {k: retried[k] for k in ("score", "turkish_reasoning")} == {k: clean[k] for k in ("score", "turkish_reasoning")}
+    _assert_monotonic(partials, retried)
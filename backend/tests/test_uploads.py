@@ -0,0 +1,87 @@
+import io
+import os
+import zipfile
+import pytest
+from config import settings
+from helpers.pdf_utils import PDFParseError
+from helpers.uploads import TooManyFiles, UploadTooLarge, unzip_pdfs
+
+PDF = b"%PDF-1.4\n" + b"0" * 1000
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    spool = tmp_path / "spool"
+    monkeypatch.setattr(settings, "UPLOAD_SPOOL_DIR", str(spool))
+    return spool
+
+
+def _zip(tmp_path, members) -> str:
+    path = tmp_path / "class.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return str(path)
+
+
+def test_unzip_extracts_pdfs_only(tmp_path, spool_dir):
+    path = _zip(tmp_path, [("a.pdf", PDF), ("notes.txt", b"x"), ("dir/b.PDF", PDF), ("__MACOSX/.c.pdf", PDF)])
+    out = unzip_pdfs(path, "class.zip", max_files=5, max_total_bytes=10_000)
+    assert [name for name, _ in out] == ["a.pdf", "b.PDF"]
+    assert all(open(p, "rb").read() == PDF for _, p in out)
+
+
+def test_unzip_stops_at_file_limit_and_cleans_up(tmp_path, spool_dir):
+    path = _zip(tmp_path, [(f"s{i}.pdf", PDF) for i in range(10)])
+    with pytest.raises(TooManyFiles):
+        unzip_pdfs(path, "class.zip", max_files=3)
+    assert os.listdir(spool_dir) == []
+
+
+def test_unzip_enforces_total_extracted_size(tmp_path, spool_dir, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 50_000)
+    # Küçük zip, büyük açılmış boyut (yüksek sıkıştırma oranı)
+    bomb = b"%PDF-1.4\n" + b"\0" * 30_000
+    path = _zip(tmp_path, [(f"s{i}.pdf", bomb) for i in range(5)])
+    assert os.path.getsize(path) < 2_000
+    with pytest.raises(UploadTooLarge):
+        unzip_pdfs(path, "class.zip", max_total_bytes=70_000)
+    assert os.listdir(spool_dir) == []
+
+
+def test_unzip_rejects_member_over_per_file_limit(tmp_path, spool_dir, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 500)
+    path = _zip(tmp_path, [("ok.pdf", PDF[:400]), ("big.pdf", PDF)])
+    with pytest.raises(UploadTooLarge):
+        unzip_pdfs(path, "class.zip", max_total_bytes=1_000_000)
+    assert os.listdir(spool_dir) == []
+
+
+def test_unzip_bad_archive(tmp_path, spool_dir):
+    path = tmp_path / "bad.zip"
+    path.write_bytes(b"not a zip")
+    with pytest.raises(PDFParseError):
+        unzip_pdfs(str(path), "bad.zip")
+
+
+def test_batch_endpoint_rejects_oversized_zip_before_submitting(tmp_path, spool_dir, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routes import assess
+
+    async def _fail(*args, **kwargs):
+        raise AssertionError("batch must not be submitted")
+
+    monkeypatch.setattr(settings, "BATCH_MAX_STUDENTS", 3)
+    monkeypatch.setattr(assess, "submit_batch", _fail)
+    app = FastAPI()
+    app.include_router(assess.router, prefix="/api")
+    zip_path = _zip(tmp_path, [(f"s{i}.pdf", PDF) for i in range(4)])
+    with TestClient(app) as client, open(zip_path, "rb") as fh:
+        resp = client.post("/api/assess/batch", files=[
+            ("answer_key", ("key.pdf", PDF, "application/pdf")),
+            ("student_pdfs", ("class.zip", fh, "application/zip")),
+        ])
+    assert resp.status_code == 400
+    assert "3" in resp.json()["detail"]
+    assert os.listdir(spool_dir) == []
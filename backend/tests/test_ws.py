@@ -0,0 +1,116 @@
+import json
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from helpers import job_store
+from helpers.job_store import MemoryJobStore, STATUS_CANCELLED
+from config import settings
+from helpers.ws_manager import JobChannel, ws_manager
+from modules.orchestrator import ResultRecord
+from routes import ws
+
+
+@pytest.fixture
+def client():
+    previous = job_store._store
+    store = MemoryJobStore()
+    job_store.set_job_store(store)
+    app = FastAPI()
+    app.include_router(ws.router)
+    with TestClient(app) as c:
+        c.store = store
+        yield c
+    job_store.set_job_store(previous)
+
+
+def _receive_until_close(sock):
+    messages = []
+    with pytest.raises(WebSocketDisconnect) as closed:
+        while True:
+            messages.append(sock.receive_json())
+    return messages, closed.value.code
+
+
+def test_unknown_job_closes_with_error(client):
+    with client.websocket_connect("/ws/assess/nope") as sock:
+        messages, code = _receive_until_close(sock)
+    assert code == ws.CLOSE_UNKNOWN_JOB
+    assert [m["type"] for m in messages] == ["error"]
+    assert not ws_manager.has_channel("nope")
+
+
+def test_finished_job_without_channel_gets_final_state(client):
+    client.store.create_job("done-1", "single", None, "a.pdf")
+    client.store.finish("done-1", {"total_score": 42})
+    with client.websocket_connect("/ws/assess/done-1?since=7") as sock:
+        messages, code = _receive_until_close(sock)
+    assert [m["type"] for m in messages] == ["summary", "done"]
+    assert messages[0]["payload"] == {"total_score": 42}
+    assert code == 1000
+    assert not ws_manager.has_channel("done-1")
+
+
+def test_cancelled_batch_without_channel(client):
+    client.store.create_job("batch-1", "batch", None, "key.pdf")
+    client.store.cancel("batch-1", "iptal")
+    assert client.store.get_job("batch-1")["status"] == STATUS_CANCELLED
+    with client.websocket_connect("/ws/assess/batch-1") as sock:
+        messages, _ = _receive_until_close(sock)
+    assert messages[0] == {"type": "error", "job_id": "batch-1", "payload": {"message": "iptal", "cancelled": True}}
+    assert messages[1]["type"] == "done"
+
+
+def _message(job_id, size):
+    return {"type": "progress", "job_id": job_id, "payload": {"question_id": "1", "reasoning_tr": "ğ" * size}}
+
+
+def test_replay_buffer_compresses_large_messages(monkeypatch):
+    monkeypatch.setattr(settings, "WS_COMPRESS_MIN_BYTES", 256)
+    chan = JobChannel(10)
+    small, large = _message("j", 10), _message("j", 2000)
+    chan.publish(small)
+    chan.publish(large)
+    (c1, f1), (c2, f2) = chan.replay(0)
+    assert isinstance(f1, str) and json.loads(f1) == {**small, "cursor": 1}
+    assert isinstance(f2, bytes) and json.loads(zlib.decompress(f2).decode("utf-8")) == {**large, "cursor": 2}
+    assert chan.buffer_bytes == len(f1) + len(f2) < len(json.dumps(large, ensure_ascii=False).encode("utf-8"))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_compressed_replay_round_trips_over_socket(client, monkeypatch, compress):
+    monkeypatch.setattr(settings, "WS_COMPRESS_MIN_BYTES", 256)
+    job_id = f"replay-{compress}"
+    client.store.create_job(job_id, "single")
+    chan = ws_manager.get_or_create_channel(job_id)
+    sent = [_message(job_id, 10), _message(job_id, 2000), {"type": "done", "job_id": job_id}]
+    for m in sent:
+        chan.publish(m)
+    chan.close()
+    try:
+        with client.websocket_connect(f"/ws/assess/{job_id}?compress={int(compress)}") as sock:
+            first = sock.receive_json()
+            if compress:
+                # Sıkıştırılmış mesaj ikili çerçeve olarak gelir; istemci açar
+                second = json.loads(zlib.decompress(sock.receive_bytes()).decode("utf-8"))
+            else:
+                second = sock.receive_json()
+            third = sock.receive_json()
+    finally:
+        ws_manager._jobs.pop(job_id, None)
+    assert [first, second, third] == [{**m, "cursor": i} for i, m in enumerate(sent, start=1)]
+
+
+def test_lean_progress_payload_keeps_fields_ui_reads():
+    question = {"question_text": " Soru ", "student_answer": " Cevap ", "key_answer": " Anahtar ", "student_name": "Ayşe"}
+    grade = {"score": 7.0, "turkish_reasoning": "İyi.", "turkish_tips": "Örnek ver.", "overall_comment": "Yeterli."}
+    record = ResultRecord("3", 2, 7.0, question, grade)
+    lean = record.progress(seq=1, total=5, lean=True)
+    assert lean == {
+        "question_id": "3", "seq": 1, "position": 2, "total": 5, "normalized_score": 7.0, "student_name": "Ayşe",
+        "reasoning_tr": "İyi.", "tips_tr": "Örnek ver.", "overall_comment": "Yeterli.", "error": False,
+    }
+    # UI, student_answer alanının yokluğundan lean modu anlar ve metinleri ayrıca alır
+    full = record.progress(seq=1, total=5, lean=False)
+    assert full == {**lean, "question_text": "Soru", "student_answer": "Cevap", "key_answer": "Anahtar"}
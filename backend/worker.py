@@ -0,0 +1,150 @@
+"""
+Kuyruk modu worker süreci (EXECUTION_MODE=queue):
+
+    python worker.py
+
+Kuyruktan görev sahiplenir (aynı anda en fazla WORKER_CONCURRENCY iş), PDF ayrıştırma + değerlendirmeyi
+bu süreçte yürütür ve ilerleme mesajlarını broker üzerinden API süreçlerine aktarır. Birden fazla worker
+(aynı makinede veya farklı makinelerde) aynı kuyruğu paylaşabilir.
+"""
+import time
+
+# Import süresi (/readyz'de raporlanır)
+_import_started = time.perf_counter()
+
+import asyncio
+import json
+import os
+import signal
+import socket
+from typing import Dict
+from config import settings
+from helpers.broker import get_broker
+from helpers.log import get_logger, setup_logging
+from helpers.metrics import registry, CONTENT_TYPE
+from helpers.ws_manager import ws_manager
+from modules.dispatch import EventOutbox, run_task, task_blob_keys, watch_cancellations
+from modules.ingestion import shutdown_pool
+from modules.warmup import warmup, warmup_steps
+from modules.llm_backend import close_backend
+
+log = get_logger("worker")
+
+warmup.import_seconds = round(time.perf_counter() - _import_started, 3)
+
+
+async def _heartbeat(broker, running: Dict[str, asyncio.Task]):
+    interval = max(1.0, settings.QUEUE_VISIBILITY_TIMEOUT_SECONDS / 3)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await broker.heartbeat(list(running))
+        except Exception as e:
+            log.error("Queue heartbeat failed: %s", e)
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Yalnızca GET /metrics, /healthz ve /readyz'e cevap veren küçük HTTP sunucusu (worker'da FastAPI yoktur).
+    /readyz ısınma bitene kadar 503 döner.
+    """
+    try:
+        request = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        path = request.split(b" ")[1:2]
+        content_type = "application/json"
+        if path == [b"/metrics"]:
+            status, body, content_type = "200 OK", registry.render().encode(), CONTENT_TYPE
+        elif path == [b"/healthz"]:
+            status, body = "200 OK", b'{"ok": true}'
+        elif path == [b"/readyz"]:
+            status = "200 OK" if warmup.ready else "503 Service Unavailable"
+            body = json.dumps(warmup.status()).encode()
+        else:
+            status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def _execute(broker, outbox: EventOutbox, task_id: str, task: Dict):
+    log.info("📥 Task %s claimed (%s job %s).", task_id, task["kind"], task["job_id"])
+    try:
+        await run_task(task)
+    except Exception as e:
+        # Orkestratör kendi hatalarını işler; buraya gelen beklenmedik hata yeniden denenmez
+        log.exception("Task %s failed: %s", task_id, e)
+    # Olaylar görev silinmeden önce yayınlanmış olmalı
+    await outbox.flush()
+    await broker.ack(task_id, task_blob_keys(task))
+    log.info("✅ Task %s done.", task_id)
+
+
+async def run_worker():
+    broker = get_broker()
+    outbox = EventOutbox(broker)
+    ws_manager.set_relay(outbox)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    slots = asyncio.Semaphore(max(1, settings.WORKER_CONCURRENCY))
+    running: Dict[str, asyncio.Task] = {}
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    # PDF/LLM yığını ve ayrıştırma havuzu ilk görevden önce arka planda ısınır
+    warmup.start(warmup_steps(executes_jobs=True) if settings.WARMUP_ENABLED else [])
+    hb = asyncio.create_task(_heartbeat(broker, running))
+    # API'den (veya kopan WebSocket'ten) gelen iptaller iş deposu üzerinden okunur
+    canceller = asyncio.create_task(watch_cancellations())
+    metrics_server = None
+    if settings.WORKER_METRICS_PORT:
+        metrics_server = await asyncio.start_server(_serve_metrics, "0.0.0.0", settings.WORKER_METRICS_PORT)
+    log.info("👷 Worker %s started (%s, concurrency=%d).", worker_id, settings.QUEUE_BACKEND, settings.WORKER_CONCURRENCY)
+    try:
+        while not stop.is_set():
+            await slots.acquire()
+            claimed = None
+            if not stop.is_set():
+                claimed = await broker.claim(worker_id, timeout=1.0)
+            if claimed is None:
+                slots.release()
+                continue
+            task_id, task = claimed
+            t = asyncio.create_task(_execute(broker, outbox, task_id, task))
+            running[task_id] = t
+
+            def _finished(_, task_id=task_id):
+                running.pop(task_id, None)
+                slots.release()
+            t.add_done_callback(_finished)
+
+        # Yeni görev alınmaz; süren işler tamamlanır (zorla durdurulursa görev başka worker'a geçer)
+        if running:
+            log.info("Worker stopping; waiting for %d running task(s).", len(running))
+            await asyncio.gather(*running.values(), return_exceptions=True)
+    finally:
+        hb.cancel()
+        canceller.cancel()
+        warmup.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        await outbox.close()
+        shutdown_pool()
+        await close_backend()
+        await broker.close()
+        log.info("Worker %s stopped.", worker_id)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(run_worker())
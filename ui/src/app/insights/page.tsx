@@ -12,6 +12,7 @@ import {
   Legend,
 } from "chart.js";
 import { getRunsDedup, palette, clearRuns } from "@/lib/runs";
+import { getInsights, ClassInsights } from "@/lib/api";
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, Tooltip, Legend);
 
@@ -19,7 +20,11 @@ export default function InsightsPage() {
   const [runs, setRuns] = useState<any[]>([]);
   const [selected, setSelected] = useState<string[]>([]);
 
+  const [classInsights, setClassInsights] = useState<ClassInsights | null>(null);
+
   useEffect(() => { setRuns(getRunsDedup()); }, []);
+  // Sınıf geneli istatistikler sunucuda hesaplanıp önbelleğe alınır; burada yalnızca gösterilir
+  useEffect(() => { getInsights().then(setClassInsights).catch(() => setClassInsights(null)); }, []);
 
   const { labels, datasetsLine, datasetsBar, maxPerQ, totalLabels, totalValues } = useMemo(() => {
     const allQ = new Set<string>();
@@ -171,6 +176,34 @@ export default function InsightsPage() {
         </div>
       </div>
 
+      {classInsights && classInsights.per_question.length ? (
+        <div className="panel" style={{ marginTop: 16 }}>
+          <h3>Sınıf Analitiği — Soru İstatistikleri <span className="info" data-tip="Kayıtlı tüm sonuçlar üzerinden sunucuda hesaplanır. Güçlük: ortalama/10 (yüksek → kolay). Ayırt edicilik: üst %27 ile alt %27 öğrenci grubunun farkı. r: soru puanı ile diğer soruların toplamı arasındaki korelasyon."><span className="info-icon">i</span></span></h3>
+          <div className="muted">{classInsights.students} öğrenci · ortalama toplam {classInsights.totals.mean?.toFixed(2) ?? "—"} · medyan {classInsights.totals.percentiles["50"]?.toFixed(2) ?? "—"}</div>
+          <div style={{ maxHeight: 320, overflow: "auto", marginTop: 8 }}>
+            <table style={{ width: "100%", borderCollapse: "collapse" }}>
+              <thead>
+                <tr>
+                  {["Soru", "n", "Ortalama", "Güçlük", "Ayırt Edicilik", "r", "P25", "Medyan", "P75"].map(h => (
+                    <th key={h} style={{ textAlign: h === "Soru" ? "left" : "right", padding: 6, borderBottom: "1px solid var(--border)" }}>{h}</th>
+                  ))}
+                </tr>
+              </thead>
+              <tbody>
+                {classInsights.per_question.map(q => (
+                  <tr key={q.question_id}>
+                    <td style={{ padding: 6, borderBottom: "1px solid var(--border)" }}>S{q.question_id}</td>
+                    {[q.n, q.mean, q.difficulty, q.discrimination, q.item_rest_r, q.percentiles["25"], q.percentiles["50"], q.percentiles["75"]].map((v, i) => (
+                      <td key={i} style={{ padding: 6, borderBottom: "1px solid var(--border)", textAlign: "right" }}>{v == null ? "—" : i === 0 ? v : Number(v).toFixed(2)}</td>
+                    ))}
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      ) : null}
+
       {/* Alt satır: dağılım ve ısı haritası placeholder */}
       <div className="grid" style={{ gridTemplateColumns: "1fr 1fr", gap: 16, marginTop: 16 }}>
         <div className="panel">
@@ -1,11 +1,25 @@
-import type { ProgressMessage } from "@/types";
+import type { ProgressMessage, PartialMessage } from "@/types";
 
-export default function ProgressItem({ msg }: { msg: ProgressMessage }) {
+export default function ProgressItem({ msg }: { msg: ProgressMessage | PartialMessage }) {
+  if (msg.type === "partial") {
+    const p = msg.payload;
+    return (
+      <div className="item">
+        <div>
+          <b>Soru {p.question_id}</b> — <span className="score">{p.normalized_score !== undefined ? p.normalized_score.toFixed(2) : "…"}</span>
+          &nbsp;<span className="muted">(değerlendiriliyor)</span>
+        </div>
+        {p.reasoning_tr ? <div style={{ marginTop: 6 }}><b>Model Yorumu:</b> {p.reasoning_tr}…</div> : null}
+      </div>
+    );
+  }
   const q = msg.payload;
   return (
     <div className="item">
       <div>
-        <b>Soru {q.question_id}</b> — <span className="score">{q.normalized_score.toFixed(2)}</span>
+        <b>Soru {q.question_id}</b> — {q.error
+          ? <span className="score" style={{ color: "#b91c1c" }}>değerlendirilemedi</span>
+          : <span className="score">{q.normalized_score.toFixed(2)}</span>}
         {q.student_name ? <> &nbsp;|&nbsp; <b>{q.student_name}</b></> : null}
       </div>
       {q.question_text ? <div className="muted" style={{ marginTop: 6 }}><b>Soru:</b> {q.question_text}</div> : null}
@@ -1,16 +1,56 @@
-import { useMemo, useState } from "react";
-import { startAssessment } from "@/lib/api";
+import { useEffect, useMemo, useState } from "react";
+import { cancelAssessment, getJobQuestions, startAssessment } from "@/lib/api";
+import type { JobQuestion } from "@/lib/api";
 import { useWebSocket } from "@/hooks/useWebSocket";
-import type { WsMessage, ProgressMessage, SummaryMessage } from "@/types";
+import type { WsMessage, ProgressMessage, PartialMessage, SummaryMessage, ErrorMessage } from "@/types";
 
 export function useAssessment() {
   const [jobId, setJobId] = useState<string | undefined>(undefined);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | undefined>(undefined);
+  const [texts, setTexts] = useState<Record<string, JobQuestion> | undefined>(undefined);
   const { messages, connected } = useWebSocket(jobId);
 
-  const progress = useMemo(() => messages.filter(m => m.type === "progress") as ProgressMessage[], [messages]);
+  // "lean" ilerleme mesajları metin taşımaz: soru metinleri iş başına bir kez alınır
+  const lean = useMemo(
+    () => messages.some(m => m.type === "progress" && m.payload.student_answer === undefined),
+    [messages]
+  );
+  useEffect(() => {
+    setTexts(undefined);
+  }, [jobId]);
+  useEffect(() => {
+    if (!jobId || !lean || texts) return;
+    let stale = false;
+    getJobQuestions(jobId)
+      .then(items => { if (!stale) setTexts(Object.fromEntries(items.map(q => [String(q.question_id), q]))); })
+      .catch(() => {});
+    return () => { stale = true; };
+  }, [jobId, lean, texts]);
+
+  // "as_completed" modunda sonuçlar sırasız gelir; position alanına göre yerleştir
+  const progress = useMemo(
+    () => (messages.filter(m => m.type === "progress") as ProgressMessage[])
+      .map(m => {
+        const t = texts?.[m.payload.question_id];
+        if (!t || m.payload.student_answer !== undefined) return m;
+        return { ...m, payload: { ...m.payload, question_text: t.question_text, student_answer: t.student_answer, key_answer: t.key_answer } };
+      })
+      .sort((a, b) => (a.payload.position ?? Number(a.payload.question_id)) - (b.payload.position ?? Number(b.payload.question_id))),
+    [messages, texts]
+  );
+  // Henüz "progress" gelmemiş sorular için son kısmi sonuç
+  const partials = useMemo(() => {
+    const finished = new Set(progress.map(p => p.payload.question_id));
+    const latest = new Map<string, PartialMessage>();
+    messages.forEach(m => {
+      if (m.type === "partial" && !finished.has(m.payload.question_id)) latest.set(m.payload.question_id, m);
+    });
+    return Array.from(latest.values());
+  }, [messages, progress]);
   const summary = useMemo(() => (messages.find(m => m.type === "summary") as SummaryMessage | undefined)?.payload, [messages]);
+  const running = !!jobId && !messages.some(m => m.type === "done");
+  const serverError = useMemo(() => (messages.find(m => m.type === "error") as ErrorMessage | undefined)?.payload.message, [messages]);
 
   async function assess(student: File, key: File) {
     setError(undefined);
@@ -25,5 +65,14 @@ export function useAssessment() {
     }
   }
 
-  return { assess, loading, error, jobId, connected, progress, summary };
+  async function cancel() {
+    if (!jobId) return;
+    try {
+      await cancelAssessment(jobId);
+    } catch (e: any) {
+      setError(e?.message || String(e));
+    }
+  }
+
+  return { assess, cancel, running, loading, error: error || serverError, jobId, connected, progress, partials, summary };
 }
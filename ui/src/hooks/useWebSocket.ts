@@ -2,6 +2,24 @@ import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import type { WsMessage, ProgressMessage } from "@/types";
 import { storage } from "@/lib/api";
 
+// localStorage'a yalnızca kesinleşmiş sonuçlar yazılır ('partial'/'ingest' yazılmaz);
+// 'progress' kayıtları bu süre içinde birleştirilir, 'summary' ve iş sonu hemen yazılır
+const SAVE_DEBOUNCE_MS = 1000;
+
+function persistRun(messages: WsMessage[]) {
+  const job = (messages[messages.length - 1] as any)?.job_id as string | undefined;
+  if (!job) return;
+  const progress = messages.filter((m): m is ProgressMessage => m.type === "progress");
+  const summary = messages.find((m) => m.type === "summary");
+  storage.saveRun({
+    job_id: job,
+    created_at: Date.now(),
+    student_name: progress[0]?.payload.student_name,
+    progress,
+    summary: (summary as any)?.payload,
+  });
+}
+
 type UseWebSocketOptions = {
   urlOverride?: string;
   autoReconnect?: boolean;
@@ -27,6 +45,36 @@ export function useWebSocket(jobId?: string, opts: UseWebSocketOptions = {}) {
   const wsRef = useRef<WebSocket | null>(null);
   const attemptsRef = useRef(0);
   const pingTimerRef = useRef<number | undefined>(undefined);
+  // Son alınan mesajın imleci: yeniden bağlanırken ?since= ile kaçırılanlar tampondan istenir
+  const lastCursorRef = useRef(0);
+  const doneRef = useRef(false);
+  // Henüz localStorage'a yazılmamış son mesaj listesi, bekleyen yazma zamanlayıcısı ve kayıt için incelenen mesaj sayısı
+  const pendingSaveRef = useRef<WsMessage[] | null>(null);
+  const saveTimerRef = useRef<number | undefined>(undefined);
+  const savedCountRef = useRef(0);
+
+  const flushSave = useCallback(() => {
+    if (saveTimerRef.current) {
+      window.clearTimeout(saveTimerRef.current);
+      saveTimerRef.current = undefined;
+    }
+    const pending = pendingSaveRef.current;
+    pendingSaveRef.current = null;
+    if (!pending) return;
+    try { persistRun(pending); } catch {}
+  }, []);
+
+  // Son run’ları localStorage’a kaydet: yeni 'progress' kayıtları birleştirilir, 'summary' / iş sonu hemen yazılır
+  useEffect(() => {
+    if (messages.length < savedCountRef.current) savedCountRef.current = 0;
+    const added = messages.slice(savedCountRef.current);
+    savedCountRef.current = messages.length;
+    if (added.some((m) => m.type === "progress" || m.type === "summary")) pendingSaveRef.current = messages;
+    if (added.some((m) => m.type === "summary" || m.type === "done" || m.type === "error")) flushSave();
+    else if (pendingSaveRef.current && !saveTimerRef.current) {
+      saveTimerRef.current = window.setTimeout(flushSave, SAVE_DEBOUNCE_MS);
+    }
+  }, [messages, flushSave]);
 
   // 🔧 Environment değişkenlerinden URL’leri al
   const API_URL = process.env.NEXT_PUBLIC_API_URL || "";
@@ -55,7 +103,8 @@ export function useWebSocket(jobId?: string, opts: UseWebSocketOptions = {}) {
   const connect = useCallback(() => {
     if (!url) return;
     try {
-      const ws = new WebSocket(url);
+      const since = lastCursorRef.current;
+      const ws = new WebSocket(since ? `${url}?since=${since}` : url);
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -69,6 +118,8 @@ export function useWebSocket(jobId?: string, opts: UseWebSocketOptions = {}) {
 
       ws.onclose = () => {
         setConnected(false);
+        // İş bittiyse (done alındı) yeniden bağlanmaya gerek yok
+        if (doneRef.current) return;
         if (autoReconnect && attemptsRef.current < reconnectAttempts) {
           attemptsRef.current += 1;
           const delay = reconnectIntervalMs * attemptsRef.current;
@@ -84,27 +135,9 @@ export function useWebSocket(jobId?: string, opts: UseWebSocketOptions = {}) {
       ws.onmessage = (e) => {
         try {
           const msg: WsMessage = JSON.parse(e.data);
-          setMessages((prev) => {
-            const next = [...prev, msg];
-
-            // Son run’ları localStorage’a kaydet
-            try {
-              const job = (msg as any).job_id as string;
-              if (job) {
-                const progress = next.filter((m): m is ProgressMessage => m.type === "progress");
-                const summary = next.find((m) => m.type === "summary");
-                const studentName = progress[0]?.payload.student_name;
-                storage.saveRun({
-                  job_id: job,
-                  created_at: Date.now(),
-                  student_name: studentName,
-                  progress,
-                  summary: (summary as any)?.payload,
-                });
-              }
-            } catch {}
-            return next;
-          });
+          if (typeof msg.cursor === "number") lastCursorRef.current = msg.cursor;
+          if (msg.type === "done") doneRef.current = true;
+          setMessages((prev) => [...prev, msg]);
           onMessage?.(msg);
         } catch {}
       };
@@ -117,10 +150,16 @@ export function useWebSocket(jobId?: string, opts: UseWebSocketOptions = {}) {
   useEffect(() => {
     if (!jobId || !url) return;
     if (clearOnNewJob) setMessages([]);
+    lastCursorRef.current = 0;
+    doneRef.current = false;
     cleanup();
     connect();
-    return () => cleanup();
-  }, [jobId, url, clearOnNewJob, connect, cleanup]);
+    return () => {
+      cleanup();
+      // Sayfadan çıkılırken / iş değişirken bekleyen kayıt kaybolmasın
+      flushSave();
+    };
+  }, [jobId, url, clearOnNewJob, connect, cleanup, flushSave]);
 
   const send = useCallback((data: string) => {
     try { wsRef.current?.send(data); } catch {}
@@ -12,6 +12,60 @@ export async function startAssessment(student: File, key: File): Promise<{ job_i
   return res.json();
 }
 
+// Süren değerlendirmeyi iptal eder (sunucu bekleyen model çağrılarını durdurur)
+export async function cancelAssessment(jobId: string): Promise<void> {
+  const res = await fetch(`${API_URL}/api/jobs/${encodeURIComponent(jobId)}/cancel`, { method: "POST" });
+  // 409: iş zaten bitmiş
+  if (!res.ok && res.status !== 409) {
+    const text = await res.text();
+    throw new Error(text || `HTTP ${res.status}`);
+  }
+}
+
+export type JobQuestion = {
+  question_id: string;
+  question_text?: string;
+  student_answer?: string;
+  key_answer?: string;
+};
+
+// İşin ayrıştırılmış soru metinleri (metinsiz "lean" ilerleme mesajlarını tamamlamak için)
+export async function getJobQuestions(jobId: string): Promise<JobQuestion[]> {
+  const res = await fetch(`${API_URL}/api/jobs/${encodeURIComponent(jobId)}/questions`);
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  return (await res.json()).items;
+}
+
+export type QuestionInsight = {
+  question_id: string;
+  n: number;
+  mean: number | null;
+  std: number | null;
+  difficulty: number | null;       // ortalama / 10 (yüksek → kolay)
+  discrimination: number | null;   // üst %27 − alt %27 ortalama farkı / 10
+  item_rest_r: number | null;      // soru puanı ile diğer soruların toplamı arasındaki korelasyon
+  percentiles: Record<string, number | null>;
+  distribution: number[];          // 0–10 puan, 10 kova
+};
+
+export type ClassInsights = {
+  scope: string;
+  version: number;
+  students: number;
+  questions: number;
+  per_question: QuestionInsight[];
+  item_correlations: (number | null)[][];
+  totals: { mean: number | null; std: number | null; percentiles: Record<string, number | null>; distribution: number[]; top: string[] };
+};
+
+// Sunucuda önbelleğe alınmış sınıf analitiği; batchId verilmezse tüm işler
+export async function getInsights(batchId?: string): Promise<ClassInsights> {
+  const qs = batchId ? `?batch_id=${encodeURIComponent(batchId)}` : "";
+  const res = await fetch(`${API_URL}/api/insights${qs}`);
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  return res.json();
+}
+
 export type AssessRun = {
   job_id: string;
   created_at: number;
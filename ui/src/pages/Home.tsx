@@ -6,7 +6,7 @@ import ErrorBanner from "@/components/ErrorBanner";
 import { useAssessment } from "@/hooks/useAssessment";
 
 export default function Home() {
-  const { assess, loading, error, progress, summary } = useAssessment();
+  const { assess, cancel, running, loading, error, progress, partials, summary } = useAssessment();
   const [selected, setSelected] = (require("react") as typeof import("react")).useState<{student?: File|null; key?: File|null}>({});
 
   return (
@@ -39,6 +39,9 @@ export default function Home() {
                   <div><b>Öğrenci PDF:</b> {selected.student ? selected.student.name : "—"}</div>
                   <div style={{ marginTop: 4 }}><b>Cevap Anahtarı:</b> {selected.key ? selected.key.name : "—"}</div>
                 </div>
+                {running && (
+                  <button type="button" className="btn" style={{ marginTop: 12 }} onClick={cancel}>Değerlendirmeyi İptal Et</button>
+                )}
               </div>
             </div>
           </div>
@@ -49,6 +52,9 @@ export default function Home() {
               {progress.map((m, i) => (
                 <ProgressItem key={i} msg={m} />
               ))}
+              {partials.map(m => (
+                <ProgressItem key={`partial-${m.payload.question_id}`} msg={m} />
+              ))}
             </div>
           </div>
         </div>
@@ -3,14 +3,30 @@ export type ProgressMessage = {
   job_id: string;
   payload: {
     question_id: string;
+    seq?: number;       // yayın sırası
+    position?: number;  // sınav içindeki yer (1..N)
+    total?: number;
     normalized_score: number;
+    // progress_payload="lean" işlerde metinler gelmez; GET /api/jobs/{job_id}/questions ile tamamlanır
     question_text?: string;
-    student_answer: string;
-    key_answer: string;
+    student_answer?: string;
+    key_answer?: string;
     student_name?: string;
     reasoning_tr?: string;
     tips_tr?: string;
     overall_comment?: string;
+    error?: boolean;    // yeniden denemelere rağmen değerlendirilemedi (puan gerçek değil)
+  };
+};
+
+// Akış modunda: önce puan, ardından büyüyen model yorumu gelir; ardından aynı soru için "progress" gelir.
+export type PartialMessage = {
+  type: "partial";
+  job_id: string;
+  payload: {
+    question_id: string;
+    normalized_score?: number;
+    reasoning_tr?: string;
   };
 };
 
@@ -27,7 +43,16 @@ export type SummaryMessage = {
   };
 };
 
+export type IngestMessage = {
+  type: "ingest";
+  job_id: string;
+  payload: { stage: "student" | "key"; pages_done: number; pages_total: number; cached?: boolean };
+};
+
 export type DoneMessage = { type: "done"; job_id: string; payload: { message: string } };
-export type ErrorMessage = { type: "error"; job_id: string; payload: { message: string } };
+export type ErrorMessage = { type: "error"; job_id: string; payload: { message: string; cancelled?: boolean } };
 
-export type WsMessage = ProgressMessage | SummaryMessage | DoneMessage | ErrorMessage;
+// cursor: sunucunun kanal içi artan mesaj imleci (yeniden bağlanırken ?since= ile kullanılır)
+export type WsMessage = (IngestMessage | PartialMessage | ProgressMessage | SummaryMessage | DoneMessage | ErrorMessage) & {
+  cursor?: number;
+};